@@ -13,58 +13,63 @@ import {
     DropdownMenuSeparator,
 } from "@/components/ui/dropdown-menu"
 import { formatPhoneNumber } from "@/lib/utils"
+import { api, Client } from "@/services/api"
 
-type Client = {
-    id: number;
-    telegram_id: number;
-    first_name: string;
-    username?: string;
-    photo_url?: string;
-    phone_number?: string;
-    created_at: string;
-    orders_count: number;
-    total_spent: number;
-}
+const PAGE_SIZE = 50
 
 export default function ClientsPage() {
     const router = useRouter()
     const [searchQuery, setSearchQuery] = useState("")
+    const [debouncedSearch, setDebouncedSearch] = useState("")
     const [clients, setClients] = useState<Client[]>([])
+    const [total, setTotal] = useState(0)
     const [isLoading, setIsLoading] = useState(true)
+    const [isLoadingMore, setIsLoadingMore] = useState(false)
     const [filterType, setFilterType] = useState<'all' | 'online' | 'offline'>('all')
     const [sortOrder, setSortOrder] = useState<'new' | 'old'>('new')
 
     useEffect(() => {
-        fetch('/api/clients')
-            .then(res => res.json())
-            .then(data => {
-                setClients(data)
-                setIsLoading(false)
-            })
-            .catch(err => {
-                console.error("Failed to fetch clients", err)
-                setIsLoading(false)
-            })
-    }, [])
-
-    const filteredClients = clients.filter(c => {
-        const matchesSearch = (c.first_name || "").toLowerCase().includes(searchQuery.toLowerCase()) ||
-            (c.username || "").toLowerCase().includes(searchQuery.toLowerCase()) ||
-            (c.phone_number || "").includes(searchQuery)
-
-        if (!matchesSearch) return false
-
-        if (filterType === 'online') return !!c.telegram_id
-        if (filterType === 'offline') return !c.telegram_id
-
-        return true
+        const timer = setTimeout(() => setDebouncedSearch(searchQuery.trim()), 300)
+        return () => clearTimeout(timer)
+    }, [searchQuery])
+
+    const fetchPage = (skip: number) => api.getClientsPage({
+        skip,
+        limit: PAGE_SIZE,
+        sort: 'created_at',
+        order: sortOrder === 'new' ? 'desc' : 'asc',
+        search: debouncedSearch,
+        source: filterType === 'all' ? undefined : filterType,
     })
 
-    const sortedClients = [...filteredClients].sort((a, b) => {
-        const dateA = new Date(a.created_at || 0).getTime()
-        const dateB = new Date(b.created_at || 0).getTime()
-        return sortOrder === 'new' ? dateB - dateA : dateA - dateB
-    })
+    useEffect(() => {
+        let cancelled = false
+        setIsLoading(true)
+        fetchPage(0)
+            .then(({ items, total }) => {
+                if (cancelled) return
+                setClients(items)
+                setTotal(total)
+            })
+            .catch(err => console.error("Failed to fetch clients", err))
+            .finally(() => {
+                if (!cancelled) setIsLoading(false)
+            })
+        return () => { cancelled = true }
+    }, [debouncedSearch, filterType, sortOrder])
+
+    const loadMore = async () => {
+        setIsLoadingMore(true)
+        try {
+            const { items, total } = await fetchPage(clients.length)
+            setClients(prev => [...prev, ...items])
+            setTotal(total)
+        } catch (err) {
+            console.error("Failed to fetch clients", err)
+        } finally {
+            setIsLoadingMore(false)
+        }
+    }
 
     return (
         <ProtectedRoute allowedRoles={['owner', 'admin', 'manager', 'worker']}>
@@ -74,7 +79,7 @@ export default function ClientsPage() {
                     <div className="flex items-center justify-between mb-6">
                         <div>
                             <h1 className="text-2xl font-bold text-gray-900 tracking-tight">Клиенты</h1>
-                            <p className="text-gray-500 text-sm font-medium mt-1">Всего: {clients.length}</p>
+                            <p className="text-gray-500 text-sm font-medium mt-1">Всего: {total}</p>
                         </div>
                     </div>
 
@@ -128,10 +133,10 @@ export default function ClientsPage() {
                     <div className="flex flex-col gap-3">
                         {isLoading ? (
                             <div className="text-center py-10 text-gray-400">Загрузка клиентов...</div>
-                        ) : sortedClients.length === 0 ? (
+                        ) : clients.length === 0 ? (
                             <div className="text-center py-10 text-gray-400">Клиенты не найдены</div>
                         ) : (
-                            sortedClients.map((client) => (
+                            clients.map((client) => (
                                 <Link href={`/clients/${client.id}`} key={client.id}>
                                     <div className="bg-white p-4 rounded-[24px] shadow-sm border border-gray-100 active:scale-[0.99] transition-transform group cursor-pointer relative overflow-hidden">
                                         <div className="flex items-center gap-4">
@@ -188,6 +193,15 @@ export default function ClientsPage() {
                                 </Link>
                             ))
                         )}
+                        {!isLoading && clients.length < total && (
+                            <button
+                                onClick={loadMore}
+                                disabled={isLoadingMore}
+                                className="w-full h-12 rounded-[20px] bg-white border border-gray-100 shadow-sm text-sm font-bold text-gray-900 hover:bg-gray-50 transition-colors disabled:opacity-50"
+                            >
+                                {isLoadingMore ? 'Загрузка...' : 'Показать ещё'}
+                            </button>
+                        )}
                     </div>
                 </div>
             </div>
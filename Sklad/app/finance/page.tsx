@@ -5,7 +5,7 @@ import { ChevronLeft, ArrowUpRight, ArrowDownLeft, Wallet, TrendingUp, Calendar
 import { toast } from "sonner"
 import Link from "next/link"
 import { motion, AnimatePresence } from "framer-motion"
-import { format, startOfWeek, endOfWeek, eachDayOfInterval, isSameDay, startOfMonth, endOfMonth, subWeeks, subMonths } from "date-fns"
+import { format, startOfWeek, endOfWeek, startOfMonth, endOfMonth, subWeeks, subMonths } from "date-fns"
 import { ru } from "date-fns/locale"
 import { api } from "@/services/api"
 import ProtectedRoute from "@/components/ProtectedRoute"
@@ -26,6 +26,9 @@ import {
     DialogTitle,
 } from "@/components/ui/dialog"
 
+// Заказы, которые считаются доходом (совпадает с INCOME_STATUSES в app/finance/service.py)
+const INCOME_STATUSES = ['new', 'processing', 'paid', 'shipping', 'done']
+
 export default function FinancePage() {
     const [period, setPeriod] = useState("Эта неделя")
     const [date, setDate] = useState<Date | undefined>(undefined)
@@ -43,9 +46,6 @@ export default function FinancePage() {
 
     const fetchData = async () => {
         try {
-            // Fetch all data
-            const [expenses, allOrders] = await Promise.all([api.getExpenses(), api.getOrders()])
-
             // Calculate period range
             const now = new Date()
             let start: Date, end: Date
@@ -76,6 +76,14 @@ export default function FinancePage() {
                 end = endOfWeek(now, { weekStartsOn: 1 })
             }
 
+            // Итоги и график считает сервер; списки ограничены выбранным периодом
+            const range = { date_from: format(start, 'yyyy-MM-dd'), date_to: format(end, 'yyyy-MM-dd') }
+            const [summary, expenses, incomeOrders] = await Promise.all([
+                api.getFinanceSummary({ ...range, group_by: 'day' }),
+                api.getExpenses(range),
+                api.getOrders({ ...range, status: INCOME_STATUSES }),
+            ])
+
             // Map Expenses
             const mappedExpenses = expenses.map(item => ({
                 id: `exp-${item.id}`,
@@ -89,11 +97,6 @@ export default function FinancePage() {
                 raw: item
             }))
 
-            // Map Income Orders (new, paid, done, shipping)
-            const incomeOrders = allOrders.filter(o =>
-                o.status === 'paid' || o.status === 'done' || o.status === 'shipping' || o.status === 'processing' || o.status === 'new'
-            )
-
             const mappedIncome = incomeOrders.map(order => ({
                 id: `ord-${order.id}`,
                 title: `Заказ #${order.id} (${order.client})`,
@@ -106,36 +109,13 @@ export default function FinancePage() {
                 raw: order
             }))
 
-            // 1. Calculate Stats based ONLY on selected period
-            let currentIncome = 0
-            let currentExpense = 0
-
-            mappedExpenses.forEach(item => {
-                const d = new Date(item.isoDate)
-                if (d >= start && d <= end) {
-                    currentExpense += item.rawAmount
-                }
-            })
-
-            mappedIncome.forEach(item => {
-                const d = new Date(item.isoDate)
-                if (d >= start && d <= end) {
-                    currentIncome += item.rawAmount
-                }
-            })
-
             setStats({
-                balance: currentIncome - currentExpense,
-                income: currentIncome,
-                expense: currentExpense
+                balance: summary.margin,
+                income: summary.revenue,
+                expense: summary.expenses
             })
 
-            // 2. Filter list of transactions to show ONLY for selected period
-            const allMapped = [...mappedExpenses, ...mappedIncome]
-            const periodTransactions = allMapped.filter(tx => {
-                const d = new Date(tx.isoDate)
-                return d >= start && d <= end
-            }).sort((a, b) => {
+            const periodTransactions = [...mappedExpenses, ...mappedIncome].sort((a, b) => {
                 const dateA = a.isoDate ? new Date(a.isoDate).getTime() : 0
                 const dateB = b.isoDate ? new Date(b.isoDate).getTime() : 0
                 return dateB - dateA
@@ -143,29 +123,20 @@ export default function FinancePage() {
 
             setTransactions(periodTransactions)
 
-            // 3. Calculate Chart Data
-            const daysInPeriod = eachDayOfInterval({ start, end })
-            const chartSource = daysInPeriod.map(day => {
-                const dayIncome = mappedIncome
-                    .filter(i => isSameDay(new Date(i.isoDate), day))
-                    .reduce((sum, curr) => sum + curr.rawAmount, 0)
-
-                const dayExpense = mappedExpenses
-                    .filter(e => isSameDay(new Date(e.isoDate), day))
-                    .reduce((sum, curr) => sum + curr.rawAmount, 0)
-
-                const labelIncome = dayIncome > 0
-                    ? (dayIncome >= 1000000 ? `${(dayIncome / 1000000).toFixed(1)}м` : `${(dayIncome / 1000).toFixed(0)}к`)
+            const chartSource = summary.series.map(point => {
+                const day = new Date(`${point.period}T00:00:00`)
+                const labelIncome = point.revenue > 0
+                    ? (point.revenue >= 1000000 ? `${(point.revenue / 1000000).toFixed(1)}м` : `${(point.revenue / 1000).toFixed(0)}к`)
                     : ''
 
-                const labelExpense = dayExpense > 0
-                    ? (dayExpense >= 1000000 ? `${(dayExpense / 1000000).toFixed(1)}м` : `${(dayExpense / 1000).toFixed(0)}к`)
+                const labelExpense = point.expenses > 0
+                    ? (point.expenses >= 1000000 ? `${(point.expenses / 1000000).toFixed(1)}м` : `${(point.expenses / 1000).toFixed(0)}к`)
                     : ''
 
                 return {
-                    day: format(day, daysInPeriod.length > 7 ? 'd' : 'EEEEEE', { locale: ru }),
-                    income: dayIncome,
-                    expense: dayExpense,
+                    day: format(day, summary.series.length > 7 ? 'd' : 'EEEEEE', { locale: ru }),
+                    income: point.revenue,
+                    expense: point.expenses,
                     labelIncome,
                     labelExpense,
                     fullDay: format(day, 'd MMMM', { locale: ru })
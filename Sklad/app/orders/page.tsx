@@ -8,7 +8,7 @@ import OrderDetails from "@/components/OrderDetails"
 
 // Mock Data
 import { api } from '@/services/api'
-import { Order } from '@/services/api' // Use type from API
+import { Order, OrderListParams } from '@/services/api' // Use type from API
 
 // Removed static mock data
 
@@ -40,16 +40,9 @@ function OrdersContent() {
     const router = useRouter()
     const orderId = searchParams.get('order')
     const [orders, setOrders] = useState<Order[]>([])
+    const [nextCursor, setNextCursor] = useState<string | null>(null)
     const [isLoading, setIsLoading] = useState(true)
-
-    useEffect(() => {
-        api.getOrders()
-            .then(data => setOrders(data))
-            .catch(err => console.error("Failed to load orders", err))
-            .finally(() => setIsLoading(false))
-    }, [])
-
-    const selectedOrder = orderId ? orders.find(o => o.id === orderId) : null
+    const [isLoadingMore, setIsLoadingMore] = useState(false)
 
     const handleCloseModal = () => {
         router.replace('/orders', { scroll: false })
@@ -62,6 +55,64 @@ function OrdersContent() {
 
     const [isSearchOpen, setIsSearchOpen] = useState(false)
     const [searchQuery, setSearchQuery] = useState("")
+    const [debouncedSearch, setDebouncedSearch] = useState("")
+
+    useEffect(() => {
+        const timer = setTimeout(() => setDebouncedSearch(searchQuery.trim()), 300)
+        return () => clearTimeout(timer)
+    }, [searchQuery])
+
+    // Статус и клиент фильтруются на сервере; номер заказа ищется среди загруженных
+    const serverParams: OrderListParams = {
+        status: statusFilter !== "all" ? statusFilter : undefined,
+        customer: debouncedSearch && !/^\d{1,6}$/.test(debouncedSearch) ? debouncedSearch : undefined,
+    }
+
+    useEffect(() => {
+        let cancelled = false
+        setIsLoading(true)
+        api.getOrdersPage(serverParams)
+            .then(({ items, nextCursor }) => {
+                if (cancelled) return
+                setOrders(items)
+                setNextCursor(nextCursor)
+            })
+            .catch(err => console.error("Failed to load orders", err))
+            .finally(() => {
+                if (!cancelled) setIsLoading(false)
+            })
+        return () => { cancelled = true }
+    }, [statusFilter, serverParams.customer])
+
+    const loadMore = async () => {
+        if (!nextCursor) return
+        setIsLoadingMore(true)
+        try {
+            const page = await api.getOrdersPage(serverParams, nextCursor)
+            setOrders(prev => [...prev, ...page.items])
+            setNextCursor(page.nextCursor)
+        } catch (err) {
+            console.error("Failed to load orders", err)
+        } finally {
+            setIsLoadingMore(false)
+        }
+    }
+
+    // Заказ по ссылке ?order= может быть за пределами загруженных страниц
+    const [linkedOrder, setLinkedOrder] = useState<Order | null>(null)
+    const loadedOrder = orderId ? orders.find(o => o.id === orderId) : null
+
+    useEffect(() => {
+        if (!orderId || loadedOrder) {
+            setLinkedOrder(null)
+            return
+        }
+        api.getOrderById(orderId)
+            .then(setLinkedOrder)
+            .catch(err => console.error("Failed to load order", err))
+    }, [orderId, !!loadedOrder])
+
+    const selectedOrder = loadedOrder || (linkedOrder?.id === orderId ? linkedOrder : null)
 
     const updateFilter = (key: string, value: string) => {
         const params = new URLSearchParams(searchParams.toString())
@@ -274,6 +325,15 @@ function OrdersContent() {
                         <p className="text-sm text-gray-500">По выбранным фильтрам ничего не найдено</p>
                     </div>
                 )}
+                {!isLoading && nextCursor && (
+                    <button
+                        onClick={loadMore}
+                        disabled={isLoadingMore}
+                        className="w-full h-12 rounded-[20px] bg-white border border-gray-100 shadow-sm text-sm font-bold text-gray-900 hover:bg-gray-50 transition-colors disabled:opacity-50"
+                    >
+                        {isLoadingMore ? 'Загрузка...' : 'Показать ещё'}
+                    </button>
+                )}
             </div>
 
             {/* Modal */}
@@ -22,6 +22,7 @@ export default function StoriesManagementPage() {
     const [storyToDelete, setStoryToDelete] = useState<number | null>(null)
     const [storyStats, setStoryStats] = useState<StoryStats | null>(null)
     const [isLoadingStats, setIsLoadingStats] = useState(false)
+    const [isLoadingMoreViewers, setIsLoadingMoreViewers] = useState(false)
 
     // Form state
     const [title, setTitle] = useState("")
@@ -75,6 +76,19 @@ export default function StoriesManagementPage() {
         }
     }
 
+    const loadMoreViewers = async () => {
+        if (!selectedStory || !storyStats?.next_cursor) return
+        setIsLoadingMoreViewers(true)
+        try {
+            const page = await api.getStoryStats(selectedStory.id, storyStats.next_cursor)
+            setStoryStats({ ...page, viewers: [...storyStats.viewers, ...page.viewers] })
+        } catch (error) {
+            console.error("Failed to fetch viewers", error)
+        } finally {
+            setIsLoadingMoreViewers(false)
+        }
+    }
+
     const handleAction = async (e: React.FormEvent) => {
         e.preventDefault()
 
@@ -549,7 +563,7 @@ export default function StoriesManagementPage() {
                                         {/* Viewers List */}
                                         <div className="flex-1 overflow-y-auto no-scrollbar space-y-2 pr-1">
                                             <h4 className="text-[13px] font-bold text-gray-400 uppercase tracking-wide px-2 mb-3">
-                                                Зрители ({storyStats?.viewers.length || 0})
+                                                Зрители ({storyStats?.views_count || 0})
                                             </h4>
                                             {storyStats?.viewers.length === 0 ? (
                                                 <div className="py-10 text-center text-gray-400 font-medium text-sm bg-white rounded-[24px]">
@@ -579,6 +593,16 @@ export default function StoriesManagementPage() {
                                                     </div>
                                                 ))
                                             )}
+                                            {storyStats?.next_cursor && (
+                                                <button
+                                                    onClick={loadMoreViewers}
+                                                    disabled={isLoadingMoreViewers}
+                                                    className="w-full py-3 rounded-[20px] bg-white text-[13px] font-bold text-black shadow-sm hover:shadow-md transition-shadow disabled:opacity-50 flex items-center justify-center gap-2"
+                                                >
+                                                    {isLoadingMoreViewers && <Loader2 className="animate-spin" size={16} />}
+                                                    Показать ещё
+                                                </button>
+                                            )}
                                         </div>
                                     </>
                                 )}
@@ -33,7 +33,7 @@ export default function TasksPage() {
         const fetchData = async () => {
             try {
                 const [ordersData, productsData] = await Promise.all([
-                    api.getOrders(),
+                    api.getOrders({ status: 'processing' }),
                     api.getProducts()
                 ])
 
@@ -47,6 +47,8 @@ export function useProductDetails(item?: any) {
     const [image, setImage] = useState("");
     const [images, setImages] = useState<string[]>([]);
     const [history, setHistory] = useState<any[]>([]);
+    // Версия товара с сервера: правка поверх чужих изменений получит 409
+    const [version, setVersion] = useState<number | undefined>(undefined);
 
     // Composition state
     const [composition, setComposition] = useState<any[]>([]);
@@ -79,6 +81,7 @@ export function useProductDetails(item?: any) {
                 setImages([]);
             }
             setHistory(item.history || []);
+            setVersion(item.version);
 
             // Parse composition
             try {
@@ -134,14 +137,16 @@ export function useProductDetails(item?: any) {
                 price_display: `${sellPrice.toLocaleString().replace(/,/g, " ")} сум`,
                 image,
                 images: JSON.stringify(images),
-                composition: JSON.stringify(composition)
+                composition: JSON.stringify(composition),
+                version
             });
             if (res && res.history) setHistory(res.history);
+            if (res) { setVersion(res.version); setStock(res.stock_quantity ?? stock); }
             setIsEditing(false);
             showNotification("Товар обновлен", "success");
         } catch (err) {
             console.error(err);
-            showNotification("Ошибка обновления", "error");
+            showNotification(err instanceof Error && err.message.includes("изменён") ? err.message : "Ошибка обновления", "error");
         }
     };
 
@@ -212,12 +217,14 @@ export function useProductDetails(item?: any) {
                 price_display: `${sellPrice.toLocaleString().replace(/,/g, " ")} сум`,
                 image: newMain,
                 images: JSON.stringify(newImagesList),
-                composition: JSON.stringify(composition)
+                composition: JSON.stringify(composition),
+                version
             };
 
             // @ts-ignore
             const res = await api.updateProduct(Number(item.id), payload);
             if (res && res.history) setHistory(res.history);
+            if (res) setVersion(res.version);
             showNotification("Главное фото обновлено", "success");
         } catch (err) {
             console.error(err);
@@ -265,18 +272,20 @@ export function useProductDetails(item?: any) {
 
         try {
             let updatedProduct;
+            // Остаток считает сервер атомарно: параллельные поставки/продажи не затираются
             if (activeAction === 'income') {
                 updatedProduct = await api.supplyProduct(Number(item.id), val, buyPrice, supplier);
-                setStock((s) => s + val);
                 setIncome((i) => i + val);
                 showNotification(`Приход: +${val} шт`, "success");
             } else {
-                const newStock = Math.max(0, stock - val);
-                updatedProduct = await api.updateProduct(Number(item.id), { stock_quantity: newStock });
-                setStock(newStock);
+                updatedProduct = await api.writeoffProduct(Number(item.id), val);
                 setWriteOff((w) => w + val);
                 showNotification(`Списание: -${val} шт`, "success"); // Changed type to success for confirmation
             }
+            if (updatedProduct) {
+                setStock(updatedProduct.stock_quantity ?? 0);
+                setVersion(updatedProduct.version);
+            }
             if (updatedProduct && updatedProduct.history) {
                 setHistory(updatedProduct.history);
             }
@@ -284,7 +293,7 @@ export function useProductDetails(item?: any) {
             setActionValue("");
         } catch (err) {
             console.error(err);
-            showNotification("Ошибка операции", "error");
+            showNotification(err instanceof Error && err.message.startsWith("Недостаточно") ? err.message : "Ошибка операции", "error");
         }
     };
 
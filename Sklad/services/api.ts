@@ -16,6 +16,7 @@ export type Product = {
     composition?: string; // JSON string
     stock_quantity?: number;
     supplier?: string;
+    version?: number; // оптимистическая блокировка: отправляется в updateProduct, иначе 409
     history?: {
         id: number;
         action: 'income' | 'writeoff';
@@ -52,6 +53,7 @@ export type Order = {
     extras?: any;
     items: OrderItem[];
     history?: any[];
+    stockDeductedAt?: string;
     user?: {
         first_name: string;
         username?: string;
@@ -69,6 +71,20 @@ export type Expense = {
     date: string;
 };
 
+export type FinanceSummary = {
+    date_from: string;
+    date_to: string;
+    group_by: 'day' | 'week' | 'month';
+    revenue: number;
+    orders_count: number;
+    average_check: number;
+    expenses: number;
+    margin: number;
+    margin_percent: number | null;
+    expenses_by_category: { category: string; amount: number; count: number }[];
+    series: { period: string; revenue: number; expenses: number; margin: number; orders_count: number }[];
+};
+
 export type WowEffect = {
     id: number;
     name: string;
@@ -115,10 +131,22 @@ export const api = {
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify(product),
         });
+        if (res.status === 409) throw new Error((await res.json().catch(() => null))?.detail || 'Product was modified');
         if (!res.ok) throw new Error('Failed to update product');
         return res.json();
     },
 
+    // Списание: атомарно на сервере (stock = stock - quantity), 409 — если остатка не хватает
+    async writeoffProduct(id: number, quantity: number): Promise<Product> {
+        const res = await fetch(`${API_URL}/products/${id}/writeoff`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ quantity }),
+        });
+        if (!res.ok) throw new Error((await res.json().catch(() => null))?.detail || 'Failed to write off product');
+        return res.json();
+    },
+
     async deleteProduct(id: number): Promise<void> {
         const res = await fetch(`${API_URL}/products/${id}`, {
             method: 'DELETE',
@@ -137,12 +165,18 @@ export const api = {
         return res.json();
     },
 
-    async getExpenses(): Promise<Expense[]> {
-        const res = await fetch(`${API_URL}/expenses`);
+    async getExpenses(params: { date_from?: string; date_to?: string; category?: string } = {}): Promise<Expense[]> {
+        const res = await fetch(`${API_URL}/expenses?${this._query(params)}`);
         if (!res.ok) throw new Error('Failed to fetch expenses');
         return res.json();
     },
 
+    async getFinanceSummary(params: { date_from?: string; date_to?: string; group_by?: 'day' | 'week' | 'month' } = {}): Promise<FinanceSummary> {
+        const res = await fetch(`${API_URL}/finance/summary?${this._query(params)}`, { cache: 'no-store' });
+        if (!res.ok) throw new Error('Failed to fetch finance summary');
+        return res.json();
+    },
+
     async deleteExpense(id: number): Promise<void> {
         const res = await fetch(`${API_URL}/expenses/${id}`, {
             method: 'DELETE',
@@ -177,6 +211,24 @@ export const api = {
         return res.json();
     },
 
+    // Сборка букетов по составу: ингредиенты списываются, 409 — если чего-то не хватает
+    async assembleProduct(productId: number, quantity: number): Promise<Product> {
+        const res = await fetch(`${API_URL}/products/${productId}/assemble`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ quantity }),
+        });
+        if (!res.ok) throw new Error((await res.json().catch(() => null))?.detail || 'Failed to assemble product');
+        return res.json();
+    },
+
+    // Списание товаров заказа со склада (один раз на заказ)
+    async deductOrderStock(id: string): Promise<{ order_id: number; stock_deducted_at: string; movements: { product_id: number; quantity: number }[] }> {
+        const res = await fetch(`${API_URL}/orders/${id}/stock/deduct`, { method: 'POST' });
+        if (!res.ok) throw new Error((await res.json().catch(() => null))?.detail || 'Failed to deduct order stock');
+        return res.json();
+    },
+
     async updateOrderStatus(id: string, status: string): Promise<Order> {
         const res = await fetch(`${API_URL}/orders/${id}/status`, {
             method: 'PUT',
@@ -245,12 +297,14 @@ export const api = {
                 } catch (e) { return [] }
             })(),
             history: o.history ? JSON.parse(o.history) : [],
+            stockDeductedAt: o.stock_deducted_at || undefined,
             user: o.user
         };
     },
 
-    async getOrders(): Promise<Order[]> {
-        const res = await fetch(`${API_URL}/orders`);
+    /** Весь список без пагинации (all=true) — для сводок на главной и поиска */
+    async getOrders(params: OrderListParams = {}): Promise<Order[]> {
+        const res = await fetch(`${API_URL}/orders?${this._query({ ...params, all: true })}`);
         if (!res.ok) throw new Error('Failed to fetch orders');
         const data = await res.json();
 
@@ -260,12 +314,36 @@ export const api = {
 
     /** Только оплаченные заказы — для страницы «Финансы» */
     async getOrdersPaidOnly(): Promise<Order[]> {
-        const res = await fetch(`${API_URL}/orders?status=paid`);
+        const res = await fetch(`${API_URL}/orders?status=paid&all=true`);
         if (!res.ok) throw new Error('Failed to fetch orders');
         const data = await res.json();
         return data.map((o: any) => this._mapOrder(o));
     },
 
+    _query(params: Record<string, any>): string {
+        const query = new URLSearchParams();
+        Object.entries(params).forEach(([key, value]) => {
+            if (value === undefined || value === null || value === '') return;
+            query.set(key, Array.isArray(value) ? value.join(',') : String(value));
+        });
+        return query.toString();
+    },
+
+    /** Keyset-страница заказов: nextCursor передаётся в следующий вызов */
+    async getOrdersPage(params: OrderListParams = {}, cursor?: string | null, limit = 50): Promise<{ items: Order[]; nextCursor: string | null }> {
+        const res = await fetch(`${API_URL}/orders?${this._query({ ...params, cursor, limit })}`, { cache: 'no-store' });
+        if (!res.ok) throw new Error('Failed to fetch orders');
+        const data = await res.json();
+        return { items: data.map((o: any) => this._mapOrder(o)), nextCursor: res.headers.get('X-Next-Cursor') };
+    },
+
+    async countOrders(params: OrderListParams = {}): Promise<number> {
+        const res = await fetch(`${API_URL}/orders/count?${this._query(params)}`, { cache: 'no-store' });
+        if (!res.ok) throw new Error('Failed to count orders');
+        const data = await res.json();
+        return data.count;
+    },
+
     async getOrderById(id: string): Promise<Order> {
         const res = await fetch(`${API_URL}/orders/${id}`);
         if (!res.ok) throw new Error('Failed to fetch order');
@@ -293,6 +371,17 @@ export const api = {
         return res.json();
     },
 
+    async getClientsPage(params: ClientListParams): Promise<{ items: Client[]; total: number }> {
+        const query = new URLSearchParams();
+        Object.entries(params).forEach(([key, value]) => {
+            if (value !== undefined && value !== null && value !== '') query.set(key, String(value));
+        });
+        const res = await fetch(`${API_URL}/clients?${query.toString()}`);
+        if (!res.ok) throw new Error('Failed to fetch clients');
+        const items: Client[] = await res.json();
+        return { items, total: Number(res.headers.get('X-Total-Count') ?? items.length) };
+    },
+
     async createClickInvoice(orderId: string | number, amount: number, returnUrl: string): Promise<any> {
         const res = await fetch(`${API_URL}/payments/create-click-invoice`, {
             method: 'POST',
@@ -473,7 +562,16 @@ export const api = {
             body: JSON.stringify({ text, filter_type: filterType }),
         });
         if (!res.ok) throw new Error('Failed to send broadcast');
-        return res.json();
+        // Рассылка идёт в фоне на сервере — ждём завершения задачи
+        let job = await res.json();
+        while (job.status === 'pending' || job.status === 'running') {
+            await new Promise(resolve => setTimeout(resolve, 2000));
+            const statusRes = await fetch(`${API_URL}/clients/broadcast/${job.id}`);
+            if (!statusRes.ok) throw new Error('Failed to fetch broadcast status');
+            job = await statusRes.json();
+        }
+        if (job.status === 'failed') throw new Error(job.error || 'Broadcast failed');
+        return { total: job.total, success: job.success, failed: job.failed };
     },
 
     // Stories
@@ -510,8 +608,9 @@ export const api = {
         if (!res.ok) throw new Error('Failed to delete story');
     },
 
-    async getStoryStats(id: number): Promise<StoryStats> {
-        const res = await fetch(`${API_URL}/stories/${id}/stats/`);
+    async getStoryStats(id: number, cursor?: string | null): Promise<StoryStats> {
+        const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+        const res = await fetch(`${API_URL}/stories/${id}/stats/${query}`);
         if (!res.ok) throw new Error('Failed to fetch story stats');
         return res.json();
     },
@@ -625,6 +724,26 @@ export type Client = {
     created_at: string;
     orders_count: number;
     total_spent: number;
+    last_order_at?: string | null;
+};
+
+export type ClientListParams = {
+    skip?: number;
+    limit?: number;
+    sort?: 'created_at' | 'orders_count' | 'total_spent' | 'last_order_at' | 'first_name';
+    order?: 'asc' | 'desc';
+    search?: string;
+    source?: 'online' | 'offline';
+    segment?: 'purchased' | 'leads';
+};
+
+export type OrderListParams = {
+    status?: string | string[];
+    date_from?: string; // YYYY-MM-DD, включительно
+    date_to?: string;
+    payment_method?: string;
+    user_id?: number;
+    customer?: string;
 };
 
 export type ClientCreate = {
@@ -710,6 +829,7 @@ export type StoryStats = {
         user_photo?: string;
         viewed_at: string;
     }[];
+    next_cursor?: string | null;
 };
 
 export type Banner = {
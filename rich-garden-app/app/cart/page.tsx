@@ -24,9 +24,9 @@ export default function CartPage() {
     const [scrolled, setScrolled] = useState(false)
 
     useEffect(() => {
-        api.getProducts('Подборка для гостей')
+        api.getCatalog('Подборка для гостей')
             .then(data => {
-                setRecommendations(data.filter(p => p.stock_quantity > 0))
+                setRecommendations(data.filter(p => p.in_stock))
             })
             .catch(console.error)
             .finally(() => setIsLoadingRecs(false))
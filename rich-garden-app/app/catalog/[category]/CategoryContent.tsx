@@ -60,8 +60,8 @@ export default function CategoryContent({ categorySlug }: { categorySlug: string
 
     useEffect(() => {
         // Fetch all products to determine active categories
-        api.getProducts().then(data => {
-            const bouquets = data.filter(p => !p.is_ingredient && p.stock_quantity > 0)
+        api.getCatalog().then(data => {
+            const bouquets = data.filter(p => p.in_stock)
 
             // Extract unique categories
             const cats = new Set<string>()
@@ -114,8 +114,8 @@ export default function CategoryContent({ categorySlug }: { categorySlug: string
             const mapped = sorted.map(p => ({
                 id: p.id,
                 name: p.name,
-                price: p.price_display || `${p.price_raw.toLocaleString()} сум`,
-                image: p.image.startsWith('http') ? p.image : `${p.image}`,
+                price: `${p.price_raw.toLocaleString()} сум`,
+                image: p.image || '/placeholder.png',
                 price_raw: p.price_raw,
                 isHit: p.is_hit,
                 isNew: p.is_new
@@ -27,12 +27,12 @@ export default function CatalogPage() {
   const [allProducts, setAllProducts] = useState<any[]>([])
 
   useEffect(() => {
-    api.getProducts().then(data => {
+    api.getCatalog().then(data => {
       const catsSet = new Set<string>()
       const catsData: { id: string, name: string }[] = []
 
       // Filter only bouquets
-      const bouquets = data.filter(p => !p.is_ingredient && p.composition && p.composition !== "[]")
+      const bouquets = data.filter(p => p.composition.length > 0)
 
       bouquets.forEach(b => {
         if (b.category) {
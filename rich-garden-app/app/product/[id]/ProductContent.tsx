@@ -6,7 +6,7 @@ import Link from 'next/link'
 import Image from 'next/image'
 import { ChevronLeft, ChevronRight, Heart, Share2, Minus, Plus, ShoppingBag, Truck, Trash2, X } from 'lucide-react'
 import { motion, AnimatePresence } from 'framer-motion'
-import { api, Product } from '@/lib/api'
+import { api, Product, CatalogProduct } from '@/lib/api'
 import { useCart } from '@/context/CartContext'
 import { useFavorites } from '@/context/FavoritesContext'
 import { toast } from 'sonner'
@@ -16,7 +16,7 @@ import { AnimatedBackground } from '@/components/features/home/AnimatedBackgroun
 export default function ProductContent({ productId }: { productId: string }) {
     const router = useRouter()
     const [product, setProduct] = useState<Product | null>(null)
-    const [recommended, setRecommended] = useState<Product[]>([])
+    const [recommended, setRecommended] = useState<CatalogProduct[]>([])
     const [loading, setLoading] = useState(true)
     const [qty, setQty] = useState(1)
     const [currentImageIndex, setCurrentImageIndex] = useState(0)
@@ -37,7 +37,7 @@ export default function ProductContent({ productId }: { productId: string }) {
         setLoading(true)
         Promise.all([
             api.getProduct(productId),
-            api.getProducts()
+            api.getCatalog()
         ]).then(([productData, allProducts]) => {
             // Parse additional images
             let gallery = []
@@ -64,10 +64,10 @@ export default function ProductContent({ productId }: { productId: string }) {
 
             // Filter recommended: exclude current, strictly bouquets
             const others = allProducts
-                .filter(p => String(p.id) !== productId && !p.is_ingredient && p.composition && p.composition !== "[]")
+                .filter(p => String(p.id) !== productId && p.composition.length > 0)
                 .map(p => ({
                     ...p,
-                    image: p.image.startsWith('http') ? p.image : `${p.image}`
+                    image: p.image || '/placeholder.png'
                 }))
                 .slice(0, 4)
 
@@ -293,7 +293,7 @@ export default function ProductContent({ productId }: { productId: string }) {
                                     <div className="px-1">
                                         <h4 className="font-black text-[14px] text-black leading-tight mb-1 truncate lowercase">{rec.name}</h4>
                                         <p className="text-[15px] font-black text-black">
-                                            {rec.price_raw?.toLocaleString() || rec.price_display} <span className="text-[11px] text-black/20 uppercase">сум</span>
+                                            {rec.price_raw?.toLocaleString() || rec.price} <span className="text-[11px] text-black/20 uppercase">сум</span>
                                         </p>
                                     </div>
                                 </Link>
@@ -58,7 +58,9 @@ export function HeroSlider() {
                                 initial={{ scale: 1.15 }}
                                 animate={{ scale: 1.05 }}
                                 transition={{ duration: 15, ease: "linear" }}
-                                src={currentBanner.image_url}
+                                src={currentBanner.image_set?.src ?? currentBanner.image_url}
+                                srcSet={currentBanner.image_set?.srcset.webp}
+                                sizes="100vw"
                                 alt={currentBanner.title}
                                 className="absolute inset-0 w-full h-full object-cover"
                             />
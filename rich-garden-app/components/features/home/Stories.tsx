@@ -83,7 +83,9 @@ export function Stories({ onStoryOpen }: StoriesProps) {
                                     story.bg_color || "bg-pink-100"
                                 )}>
                                     <img
-                                        src={story.thumbnail_url.startsWith('http') ? story.thumbnail_url : story.thumbnail_url}
+                                        src={story.thumbnail_set?.src ?? story.thumbnail_url}
+                                        srcSet={story.thumbnail_set?.srcset.webp}
+                                        sizes="80px"
                                         alt={story.title}
                                         className="w-full h-full object-cover"
                                         onError={(e) => {
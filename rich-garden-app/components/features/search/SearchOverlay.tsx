@@ -2,7 +2,7 @@ import { useState, useEffect } from "react";
 import { motion, AnimatePresence } from "framer-motion";
 import { Search, X, Clock, LayoutGrid, ChevronRight } from 'lucide-react';
 import Link from "next/link";
-import { api } from '@/lib/api';
+import { api, type CatalogProduct } from '@/lib/api';
 import { useFavorites } from '@/context/FavoritesContext';
 import { toast } from 'sonner';
 import { useProducts } from '@/hooks/useProducts';
@@ -18,8 +18,27 @@ export function SearchOverlay({ isOpen, onClose, telegramUserId }: SearchOverlay
     const [popularTags, setPopularTags] = useState<string[]>([]);
     const [recentProducts, setRecentProducts] = useState<any[]>([]);
     const { toggleFavorite, isFavorite } = useFavorites();
-    const { categories, products } = useProducts();
+    const { categories } = useProducts();
     const [query, setQuery] = useState("");
+    const [results, setResults] = useState<CatalogProduct[]>([]);
+    const [suggestions, setSuggestions] = useState<string[]>([]);
+
+    // Поиск на сервере с задержкой ввода; в популярные запрос попадает только при выборе товара
+    useEffect(() => {
+        const q = query.trim();
+        if (!q) {
+            setResults([]);
+            setSuggestions([]);
+            return;
+        }
+        const timer = setTimeout(() => {
+            api.searchProducts(q).then(setResults).catch(console.error);
+            api.getSearchSuggestions(q)
+                .then(data => setSuggestions(data.queries.filter(s => s !== q.toLowerCase())))
+                .catch(console.error);
+        }, 250);
+        return () => clearTimeout(timer);
+    }, [query]);
 
     useEffect(() => {
         if (!isOpen) {
@@ -32,12 +51,12 @@ export function SearchOverlay({ isOpen, onClose, telegramUserId }: SearchOverlay
 
             if (telegramUserId) {
                 api.getRecentlyViewed(telegramUserId).then(products => {
-                    const mapped = products.map((p: any) => ({
+                    const mapped = products.map((p: CatalogProduct) => ({
                         id: p.id,
                         name: p.name,
                         category: p.category,
-                        price: p.price_display || `${p.price_raw.toLocaleString()} сум`,
-                        image: p.image.startsWith('http') ? p.image : `${p.image}`,
+                        price: `${p.price_raw.toLocaleString()} сум`,
+                        image: p.image || '',
                         rating: p.rating,
                         isHit: p.is_hit,
                         isNew: p.is_new,
@@ -50,15 +69,37 @@ export function SearchOverlay({ isOpen, onClose, telegramUserId }: SearchOverlay
     }, [isOpen, telegramUserId]);
 
     const handleProductClick = (productId: number) => {
+        if (query.trim()) {
+            api.searchProducts(query.trim(), true).catch(console.error);
+        }
         if (telegramUserId) {
             api.addRecentlyViewed(telegramUserId, productId).catch(console.error);
         }
         onClose();
     };
 
-    const filteredProducts = query
-        ? products.filter(p => p.name.toLowerCase().includes(query.toLowerCase()))
-        : [];
+    const filteredProducts = results.map(p => ({
+        id: p.id,
+        name: p.name,
+        price: `${p.price_raw.toLocaleString()} сум`,
+        image: p.image || '/placeholder.png',
+        isHit: p.is_hit,
+        isNew: p.is_new,
+    }));
+
+    const renderTags = (tags: string[]) => (
+        <div className="flex flex-wrap gap-2 mb-6">
+            {tags.map(tag => (
+                <button
+                    key={tag}
+                    onClick={() => setQuery(tag)}
+                    className="px-4 py-2 rounded-full bg-gray-100 text-[13px] font-bold text-black lowercase active:scale-95 transition-transform"
+                >
+                    {tag}
+                </button>
+            ))}
+        </div>
+    );
 
     return (
         <AnimatePresence>
@@ -106,6 +147,8 @@ export function SearchOverlay({ isOpen, onClose, telegramUserId }: SearchOverlay
                                 animate={{ opacity: 1 }}
                                 className="flex flex-col gap-4"
                             >
+                                {suggestions.length > 0 && renderTags(suggestions)}
+
                                 <div className="flex items-center gap-2 mb-2 text-gray-400 text-[12px] font-bold uppercase tracking-widest">
                                     <Search size={14} />
                                     <span>Результаты поиска</span>
@@ -151,8 +194,10 @@ export function SearchOverlay({ isOpen, onClose, telegramUserId }: SearchOverlay
                                 )}
                             </motion.div>
                         ) : (
-                            // Default View: Catalog + Recent
+                            // Default View: Popular + Catalog + Recent
                             <>
+                                {popularTags.length > 0 && renderTags(popularTags)}
+
                                 {/* Catalog Categories */}
                                 <motion.div
                                     initial={{ y: 20, opacity: 0 }}
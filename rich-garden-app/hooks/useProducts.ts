@@ -20,21 +20,22 @@ export function useProducts() {
     const [loading, setLoading] = useState(true);
 
     useEffect(() => {
-        api.getProducts()
+        api.getCatalog()
             .then(data => {
                 if (!Array.isArray(data)) {
                     setProducts([]);
                     setCategories(["Все"]);
                     return;
                 }
-                // Filter ONLY bouquets (No ingredients) AND In Stock
-                // Ослаблен фильтр: убрана проверка на composition !== "[]", так как некоторые букеты могут иметь пустой состав
-                const bouquets = data.filter((p: any) => !p.is_ingredient && p.stock_quantity > 0).map((p: any) => ({
+                // Витрина уже без ингредиентов; оставляем только товары в наличии
+                // Ослаблен фильтр: убрана проверка на пустой состав, так как некоторые букеты могут иметь пустой состав
+                const bouquets = data.filter((p: any) => p.in_stock).map((p: any) => ({
                     id: p.id,
                     name: p.name,
                     category: p.category,
                     price: p.price_display || `${p.price_raw.toLocaleString()} сум`,
-                    image: p.image ? (p.image.startsWith('http') ? p.image : p.image) : '/placeholder.png',
+                    // image_set — размер card (640px) вместо исходных 1920px; у старых загрузок его нет
+                    image: p.image_set?.src ?? (p.image || '/placeholder.png'),
                     images: p.images || "[]",
                     rating: p.rating,
                     isHit: p.is_hit,
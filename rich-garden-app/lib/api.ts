@@ -16,6 +16,14 @@ export type Order = {
     created_at: string;
 };
 
+// Производные фото (thumb/card/full): src — JPEG нужного размера, srcset по форматам; null у старых загрузок
+export type ImageSet = {
+    src: string;
+    width: number;
+    height: number;
+    srcset: { avif?: string; webp?: string; jpeg?: string };
+};
+
 export type Product = {
     id: number;
     name: string;
@@ -31,6 +39,30 @@ export type Product = {
     composition?: string;
     is_ingredient?: boolean;
     stock_quantity: number;
+    image_set?: ImageSet | null;
+};
+
+export type CatalogComponent = {
+    id: number | null;
+    name: string;
+    qty: number;
+};
+
+// Витрина: GET /products/catalog — без описания и истории, состав уже разобран
+export type CatalogProduct = {
+    id: number;
+    name: string;
+    category: string | null;
+    price: string | null;
+    price_raw: number;
+    image: string | null;
+    images: string; // JSON string
+    rating: number;
+    is_hit: boolean;
+    is_new: boolean;
+    in_stock: boolean;
+    composition: CatalogComponent[];
+    image_set?: ImageSet | null; // размер card
 };
 
 export type OrderCreate = {
@@ -97,6 +129,16 @@ export const api = {
         return res.json();
     },
 
+    // Кэшируется на сервере; браузер сам переспрашивает с If-None-Match и получает 304
+    async getCatalog(category?: string): Promise<CatalogProduct[]> {
+        const query = new URLSearchParams();
+        if (category) query.append('category', category);
+
+        const res = await fetch(`${API_URL}/products/catalog?${query.toString()}`);
+        if (!res.ok) throw new Error('Failed to fetch catalog');
+        return res.json();
+    },
+
     async getProduct(id: string): Promise<Product> {
         const res = await fetch(`${API_URL}/products/${id}`);
         if (!res.ok) throw new Error('Failed to fetch product');
@@ -131,7 +173,7 @@ export const api = {
         return res.json();
     },
 
-    async getRecentlyViewed(telegramId: number): Promise<Product[]> {
+    async getRecentlyViewed(telegramId: number): Promise<CatalogProduct[]> {
         const res = await fetch(`${API_URL}/user/${telegramId}/recent`);
         if (!res.ok) return [];
         return res.json();
@@ -143,12 +185,26 @@ export const api = {
         });
     },
 
-    async getPopularSearches(): Promise<{ tags: string[], products: Product[] }> {
+    async getPopularSearches(): Promise<{ tags: string[], products: CatalogProduct[] }> {
         const res = await fetch(`${API_URL}/search/popular`);
         if (!res.ok) return { tags: [], products: [] };
         return res.json();
     },
 
+    // Ранжированный поиск (пион / pion / peony). track=false — поиск по мере ввода, не попадает в популярные
+    async searchProducts(q: string, track = false): Promise<CatalogProduct[]> {
+        const query = new URLSearchParams({ q, track: String(track) });
+        const res = await fetch(`${API_URL}/search?${query.toString()}`);
+        if (!res.ok) return [];
+        return res.json();
+    },
+
+    async getSearchSuggestions(q: string): Promise<{ queries: string[], products: { id: number, name: string }[] }> {
+        const res = await fetch(`${API_URL}/search/suggest?${new URLSearchParams({ q }).toString()}`);
+        if (!res.ok) return { queries: [], products: [] };
+        return res.json();
+    },
+
     async createAddress(telegramId: number, address: { title: string, address: string, info?: string }): Promise<Address | null> {
         const res = await fetch(`${API_URL}/user/${telegramId}/addresses`, {
             method: 'POST',
@@ -383,6 +439,8 @@ export type Story = {
     views_count: number;
     is_viewed_by_me: boolean;
     created_at: string;
+    thumbnail_set?: ImageSet | null;
+    content_set?: ImageSet | null;
 }
 
 export type Banner = {
@@ -401,4 +459,5 @@ export type Banner = {
 
     sort_order: number;
     is_active: boolean;
+    image_set?: ImageSet | null;
 };
@@ -1,24 +1,27 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.banners import models, schemas
 
-def get_all(db: Session, active_only: bool = False):
-    query = db.query(models.Banner)
+async def get_all(db: AsyncSession, active_only: bool = False):
+    query = select(models.Banner)
     if active_only:
         query = query.filter(models.Banner.is_active == True)
-    return query.order_by(models.Banner.sort_order.asc()).all()
+    result = await db.execute(query.order_by(models.Banner.sort_order.asc()))
+    return result.scalars().all()
 
-def get_by_id(db: Session, banner_id: int):
-    return db.query(models.Banner).filter(models.Banner.id == banner_id).first()
+async def get_by_id(db: AsyncSession, banner_id: int):
+    result = await db.execute(select(models.Banner).filter(models.Banner.id == banner_id))
+    return result.scalars().first()
 
-def create(db: Session, banner: schemas.BannerCreate):
+async def create(db: AsyncSession, banner: schemas.BannerCreate):
     db_banner = models.Banner(**banner.model_dump())
     db.add(db_banner)
-    db.commit()
-    db.refresh(db_banner)
+    await db.commit()
+    await db.refresh(db_banner)
     return db_banner
 
-def update(db: Session, banner_id: int, banner_data: schemas.BannerUpdate):
-    db_banner = get_by_id(db, banner_id)
+async def update(db: AsyncSession, banner_id: int, banner_data: schemas.BannerUpdate):
+    db_banner = await get_by_id(db, banner_id)
     if not db_banner:
         return None
     
@@ -35,15 +38,15 @@ def update(db: Session, banner_id: int, banner_data: schemas.BannerUpdate):
         if value is not None:
             setattr(db_banner, key, value)
     
-    db.commit()
-    db.refresh(db_banner)
+    await db.commit()
+    await db.refresh(db_banner)
     return db_banner
 
-def delete(db: Session, banner_id: int):
-    db_banner = get_by_id(db, banner_id)
+async def delete(db: AsyncSession, banner_id: int):
+    db_banner = await get_by_id(db, banner_id)
     if not db_banner:
         return False
     
-    db.delete(db_banner)
-    db.commit()
+    await db.delete(db_banner)
+    await db.commit()
     return True
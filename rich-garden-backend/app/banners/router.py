@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
-from app.database import get_db
+from app.database import get_async_db
 from app.banners import schemas, repository
 
 router = APIRouter(
@@ -11,26 +11,26 @@ router = APIRouter(
 
 @router.get("/", response_model=List[schemas.Banner])
 @router.get("", response_model=List[schemas.Banner])
-def read_banners(active_only: bool = False, db: Session = Depends(get_db)):
-    return repository.get_all(db, active_only=active_only)
+async def read_banners(active_only: bool = False, db: AsyncSession = Depends(get_async_db)):
+    return await repository.get_all(db, active_only=active_only)
 
 @router.post("/", response_model=schemas.Banner)
 @router.post("", response_model=schemas.Banner)
-def create_banner(banner: schemas.BannerCreate, db: Session = Depends(get_db)):
-    return repository.create(db, banner)
+async def create_banner(banner: schemas.BannerCreate, db: AsyncSession = Depends(get_async_db)):
+    return await repository.create(db, banner)
 
 @router.patch("/{banner_id}", response_model=schemas.Banner)
 @router.patch("/{banner_id}/", response_model=schemas.Banner)
-def update_banner(banner_id: int, banner: schemas.BannerUpdate, db: Session = Depends(get_db)):
-    db_banner = repository.update(db, banner_id, banner)
+async def update_banner(banner_id: int, banner: schemas.BannerUpdate, db: AsyncSession = Depends(get_async_db)):
+    db_banner = await repository.update(db, banner_id, banner)
     if not db_banner:
         raise HTTPException(status_code=404, detail="Banner not found")
     return db_banner
 
 @router.delete("/{banner_id}")
 @router.delete("/{banner_id}/")
-def delete_banner(banner_id: int, db: Session = Depends(get_db)):
-    success = repository.delete(db, banner_id)
+async def delete_banner(banner_id: int, db: AsyncSession = Depends(get_async_db)):
+    success = await repository.delete(db, banner_id)
     if not success:
         raise HTTPException(status_code=404, detail="Banner not found")
     return {"ok": True}
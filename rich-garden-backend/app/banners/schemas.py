@@ -1,6 +1,8 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, computed_field
 from typing import Optional
 
+from app.common.schemas import ImageSet, image_set
+
 class BannerBase(BaseModel):
     title: str
     subtitle: str
@@ -39,5 +41,10 @@ class BannerUpdate(BaseModel):
 class Banner(BannerBase):
     id: int
 
+    @computed_field
+    @property
+    def image_set(self) -> Optional[ImageSet]:
+        return image_set(self.image_url, "full")
+
     class Config:
         from_attributes = True
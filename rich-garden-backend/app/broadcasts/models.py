@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime
+import datetime
+from app.database import Base
+
+class BroadcastJob(Base):
+    __tablename__ = "broadcast_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    text = Column(Text)
+    filter_type = Column(String, default="all")  # all / purchased / leads
+    status = Column(String, default="pending", index=True)  # pending / running / done / failed
+
+    total = Column(Integer, default=0)
+    success = Column(Integer, default=0)
+    failed = Column(Integer, default=0)
+    # Keyset-курсор: TelegramUser.id последнего обработанного получателя.
+    # После рестарта рассылка продолжается с него, а не с начала.
+    last_user_id = Column(Integer, default=0)
+    error = Column(String, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.datetime.now)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
@@ -0,0 +1,52 @@
+from sqlalchemy import select, func, exists
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import models
+from app.users.models import TelegramUser
+from app.orders.models import Order
+
+UNFINISHED_STATUSES = ("pending", "running")
+
+async def create(db: AsyncSession, text: str, filter_type: str, total: int):
+    job = models.BroadcastJob(text=text, filter_type=filter_type, total=total)
+    db.add(job)
+    await db.commit()
+    await db.refresh(job)
+    return job
+
+async def get_by_id(db: AsyncSession, job_id: int):
+    result = await db.execute(select(models.BroadcastJob).filter(models.BroadcastJob.id == job_id))
+    return result.scalars().first()
+
+async def get_all(db: AsyncSession, limit: int = 20):
+    result = await db.execute(
+        select(models.BroadcastJob).order_by(models.BroadcastJob.id.desc()).limit(limit)
+    )
+    return result.scalars().all()
+
+async def get_unfinished(db: AsyncSession):
+    result = await db.execute(
+        select(models.BroadcastJob)
+        .filter(models.BroadcastJob.status.in_(UNFINISHED_STATUSES))
+        .order_by(models.BroadcastJob.id)
+    )
+    return result.scalars().all()
+
+def _recipients_filter(query, filter_type: str):
+    query = query.filter(TelegramUser.telegram_id.isnot(None))
+    has_orders = exists().where(Order.user_id == TelegramUser.id)
+    if filter_type == "purchased":
+        query = query.filter(has_orders)
+    elif filter_type == "leads":
+        query = query.filter(~has_orders)
+    return query
+
+async def count_recipients(db: AsyncSession, filter_type: str):
+    result = await db.execute(_recipients_filter(select(func.count(TelegramUser.id)), filter_type))
+    return result.scalar() or 0
+
+async def get_recipients_batch(db: AsyncSession, filter_type: str, after_user_id: int, limit: int):
+    """Следующая пачка получателей (id, telegram_id) по возрастанию id — keyset, без OFFSET."""
+    query = _recipients_filter(select(TelegramUser.id, TelegramUser.telegram_id), filter_type)
+    query = query.filter(TelegramUser.id > after_user_id).order_by(TelegramUser.id).limit(limit)
+    result = await db.execute(query)
+    return result.all()
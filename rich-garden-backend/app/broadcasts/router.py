@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+from app.database import get_async_db
+from . import service, schemas
+
+# Живёт под /api/clients рядом с остальными эндпоинтами клиентов
+router = APIRouter(prefix="/clients", tags=["broadcasts"])
+
+@router.post("/broadcast", response_model=schemas.BroadcastJob, status_code=202)
+async def create_broadcast(request: schemas.BroadcastRequest, db: AsyncSession = Depends(get_async_db)):
+    return await service.start_broadcast(db, request.text, request.filter_type)
+
+@router.get("/broadcasts", response_model=List[schemas.BroadcastJob])
+async def get_broadcasts(limit: int = 20, db: AsyncSession = Depends(get_async_db)):
+    return await service.get_jobs(db, limit)
+
+@router.get("/broadcast/{job_id}", response_model=schemas.BroadcastJob)
+async def get_broadcast(job_id: int, db: AsyncSession = Depends(get_async_db)):
+    return await service.get_job(db, job_id)
@@ -0,0 +1,24 @@
+from pydantic import BaseModel
+from typing import Optional
+import datetime
+
+class BroadcastRequest(BaseModel):
+    text: str
+    filter_type: Optional[str] = "all"
+
+class BroadcastJob(BaseModel):
+    id: int
+    text: str
+    filter_type: str
+    status: str
+    total: int = 0
+    success: int = 0
+    failed: int = 0
+    progress: float = 0  # 0..100
+    error: Optional[str] = None
+    created_at: datetime.datetime
+    started_at: Optional[datetime.datetime] = None
+    finished_at: Optional[datetime.datetime] = None
+
+    class Config:
+        from_attributes = True
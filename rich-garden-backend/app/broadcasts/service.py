@@ -0,0 +1,141 @@
+"""
+Рассылки клиентам в фоне.
+
+POST /api/clients/broadcast только создаёт задачу (broadcast_jobs) и сразу
+возвращает её id. Задача выполняется asyncio-таском: получатели читаются
+пачками по id (keyset), отправка идёт через общий token bucket (лимит Telegram
+~30 сообщений/с на бота), 429 retry_after ставит на паузу всю рассылку.
+Прогресс и курсор сохраняются после каждой пачки — после рестарта процесса
+незавершённые задачи продолжаются с места остановки (пачка, прерванная
+посередине, может быть отправлена повторно).
+"""
+import asyncio
+import datetime
+import os
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import AsyncSessionLocal
+from app.services import telegram
+from app.services.rate_limit import TokenBucket
+from . import repository, schemas
+
+BROADCAST_RATE_PER_SEC = float(os.getenv("BROADCAST_RATE_PER_SEC", "30"))
+BROADCAST_BATCH_SIZE = int(os.getenv("BROADCAST_BATCH_SIZE", "200"))
+BROADCAST_CONCURRENCY = int(os.getenv("BROADCAST_CONCURRENCY", "10"))
+BROADCAST_MAX_RETRIES = int(os.getenv("BROADCAST_MAX_RETRIES", "3"))
+
+FILTER_TYPES = ("all", "purchased", "leads")
+
+# Один bucket на процесс: лимит Telegram считается на бота, а не на рассылку
+_bucket = TokenBucket(BROADCAST_RATE_PER_SEC)
+_tasks: dict[int, asyncio.Task] = {}
+
+
+def to_schema(job) -> schemas.BroadcastJob:
+    data = schemas.BroadcastJob.model_validate(job)
+    if job.total:
+        data.progress = round(min(100.0, (job.success + job.failed) * 100 / job.total), 1)
+    elif job.status == "done":
+        data.progress = 100.0
+    return data
+
+
+async def start_broadcast(db: AsyncSession, text: str, filter_type: str = "all"):
+    filter_type = filter_type or "all"
+    if filter_type not in FILTER_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unknown filter_type: {filter_type}")
+    if not text or not text.strip():
+        raise HTTPException(status_code=400, detail="Text is required")
+
+    total = await repository.count_recipients(db, filter_type)
+    job = await repository.create(db, text, filter_type, total)
+    _spawn(job.id)
+    return to_schema(job)
+
+
+async def get_job(db: AsyncSession, job_id: int):
+    job = await repository.get_by_id(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Broadcast not found")
+    return to_schema(job)
+
+
+async def get_jobs(db: AsyncSession, limit: int = 20):
+    return [to_schema(j) for j in await repository.get_all(db, limit)]
+
+
+def _spawn(job_id: int):
+    task = _tasks.get(job_id)
+    if task and not task.done():
+        return
+    task = asyncio.create_task(run_job(job_id))
+    _tasks[job_id] = task
+    task.add_done_callback(lambda t: _tasks.pop(job_id, None))
+
+
+async def _send_one(telegram_id: int, text: str) -> bool:
+    for attempt in range(BROADCAST_MAX_RETRIES + 1):
+        await _bucket.acquire()
+        try:
+            return await telegram.send_broadcast_message(telegram_id, text)
+        except telegram.TelegramRetryAfter as e:
+            print(f"Broadcast: 429 from Telegram, pausing {e.retry_after}s (attempt {attempt + 1})")
+            _bucket.pause(e.retry_after)
+    return False
+
+
+async def run_job(job_id: int):
+    async with AsyncSessionLocal() as db:
+        job = await repository.get_by_id(db, job_id)
+        if not job or job.status not in repository.UNFINISHED_STATUSES:
+            return
+
+        job.status = "running"
+        job.started_at = job.started_at or datetime.datetime.now()
+        await db.commit()
+
+        semaphore = asyncio.Semaphore(BROADCAST_CONCURRENCY)
+
+        async def send(telegram_id):
+            async with semaphore:
+                return await _send_one(telegram_id, job.text)
+
+        try:
+            while True:
+                batch = await repository.get_recipients_batch(db, job.filter_type, job.last_user_id, BROADCAST_BATCH_SIZE)
+                if not batch:
+                    break
+                results = await asyncio.gather(*(send(r.telegram_id) for r in batch))
+                job.success += results.count(True)
+                job.failed += results.count(False)
+                job.last_user_id = batch[-1].id
+                await db.commit()
+            job.status = "done"
+        except asyncio.CancelledError:
+            # Остановка процесса: задача остаётся running и продолжится при следующем старте
+            raise
+        except Exception as e:
+            print(f"Broadcast {job_id} failed: {e}")
+            await db.rollback()
+            job = await repository.get_by_id(db, job_id)
+            job.status = "failed"
+            job.error = str(e)[:500]
+        job.finished_at = datetime.datetime.now()
+        await db.commit()
+        print(f"Broadcast {job_id} {job.status}: success={job.success}, failed={job.failed}, total={job.total}")
+
+
+async def resume_unfinished():
+    """Запускается из lifespan: продолжает рассылки, прерванные рестартом."""
+    async with AsyncSessionLocal() as db:
+        jobs = await repository.get_unfinished(db)
+    for job in jobs:
+        print(f"Broadcast {job.id}: resuming from user_id>{job.last_user_id}")
+        _spawn(job.id)
+
+
+async def shutdown():
+    tasks = list(_tasks.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
@@ -1,12 +1,15 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select, delete as sql_delete
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException
 from . import repository as calendar_repo
 from . import schemas
 from app.users import repository as user_repo
+from app.users import identity
+from app.database import unit_of_work
 
-def get_or_create_user(db: Session, telegram_id: int):
-    user = user_repo.get_by_telegram_id(db, telegram_id)
-    if not user:
+async def get_or_create_user_id(db: AsyncSession, telegram_id: int) -> int:
+    user_id = await identity.get_user_id(db, telegram_id)
+    if user_id is None:
         # Create a basic user if not exists (for calendar support)
         from app.users.schemas import TelegramUserCreate
         user_in = TelegramUserCreate(
@@ -14,18 +17,21 @@ def get_or_create_user(db: Session, telegram_id: int):
             first_name=f"User {telegram_id}",
             username=f"user_{telegram_id}"
         )
-        user = user_repo.create_or_update_telegram_user(db, user_in)
-    return user
+        async with unit_of_work(db):
+            user = await user_repo.create_or_update_telegram_user(db, user_in)
+        user_id = user.id
+        identity.remember(telegram_id, user_id)
+    return user_id
 
-def get_calendar_data(db: Session, telegram_id: int):
-    user = user_repo.get_by_telegram_id(db, telegram_id)
+async def get_calendar_data(db: AsyncSession, telegram_id: int):
+    user_id = await identity.get_user_id(db, telegram_id)
     repo = calendar_repo.CalendarRepository(db)
 
-    if not user:
+    if user_id is None:
         return {"family": [], "events": []}
     
-    family = repo.get_family_members(user.id)
-    real_events = repo.get_events(user.id)
+    family = await repo.get_family_members(user_id)
+    real_events = await repo.get_events(user_id)
     
     # Process virtual birthday events from family members
     all_events = []
@@ -59,7 +65,7 @@ def get_calendar_data(db: Session, telegram_id: int):
                     from .models import CalendarEvent
                     virtual_event = CalendarEvent(
                         id=f"v-{member.id}", # Virtual ID
-                        user_id=user.id,
+                        user_id=user_id,
                         family_member_id=member.id,
                         title=f"День рождения: {member.name}",
                         date=event_date,
@@ -75,41 +81,41 @@ def get_calendar_data(db: Session, telegram_id: int):
         "events": all_events
     }
 
-def create_family_member(db: Session, telegram_id: int, member: schemas.FamilyMemberCreate):
-    user = get_or_create_user(db, telegram_id)
+async def create_family_member(db: AsyncSession, telegram_id: int, member: schemas.FamilyMemberCreate):
+    user_id = await get_or_create_user_id(db, telegram_id)
     repo = calendar_repo.CalendarRepository(db)
     
-    db_member = repo.create_family_member(user.id, member)
+    db_member = await repo.create_family_member(user_id, member)
     # No longer auto-creating a separate record in calendar_events table
     return db_member
 
-def delete_family_member(db: Session, telegram_id: int, member_id: int):
-    user = user_repo.get_by_telegram_id(db, telegram_id)
-    if not user:
+async def delete_family_member(db: AsyncSession, telegram_id: int, member_id: int):
+    user_id = await identity.get_user_id(db, telegram_id)
+    if user_id is None:
         return {"message": "User not found"}
     
     repo = calendar_repo.CalendarRepository(db)
     # Delete associated events
-    db.query(calendar_repo.models.CalendarEvent).filter(
-        calendar_repo.models.CalendarEvent.user_id == user.id,
+    await db.execute(sql_delete(calendar_repo.models.CalendarEvent).where(
+        calendar_repo.models.CalendarEvent.user_id == user_id,
         calendar_repo.models.CalendarEvent.family_member_id == member_id
-    ).delete()
-    db.commit()
+    ))
+    await db.commit()
     
-    if not repo.delete_family_member(user.id, member_id):
+    if not await repo.delete_family_member(user_id, member_id):
         raise HTTPException(status_code=404, detail="Member not found")
     return {"message": "OK"}
 
-def create_event(db: Session, telegram_id: int, event: schemas.CalendarEventCreate):
-    user = get_or_create_user(db, telegram_id)
+async def create_event(db: AsyncSession, telegram_id: int, event: schemas.CalendarEventCreate):
+    user_id = await get_or_create_user_id(db, telegram_id)
     repo = calendar_repo.CalendarRepository(db)
-    return repo.create_event(user.id, event)
+    return await repo.create_event(user_id, event)
 
 from typing import Union
 
-def delete_event(db: Session, telegram_id: int, event_id: Union[int, str]):
-    user = user_repo.get_by_telegram_id(db, telegram_id)
-    if not user:
+async def delete_event(db: AsyncSession, telegram_id: int, event_id: Union[int, str]):
+    user_id = await identity.get_user_id(db, telegram_id)
+    if user_id is None:
         raise HTTPException(status_code=404, detail="User not found")
     
     # Handle virtual events (starting with v-)
@@ -122,15 +128,15 @@ def delete_event(db: Session, telegram_id: int, event_id: Union[int, str]):
         )
 
     repo = calendar_repo.CalendarRepository(db)
-    if not repo.delete_event(user.id, int(event_id)):
+    if not await repo.delete_event(user_id, int(event_id)):
         raise HTTPException(status_code=404, detail="Event not found")
     return {"message": "OK"}
 
-def get_all_calendar_data(db: Session):
-    from sqlalchemy.orm import joinedload
+async def get_all_calendar_data(db: AsyncSession):
+    from sqlalchemy.orm import selectinload
     from datetime import datetime
-    family = db.query(calendar_repo.models.FamilyMember).options(joinedload(calendar_repo.models.FamilyMember.user)).all()
-    real_events = db.query(calendar_repo.models.CalendarEvent).options(joinedload(calendar_repo.models.CalendarEvent.user)).all()
+    family = (await db.execute(select(calendar_repo.models.FamilyMember).options(selectinload(calendar_repo.models.FamilyMember.user)))).scalars().all()
+    real_events = (await db.execute(select(calendar_repo.models.CalendarEvent).options(selectinload(calendar_repo.models.CalendarEvent.user)))).scalars().all()
     
     all_events = [e for e in real_events]
     current_year = datetime.now().year
@@ -0,0 +1,16 @@
+from pydantic import BaseModel
+from typing import Dict, Optional
+
+from app.services import images
+
+class ImageSet(BaseModel):
+    """Производные фото (app.services.images): src — JPEG нужного размера, srcset — по форматам (avif/webp/jpeg)."""
+    src: str
+    width: int
+    height: int
+    srcset: Dict[str, str] = {}
+
+def image_set(url: Optional[str], size: str) -> Optional[ImageSet]:
+    """Размер size (thumb/card/full) фото по сохранённому URL; None для старых загрузок без производных."""
+    data = images.image_set(url, size)
+    return ImageSet(**data) if data else None
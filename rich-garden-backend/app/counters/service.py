@@ -0,0 +1,180 @@
+"""
+Write-behind счётчики: просмотры товаров, «недавно просмотренные» и поисковые запросы.
+
+Раньше каждый тап по карточке в Mini App — это поиск товара, UPDATE views, поиск пользователя
+с адресами, поиск записи recently_viewed и отдельный commit. Теперь запрос только увеличивает
+счётчик в памяти процесса, а воркер (asyncio-таск в lifespan, как outbox) раз в
+COUNTERS_FLUSH_INTERVAL секунд — или раньше, когда накопилось COUNTERS_FLUSH_MAX_PENDING
+событий — пишет всё одной транзакцией: один UPDATE views = views + n на все товары, пачка
+upsert recently_viewed и один upsert search_queries. При ошибке БД пачка возвращается в буфер.
+
+Топ просматриваемых и популярные запросы читаются из кэша рейтингов (COUNTERS_RANKING_TTL):
+это витринные подсказки, минутная задержка для них не важна.
+"""
+import asyncio
+import datetime
+import os
+import time
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import AsyncSessionLocal, unit_of_work
+from app.products import catalog
+from app.products import repository as product_repo
+from app.search import repository as search_repo
+from app.users import repository as user_repo
+from app.users import recent as user_recent
+
+COUNTERS_FLUSH_INTERVAL = float(os.getenv("COUNTERS_FLUSH_INTERVAL", "5"))
+COUNTERS_FLUSH_MAX_PENDING = int(os.getenv("COUNTERS_FLUSH_MAX_PENDING", "1000"))
+COUNTERS_RANKING_TTL = int(os.getenv("COUNTERS_RANKING_TTL", "60"))
+
+_views = {}     # product_id -> n
+_recent = {}    # telegram_id -> {product_id: viewed_at}
+_queries = {}   # query -> [count, results, last_searched_at]
+_pending = 0
+# Пачка, которую сейчас пишет flush: «недавно просмотренные» не должны пропадать на это время
+_flushing_recent = {}
+_flush_lock = asyncio.Lock()
+
+_rankings = {}  # ключ -> (значение, generation каталога, expires_at)
+
+_wakeup: asyncio.Event | None = None
+_task: asyncio.Task | None = None
+
+
+def _counted():
+    global _pending
+    _pending += 1
+    if _pending >= COUNTERS_FLUSH_MAX_PENDING and _wakeup is not None:
+        _wakeup.set()
+
+
+def add_view(product_id: int, telegram_id: int = None):
+    """Просмотр карточки: +1 к views и (если пользователь известен) запись в «недавно просмотренные»."""
+    _views[product_id] = _views.get(product_id, 0) + 1
+    if telegram_id is not None:
+        _recent.setdefault(telegram_id, {})[product_id] = datetime.datetime.now()
+    _counted()
+
+
+def add_search(query: str, results: int):
+    entry = _queries.get(query)
+    if entry is None:
+        _queries[query] = [1, results, datetime.datetime.utcnow()]
+    else:
+        entry[0] += 1
+        entry[1] = results
+        entry[2] = datetime.datetime.utcnow()
+    _counted()
+
+
+def pending_recent(telegram_id: int) -> dict:
+    """Ещё не записанные в БД просмотры пользователя: {product_id: viewed_at}."""
+    pending = dict(_flushing_recent.get(telegram_id, {}))
+    pending.update(_recent.get(telegram_id, {}))
+    return pending
+
+
+def _merge_back(views: dict, recent: dict, queries: dict):
+    global _pending
+    for product_id, n in views.items():
+        _views[product_id] = _views.get(product_id, 0) + n
+    for telegram_id, items in recent.items():
+        current = _recent.setdefault(telegram_id, {})
+        for product_id, viewed_at in items.items():
+            if product_id not in current or viewed_at > current[product_id]:
+                current[product_id] = viewed_at
+    for query, (count, results, at) in queries.items():
+        entry = _queries.get(query)
+        if entry is None:
+            _queries[query] = [count, results, at]
+        else:
+            entry[0] += count
+            if at > entry[2]:  # results — от самого свежего поиска
+                entry[1], entry[2] = results, at
+    _pending += len(views) + len(queries) + sum(len(items) for items in recent.values())
+
+
+async def flush() -> int:
+    """Пишет накопленные счётчики одной транзакцией. Возвращает число записанных событий."""
+    global _views, _recent, _queries, _pending, _flushing_recent
+    async with _flush_lock:
+        if not (_views or _recent or _queries):
+            return 0
+        views, recent, queries, pending = _views, _recent, _queries, _pending
+        _views, _recent, _queries, _pending = {}, {}, {}, 0
+        _flushing_recent = recent
+        try:
+            async with AsyncSessionLocal() as db:
+                async with unit_of_work(db):
+                    await product_repo.add_views(db, views)
+                    await user_repo.upsert_recent_views(db, recent)
+                    await search_repo.record_queries(
+                        db, {query: tuple(entry) for query, entry in queries.items()}
+                    )
+        except BaseException:
+            _merge_back(views, recent, queries)
+            raise
+        finally:
+            _flushing_recent = {}
+        user_recent.remember(recent)
+        return pending
+
+
+async def run_worker():
+    while True:
+        try:
+            await asyncio.wait_for(_wakeup.wait(), timeout=COUNTERS_FLUSH_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        _wakeup.clear()
+        try:
+            await flush()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"ERROR counters worker: {e}")
+
+
+def start():
+    global _wakeup, _task
+    _wakeup = asyncio.Event()
+    _task = asyncio.create_task(run_worker())
+
+
+async def stop():
+    """Останавливает воркер и дописывает буфер, чтобы рестарт не терял просмотры."""
+    global _task
+    if _task is not None:
+        _task.cancel()
+        await asyncio.gather(_task, return_exceptions=True)
+        _task = None
+    try:
+        await flush()
+    except Exception as e:
+        print(f"ERROR counters: final flush failed: {e}")
+
+
+async def _ranking(key, load):
+    entry = _rankings.get(key)
+    if entry and entry[1] == catalog.generation() and entry[2] > time.monotonic():
+        return entry[0]
+    generation = catalog.generation()
+    value = await load()
+    _rankings[key] = (value, generation, time.monotonic() + COUNTERS_RANKING_TTL)
+    return value
+
+
+async def get_top_viewed(db: AsyncSession, limit: int = 4):
+    """Самые просматриваемые товары (карточки витрины); сбрасывается и при изменении товаров."""
+    async def load():
+        rows = await product_repo.get_top_viewed(db, limit=limit)
+        return [catalog.build_item(row) for row in rows]
+    return await _ranking(("top_viewed", limit), load)
+
+
+async def get_popular_queries(db: AsyncSession, limit: int, min_count: int = 1):
+    async def load():
+        return list(await search_repo.get_popular_queries(db, limit, min_count))
+    return await _ranking(("popular_queries", limit, min_count), load)
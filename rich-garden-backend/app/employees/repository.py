@@ -1,28 +1,32 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from . import models, schemas
 
-def get_employees(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Employee).offset(skip).limit(limit).all()
+async def get_employees(db: AsyncSession, skip: int = 0, limit: int = 100):
+    result = await db.execute(select(models.Employee).offset(skip).limit(limit))
+    return result.scalars().all()
 
-def get_employee(db: Session, employee_id: int):
-    return db.query(models.Employee).filter(models.Employee.id == employee_id).first()
+async def get_employee(db: AsyncSession, employee_id: int):
+    result = await db.execute(select(models.Employee).filter(models.Employee.id == employee_id))
+    return result.scalars().first()
 
-def get_by_telegram_id(db: Session, telegram_id: int):
-    return db.query(models.Employee).filter(models.Employee.telegram_id == telegram_id).first()
+async def get_by_telegram_id(db: AsyncSession, telegram_id: int):
+    result = await db.execute(select(models.Employee).filter(models.Employee.telegram_id == telegram_id))
+    return result.scalars().first()
 
-def create_employee(db: Session, employee: schemas.EmployeeCreate, photo_url: str = None):
+async def create_employee(db: AsyncSession, employee: schemas.EmployeeCreate, photo_url: str = None):
     data = employee.dict()
     if photo_url:
         data['photo_url'] = photo_url
         
     db_employee = models.Employee(**data)
     db.add(db_employee)
-    db.commit()
-    db.refresh(db_employee)
+    await db.commit()
+    await db.refresh(db_employee)
     return db_employee
 
-def update_employee(db: Session, employee_id: int, employee_update: schemas.EmployeeUpdate):
-    db_employee = get_employee(db, employee_id)
+async def update_employee(db: AsyncSession, employee_id: int, employee_update: schemas.EmployeeUpdate):
+    db_employee = await get_employee(db, employee_id)
     if not db_employee:
         return None
     
@@ -30,13 +34,13 @@ def update_employee(db: Session, employee_id: int, employee_update: schemas.Empl
     for key, value in update_data.items():
         setattr(db_employee, key, value)
     
-    db.commit()
-    db.refresh(db_employee)
+    await db.commit()
+    await db.refresh(db_employee)
     return db_employee
 
-def delete_employee(db: Session, employee_id: int):
-    db_employee = get_employee(db, employee_id)
+async def delete_employee(db: AsyncSession, employee_id: int):
+    db_employee = await get_employee(db, employee_id)
     if db_employee:
-        db.delete(db_employee)
-        db.commit()
+        await db.delete(db_employee)
+        await db.commit()
     return db_employee
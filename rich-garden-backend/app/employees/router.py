@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
-from app.database import get_db
+from app.database import get_async_db
 from . import service, schemas
 
 router = APIRouter(
@@ -10,24 +10,24 @@ router = APIRouter(
 )
 
 @router.get("", response_model=List[schemas.Employee])
-def get_employees(db: Session = Depends(get_db)):
-    return service.get_all_employees(db)
+async def get_employees(db: AsyncSession = Depends(get_async_db)):
+    return await service.get_all_employees(db)
 
 @router.post("", response_model=schemas.Employee)
-async def create_employee(employee: schemas.EmployeeCreate, db: Session = Depends(get_db)):
+async def create_employee(employee: schemas.EmployeeCreate, db: AsyncSession = Depends(get_async_db)):
     return await service.create_employee(db, employee)
 
 @router.put("/{employee_id}", response_model=schemas.Employee)
-async def update_employee(employee_id: int, employee_update: schemas.EmployeeUpdate, db: Session = Depends(get_db)):
+async def update_employee(employee_id: int, employee_update: schemas.EmployeeUpdate, db: AsyncSession = Depends(get_async_db)):
     return await service.update_employee(db, employee_id, employee_update)
 
 @router.delete("/{employee_id}")
-def delete_employee(employee_id: int, db: Session = Depends(get_db)):
-    service.delete_employee(db, employee_id)
+async def delete_employee(employee_id: int, db: AsyncSession = Depends(get_async_db)):
+    await service.delete_employee(db, employee_id)
     return {"message": "Success"}
 
 @router.get("/check/{telegram_id}", response_model=schemas.Employee)
-async def check_employee_access(telegram_id: int, username: str = None, db: Session = Depends(get_db)):
+async def check_employee_access(telegram_id: int, username: str = None, db: AsyncSession = Depends(get_async_db)):
     # Helper endpoint to check if a user is an employee
     emp = await service.check_access(db, telegram_id, username=username)
     if not emp:
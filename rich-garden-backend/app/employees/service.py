@@ -1,21 +1,21 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from . import repository, schemas, models
 from fastapi import HTTPException
 
-def get_all_employees(db: Session):
-    return repository.get_employees(db)
+async def get_all_employees(db: AsyncSession):
+    return await repository.get_employees(db)
 
-def get_employee(db: Session, employee_id: int):
-    emb = repository.get_employee(db, employee_id)
+async def get_employee(db: AsyncSession, employee_id: int):
+    emb = await repository.get_employee(db, employee_id)
     if not emb:
         raise HTTPException(status_code=404, detail="Employee not found")
     return emb
 
-async def create_employee(db: Session, employee: schemas.EmployeeCreate):
+async def create_employee(db: AsyncSession, employee: schemas.EmployeeCreate):
     from app.services import telegram
     
     # Check if employee already exists
-    existing = repository.get_by_telegram_id(db, employee.telegram_id)
+    existing = await repository.get_by_telegram_id(db, employee.telegram_id)
     if existing:
         raise HTTPException(status_code=400, detail="Employee with this Telegram ID already exists")
     
@@ -27,9 +27,9 @@ async def create_employee(db: Session, employee: schemas.EmployeeCreate):
         print(f"Warning: Could not get photo for user {employee.telegram_id}: {e}")
         # Continue without photo
     
-    return repository.create_employee(db, employee, photo_url=photo_url)
+    return await repository.create_employee(db, employee, photo_url=photo_url)
 
-async def update_employee(db: Session, employee_id: int, employee_update: schemas.EmployeeUpdate):
+async def update_employee(db: AsyncSession, employee_id: int, employee_update: schemas.EmployeeUpdate):
     from app.services import telegram
     
     # If telegram_id is updated, try to refresh photo
@@ -41,13 +41,13 @@ async def update_employee(db: Session, employee_id: int, employee_update: schema
         except Exception as e:
             print(f"Warning: Could not refresh photo for updated user {employee_update.telegram_id}: {e}")
 
-    return repository.update_employee(db, employee_id, employee_update)
+    return await repository.update_employee(db, employee_id, employee_update)
 
-def delete_employee(db: Session, employee_id: int):
-    return repository.delete_employee(db, employee_id)
+async def delete_employee(db: AsyncSession, employee_id: int):
+    return await repository.delete_employee(db, employee_id)
 
-async def check_access(db: Session, telegram_id: int, username: str = None):
-    emp = repository.get_by_telegram_id(db, telegram_id)
+async def check_access(db: AsyncSession, telegram_id: int, username: str = None):
+    emp = await repository.get_by_telegram_id(db, telegram_id)
     if not emp:
         return None
     
@@ -67,7 +67,6 @@ async def check_access(db: Session, telegram_id: int, username: str = None):
             needs_update = True
             
     if needs_update:
-        repository.update_employee(db, emp.id, schemas.EmployeeUpdate(**update_data))
-        db.refresh(emp)
+        await repository.update_employee(db, emp.id, schemas.EmployeeUpdate(**update_data))
         
     return emp
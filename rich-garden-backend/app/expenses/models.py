@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, Integer, String
+from sqlalchemy import Boolean, Column, Integer, String, DateTime
 from app.database import Base
 
 class Expense(Base):
@@ -8,4 +8,5 @@ class Expense(Base):
     amount = Column(Integer)
     category = Column(String)
     note = Column(String)
-    date = Column(String)
+    # Раньше строка ISO; существующие БД: migrate_expenses_date.py
+    date = Column(DateTime, index=True)
@@ -1,19 +1,36 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
 from . import models, schemas
+import datetime
 
-def create(db: Session, expense: schemas.ExpenseCreate):
+async def create(db: AsyncSession, expense: schemas.ExpenseCreate):
     db_expense = models.Expense(**expense.dict())
     db.add(db_expense)
-    db.commit()
-    db.refresh(db_expense)
+    await db.flush()  # commit — в сервисе (unit_of_work)
+    await db.refresh(db_expense)
     return db_expense
 
-def get_all(db: Session):
-    return db.query(models.Expense).all()
+async def get_all(
+    db: AsyncSession,
+    date_from: Optional[datetime.date] = None,
+    date_to: Optional[datetime.date] = None,
+    category: Optional[str] = None,
+):
+    q = select(models.Expense)
+    if date_from:
+        q = q.filter(models.Expense.date >= datetime.datetime.combine(date_from, datetime.time.min))
+    if date_to:
+        q = q.filter(models.Expense.date < datetime.datetime.combine(date_to + datetime.timedelta(days=1), datetime.time.min))
+    if category:
+        q = q.filter(models.Expense.category == category)
+    result = await db.execute(q.order_by(models.Expense.date.desc(), models.Expense.id.desc()))
+    return result.scalars().all()
 
-def delete(db: Session, expense_id: int):
-    db_expense = db.query(models.Expense).filter(models.Expense.id == expense_id).first()
+async def delete(db: AsyncSession, expense_id: int):
+    result = await db.execute(select(models.Expense).filter(models.Expense.id == expense_id))
+    db_expense = result.scalars().first()
     if db_expense:
-        db.delete(db_expense)
-        db.commit()
+        await db.delete(db_expense)
+        await db.flush()
     return db_expense
@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from typing import List
-from app.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+import datetime
+from app.database import get_async_db
 from . import service, schemas
 
 router = APIRouter(
@@ -10,14 +11,19 @@ router = APIRouter(
 )
 
 @router.post("", response_model=schemas.Expense)
-def create_expense(expense: schemas.ExpenseCreate, db: Session = Depends(get_db)):
-    return service.create_expense(db, expense)
+async def create_expense(expense: schemas.ExpenseCreate, db: AsyncSession = Depends(get_async_db)):
+    return await service.create_expense(db, expense)
 
 @router.get("", response_model=List[schemas.Expense])
-def get_expenses(db: Session = Depends(get_db)):
-    return service.get_expenses(db)
+async def get_expenses(
+    date_from: Optional[datetime.date] = None,
+    date_to: Optional[datetime.date] = None,
+    category: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await service.get_expenses(db, date_from=date_from, date_to=date_to, category=category)
 
 @router.delete("/{expense_id}")
-def delete_expense(expense_id: int, db: Session = Depends(get_db)):
-    service.delete_expense(db, expense_id)
+async def delete_expense(expense_id: int, db: AsyncSession = Depends(get_async_db)):
+    await service.delete_expense(db, expense_id)
     return {"message": "Expense deleted"}
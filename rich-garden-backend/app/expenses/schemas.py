@@ -1,11 +1,20 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator
 from typing import Optional
+import datetime
 
 class ExpenseBase(BaseModel):
     amount: int
     category: str
     note: str
-    date: str
+    date: datetime.datetime
+
+    @field_validator("date")
+    @classmethod
+    def to_server_time(cls, value: datetime.datetime):
+        # Sklad шлёт toISOString() (UTC, "Z"); в БД, как и orders.created_at, — локальное время сервера без зоны
+        if value.tzinfo is not None:
+            value = value.astimezone().replace(tzinfo=None)
+        return value
 
 class ExpenseCreate(ExpenseBase):
     pass
@@ -1,11 +1,14 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import unit_of_work
 from . import repository, schemas
 
-def create_expense(db: Session, expense: schemas.ExpenseCreate):
-    return repository.create(db, expense)
+async def create_expense(db: AsyncSession, expense: schemas.ExpenseCreate):
+    async with unit_of_work(db):
+        return await repository.create(db, expense)
 
-def get_expenses(db: Session):
-    return repository.get_all(db)
+async def get_expenses(db: AsyncSession, **filters):
+    return await repository.get_all(db, **filters)
 
-def delete_expense(db: Session, expense_id: int):
-    return repository.delete(db, expense_id)
+async def delete_expense(db: AsyncSession, expense_id: int):
+    async with unit_of_work(db):
+        return await repository.delete(db, expense_id)
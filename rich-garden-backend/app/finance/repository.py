@@ -0,0 +1,109 @@
+from sqlalchemy import select, func, cast, Date
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional, Sequence
+from app.orders.models import Order, OrderItem
+from app.products.models import Product
+from app.expenses.models import Expense
+import datetime
+
+def _bucket(db: AsyncSession, column, group_by: str):
+    """Начало периода (day/week/month) для колонки DateTime; неделя начинается с понедельника."""
+    if db.bind.dialect.name == "postgresql":
+        return cast(func.date_trunc(group_by, column), Date)
+    if group_by == "week":
+        return func.date(column, "weekday 0", "-6 days")
+    if group_by == "month":
+        return func.strftime("%Y-%m-01", column)
+    return func.date(column)
+
+def _as_date(value) -> datetime.date:
+    # SQLite возвращает строку 'YYYY-MM-DD', PostgreSQL — date
+    if isinstance(value, str):
+        return datetime.date.fromisoformat(value)
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    return value
+
+def _range(column, start: datetime.datetime, end: datetime.datetime):
+    return (column >= start, column < end)
+
+async def get_revenue(db: AsyncSession, statuses: Sequence[str], start: datetime.datetime, end: datetime.datetime):
+    result = await db.execute(
+        select(func.count(Order.id), func.coalesce(func.sum(Order.total_price), 0))
+        .filter(Order.status.in_(statuses), *_range(Order.created_at, start, end))
+    )
+    orders_count, revenue = result.one()
+    return orders_count or 0, revenue or 0
+
+async def get_expenses_by_category(db: AsyncSession, start: datetime.datetime, end: datetime.datetime):
+    amount = func.coalesce(func.sum(Expense.amount), 0)
+    result = await db.execute(
+        select(Expense.category, amount.label("amount"), func.count(Expense.id).label("count"))
+        .filter(*_range(Expense.date, start, end))
+        .group_by(Expense.category)
+        .order_by(amount.desc())
+    )
+    return [
+        {"category": row.category or "Без категории", "amount": row.amount or 0, "count": row.count}
+        for row in result.all()
+    ]
+
+async def get_revenue_series(db: AsyncSession, statuses: Sequence[str], start: datetime.datetime, end: datetime.datetime, group_by: str):
+    period = _bucket(db, Order.created_at, group_by).label("period")
+    result = await db.execute(
+        select(period, func.count(Order.id), func.coalesce(func.sum(Order.total_price), 0))
+        .filter(Order.status.in_(statuses), *_range(Order.created_at, start, end))
+        .group_by(period)
+    )
+    return {_as_date(p): (count, revenue) for p, count, revenue in result.all()}
+
+async def get_expense_series(db: AsyncSession, start: datetime.datetime, end: datetime.datetime, group_by: str):
+    period = _bucket(db, Expense.date, group_by).label("period")
+    result = await db.execute(
+        select(period, func.coalesce(func.sum(Expense.amount), 0))
+        .filter(*_range(Expense.date, start, end))
+        .group_by(period)
+    )
+    return {_as_date(p): amount for p, amount in result.all()}
+
+async def get_product_sales(
+    db: AsyncSession,
+    statuses: Sequence[str],
+    start: datetime.datetime,
+    end: datetime.datetime,
+    sort: str = "quantity",
+    limit: int = 20,
+    category: Optional[str] = None,
+):
+    """Продажи по товарам из order_items (индексы ix_orders_status_created + ix_order_items_product_order)."""
+    quantity = func.sum(OrderItem.quantity).label("quantity")
+    revenue = func.sum(OrderItem.quantity * OrderItem.unit_price).label("revenue")
+    q = (
+        select(
+            OrderItem.product_id,
+            func.coalesce(Product.name, func.max(OrderItem.name)).label("name"),
+            Product.category,
+            quantity,
+            revenue,
+            func.count(func.distinct(OrderItem.order_id)).label("orders_count"),
+        )
+        .join(Order, Order.id == OrderItem.order_id)
+        .outerjoin(Product, Product.id == OrderItem.product_id)
+        .filter(Order.status.in_(statuses), *_range(Order.created_at, start, end))
+        .group_by(OrderItem.product_id, Product.name, Product.category)
+    )
+    if category:
+        q = q.filter(Product.category == category)
+    order_column = revenue if sort == "revenue" else quantity
+    result = await db.execute(q.order_by(order_column.desc()).limit(limit))
+    return [
+        {
+            "product_id": row.product_id,
+            "name": row.name or "Товар",
+            "category": row.category,
+            "quantity": row.quantity or 0,
+            "revenue": row.revenue or 0,
+            "orders_count": row.orders_count,
+        }
+        for row in result.all()
+    ]
@@ -0,0 +1,33 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from app.database import get_async_db
+from . import service, schemas
+import datetime
+
+router = APIRouter(
+    prefix="/finance",
+    tags=["finance"]
+)
+
+@router.get("/summary", response_model=schemas.FinanceSummary)
+async def get_summary(
+    date_from: Optional[datetime.date] = None,
+    date_to: Optional[datetime.date] = None,
+    group_by: str = "day",
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Выручка, расходы по категориям, маржа и ряд по дням/неделям/месяцам за период (по умолчанию 30 дней)."""
+    return await service.get_summary(db, date_from=date_from, date_to=date_to, group_by=group_by)
+
+@router.get("/products", response_model=schemas.ProductSalesReport)
+async def get_product_sales(
+    date_from: Optional[datetime.date] = None,
+    date_to: Optional[datetime.date] = None,
+    sort: str = "quantity",
+    limit: int = Query(20, ge=1, le=500),
+    category: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Продажи по товарам (хиты продаж): количество, выручка и число заказов за период."""
+    return await service.get_product_sales(db, date_from=date_from, date_to=date_to, sort=sort, limit=limit, category=category)
@@ -0,0 +1,42 @@
+from pydantic import BaseModel
+from typing import List, Optional
+import datetime
+
+class ExpenseCategoryTotal(BaseModel):
+    category: str
+    amount: int
+    count: int
+
+class FinancePoint(BaseModel):
+    period: datetime.date  # начало дня / недели (пн) / месяца
+    revenue: int
+    expenses: int
+    margin: int
+    orders_count: int
+
+class FinanceSummary(BaseModel):
+    date_from: datetime.date
+    date_to: datetime.date
+    group_by: str
+    revenue: int
+    orders_count: int
+    average_check: int
+    expenses: int
+    margin: int
+    margin_percent: Optional[float] = None
+    expenses_by_category: List[ExpenseCategoryTotal]
+    series: List[FinancePoint]
+
+class ProductSales(BaseModel):
+    product_id: Optional[int] = None  # None — товар удалён или не найден при переносе
+    name: str
+    category: Optional[str] = None
+    quantity: int
+    revenue: int
+    orders_count: int
+
+class ProductSalesReport(BaseModel):
+    date_from: datetime.date
+    date_to: datetime.date
+    sort: str
+    items: List[ProductSales]
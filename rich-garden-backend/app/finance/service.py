@@ -0,0 +1,95 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import HTTPException
+from typing import Optional
+from . import repository, schemas
+import datetime
+
+# Заказы, которые страница «Финансы» считает доходом
+INCOME_STATUSES = ("new", "processing", "paid", "shipping", "done")
+GROUP_BY = ("day", "week", "month")
+DEFAULT_PERIOD_DAYS = 30
+
+def _period_start(day: datetime.date, group_by: str) -> datetime.date:
+    if group_by == "week":
+        return day - datetime.timedelta(days=day.weekday())
+    if group_by == "month":
+        return day.replace(day=1)
+    return day
+
+def _next_period(day: datetime.date, group_by: str) -> datetime.date:
+    if group_by == "week":
+        return day + datetime.timedelta(days=7)
+    if group_by == "month":
+        return (day.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+    return day + datetime.timedelta(days=1)
+
+def _date_range(date_from: Optional[datetime.date], date_to: Optional[datetime.date]):
+    """Период по умолчанию — последние 30 дней; границы включительно: [date_from 00:00, date_to + 1 день 00:00)."""
+    date_to = date_to or datetime.date.today()
+    date_from = date_from or date_to - datetime.timedelta(days=DEFAULT_PERIOD_DAYS - 1)
+    if date_from > date_to:
+        raise HTTPException(status_code=400, detail="date_from must be before date_to")
+    start = datetime.datetime.combine(date_from, datetime.time.min)
+    end = datetime.datetime.combine(date_to + datetime.timedelta(days=1), datetime.time.min)
+    return date_from, date_to, start, end
+
+async def get_summary(
+    db: AsyncSession,
+    date_from: Optional[datetime.date] = None,
+    date_to: Optional[datetime.date] = None,
+    group_by: str = "day",
+):
+    if group_by not in GROUP_BY:
+        raise HTTPException(status_code=400, detail=f"Unknown group_by: {group_by}")
+    date_from, date_to, start, end = _date_range(date_from, date_to)
+
+    orders_count, revenue = await repository.get_revenue(db, INCOME_STATUSES, start, end)
+    by_category = await repository.get_expenses_by_category(db, start, end)
+    revenue_series = await repository.get_revenue_series(db, INCOME_STATUSES, start, end, group_by)
+    expense_series = await repository.get_expense_series(db, start, end, group_by)
+
+    expenses = sum(c["amount"] for c in by_category)
+    margin = revenue - expenses
+
+    # Пустые периоды тоже отдаём, чтобы график не достраивал их на клиенте
+    series = []
+    period = _period_start(date_from, group_by)
+    while period <= date_to:
+        count, period_revenue = revenue_series.get(period, (0, 0))
+        period_expenses = expense_series.get(period, 0)
+        series.append({
+            "period": period,
+            "revenue": period_revenue,
+            "expenses": period_expenses,
+            "margin": period_revenue - period_expenses,
+            "orders_count": count,
+        })
+        period = _next_period(period, group_by)
+
+    return {
+        "date_from": date_from,
+        "date_to": date_to,
+        "group_by": group_by,
+        "revenue": revenue,
+        "orders_count": orders_count,
+        "average_check": revenue // orders_count if orders_count else 0,
+        "expenses": expenses,
+        "margin": margin,
+        "margin_percent": round(margin * 100 / revenue, 1) if revenue else None,
+        "expenses_by_category": by_category,
+        "series": series,
+    }
+
+async def get_product_sales(
+    db: AsyncSession,
+    date_from: Optional[datetime.date] = None,
+    date_to: Optional[datetime.date] = None,
+    sort: str = "quantity",
+    limit: int = 20,
+    category: Optional[str] = None,
+):
+    if sort not in ("quantity", "revenue"):
+        raise HTTPException(status_code=400, detail=f"Unknown sort: {sort}")
+    date_from, date_to, start, end = _date_range(date_from, date_to)
+    items = await repository.get_product_sales(db, INCOME_STATUSES, start, end, sort=sort, limit=limit, category=category)
+    return {"date_from": date_from, "date_to": date_to, "sort": sort, "items": items}
@@ -1,8 +1,8 @@
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 import os
+from contextlib import asynccontextmanager
 
 from app import database
 # Import models to register them with Base
@@ -16,12 +16,21 @@ from app.stories import models as story_models
 from app.banners import models as banner_models
 from app.wow_effects import models as wow_effects_models
 from app.payments import models as payment_models  # PaymeTransaction
+from app.broadcasts import models as broadcast_models
+from app.outbox import models as outbox_models
+from app.stock import models as stock_models
+from app.search import models as search_models
+from app.telegram_files import models as telegram_file_models
+from app.stored_files import models as stored_file_models
+from app.stored_files import service as stored_files_service  # слушатель flush: счётчики ссылок на файлы
 
 # Import routers
 from app.products import router as products_router
 from app.orders import router as orders_router
 from app.users import router as users_router
 from app.expenses import router as expenses_router
+from app.finance import router as finance_router
+from app.stock import router as stock_router
 from app.search import router as search_router
 from app.common import router as common_router
 from app.calendar import router as calendar_router
@@ -31,10 +40,41 @@ from app.stories import router as stories_router
 from app.banners import router as banners_router
 from app.payments import router as payments_router
 from app.wow_effects import router as wow_effects_router
+from app.broadcasts import router as broadcasts_router
+from app.broadcasts import service as broadcast_service
+from app.outbox import service as outbox_service
+from app.stock import service as stock_service
+from app.counters import service as counters_service
+from app.payments import gateway as payment_gateway
+from app.services import telegram_client
+from app.services import images, query_stats, storage, uploads
+from app.services.static_files import CachedStaticFiles
 
 from app.products import repository as product_repo # for seed
 
-app = FastAPI(title="Rich Garden API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        await broadcast_service.resume_unfinished()
+    except Exception as e:
+        import logging
+        logging.warning(f"Could not resume broadcasts: {e}")
+    outbox_service.start()
+    stock_service.start()
+    counters_service.start()
+    yield
+    await counters_service.stop()
+    await stock_service.stop()
+    await outbox_service.stop()
+    await broadcast_service.shutdown()
+    images.stop()
+    storage.stop()
+    # Close pooled connections on shutdown
+    await payment_gateway.close_client()
+    await telegram_client.close_client()
+    await database.async_engine.dispose()
+
+app = FastAPI(title="Rich Garden API", lifespan=lifespan)
 
 # Create tables
 # user_models.Base.metadata.create_all(bind=database.engine)
@@ -65,15 +105,19 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count", "X-Next-Cursor", "X-DB-Queries"],
 )
 
+# Число SQL-запросов на запрос: заголовок X-DB-Queries и GET /api/debug/query-stats (DEBUG_QUERY_STATS=1)
+query_stats.install(database.async_engine)
+app.add_middleware(query_stats.QueryStatsMiddleware)
+
 # Ensure static directory exists
-if not os.path.exists("app/static"):
-    os.makedirs("app/static", exist_ok=True)
-if not os.path.exists("app/static/uploads"):
-    os.makedirs("app/static/uploads", exist_ok=True)
+# Тот же каталог, куда пишет app.services.uploads (не зависит от cwd)
+os.makedirs(uploads.UPLOADS_DIR, exist_ok=True)
 
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
+# immutable-кэш, сильные ETag, Range, .br/.gz и LRU горячих файлов — app.services.static_files
+app.mount("/static", CachedStaticFiles(directory=uploads.STATIC_DIR), name="static")
 
 # Include Routers
 # Note: Some routers have prefix defined, some don't.
@@ -87,6 +131,8 @@ app.mount("/static", StaticFiles(directory="app/static"), name="static")
 app.include_router(products_router.router, prefix="/api")
 app.include_router(orders_router.router, prefix="/api")
 app.include_router(expenses_router.router, prefix="/api")
+app.include_router(finance_router.router, prefix="/api")
+app.include_router(stock_router.router, prefix="/api")
 app.include_router(search_router.router, prefix="/api")
 app.include_router(common_router.router) # /api/upload is hardcoded in router
 app.include_router(calendar_router.router, prefix="/api")
@@ -95,6 +141,7 @@ app.include_router(stories_router.router) # Prefix /api/stories is inside router
 app.include_router(banners_router.router, prefix="/api")
 app.include_router(payments_router.router, prefix="/api")
 app.include_router(wow_effects_router.router, prefix="/api")
+app.include_router(broadcasts_router.router, prefix="/api") # /api/clients/broadcast
 
 # Users router is complex.
 from app.users import router as users_module
@@ -104,18 +151,18 @@ app.include_router(users_module.clients_router, prefix="/api") # /api/clients
 
 
 @app.get("/")
-def read_root():
+async def read_root():
     return {"message": "Rich Garden API is running"}
 
 # Seed Data Endpoint
 @app.post("/api/seed")
-def seed_data(db: Session = Depends(database.get_db)):
+async def seed_data(db: AsyncSession = Depends(database.get_async_db)):
     # Check via repo
     # existing = product_repo.get_all(db)
     # Checking count efficiently involves query, repo uses all() -> inefficient for count but fine here.
     # Or just use model directly if repo doesn't expose count.
     # Repo get_all is fine.
-    existing = product_repo.get_all(db)
+    existing = await product_repo.get_all(db)
     if len(existing) > 0:
         return {"message": "Data already exists"}
     
@@ -125,11 +172,12 @@ def seed_data(db: Session = Depends(database.get_db)):
         {"name": "Summer Breeze", "price_display": "320 000 сум", "price_raw": 320000, "image": "/flowers2.png", "category": "mix"},
         {"name": "Royal Peony", "price_display": "850 000 сум", "price_raw": 850000, "image": "/flowers.png", "category": "peonies", "is_new": True},
     ]
-    for p in products:
-        # p is dict. Schema expects keyword args.
-        # ProductCreate schema matches dict keys?
-        # ProductCreate has defaults.
-        product_in = schemas.ProductCreate(**p)
-        product_repo.create(db, product_in)
+    async with database.unit_of_work(db):
+        for p in products:
+            # p is dict. Schema expects keyword args.
+            # ProductCreate schema matches dict keys?
+            # ProductCreate has defaults.
+            product_in = schemas.ProductCreate(**p)
+            await product_repo.create(db, product_in)
         
     return {"message": "Seeded successfully"}
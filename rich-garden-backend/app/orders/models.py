@@ -1,11 +1,21 @@
-from sqlalchemy import Column, ForeignKey, Integer, String, DateTime
+from sqlalchemy import Column, ForeignKey, Integer, String, DateTime, Index
 from sqlalchemy.orm import relationship
 import datetime
+import json
 from app.database import Base
 
 class Order(Base):
     __tablename__ = "orders"
-    
+    __table_args__ = (
+        # Агрегаты клиентов (users.repository.get_all_clients) и заказы клиента по дате.
+        # Существующие БД: migrate_orders_user_index.py
+        Index("ix_orders_user_created", "user_id", "created_at"),
+        # Лента заказов: keyset по (created_at, id) и фильтр по статусу с той же сортировкой.
+        # Существующие БД: migrate_orders_list_indexes.py
+        Index("ix_orders_created_id", "created_at", "id"),
+        Index("ix_orders_status_created", "status", "created_at", "id"),
+    )
+
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("telegram_users.id"), nullable=True)
     customer_name = Column(String)
@@ -19,8 +29,65 @@ class Order(Base):
     delivery_time = Column(String, nullable=True)
     payme_receipt_id = Column(String, nullable=True)  # Subscribe API: receipt id для polling
     extras = Column(String, nullable=True) # JSON string for postcard, wow-effect, balloons, etc.
-    history = Column(String, default='[]') # JSON string of list of {status, time, description}
+    # Старый JSON истории: больше не пишется, читается только для заказов без событий
+    legacy_history = Column("history", String, default='[]')
     created_at = Column(DateTime, default=datetime.datetime.now)
     telegram_message_id = Column(Integer, nullable=True)
+    # Когда товары заказа списаны со склада (service.deduct_order_stock); NULL — ещё не списаны
+    stock_deducted_at = Column(DateTime, nullable=True)
 
     user = relationship("TelegramUser", back_populates="orders")
+    # selectin: история нужна в каждом ответе schemas.Order, одна IN-выборка на страницу заказов
+    status_events = relationship(
+        "OrderStatusEvent",
+        lazy="selectin",
+        order_by="(OrderStatusEvent.at, OrderStatusEvent.id)",
+        cascade="all, delete-orphan",
+    )
+
+    @property
+    def history(self) -> str:
+        """JSON истории для schemas.Order: новые сверху, активна последняя запись (формат прежнего поля)."""
+        if not self.status_events:
+            return self.legacy_history or "[]"
+        entries = []
+        for i, event in enumerate(reversed(self.status_events)):
+            entry = {"status": event.status, "time": event.at.strftime("%d.%m.%Y %H:%M"), "active": i == 0}
+            if event.actor:
+                entry["actor"] = event.actor
+            entries.append(entry)
+        return json.dumps(entries, ensure_ascii=False)
+
+class OrderItem(Base):
+    """
+    Позиция заказа. Переходный период: Order.items (JSON) остаётся источником для API,
+    строки пишутся вместе с заказом (repository.create), старые заказы — migrate_order_items.py.
+    """
+    __tablename__ = "order_items"
+    __table_args__ = (
+        # Продажи по товару: product_id -> заказы
+        Index("ix_order_items_product_order", "product_id", "order_id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    order_id = Column(Integer, ForeignKey("orders.id", ondelete="CASCADE"), nullable=False, index=True)
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="SET NULL"), nullable=True)
+    name = Column(String) # название на момент заказа
+    image = Column(String, nullable=True)
+    quantity = Column(Integer, nullable=False, default=1)
+    unit_price = Column(Integer, nullable=False, default=0)
+
+class OrderStatusEvent(Base):
+    """Журнал смен статуса заказа (только INSERT). Существующие БД: migrate_order_status_events.py"""
+    __tablename__ = "order_status_events"
+    __table_args__ = (
+        Index("ix_order_status_events_order_at", "order_id", "at"),
+        # SLA: первое попадание заказов в статус (paid -> done и т.п.)
+        Index("ix_order_status_events_status_at", "status", "at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    order_id = Column(Integer, ForeignKey("orders.id", ondelete="CASCADE"), nullable=False)
+    status = Column(String, nullable=False)
+    at = Column(DateTime, nullable=False, default=datetime.datetime.now)
+    actor = Column(String, nullable=True) # "click", "payme", сотрудник Sklad; None — не указан
@@ -1,25 +1,25 @@
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import select, func, or_, and_, update as sql_update, delete as sql_delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased, selectinload
 from . import models, schemas
 import json
 import datetime
+from typing import Optional, Sequence
 from app.users import repository as user_repo
 
-def create(db: Session, order: schemas.OrderCreate):
+async def create(db: AsyncSession, order: schemas.OrderCreate):
     order_data = order.dict()
     telegram_id = order_data.pop("telegram_id", None)
-    
-    # Init history
-    initial_history = [{
-        "status": "new",
-        "time": datetime.datetime.now().strftime("%d.%m.%Y %H:%M"),
-        "active": True
-    }]
-    order_data["history"] = json.dumps(initial_history)
-    
+
+    # История — события order_status_events; присланный клиентом JSON игнорируется
+    order_data.pop("history", None)
+
     db_order = models.Order(**order_data)
-    
+    db_order.status = db_order.status or "new"
+    db_order.status_events = [models.OrderStatusEvent(status=db_order.status, at=datetime.datetime.now())]
+
     if telegram_id:
-        user = user_repo.get_by_telegram_id(db, telegram_id)
+        user = await user_repo.get_by_telegram_id(db, telegram_id)
         if user:
             db_order.user_id = user.id
             if db_order.customer_name == "Гость" or not db_order.customer_name:
@@ -30,64 +30,314 @@ def create(db: Session, order: schemas.OrderCreate):
                 db_order.customer_phone = user.phone_number
 
     db.add(db_order)
-    db.commit()
-    db.refresh(db_order)
-    return db_order
+    await db.flush()  # commit делает сервис вместе с событием outbox
+    await add_items(db, db_order.id, db_order.items)
+    return await get_by_id(db, db_order.id)
+
+def _to_int(value, default: int = 0) -> int:
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return default
+
+def parse_items(items_json) -> list:
+    """
+    Order.items (JSON-строка от Mini App / POS) -> строки order_items:
+    {product_id, name, image, quantity, unit_price}. Нераспознанный JSON -> [].
+    """
+    try:
+        items = json.loads(items_json) if isinstance(items_json, str) else items_json
+    except (TypeError, ValueError):
+        return []
+    if not isinstance(items, list):
+        return []
+    rows = []
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        rows.append({
+            "product_id": _to_int(item.get("id"), None),
+            "name": item.get("name"),
+            "image": item.get("image"),
+            "quantity": _to_int(item.get("quantity"), 1),
+            "unit_price": _to_int(item.get("price")),
+        })
+    return rows
+
+async def add_items(db: AsyncSession, order_id: int, items_json):
+    """Пишет order_items для заказа (без commit). Несуществующие product_id сохраняются как NULL."""
+    from app.products.models import Product
+
+    rows = parse_items(items_json)
+    if not rows:
+        return []
+    ids = {r["product_id"] for r in rows if r["product_id"] is not None}
+    known = set()
+    if ids:
+        result = await db.execute(select(Product.id).filter(Product.id.in_(ids)))
+        known = set(result.scalars().all())
+    items = []
+    for r in rows:
+        if r["product_id"] not in known:
+            r["product_id"] = None
+        items.append(models.OrderItem(order_id=order_id, **r))
+    db.add_all(items)
+    await db.flush()
+    return items
+
+async def get_item_quantities(db: AsyncSession, order: models.Order) -> dict:
+    """{product_id: количество} по позициям заказа (order_items, для старых заказов — JSON)."""
+    result = await db.execute(
+        select(models.OrderItem.product_id, func.sum(models.OrderItem.quantity))
+        .filter(models.OrderItem.order_id == order.id, models.OrderItem.product_id.isnot(None))
+        .group_by(models.OrderItem.product_id)
+    )
+    quantities = dict(result.all())
+    if not quantities:
+        for r in parse_items(order.items):
+            if r["product_id"] is not None:
+                quantities[r["product_id"]] = quantities.get(r["product_id"], 0) + r["quantity"]
+    return quantities
+
+async def claim_stock_deduction(db: AsyncSession, order_id: int) -> bool:
+    """
+    Помечает заказ списанным (без commit). Условный UPDATE: из двух параллельных
+    запросов списать сможет только один, второй получит False.
+    """
+    result = await db.execute(
+        sql_update(models.Order)
+        .where(models.Order.id == order_id, models.Order.stock_deducted_at.is_(None))
+        .values(stock_deducted_at=datetime.datetime.now())
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+async def get_items(db: AsyncSession, order_id: int):
+    """Позиции заказа с названием и картинкой товара (одним запросом)."""
+    from app.products.models import Product
+
+    result = await db.execute(
+        select(models.OrderItem, Product.name, Product.image)
+        .outerjoin(Product, Product.id == models.OrderItem.product_id)
+        .filter(models.OrderItem.order_id == order_id)
+        .order_by(models.OrderItem.id)
+    )
+    return result.all()
+
+def _apply_filters(
+    q,
+    statuses: Optional[Sequence[str]] = None,
+    date_from: Optional[datetime.date] = None,
+    date_to: Optional[datetime.date] = None,
+    payment_method: Optional[str] = None,
+    user_id: Optional[int] = None,
+    customer: Optional[str] = None,
+):
+    if statuses:
+        q = q.filter(models.Order.status.in_(statuses))
+    if date_from:
+        q = q.filter(models.Order.created_at >= datetime.datetime.combine(date_from, datetime.time.min))
+    if date_to:
+        # Включительно: до начала следующего дня
+        q = q.filter(models.Order.created_at < datetime.datetime.combine(date_to + datetime.timedelta(days=1), datetime.time.min))
+    if payment_method:
+        q = q.filter(models.Order.payment_method == payment_method)
+    if user_id:
+        q = q.filter(models.Order.user_id == user_id)
+    if customer:
+        pattern = f"%{customer.strip()}%"
+        q = q.filter(or_(models.Order.customer_name.ilike(pattern), models.Order.customer_phone.ilike(pattern)))
+    return q
 
-def get_all(db: Session, status: str = None):
-    q = db.query(models.Order).options(joinedload(models.Order.user)).order_by(models.Order.created_at.desc())
+async def get_all(db: AsyncSession, status: str = None, **filters):
+    """Все заказы без пагинации (GET /api/orders?all=true и внутренние вызовы)."""
     if status:
-        q = q.filter(models.Order.status == status)
-    return q.all()
+        filters.setdefault("statuses", [status])
+    q = _apply_filters(select(models.Order), **filters)
+    q = q.options(selectinload(models.Order.user)).order_by(models.Order.created_at.desc(), models.Order.id.desc())
+    result = await db.execute(q)
+    return result.scalars().all()
 
-def get_by_id(db: Session, order_id: int):
+def _encode_cursor(created_at: datetime.datetime, order_id: int) -> str:
+    return f"{created_at.isoformat()}_{order_id}"
+
+def _decode_cursor(cursor: str):
+    created_at, _, order_id = cursor.rpartition("_")
+    return datetime.datetime.fromisoformat(created_at), int(order_id)
+
+async def get_page(db: AsyncSession, cursor: Optional[str] = None, limit: int = 50, **filters):
+    """
+    Keyset-страница: новые сверху, курсор — (created_at, id) последнего заказа предыдущей страницы
+    (индекс ix_orders_created_id). Возвращает (orders, next_cursor).
+    """
+    q = _apply_filters(select(models.Order), **filters)
+    if cursor:
+        created_at, order_id = _decode_cursor(cursor)
+        q = q.filter(or_(
+            models.Order.created_at < created_at,
+            and_(models.Order.created_at == created_at, models.Order.id < order_id),
+        ))
+    q = (
+        q.options(selectinload(models.Order.user))
+        .order_by(models.Order.created_at.desc(), models.Order.id.desc())
+        .limit(limit + 1)
+    )
+    result = await db.execute(q)
+    orders = result.scalars().all()
+
+    next_cursor = None
+    if len(orders) > limit:
+        orders = orders[:limit]
+        next_cursor = _encode_cursor(orders[-1].created_at, orders[-1].id)
+    return orders, next_cursor
+
+async def count(db: AsyncSession, **filters):
+    result = await db.execute(_apply_filters(select(func.count(models.Order.id)), **filters))
+    return result.scalar() or 0
+
+async def get_by_id(db: AsyncSession, order_id: int):
     print(f"DEBUG: get_by_id called with order_id={order_id}")
-    ord = db.query(models.Order).filter(models.Order.id == order_id).first()
+    result = await db.execute(
+        select(models.Order).options(selectinload(models.Order.user)).filter(models.Order.id == order_id)
+    )
+    ord = result.scalars().first()
     print(f"DEBUG: get_by_id result for {order_id}: {ord}")
     return ord
 
-def get_by_user_id(db: Session, user_id: int):
-    return db.query(models.Order).filter(models.Order.user_id == user_id).order_by(models.Order.created_at.desc()).all()
+async def get_by_user_id(db: AsyncSession, user_id: int):
+    result = await db.execute(
+        select(models.Order)
+        .options(selectinload(models.Order.user))
+        .filter(models.Order.user_id == user_id)
+        .order_by(models.Order.created_at.desc())
+    )
+    return result.scalars().all()
+
+async def set_status(db: AsyncSession, order: models.Order, status: str, actor: Optional[str] = None):
+    """
+    Меняет статус и дописывает событие в order_status_events (без commit). Возвращает событие,
+    или None, если статус не изменился (повторный «оплатить» не плодит события).
+    """
+    from app.stock import service as stock_service
 
-def update_status(db: Session, order_id: int, status_update: schemas.OrderUpdateStatus):
+    if order.status == status and order.status_events:
+        if status == "pending_payment":
+            await stock_service.reserve_order(db, order)  # повторная попытка оплаты продлевает резерв
+        return None
+    old_status = order.status
+    order.status = status
+    event = models.OrderStatusEvent(status=status, at=datetime.datetime.now(), actor=actor)
+    order.status_events.append(event)
+    await db.flush()
+    # Резерв склада: pending_payment — зарезервировать, оплата — зафиксировать, отмена — вернуть
+    await stock_service.on_status_change(db, order, old_status, status)
+    return event
+
+async def update_status(db: AsyncSession, order_id: int, status_update: schemas.OrderUpdateStatus):
     print(f"DEBUG: update_status called for order_id={order_id}")
-    order = get_by_id(db, order_id)
+    order = await get_by_id(db, order_id)
     if not order:
         print(f"DEBUG: update_status failed - Order {order_id} not found in DB")
         return None
-    
-    new_status = status_update.status
-    if new_status:
-        order.status = new_status
-        
-        # Update history
-        history = json.loads(order.history) if order.history else []
-        
-        # Deactivate previous
-        for h in history:
-            h['active'] = False
-            
-        history.insert(0, {
-            "status": new_status,
-            "time": datetime.datetime.now().strftime("%d.%m.%Y %H:%M"),
-            "active": True
-        })
-        order.history = json.dumps(history)
-        
-    db.commit()
-    db.refresh(order)
-    return order
-
-def update_telegram_message_id(db: Session, order_id: int, message_id: int):
-    order = get_by_id(db, order_id)
+
+    if status_update.status:
+        await set_status(db, order, status_update.status, actor=status_update.actor)
+    return order  # commit делает сервис вместе с событием outbox
+
+async def update_telegram_message_id(db: AsyncSession, order_id: int, message_id: int):
+    order = await get_by_id(db, order_id)
     if order:
         order.telegram_message_id = message_id
-        db.commit()
+        await db.flush()  # commit — в outbox вместе с пометкой события done
 
-def delete(db: Session, order_id: int):
-    order = get_by_id(db, order_id)
+async def delete(db: AsyncSession, order_id: int):
+    order = await get_by_id(db, order_id)
     if order:
-        db.delete(order)
-        db.commit()
+        # ON DELETE CASCADE есть в схеме, но SQLite без PRAGMA foreign_keys его не применяет
+        await db.execute(sql_delete(models.OrderItem).where(models.OrderItem.order_id == order_id))
+        await db.delete(order)
+        await db.flush()
+
+def _duration_seconds(db: AsyncSession, start, end):
+    if db.bind.dialect.name == "postgresql":
+        return func.extract("epoch", end - start)
+    return (func.julianday(end) - func.julianday(start)) * 86400
+
+def get_status_durations(
+    db: AsyncSession,
+    from_status: str,
+    to_status: str,
+    date_from: Optional[datetime.date] = None,
+    date_to: Optional[datetime.date] = None,
+):
+    """
+    Подзапрос длительностей (seconds) от входа в from_status до первого to_status не раньше него,
+    по входам в from_status в заданный период. Статусы повторяются (pending_payment -> new ->
+    pending_payment), поэтому пары строятся по событиям, а не по первому событию заказа;
+    несколько входов до одного и того же to_status — одна пара от самого раннего.
+    """
+    E = models.OrderStatusEvent
+    start = aliased(E)
+    end_at = (
+        select(func.min(E.at))
+        .filter(E.order_id == start.order_id, E.status == to_status, E.at >= start.at)
+        .correlate(start)
+        .scalar_subquery()
+    )
+    pairs = (
+        select(start.order_id, start.at.label("start_at"), end_at.label("end_at"))
+        .filter(start.status == from_status)
+        .subquery()
+    )
+    spans = (
+        select(pairs.c.order_id, func.min(pairs.c.start_at).label("at"), pairs.c.end_at)
+        .filter(pairs.c.end_at.isnot(None))
+        .group_by(pairs.c.order_id, pairs.c.end_at)
+        .subquery()
+    )
+    q = select(_duration_seconds(db, spans.c.at, spans.c.end_at).label("seconds"))
+    if date_from:
+        q = q.filter(spans.c.at >= datetime.datetime.combine(date_from, datetime.time.min))
+    if date_to:
+        q = q.filter(spans.c.at < datetime.datetime.combine(date_to + datetime.timedelta(days=1), datetime.time.min))
+    return q.subquery()
 
+async def _percentile(db: AsyncSession, durations, n: int, fraction: float):
+    # SQLite без percentile_cont: два соседних значения по OFFSET и линейная интерполяция (как percentile_cont)
+    position = fraction * (n - 1)
+    offset = int(position)
+    result = await db.execute(
+        select(durations.c.seconds).order_by(durations.c.seconds).offset(offset).limit(2)
+    )
+    values = [float(v) for v in result.scalars().all()]
+    if len(values) == 1:
+        return values[0]
+    return values[0] + (values[1] - values[0]) * (position - offset)
 
+async def get_sla_stats(db: AsyncSession, from_status: str, to_status: str, **period):
+    durations = get_status_durations(db, from_status, to_status, **period)
+    seconds = durations.c.seconds
+    columns = [func.count(), func.avg(seconds), func.min(seconds), func.max(seconds)]
+    postgres = db.bind.dialect.name == "postgresql"
+    if postgres:
+        columns += [
+            func.percentile_cont(0.5).within_group(seconds),
+            func.percentile_cont(0.9).within_group(seconds),
+        ]
+    row = (await db.execute(select(*columns).select_from(durations))).one()
+    count = row[0] or 0
+    stats = {
+        "count": count,
+        "avg_seconds": float(row[1]) if row[1] is not None else None,
+        "min_seconds": float(row[2]) if row[2] is not None else None,
+        "max_seconds": float(row[3]) if row[3] is not None else None,
+        "median_seconds": None,
+        "p90_seconds": None,
+    }
+    if count:
+        if postgres:
+            stats["median_seconds"], stats["p90_seconds"] = float(row[4]), float(row[5])
+        else:
+            stats["median_seconds"] = await _percentile(db, durations, count, 0.5)
+            stats["p90_seconds"] = await _percentile(db, durations, count, 0.9)
+    return stats
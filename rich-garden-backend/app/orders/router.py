@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Depends, Response
-from sqlalchemy.orm import Session
-from typing import List
-from app.database import get_db
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+import datetime
+from app.database import get_async_db
 from . import service, schemas
 
 router = APIRouter(
@@ -10,26 +11,75 @@ router = APIRouter(
 )
 
 @router.post("", response_model=schemas.Order)
-async def create_order(order: schemas.OrderCreate, db: Session = Depends(get_db)):
+async def create_order(order: schemas.OrderCreate, db: AsyncSession = Depends(get_async_db)):
     return await service.create_order(db, order)
 
+def order_filters(
+    status: Optional[str] = Query(None, description="Статус или несколько через запятую: paid,processing"),
+    date_from: Optional[datetime.date] = None,
+    date_to: Optional[datetime.date] = None,
+    payment_method: Optional[str] = None,
+    user_id: Optional[int] = None,
+    customer: Optional[str] = Query(None, description="Поиск по имени или телефону"),
+):
+    statuses = [s.strip() for s in status.split(",") if s.strip()] if status else None
+    return {
+        "statuses": statuses,
+        "date_from": date_from,
+        "date_to": date_to,
+        "payment_method": payment_method,
+        "user_id": user_id,
+        "customer": customer,
+    }
+
 @router.get("", response_model=List[schemas.Order])
-def get_orders(response: Response, db: Session = Depends(get_db), status: str = None):
+async def get_orders(
+    response: Response,
+    filters: dict = Depends(order_filters),
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    unpaged: bool = Query(False, alias="all", description="Весь список без пагинации"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Keyset-пагинация: следующую страницу запрашивать с cursor из заголовка X-Next-Cursor."""
     response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate"
-    if status:
-        response.headers["X-Orders-Filter"] = status
-    return service.get_orders(db, status=status)
+    if filters["statuses"]:
+        response.headers["X-Orders-Filter"] = ",".join(filters["statuses"])
+    orders, next_cursor = await service.get_orders(db, unpaged=unpaged, cursor=cursor, limit=limit, **filters)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return orders
+
+@router.get("/count")
+async def count_orders(filters: dict = Depends(order_filters), db: AsyncSession = Depends(get_async_db)):
+    return {"count": await service.count_orders(db, **filters)}
+
+@router.get("/stats/sla", response_model=schemas.StatusSlaStats)
+async def get_sla_stats(
+    from_status: str = "paid",
+    to_status: str = "done",
+    date_from: Optional[datetime.date] = None,
+    date_to: Optional[datetime.date] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Время между статусами по order_status_events: среднее, медиана, p90 (период — по входу в from_status)."""
+    return await service.get_sla_stats(db, from_status, to_status, date_from=date_from, date_to=date_to)
 
 @router.get("/{order_id}", response_model=schemas.Order)
-def get_order(order_id: int, db: Session = Depends(get_db)):
-    return service.get_order(db, order_id)
+async def get_order(order_id: int, db: AsyncSession = Depends(get_async_db)):
+    return await service.get_order(db, order_id)
 
 @router.put("/{order_id}/status", response_model=schemas.Order)
 @router.patch("/{order_id}/status", response_model=schemas.Order)
-async def update_order_status(order_id: int, status_update: schemas.OrderUpdateStatus, db: Session = Depends(get_db)):
+async def update_order_status(order_id: int, status_update: schemas.OrderUpdateStatus, db: AsyncSession = Depends(get_async_db)):
     return await service.update_order_status(db, order_id, status_update)
 
+@router.post("/{order_id}/stock/deduct", response_model=schemas.StockDeduction)
+async def deduct_order_stock(order_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Списать товары заказа со склада (букеты без остатка — по составу). Один раз на заказ."""
+    return await service.deduct_order_stock(db, order_id)
+
 @router.delete("/{order_id}")
-def delete_order(order_id: int, db: Session = Depends(get_db)):
-    service.delete_order(db, order_id)
+async def delete_order(order_id: int, db: AsyncSession = Depends(get_async_db)):
+    await service.delete_order(db, order_id)
     return {"message": "Order deleted"}
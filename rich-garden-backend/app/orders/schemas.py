@@ -24,7 +24,7 @@ class OrderBase(BaseModel):
     payment_method: Optional[str] = None
     delivery_time: Optional[str] = None
     extras: Optional[str] = None
-    history: Optional[str] = "[]"
+    history: Optional[str] = "[]" # JSON, производное от order_status_events (при создании игнорируется)
     created_at: Optional[datetime.datetime] = None
 
 class OrderCreate(OrderBase):
@@ -32,9 +32,30 @@ class OrderCreate(OrderBase):
 
 class OrderUpdateStatus(BaseModel):
     status: str
+    actor: Optional[str] = None # кто сменил статус (имя сотрудника и т.п.)
+
+class StatusSlaStats(BaseModel):
+    from_status: str
+    to_status: str
+    count: int
+    avg_seconds: Optional[float] = None
+    median_seconds: Optional[float] = None
+    p90_seconds: Optional[float] = None
+    min_seconds: Optional[float] = None
+    max_seconds: Optional[float] = None
+
+class StockMovement(BaseModel):
+    product_id: int
+    quantity: int # отрицательное — списание
+
+class StockDeduction(BaseModel):
+    order_id: int
+    stock_deducted_at: datetime.datetime
+    movements: List[StockMovement]
 
 class Order(OrderBase):
     id: int
     user: Optional[TelegramUserMinimal] = None
+    stock_deducted_at: Optional[datetime.datetime] = None
     class Config:
         from_attributes = True
@@ -1,198 +1,258 @@
 
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException
 from . import repository, schemas
 from typing import List
 from app.services import telegram
+from app.database import unit_of_work
+from app.outbox import repository as outbox_repo
+from app.outbox import service as outbox_service
+from app.stock import repository as stock_repo
+from app.stock import service as stock_service
 import json
 
-async def notify_new_order(db: Session, db_order: schemas.Order, telegram_id: int = None):
-    print(f"DEBUG notify_new_order: Called for order {db_order.id}, payment_method: {db_order.payment_method}")
-    # Prepare data for notification
+def _order_dict(db_order) -> dict:
+    extras_data = {}
+    if db_order.extras:
+        try:
+            extras_data = json.loads(db_order.extras) if isinstance(db_order.extras, str) else db_order.extras
+        except:
+            pass
+
+    return {
+        "id": db_order.id,
+        "status": db_order.status,
+        "customer_name": db_order.customer_name or "Гость",
+        "customer_phone": db_order.customer_phone or "Не указан",
+        "address": db_order.address,
+        "total_price": db_order.total_price or 0,
+        "payment_method": db_order.payment_method,
+        "comment": db_order.comment,
+        "extras": extras_data,
+        "delivery_time": db_order.delivery_time
+    }
+
+async def _order_lines(db: AsyncSession, db_order):
+    """
+    Позиции заказа [(name, quantity, image)] из order_items одним запросом.
+    Заказы без строк (ещё не перенесены migrate_order_items.py) читаются из JSON.
+    """
+    rows = await repository.get_items(db, db_order.id)
+    if not rows:
+        rows = [
+            (repository.models.OrderItem(**r), None, None)
+            for r in repository.parse_items(db_order.items)
+        ]
+        if not rows and db_order.items:
+            raise ValueError(f"Unparseable items for order {db_order.id}")
+        missing = {item.product_id for item, _, _ in rows if item.product_id and (not item.name or not item.image)}
+        if missing:
+            from app.products import repository as prod_repo
+            products = {p.id: p for p in await prod_repo.get_by_ids(db, missing)}
+            rows = [
+                (item, getattr(products.get(item.product_id), "name", None), getattr(products.get(item.product_id), "image", None))
+                for item, _, _ in rows
+            ]
+    return [
+        (item.name or product_name or "Товар", item.quantity or 1, item.image or product_image)
+        for item, product_name, product_image in rows
+    ]
+
+async def _items_detail(db: AsyncSession, db_order):
+    """Текст состава заказа и картинки позиций (одна на строку заказа)."""
     items_detail = ""
     image_strings = [] # Store image URLs or paths
 
     try:
-        items = json.loads(db_order.items)
-        if isinstance(items, list):
-            from app.products import repository as prod_repo
-            
-            for item in items:
-                name = item.get('name')
-                img = item.get('image')
-                
-                # If missing name or image, try to fetch from DB product
-                if (not name or not img) and item.get('id'):
-                    p = prod_repo.get_by_id(db, int(item.get('id')))
-                    if p:
-                        if not name: name = p.name
-                        if not img: img = p.image
-                
-                name = name or "Товар"
-                qty = item.get('quantity') or 1
-                items_detail += f"{name} - {qty} шт.\n"
-                
-                if img:
-                    # Add image per quantity? No, usually just one photo per product type
-                    # Or per item entry. User said "if 2 photos ordered, 2 photos come".
-                    # If I order 51 Tulips x 1, it's 1 photo.
-                    # If I order Tulip x 1 and Rose x 1, it's 2 photos.
-                    # So we collect one image per line item.
-                    image_strings.append(img)
-        else:
-            items_detail = "Детали заказа: " + str(items)
+        for name, qty, img in await _order_lines(db, db_order):
+            items_detail += f"{name} - {qty} шт.\n"
+            # Одна картинка на строку заказа: Tulip x51 — одно фото, Tulip + Rose — два
+            if img:
+                image_strings.append(img)
     except Exception as e:
         print(f"ERROR: Error parsing items for notification: {e}")
         import traceback
         traceback.print_exc()
         items_detail = "Детали заказа не распознаны"
+    return items_detail, image_strings
 
-    # Send Notification to Admin Group
-    try:
-        print(f"DEBUG notify_new_order: Preparing order_dict for order {db_order.id}")
-        extras_data = {}
-        if db_order.extras:
-            try:
-                extras_data = json.loads(db_order.extras) if isinstance(db_order.extras, str) else db_order.extras
-            except:
-                pass
-
-        order_dict = {
-            "id": db_order.id,
-            "status": db_order.status,
-            "customer_name": db_order.customer_name or "Гость",
-            "customer_phone": db_order.customer_phone or "Не указан",
-            "address": db_order.address,
-            "total_price": db_order.total_price or 0,
-            "payment_method": db_order.payment_method,
-            "comment": db_order.comment,
-            "extras": extras_data,
-            "delivery_time": db_order.delivery_time
-        }
-        
-        # 1. Admin Notification
-        print(f"DEBUG notify_new_order: Calling send_order_notification for order {db_order.id}")
-        msg_id = await telegram.send_order_notification(order_dict, items_detail, images=image_strings)
-        print(f"DEBUG notify_new_order: send_order_notification returned message_id: {msg_id}")
-        if msg_id:
-            repository.update_telegram_message_id(db, db_order.id, msg_id)
-            print(f"DEBUG notify_new_order: Updated telegram_message_id for order {db_order.id}")
-            
-        # 2. Customer Receipt
-        # Priority: Linked User -> Manual Telegram ID
-        sent_to_user = False
-        
-        if db_order.user_id:
-            try:
-                from app.users import repository as user_repo
-                user = user_repo.get_by_id(db, db_order.user_id)
-                if user and user.telegram_id:
-                     await telegram.send_customer_receipt(user.telegram_id, order_dict, items_detail)
-                     sent_to_user = True
-            except Exception as e:
-                print(f"Failed to send receipt to linked user: {e}")
-        
-        if not sent_to_user and telegram_id:
-            # Fallback to provided telegram_id (e.g. Guest with known ID or manual)
-             await telegram.send_customer_receipt(telegram_id, order_dict, items_detail)
-
-        if msg_id:
-            return msg_id
-        else:
-            print(f"ERROR notify_new_order: No message_id returned for order {db_order.id}")
-            
-    except Exception as e:
-        print(f"ERROR: Exception during order notification: {e}")
-        import traceback
-        traceback.print_exc()
-    return None
+async def queue_new_order_notification(db: AsyncSession, db_order, telegram_id: int = None):
+    """
+    Ставит уведомления о новом заказе в outbox (в текущую транзакцию, без commit).
+    Сообщение в группу и чек клиенту — отдельные события, чтобы ретрай одного не дублировал другое.
+    """
+    await outbox_repo.add(db, "order.new", db_order.id, f"order:{db_order.id}:new")
+    await outbox_repo.add(db, "order.receipt", db_order.id, f"order:{db_order.id}:receipt", {"telegram_id": telegram_id})
+
+async def queue_status_notification(db: AsyncSession, db_order):
+    # Ключ по id события смены статуса: повторная доставка того же перехода не дублирует сообщение
+    event_id = db_order.status_events[-1].id if db_order.status_events else 0
+    key = f"order:{db_order.id}:status-event:{event_id}:{db_order.status}"
+    await outbox_repo.add(db, "order.status", db_order.id, key)
+
+# --- Обработчики outbox (вызываются воркером app/outbox/service.py) ---
+
+async def handle_new_order_event(db: AsyncSession, order_id: int, payload: dict):
+    """Сообщение в группу админов. Повтор безопасен: если message_id уже сохранён — пропускаем."""
+    db_order = await repository.get_by_id(db, order_id)
+    if not db_order or db_order.telegram_message_id:
+        return
+    items_detail, image_strings = await _items_detail(db, db_order)
+    print(f"DEBUG handle_new_order_event: Calling send_order_notification for order {db_order.id}")
+    msg_id = await telegram.send_order_notification(_order_dict(db_order), items_detail, images=image_strings)
+    print(f"DEBUG handle_new_order_event: send_order_notification returned message_id: {msg_id}")
+    if not msg_id:
+        raise RuntimeError(f"No message_id returned for order {db_order.id}")
+    await repository.update_telegram_message_id(db, db_order.id, msg_id)
+
+async def handle_receipt_event(db: AsyncSession, order_id: int, payload: dict):
+    """Чек клиенту. Priority: Linked User -> Manual Telegram ID"""
+    db_order = await repository.get_by_id(db, order_id)
+    if not db_order:
+        return
+    telegram_id = db_order.user.telegram_id if db_order.user and db_order.user.telegram_id else payload.get("telegram_id")
+    if not telegram_id:
+        return
+    items_detail, _ = await _items_detail(db, db_order)
+    if not await telegram.send_customer_receipt(telegram_id, _order_dict(db_order), items_detail):
+        raise RuntimeError(f"Failed to send receipt for order {db_order.id} to {telegram_id}")
+
+async def handle_status_event(db: AsyncSession, order_id: int, payload: dict):
+    """Приводит сообщение в группе к текущему статусу заказа."""
+    order = await repository.get_by_id(db, order_id)
+    if not order:
+        return
+
+    if order.telegram_message_id:
+        try:
+            items_detail = ""
+            for name, qty, _ in await _order_lines(db, order):
+                items_detail += f"- {name} x{qty}\n"
+        except Exception:
+            items_detail = "Детали заказа не распознаны"
 
-async def create_order(db: Session, order: schemas.OrderCreate):
+        if not await telegram.update_order_status_message(order.telegram_message_id, _order_dict(order), items_detail):
+            raise RuntimeError(f"Failed to update status message for order {order.id}")
+    elif order.status != 'pending_payment':
+        # If notification wasn't sent yet (e.g. for deferred online payments)
+        # and it's now 'paid' or admin manually updated status, send it now.
+        # Чек клиенту — тем же ключом, что у callback'ов оплаты: если он уже в outbox, дубля не будет
+        await outbox_repo.add(db, "order.receipt", order.id, f"order:{order.id}:receipt", {})
+        await handle_new_order_event(db, order_id, payload)
+
+async def create_order(db: AsyncSession, order: schemas.OrderCreate):
     # Capture telegram_id before it might be consumed/modified (though here it's input schema)
     telegram_id = order.telegram_id
     
-    # 1. Create Order in DB
+    # 1. Create Order in DB (+ outbox event in the same commit)
     try:
-        db_order = repository.create(db, order)
+        async with unit_of_work(db):
+            db_order = await repository.create(db, order)
+
+            # 2. Only notify immediately if it's CASH
+            # For Click/Payme, notification will be queued after successful payment
+            payment_method = str(db_order.payment_method).lower().strip() if db_order.payment_method else None
+            print(f"DEBUG: Order created - ID: {db_order.id}, Payment method: '{db_order.payment_method}' (normalized: '{payment_method}')")
+            if payment_method == 'cash':
+                await queue_new_order_notification(db, db_order, telegram_id)
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Database error during order creation: {e}")
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
     
-    # 2. Only notify immediately if it's CASH
-    # For Click/Payme, notification will be sent after successful payment
-    payment_method = str(db_order.payment_method).lower().strip() if db_order.payment_method else None
-    print(f"DEBUG: Order created - ID: {db_order.id}, Payment method: '{db_order.payment_method}' (normalized: '{payment_method}')")
-    
-    if payment_method == 'cash':
-        print(f"DEBUG: Sending notification for cash order {db_order.id}")
-        await notify_new_order(db, db_order, telegram_id)
-    else:
-        print(f"DEBUG: Skipping notification for order {db_order.id} (payment_method: '{payment_method}')")
-        print(f"DEBUG: Note: Online payments (click/payme) will be notified after successful payment")
-        
+    outbox_service.wake()
     return db_order
 
-def get_orders(db: Session, status: str = None):
-    return repository.get_all(db, status=status)
+async def get_orders(db: AsyncSession, unpaged: bool = False, cursor: str = None, limit: int = 50, **filters):
+    """Возвращает (orders, next_cursor); при unpaged=True — весь список и next_cursor=None."""
+    if unpaged:
+        return await repository.get_all(db, **filters), None
+    try:
+        return await repository.get_page(db, cursor=cursor, limit=limit, **filters)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
-def get_order(db: Session, order_id: int):
-    order = repository.get_by_id(db, order_id)
+async def count_orders(db: AsyncSession, **filters):
+    return await repository.count(db, **filters)
+
+async def get_order(db: AsyncSession, order_id: int):
+    order = await repository.get_by_id(db, order_id)
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     return order
 
-def get_user_orders(db: Session, user_id: int):
-    return repository.get_by_user_id(db, user_id)
+async def get_user_orders(db: AsyncSession, user_id: int):
+    return await repository.get_by_user_id(db, user_id)
+
+async def update_order_status(db: AsyncSession, order_id: int, status_update: schemas.OrderUpdateStatus):
+    # 1. Update DB Status (+ outbox event in the same commit)
+    async with unit_of_work(db):
+        order = await repository.update_status(db, order_id, status_update)
+        if not order:
+            raise HTTPException(status_code=404, detail="Order not found")
+
+        # 2. Telegram message is updated/sent by the outbox worker
+        await queue_status_notification(db, order)
+    outbox_service.wake()
+    return order
+
+async def get_sla_stats(db: AsyncSession, from_status: str, to_status: str, date_from=None, date_to=None):
+    if from_status == to_status:
+        raise HTTPException(status_code=400, detail="from_status and to_status must differ")
+    stats = await repository.get_sla_stats(db, from_status, to_status, date_from=date_from, date_to=date_to)
+    return {"from_status": from_status, "to_status": to_status, **stats}
 
-async def update_order_status(db: Session, order_id: int, status_update: schemas.OrderUpdateStatus):
-    # 1. Update DB Status
-    order = repository.update_status(db, order_id, status_update)
+async def deduct_order_stock(db: AsyncSession, order_id: int):
+    """
+    Списывает товары заказа со склада одной транзакцией. Собранные букеты берутся с остатка,
+    недостающие — раскрываются по составу (product_components) до ингредиентов.
+    Активный резерв (pending_payment) фиксируется вместо повторного списания, а нехватка,
+    оставшаяся после оплаты (owed), списывается отдельно — без повторного списания резерва.
+    Повторный вызов — 409: заказ помечается stock_deducted_at условным UPDATE.
+    """
+    from app.products import repository as prod_repo
+
+    order = await repository.get_by_id(db, order_id)
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
-    
-    # 2. Update/Send Telegram Notification
-    if order.telegram_message_id:
-        try:
-            items = json.loads(order.items)
-            items_detail = ""
-            for item in items:
-                name = item.get('name') or "Товар"
-                qty = item.get('quantity') or 1
-                items_detail += f"- {name} x{qty}\n"
-        except:
-             items_detail = "Детали заказа не распознаны"
-
-        extras_data = {}
-        if order.extras:
-            try:
-                 extras_data = json.loads(order.extras) if isinstance(order.extras, str) else order.extras
-            except:
-                 pass
-
-        order_dict = {
-            "id": order.id,
-            "status": order.status,
-            "customer_name": order.customer_name,
-            "customer_phone": order.customer_phone,
-            "address": order.address,
-            "total_price": order.total_price,
-            "payment_method": order.payment_method,
-            "comment": order.comment,
-            "extras": extras_data,
-            "delivery_time": order.delivery_time
-        }
-        
-        await telegram.update_order_status_message(order.telegram_message_id, order_dict, items_detail)
-    else:
-        # If notification wasn't sent yet (e.g. for deferred online payments)
-        # and it's now 'paid' or admin manually updated status, send it now.
-        if order.status != 'pending_payment':
-            await notify_new_order(db, order)
-        
-        
-    return order
+    quantities = await repository.get_item_quantities(db, order)
+    if not quantities:
+        raise HTTPException(status_code=400, detail="В заказе нет товаров со склада")
+
+    async with unit_of_work(db):
+        reservations = await stock_repo.get_active(db, order_id, stock_repo.PENDING)
+        deltas = {}
+        if reservations:
+            await stock_service.commit_order(db, order)  # short -> owed, списывается ниже
+            for r in reservations:
+                if r.status == "active":
+                    deltas[r.product_id] = deltas.get(r.product_id, 0) - r.quantity
+        owed = await stock_service.settle_owed(db, order)
+        for pid, d in owed.items():
+            deltas[pid] = deltas.get(pid, 0) + d
+        if not reservations and not owed:
+            if not await repository.claim_stock_deduction(db, order_id):
+                raise HTTPException(status_code=409, detail="Товары заказа уже списаны")
+            deltas = await stock_service.plan_order(db, quantities)
+            shortages = await prod_repo.apply_stock_deltas(db, deltas)
+            if shortages:
+                stock_service.raise_shortage(shortages)
+        await db.refresh(order, attribute_names=["stock_deducted_at"])
+    return {
+        "order_id": order_id,
+        "stock_deducted_at": order.stock_deducted_at,
+        "movements": [{"product_id": pid, "quantity": d} for pid, d in sorted(deltas.items()) if d],
+    }
 
-def delete_order(db: Session, order_id: int):
+async def delete_order(db: AsyncSession, order_id: int):
     # Optional: Delete telegram message if exists
-    repository.delete(db, order_id)
+    async with unit_of_work(db):
+        await outbox_repo.delete_by_order(db, order_id)
+        order = await repository.get_by_id(db, order_id)
+        if order:
+            # Неоплаченный заказ удалён — резерв возвращается на склад
+            await stock_service.release_order(db, order)
+            await stock_repo.delete_by_order(db, order_id)
+        await repository.delete(db, order_id)
 
@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime
+import datetime
+from app.database import Base
+
+class OutboxEvent(Base):
+    """
+    Transactional outbox: событие пишется в том же коммите, что и изменение заказа,
+    а побочный эффект (Telegram) выполняет фоновый воркер app/outbox/service.py.
+    """
+    __tablename__ = "outbox_events"
+
+    id = Column(Integer, primary_key=True, index=True)
+    event_type = Column(String, index=True)  # order.new / order.receipt / order.status
+    order_id = Column(Integer, index=True)  # без FK: удаление заказа не должно ломаться об outbox
+    payload = Column(Text, default="{}")  # JSON
+    # Повторная постановка того же события (ретрай Click, повторный polling Payme) отбрасывается
+    idempotency_key = Column(String, unique=True, index=True)
+
+    status = Column(String, default="pending", index=True)  # pending / done / failed
+    attempts = Column(Integer, default=0)
+    next_attempt_at = Column(DateTime, default=datetime.datetime.now, index=True)
+    last_error = Column(String, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.datetime.now)
+    processed_at = Column(DateTime, nullable=True)
@@ -0,0 +1,51 @@
+from sqlalchemy import select, delete as sql_delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import models
+import datetime
+import json
+
+async def add(db: AsyncSession, event_type: str, order_id: int, idempotency_key: str, payload: dict = None):
+    """
+    Добавляет событие в текущую транзакцию (без commit — коммитит вызывающий вместе с заказом).
+    Если событие с таким ключом уже есть, ничего не делает.
+    """
+    pending = [o for o in db.new if isinstance(o, models.OutboxEvent) and o.idempotency_key == idempotency_key]
+    if pending:
+        return pending[0]
+    result = await db.execute(select(models.OutboxEvent).filter(models.OutboxEvent.idempotency_key == idempotency_key))
+    existing = result.scalars().first()
+    if existing:
+        return existing
+    event = models.OutboxEvent(
+        event_type=event_type,
+        order_id=order_id,
+        idempotency_key=idempotency_key,
+        payload=json.dumps(payload or {}),
+    )
+    db.add(event)
+    return event
+
+async def get_due(db: AsyncSession, limit: int = 20):
+    """
+    Готовые к обработке события по порядку создания.
+    FOR UPDATE SKIP LOCKED (PostgreSQL) — несколько воркеров не возьмут одно событие.
+    """
+    result = await db.execute(
+        select(models.OutboxEvent)
+        .filter(
+            models.OutboxEvent.status == "pending",
+            models.OutboxEvent.next_attempt_at <= datetime.datetime.now(),
+        )
+        .order_by(models.OutboxEvent.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    return result.scalars().all()
+
+async def get_by_id(db: AsyncSession, event_id: int):
+    result = await db.execute(select(models.OutboxEvent).filter(models.OutboxEvent.id == event_id))
+    return result.scalars().first()
+
+async def delete_by_order(db: AsyncSession, order_id: int):
+    """События удалённого заказа больше не нужны (и id заказа может быть переиспользован в SQLite)."""
+    await db.execute(sql_delete(models.OutboxEvent).where(models.OutboxEvent.order_id == order_id))
@@ -0,0 +1,124 @@
+"""
+Воркер transactional outbox.
+
+События пишутся в outbox_events в том же коммите, что и заказ/статус, поэтому
+HTTP-ответ (чекаут, callback Click/Payme) не ждёт Telegram. Воркер — asyncio-таск
+в lifespan приложения: забирает готовые события пачкой (аренда через
+next_attempt_at, FOR UPDATE SKIP LOCKED на PostgreSQL), выполняет обработчик и
+при ошибке откладывает повтор с экспоненциальной задержкой.
+"""
+import asyncio
+import datetime
+import json
+import os
+import random
+from app.database import AsyncSessionLocal
+from . import repository
+
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "2"))
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "20"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+# Пока событие обрабатывается, другие воркеры его не видят; после падения процесса — подхватят
+OUTBOX_LEASE_SECONDS = int(os.getenv("OUTBOX_LEASE_SECONDS", "120"))
+
+_wakeup: asyncio.Event | None = None
+_task: asyncio.Task | None = None
+
+
+def _handlers():
+    from app.orders import service as order_service
+    return {
+        "order.new": order_service.handle_new_order_event,
+        "order.receipt": order_service.handle_receipt_event,
+        "order.status": order_service.handle_status_event,
+    }
+
+
+def wake():
+    """Будит воркер сразу после commit, не дожидаясь следующего опроса."""
+    if _wakeup is not None:
+        _wakeup.set()
+
+
+def _retry_delay(attempts: int) -> float:
+    # 5s, 10s, 20s ... до 10 минут, с jitter
+    base = min(5 * (2 ** (attempts - 1)), 600)
+    return base * random.uniform(0.8, 1.2)
+
+
+async def _claim_batch():
+    async with AsyncSessionLocal() as db:
+        events = await repository.get_due(db, OUTBOX_BATCH_SIZE)
+        lease = datetime.datetime.now() + datetime.timedelta(seconds=OUTBOX_LEASE_SECONDS)
+        for event in events:
+            event.next_attempt_at = lease
+        await db.commit()
+        return [event.id for event in events]
+
+
+async def process_event(event_id: int, handlers: dict):
+    async with AsyncSessionLocal() as db:
+        event = await repository.get_by_id(db, event_id)
+        if not event or event.status != "pending":
+            return
+        handler = handlers.get(event.event_type)
+        try:
+            if handler is None:
+                raise RuntimeError(f"No handler for outbox event type {event.event_type}")
+            await handler(db, event.order_id, json.loads(event.payload or "{}"))
+        except Exception as e:
+            await db.rollback()
+            event = await repository.get_by_id(db, event_id)
+            event.attempts = (event.attempts or 0) + 1
+            event.last_error = str(e)[:500]
+            if event.attempts >= OUTBOX_MAX_ATTEMPTS:
+                event.status = "failed"
+                print(f"ERROR outbox: event {event.id} ({event.event_type}, order {event.order_id}) failed permanently: {e}")
+            else:
+                event.next_attempt_at = datetime.datetime.now() + datetime.timedelta(seconds=_retry_delay(event.attempts))
+                print(f"ERROR outbox: event {event.id} ({event.event_type}) attempt {event.attempts} failed: {e}")
+        else:
+            event.status = "done"
+            event.processed_at = datetime.datetime.now()
+        await db.commit()
+
+
+async def drain_once() -> int:
+    """Обрабатывает одну пачку готовых событий. Возвращает их количество."""
+    event_ids = await _claim_batch()
+    handlers = _handlers()
+    for event_id in event_ids:
+        await process_event(event_id, handlers)
+    return len(event_ids)
+
+
+async def run_worker():
+    while True:
+        _wakeup.clear()
+        try:
+            processed = await drain_once()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"ERROR outbox worker: {e}")
+            processed = 0
+        if processed:
+            continue
+        try:
+            await asyncio.wait_for(_wakeup.wait(), timeout=OUTBOX_POLL_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+
+
+def start():
+    global _wakeup, _task
+    _wakeup = asyncio.Event()
+    _task = asyncio.create_task(run_worker())
+
+
+async def stop():
+    global _task
+    if _task is not None:
+        _task.cancel()
+        await asyncio.gather(_task, return_exceptions=True)
+        _task = None
@@ -1,3 +1,5 @@
+import os
+
 # Click: счёт по номеру телефона (service_id 93495 — у каждого service_id свой SECRET_KEY)
 CLICK_SERVICE_ID = "93495"
 CLICK_MERCHANT_ID = "14071"
@@ -15,4 +17,19 @@ PAYME_API_URL = "https://payme.uz/api"  # Merchant API endpoint (для callback
 PAYME_CHECKOUT_URL = "https://checkout.paycom.uz"  # URL для редиректа пользователя
 PAYME_CALLBACK_URL = "https://24eywa.ru/api/payments/payme"  # URL для callback от Payme
 # Subscribe API (receipts) — для Mini App, X-Auth, без callback
-PAYME_RECEIPTS_API_URL = "https://checkout.paycom.uz/api"  # receipts.create / receipts.send / receipts.get
+PAYME_RECEIPTS_API_URL = os.getenv("PAYME_RECEIPTS_API_URL", "https://checkout.paycom.uz/api")  # receipts.create / receipts.send / receipts.get
+
+# Click Merchant API (выставление счёта по номеру). Переопределяется для fake_payment_gateway.py
+CLICK_API_URL = os.getenv("CLICK_API_URL", "https://api.click.uz/v2/merchant/invoice/create")
+
+# HTTP-клиент шлюзов (app/payments/gateway.py): общий пул keep-alive соединений
+PAYMENT_HTTP_MAX_CONNECTIONS = int(os.getenv("PAYMENT_HTTP_MAX_CONNECTIONS", "50"))
+PAYMENT_HTTP_MAX_KEEPALIVE = int(os.getenv("PAYMENT_HTTP_MAX_KEEPALIVE", "20"))
+# Таймауты по провайдеру (секунды): connect / read
+CLICK_CONNECT_TIMEOUT = float(os.getenv("CLICK_CONNECT_TIMEOUT", "5"))
+CLICK_READ_TIMEOUT = float(os.getenv("CLICK_READ_TIMEOUT", "20"))
+PAYME_CONNECT_TIMEOUT = float(os.getenv("PAYME_CONNECT_TIMEOUT", "5"))
+PAYME_READ_TIMEOUT = float(os.getenv("PAYME_READ_TIMEOUT", "15"))
+# Повторы: только для сетевых сбоев / 5xx, с экспоненциальной задержкой и jitter
+PAYMENT_HTTP_RETRIES = int(os.getenv("PAYMENT_HTTP_RETRIES", "2"))
+PAYMENT_HTTP_BACKOFF = float(os.getenv("PAYMENT_HTTP_BACKOFF", "0.3"))
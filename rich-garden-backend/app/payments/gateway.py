@@ -0,0 +1,87 @@
+"""
+Асинхронный HTTP-клиент платёжных шлюзов (Click, Payme).
+
+Один httpx.AsyncClient на процесс: keep-alive пул соединений переиспользуется
+между запросами, таймауты задаются по провайдеру. Повторы ограничены и идут
+с экспоненциальной задержкой + jitter. Неидемпотентные вызовы (создание счёта,
+отправка чека) повторяются только если запрос гарантированно не ушёл на шлюз
+(ошибка соединения), чтобы не выставить счёт дважды.
+"""
+import asyncio
+import random
+
+import httpx
+
+from app.payments.config import (
+    CLICK_CONNECT_TIMEOUT, CLICK_READ_TIMEOUT,
+    PAYME_CONNECT_TIMEOUT, PAYME_READ_TIMEOUT,
+    PAYMENT_HTTP_MAX_CONNECTIONS, PAYMENT_HTTP_MAX_KEEPALIVE,
+    PAYMENT_HTTP_RETRIES, PAYMENT_HTTP_BACKOFF,
+)
+
+PROVIDER_TIMEOUTS = {
+    "click": httpx.Timeout(CLICK_READ_TIMEOUT, connect=CLICK_CONNECT_TIMEOUT),
+    "payme": httpx.Timeout(PAYME_READ_TIMEOUT, connect=PAYME_CONNECT_TIMEOUT),
+}
+
+# Ответы шлюза, после которых имеет смысл повторить идемпотентный запрос
+RETRY_STATUS_CODES = {502, 503, 504}
+
+_client: httpx.AsyncClient | None = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """Общий клиент с пулом соединений (создаётся лениво)."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=PAYMENT_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=PAYMENT_HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=30,
+            ),
+        )
+    return _client
+
+
+async def close_client():
+    """Закрывает пул соединений (вызывается из lifespan приложения)."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def _backoff_delay(attempt: int) -> float:
+    # Full jitter: случайная задержка в [0, base * 2^attempt]
+    return random.uniform(0, PAYMENT_HTTP_BACKOFF * (2 ** attempt))
+
+
+async def post_json(provider: str, url: str, payload: dict, headers: dict, idempotent: bool = False) -> httpx.Response:
+    """
+    POST JSON на шлюз провайдера ("click" / "payme").
+
+    Ошибки соединения повторяются всегда (запрос не дошёл до шлюза).
+    Таймаут чтения, обрыв и 502/503/504 повторяются только для idempotent=True.
+    После исчерпания попыток пробрасывается исключение httpx (или возвращается последний ответ).
+    """
+    timeout = PROVIDER_TIMEOUTS[provider]
+    attempts = PAYMENT_HTTP_RETRIES + 1
+    for attempt in range(attempts):
+        last = attempt == attempts - 1
+        try:
+            response = await get_client().post(url, json=payload, headers=headers, timeout=timeout)
+        except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as e:
+            if last:
+                raise
+            print(f"DEBUG {provider} gateway connect failed (attempt {attempt + 1}/{attempts}): {e!r}")
+        except (httpx.TimeoutException, httpx.RemoteProtocolError, httpx.ReadError) as e:
+            if last or not idempotent:
+                raise
+            print(f"DEBUG {provider} gateway request failed (attempt {attempt + 1}/{attempts}): {e!r}")
+        else:
+            if response.status_code in RETRY_STATUS_CODES and idempotent and not last:
+                print(f"DEBUG {provider} gateway HTTP {response.status_code} (attempt {attempt + 1}/{attempts}), retrying")
+            else:
+                return response
+        await asyncio.sleep(_backoff_delay(attempt))
@@ -6,9 +6,9 @@ import base64
 import hashlib
 import time
 import json
-import requests
 from typing import Optional, Dict, Any
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.orders.models import Order
 from app.payments.models import PaymeTransaction
 from app.payments.config import (
@@ -77,6 +77,11 @@ def generate_payme_checkout_url(order_id: int, amount: int, return_url: str) ->
     return checkout_url
 
 
+async def _get_transaction(db: AsyncSession, transaction_id: str) -> Optional[PaymeTransaction]:
+    result = await db.execute(select(PaymeTransaction).filter(PaymeTransaction.transaction_id == transaction_id))
+    return result.scalars().first()
+
+
 def verify_payme_request(data: Dict[str, Any]) -> bool:
     """
     Проверяет авторизацию запроса от Payme.
@@ -86,7 +91,7 @@ def verify_payme_request(data: Dict[str, Any]) -> bool:
     return True
 
 
-def check_perform_transaction(params: Dict[str, Any], db: Session) -> Dict[str, Any]:
+async def check_perform_transaction(params: Dict[str, Any], db: AsyncSession) -> Dict[str, Any]:
     """
     CheckPerformTransaction - проверка возможности выполнения транзакции.
     
@@ -124,7 +129,8 @@ def check_perform_transaction(params: Dict[str, Any], db: Session) -> Dict[str,
             }
         }
     
-    order = db.query(Order).filter(Order.id == order_id_int).first()
+    result = await db.execute(select(Order).filter(Order.id == order_id_int))
+    order = result.scalars().first()
     
     if not order:
         return {
@@ -164,7 +170,7 @@ def check_perform_transaction(params: Dict[str, Any], db: Session) -> Dict[str,
     }
 
 
-def create_transaction(params: Dict[str, Any], db: Session) -> Dict[str, Any]:
+async def create_transaction(params: Dict[str, Any], db: AsyncSession) -> Dict[str, Any]:
     """
     CreateTransaction - создание транзакции.
     
@@ -204,9 +210,7 @@ def create_transaction(params: Dict[str, Any], db: Session) -> Dict[str, Any]:
         }
     
     # Проверяем, не существует ли уже транзакция с таким ID
-    existing_transaction = db.query(PaymeTransaction).filter(
-        PaymeTransaction.transaction_id == id
-    ).first()
+    existing_transaction = await _get_transaction(db, id)
     
     if existing_transaction:
         # Транзакция уже существует - возвращаем её данные
@@ -219,7 +223,7 @@ def create_transaction(params: Dict[str, Any], db: Session) -> Dict[str, Any]:
         }
     
     # Проверяем заказ
-    check_result = check_perform_transaction(params, db)
+    check_result = await check_perform_transaction(params, db)
     if "error" in check_result:
         return check_result
     
@@ -233,8 +237,7 @@ def create_transaction(params: Dict[str, Any], db: Session) -> Dict[str, Any]:
     )
     
     db.add(transaction)
-    db.commit()
-    db.refresh(transaction)
+    await db.commit()
     
     print(f"DEBUG: Payme transaction created: {id} for order {order_id_int}")
     
@@ -247,7 +250,7 @@ def create_transaction(params: Dict[str, Any], db: Session) -> Dict[str, Any]:
     }
 
 
-def perform_transaction(params: Dict[str, Any], db: Session) -> Dict[str, Any]:
+async def perform_transaction(params: Dict[str, Any], db: AsyncSession) -> Dict[str, Any]:
     """
     PerformTransaction - выполнение транзакции (подтверждение оплаты).
     
@@ -272,9 +275,7 @@ def perform_transaction(params: Dict[str, Any], db: Session) -> Dict[str, Any]:
             }
         }
     
-    transaction = db.query(PaymeTransaction).filter(
-        PaymeTransaction.transaction_id == id
-    ).first()
+    transaction = await _get_transaction(db, id)
     
     if not transaction:
         return {
@@ -310,20 +311,18 @@ def perform_transaction(params: Dict[str, Any], db: Session) -> Dict[str, Any]:
     transaction.perform_time = time_param
     
     # Обновляем заказ
-    order = db.query(Order).filter(Order.id == transaction.order_id).first()
+    result = await db.execute(select(Order).filter(Order.id == transaction.order_id))
+    order = result.scalars().first()
     if order:
-        order.status = "paid"
-        db.commit()
-        
-        # Уведомляем о новом заказе
-        from app.orders.service import notify_new_order
-        import asyncio
-        try:
-            asyncio.run(notify_new_order(db, order))
-        except Exception as e:
-            print(f"ERROR: Failed to notify about order: {e}")
-    
-    db.commit()
+        from app.orders import repository as order_repo
+        await order_repo.set_status(db, order, "paid", actor="payme")
+        # Уведомляем о новом заказе (через outbox, в том же коммите)
+        from app.orders.service import queue_new_order_notification
+        await queue_new_order_notification(db, order)
+    
+    await db.commit()
+    from app.outbox import service as outbox_service
+    outbox_service.wake()
     
     print(f"DEBUG: Payme transaction performed: {id} for order {transaction.order_id}")
     
@@ -336,7 +335,7 @@ def perform_transaction(params: Dict[str, Any], db: Session) -> Dict[str, Any]:
     }
 
 
-def check_transaction(params: Dict[str, Any], db: Session) -> Dict[str, Any]:
+async def check_transaction(params: Dict[str, Any], db: AsyncSession) -> Dict[str, Any]:
     """
     CheckTransaction - проверка статуса транзакции.
     
@@ -354,9 +353,7 @@ def check_transaction(params: Dict[str, Any], db: Session) -> Dict[str, Any]:
             }
         }
     
-    transaction = db.query(PaymeTransaction).filter(
-        PaymeTransaction.transaction_id == id
-    ).first()
+    transaction = await _get_transaction(db, id)
     
     if not transaction:
         return {
@@ -385,7 +382,7 @@ def check_transaction(params: Dict[str, Any], db: Session) -> Dict[str, Any]:
     return result
 
 
-def cancel_transaction(params: Dict[str, Any], db: Session) -> Dict[str, Any]:
+async def cancel_transaction(params: Dict[str, Any], db: AsyncSession) -> Dict[str, Any]:
     """
     CancelTransaction - отмена транзакции.
     
@@ -405,9 +402,7 @@ def cancel_transaction(params: Dict[str, Any], db: Session) -> Dict[str, Any]:
             }
         }
     
-    transaction = db.query(PaymeTransaction).filter(
-        PaymeTransaction.transaction_id == id
-    ).first()
+    transaction = await _get_transaction(db, id)
     
     if not transaction:
         return {
@@ -443,7 +438,7 @@ def cancel_transaction(params: Dict[str, Any], db: Session) -> Dict[str, Any]:
     transaction.cancel_time = time_param
     transaction.reason = reason
     
-    db.commit()
+    await db.commit()
     
     print(f"DEBUG: Payme transaction cancelled: {id} for order {transaction.order_id}, reason: {reason}")
     
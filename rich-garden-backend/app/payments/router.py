@@ -5,8 +5,9 @@ from urllib.parse import parse_qs
 
 from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
-from app.database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
 from app.orders.models import Order
 from app.payments.schemas import ClickInvoiceCreate, PaymeReceiptCreate
 from app.users import repository as user_repo
@@ -20,7 +21,9 @@ from app.payments.payme_merchant import (
     check_perform_transaction, create_transaction,
     perform_transaction, check_transaction, cancel_transaction
 )
-from app.orders.service import notify_new_order
+from app.orders.service import queue_new_order_notification
+from app.orders import repository as order_repo
+from app.outbox import service as outbox_service
 
 router = APIRouter(prefix="/payments", tags=["payments"])
 
@@ -50,6 +53,15 @@ async def verify_click_ip(request: Request):
         # return False 
     return True
 
+async def _get_order(db: AsyncSession, order_id) -> Order | None:
+    try:
+        order_id = int(order_id)
+    except (TypeError, ValueError):
+        return None
+    result = await db.execute(select(Order).filter(Order.id == order_id))
+    return result.scalars().first()
+
+
 def _normalize_phone(s: str | None) -> str | None:
     if not s:
         return None
@@ -57,42 +69,43 @@ def _normalize_phone(s: str | None) -> str | None:
     return digits if len(digits) >= 9 else None
 
 
-def _phone_for_click(order: Order, db: Session) -> str | None:
+async def _phone_for_click(order: Order, db: AsyncSession) -> str | None:
     """Номер для Click: из заказа или из привязанного пользователя (fallback)."""
     raw = (order.customer_phone or "").strip()
     if raw and _normalize_phone(raw):
         return _normalize_phone(raw)
     if order.user_id:
-        user = user_repo.get_by_id(db, order.user_id)
+        user = await user_repo.get_by_id(db, order.user_id)
         if user and _normalize_phone(user.phone_number):
             return _normalize_phone(user.phone_number)
     return None
 
 
 @router.post("/create-click-invoice")
-def create_click_invoice_endpoint(data: ClickInvoiceCreate, db: Session = Depends(get_db)):
+async def create_click_invoice_endpoint(data: ClickInvoiceCreate, db: AsyncSession = Depends(get_async_db)):
     """
     Создает Click invoice через API (отправляет счет в приложение Click по номеру телефона)
     и возвращает payment_url для редиректа.
     """
-    order = db.query(Order).filter(Order.id == data.order_id).first()
+    order = await _get_order(db, data.order_id)
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
 
     # Обновляем статус заказа
-    order.status = "pending_payment"
-    db.commit()
+    await order_repo.set_status(db, order, "pending_payment", actor="click")
+    await db.commit()
 
     # Определяем номер телефона для Click
-    phone_for_click = data.phone_number or _phone_for_click(order, db)
-    print(f"DEBUG Click endpoint: order_id={order.id}, phone_from_data={data.phone_number}, phone_from_order={_phone_for_click(order, db)}, phone_final={phone_for_click}")
+    phone_from_order = await _phone_for_click(order, db)
+    phone_for_click = data.phone_number or phone_from_order
+    print(f"DEBUG Click endpoint: order_id={order.id}, phone_from_data={data.phone_number}, phone_from_order={phone_from_order}, phone_final={phone_for_click}")
     
     # ВАЖНО: ВСЕГДА пытаемся создать счет через Click API для отправки SMS
     # Даже если нет номера или API вернет ошибку, мы попробуем отправить счет
     invoice_result = None
     if phone_for_click:
         # Создаем счет через Click API (отправляет SMS и счет в приложение)
-        invoice_result = create_click_invoice(order, data.return_url, phone_for_click)
+        invoice_result = await create_click_invoice(order, data.return_url, phone_for_click)
         print(f"DEBUG Click API call result: status={invoice_result.get('status')}, invoice_id={invoice_result.get('invoice_id')}, fallback_pay_link={invoice_result.get('fallback_pay_link')}")
     else:
         print(f"DEBUG Click: No phone number found, will use direct URL")
@@ -144,18 +157,18 @@ def create_click_invoice_endpoint(data: ClickInvoiceCreate, db: Session = Depend
     }
 
 @router.post("/create-payme-invoice")
-def create_payme_invoice_endpoint(data: ClickInvoiceCreate, db: Session = Depends(get_db)):
+async def create_payme_invoice_endpoint(data: ClickInvoiceCreate, db: AsyncSession = Depends(get_async_db)):
     """
     Создание платежа через Payme Merchant API (web, редирект).
     Возвращает URL для редиректа пользователя на Payme Checkout.
     Payme сам вызовет наши методы для обработки платежа.
     """
-    order = db.query(Order).filter(Order.id == data.order_id).first()
+    order = await _get_order(db, data.order_id)
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     
-    order.status = "pending_payment"
-    db.commit()
+    await order_repo.set_status(db, order, "pending_payment", actor="payme")
+    await db.commit()
     
     # Генерируем URL для редиректа на Payme Checkout
     # Формат: https://checkout.payme.uz/{merchant_id}/{order_id}/{amount_tiyin}
@@ -174,21 +187,26 @@ def create_payme_invoice_endpoint(data: ClickInvoiceCreate, db: Session = Depend
 
 
 @router.post("/create-payme-receipt")
-def create_payme_receipt_endpoint(data: PaymeReceiptCreate, db: Session = Depends(get_db)):
+async def create_payme_receipt_endpoint(data: PaymeReceiptCreate, db: AsyncSession = Depends(get_async_db)):
     """
     Subscribe API: создание чека для Mini App.
     receipts.create → receipts.send → заказ pending_payment.
     Фронт показывает «Ожидание оплаты» и опрашивает GET /payme-receipt-status/{receipt_id}.
     """
-    order = db.query(Order).filter(Order.id == data.order_id).first()
+    order = await _get_order(db, data.order_id)
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
 
     if order.status == "paid":
         raise HTTPException(status_code=400, detail="Order already paid")
 
+    # Статус и резерв склада — до вызова Payme (как в create-click-invoice / create-payme-invoice):
+    # ошибка перехода не оставит у Payme чек, который никто не отменит
+    await order_repo.set_status(db, order, "pending_payment", actor="payme")
+    await db.commit()
+
     # receipts.create
-    result = create_payme_receipt(order)
+    result = await create_payme_receipt(order)
     if result.get("status") != "success":
         error_msg = result.get("error", "Unknown error")
         error_code = result.get("error_code")
@@ -203,14 +221,13 @@ def create_payme_receipt_endpoint(data: PaymeReceiptCreate, db: Session = Depend
         )
 
     receipt_id = result["receipt_id"]
-    order.status = "pending_payment"
     order.payme_receipt_id = receipt_id
-    db.commit()
+    await db.commit()
 
     # receipts.send — отправить чек на телефон (Payme покажет экран оплаты в приложении)
-    phone = data.phone_number or _phone_for_click(order, db) or (order.customer_phone or "").strip()
+    phone = data.phone_number or await _phone_for_click(order, db) or (order.customer_phone or "").strip()
     if phone:
-        send_payme_receipt(receipt_id, phone)
+        await send_payme_receipt(receipt_id, phone)
 
     return {
         "status": "success",
@@ -222,12 +239,12 @@ def create_payme_receipt_endpoint(data: PaymeReceiptCreate, db: Session = Depend
 
 
 @router.get("/payme-receipt-status/{receipt_id}")
-async def payme_receipt_status_endpoint(receipt_id: str, db: Session = Depends(get_db)):
+async def payme_receipt_status_endpoint(receipt_id: str, db: AsyncSession = Depends(get_async_db)):
     """
     Subscribe API: проверка статуса чека. state = 4 — оплата успешна.
-    При state=4 заказ помечается paid и вызывается notify_new_order.
+    При state=4 заказ помечается paid, уведомление ставится в outbox.
     """
-    result = check_payme_receipt(receipt_id)
+    result = await check_payme_receipt(receipt_id)
     if result.get("status") != "success":
         return {
             "status": "error",
@@ -239,14 +256,13 @@ async def payme_receipt_status_endpoint(receipt_id: str, db: Session = Depends(g
     paid = result.get("paid", False)  # state == 4
 
     if paid:
-        order = db.query(Order).filter(Order.payme_receipt_id == receipt_id).first()
+        rows = await db.execute(select(Order).filter(Order.payme_receipt_id == receipt_id))
+        order = rows.scalars().first()
         if order and order.status != "paid":
-            order.status = "paid"
-            db.commit()
-            try:
-                await notify_new_order(db, order)
-            except Exception as e:
-                print(f"ERROR: notify_new_order failed: {e}")
+            await order_repo.set_status(db, order, "paid", actor="payme")
+            await queue_new_order_notification(db, order)
+            await db.commit()
+            outbox_service.wake()
 
     return {
         "status": "success",
@@ -273,7 +289,7 @@ async def verify_payme_auth(request: Request):
 
 
 @router.post("/payme")
-async def payme_merchant_api(request: Request, db: Session = Depends(get_db)):
+async def payme_merchant_api(request: Request, db: AsyncSession = Depends(get_async_db)):
     """
     Endpoint для приема запросов от Payme Merchant API.
     
@@ -319,15 +335,15 @@ async def payme_merchant_api(request: Request, db: Session = Depends(get_db)):
     
     # Обработка методов
     if method == "CheckPerformTransaction":
-        result = check_perform_transaction(params, db)
+        result = await check_perform_transaction(params, db)
     elif method == "CreateTransaction":
-        result = create_transaction(params, db)
+        result = await create_transaction(params, db)
     elif method == "PerformTransaction":
-        result = perform_transaction(params, db)
+        result = await perform_transaction(params, db)
     elif method == "CheckTransaction":
-        result = check_transaction(params, db)
+        result = await check_transaction(params, db)
     elif method == "CancelTransaction":
-        result = cancel_transaction(params, db)
+        result = await cancel_transaction(params, db)
     else:
         result = {
             "error": {
@@ -418,7 +434,7 @@ def _check_return(out: dict):
 
 
 @router.post("/click/check")
-async def click_check(request: Request, db: Session = Depends(get_db)):
+async def click_check(request: Request, db: AsyncSession = Depends(get_async_db)):
     """
     Check availability of order to pay (Step 1 of Click callback).
     """
@@ -462,7 +478,7 @@ async def click_check(request: Request, db: Session = Depends(get_db)):
             order_id = int(data.get("merchant_trans_id") or 0)
         except (TypeError, ValueError):
             order_id = 0
-        order = db.query(Order).filter(Order.id == order_id).first()
+        order = await _get_order(db, order_id)
 
         if not order:
             print(f"DEBUG: Click check order not found id={order_id}")
@@ -519,7 +535,7 @@ def _click_return(out: dict):
 
 
 @router.post("/click/result")
-async def click_result(request: Request, db: Session = Depends(get_db)):
+async def click_result(request: Request, db: AsyncSession = Depends(get_async_db)):
     """
     Finalize payment (Step 2 of Click callback). Sign includes merchant_prepare_id.
     Reply: click_trans_id, merchant_trans_id, merchant_confirm_id, error, error_note.
@@ -571,7 +587,7 @@ async def click_result(request: Request, db: Session = Depends(get_db)):
             print(f"DEBUG: Click вернул ошибку: {click_error}")
             return _click_return(_click_result_response(cti, mti, 0, -9, "Transaction failed at Click side"))
 
-        order = db.query(Order).filter(Order.id == order_id).first()
+        order = await _get_order(db, order_id)
         if not order:
             print(f"DEBUG: Click result order not found id={order_id}")
             return _click_return(_click_result_response(cti, mti, 0, -5, "Order not found"))
@@ -585,9 +601,11 @@ async def click_result(request: Request, db: Session = Depends(get_db)):
         # merchant_confirm_id должен быть равен merchant_prepare_id (или order_id)
         merchant_confirm_id = merchant_prepare_id_from_click if merchant_prepare_id_from_click > 0 else order_id
         
-        order.status = "paid"
-        db.commit()
-        await notify_new_order(db, order)
+        await order_repo.set_status(db, order, "paid", actor="click")
+        # Уведомление в Telegram шлёт outbox-воркер — Click получает ответ сразу после commit
+        await queue_new_order_notification(db, order)
+        await db.commit()
+        outbox_service.wake()
 
         print(f"DEBUG Click Complete SUCCESS: order {order_id} marked as paid, merchant_confirm_id={merchant_confirm_id}")
         # ВАЖНО: error ВСЕГДА 0 при успехе, иначе Click покажет "что-то пошло не так"
@@ -1,19 +1,18 @@
 
 import hashlib
 import time
-import requests
-from sqlalchemy.orm import Session
+import httpx
 from app.orders.models import Order
 from app.payments.config import (
     CLICK_SERVICE_ID, CLICK_MERCHANT_ID, CLICK_SECRET_KEY, CLICK_MERCHANT_USER_ID,
-    PAYME_MERCHANT_ID, PAYME_KEY, PAYME_API_URL, PAYME_RECEIPTS_API_URL
+    PAYME_MERCHANT_ID, PAYME_KEY, PAYME_API_URL, PAYME_RECEIPTS_API_URL,
+    CLICK_API_URL,
 )
+from app.payments import gateway
 import base64
 import json
 from urllib.parse import urlencode
 
-CLICK_API_URL = "https://api.click.uz/v2/merchant/invoice/create"
-
 def generate_click_checkout_url(order: Order, return_url: str) -> str:
     """
     Генерирует URL для оплаты через Click Checkout (Redirect метод).
@@ -61,7 +60,7 @@ def _normalize_click_phone(phone: str) -> str:
     return clean
 
 
-def create_click_invoice(order: Order, return_url: str, phone_override: str | None = None):
+async def create_click_invoice(order: Order, return_url: str, phone_override: str | None = None):
     """
     Выставление счёта Click по номеру телефона.
     Номер берётся из заказа (customer_phone с чекаута) или из phone_override (fallback).
@@ -103,8 +102,8 @@ def create_click_invoice(order: Order, return_url: str, phone_override: str | No
     print(f"DEBUG Click Auth header (first 50 chars): {headers['Auth'][:50]}...")
 
     try:
-        response = requests.post(url, json=payload, headers=headers, timeout=30)
-    except requests.exceptions.RequestException as e:
+        response = await gateway.post_json("click", url, payload, headers)
+    except httpx.HTTPError as e:
         print(f"ERROR Click API request failed: {e}")
         return {"error": f"Ошибка подключения к Click API: {e}", "status": "error"}
 
@@ -368,7 +367,7 @@ def verify_click_signature(data: dict, for_complete: bool = False) -> bool:
         print(f"Click signature verification failed: {e}")
         return False
 
-def create_payme_receipt(order: Order):
+async def create_payme_receipt(order: Order):
     """
     Subscribe API: receipts.create
     Официальный формат: amount (тийины), account.order_id.
@@ -402,12 +401,7 @@ def create_payme_receipt(order: Order):
         print(f"DEBUG: Payme Receipts API URL: {PAYME_RECEIPTS_API_URL}")
         print(f"DEBUG: Payload: {json.dumps(rpc_payload, indent=2, ensure_ascii=False)}")
         
-        response = requests.post(
-            PAYME_RECEIPTS_API_URL,
-            json=rpc_payload,
-            headers=headers,
-            timeout=30
-        )
+        response = await gateway.post_json("payme", PAYME_RECEIPTS_API_URL, rpc_payload, headers)
         
         print(f"DEBUG: Payme Response Status: {response.status_code}")
         print(f"DEBUG: Payme Response Headers: {dict(response.headers)}")
@@ -505,14 +499,14 @@ def create_payme_receipt(order: Order):
             "receipt_id": receipt_id
         }
         
-    except requests.exceptions.Timeout:
+    except httpx.TimeoutException:
         print(f"ERROR: Payme API request timeout")
         return {
             "error": "Превышено время ожидания ответа от Payme. Попробуйте позже.",
             "status": "error",
             "error_code": "timeout"
         }
-    except requests.exceptions.ConnectionError as e:
+    except httpx.TransportError as e:
         print(f"ERROR: Payme API connection error: {e}")
         return {
             "error": "Не удалось подключиться к серверу Payme. Проверьте интернет-соединение или попробуйте позже.",
@@ -529,7 +523,7 @@ def create_payme_receipt(order: Order):
             "error_code": None
         }
 
-def send_payme_receipt(receipt_id: str, phone: str):
+async def send_payme_receipt(receipt_id: str, phone: str):
     """
     Subscribe API: receipts.send
     Отправка чека пользователю — Payme показывает экран оплаты в приложении.
@@ -554,17 +548,12 @@ def send_payme_receipt(receipt_id: str, phone: str):
     }
 
     try:
-        response = requests.post(
-            PAYME_RECEIPTS_API_URL,
-            json=rpc_payload,
-            headers=headers,
-            timeout=30
-        )
+        response = await gateway.post_json("payme", PAYME_RECEIPTS_API_URL, rpc_payload, headers)
         return response.json()
     except Exception as e:
         return {"error": str(e), "status": "error"}
 
-def check_payme_receipt(receipt_id: str):
+async def check_payme_receipt(receipt_id: str):
     """
     Subscribe API: receipts.get
     Проверка статуса чека. state = 4 — оплата успешна.
@@ -585,12 +574,8 @@ def check_payme_receipt(receipt_id: str):
 
     try:
         print(f"DEBUG: Checking Payme receipt status for {receipt_id}")
-        response = requests.post(
-            PAYME_RECEIPTS_API_URL,
-            json=rpc_payload,
-            headers=headers,
-            timeout=15
-        )
+        # receipts.get только читает состояние — безопасно повторять
+        response = await gateway.post_json("payme", PAYME_RECEIPTS_API_URL, rpc_payload, headers, idempotent=True)
         json_response = response.json()
         print(f"DEBUG: Payme receipt check response: {json_response}")
         
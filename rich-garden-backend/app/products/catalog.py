@@ -0,0 +1,125 @@
+"""
+Витрина Mini App: read-модель каталога в памяти процесса.
+
+Карточки без description/history, состав разобран из JSON один раз при сборке, ответ хранится
+готовым JSON с ETag. Ключ — категория. Сбрасывается после commit любой транзакции, в которой
+репозиторий пометил товары изменёнными (repository.mark_catalog_dirty), и по CATALOG_CACHE_TTL —
+на случай нескольких воркеров uvicorn и правок из скриптов в обход API.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import time
+from typing import List, Tuple
+
+from pydantic import TypeAdapter
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import repository, schemas
+
+CATALOG_CACHE_TTL = int(os.getenv("CATALOG_CACHE_TTL", "60"))
+# Категория приходит из query-параметра: число ключей ограничено, остальное отдаётся без кэша
+CATALOG_CACHE_MAX_KEYS = int(os.getenv("CATALOG_CACHE_MAX_KEYS", "64"))
+
+_entries = {}  # category -> (etag, body, expires_at)
+_locks = {}
+_generation = 0
+_adapter = TypeAdapter(List[schemas.CatalogProduct])
+
+
+def invalidate():
+    global _generation
+    _generation += 1
+    _entries.clear()
+    _locks.clear()
+
+
+def generation() -> int:
+    """Растёт при каждом изменении товаров: по нему другие кэши карточек понимают, что устарели."""
+    return _generation
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    if session.info.pop("catalog_dirty", False):
+        invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session):
+    session.info.pop("catalog_dirty", None)
+
+
+def _composition(composition_json) -> list:
+    try:
+        items = json.loads(composition_json) if isinstance(composition_json, str) else composition_json
+    except (TypeError, ValueError):
+        return []
+    if not isinstance(items, list):
+        return []
+    components = []
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        try:
+            component_id = int(item["id"]) if item.get("id") is not None else None
+            qty = int(float(item.get("qty") or 0))
+        except (TypeError, ValueError):
+            continue
+        components.append(schemas.CatalogComponent(id=component_id, name=str(item.get("name") or ""), qty=qty))
+    return components
+
+
+def _rating(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 5.0
+
+
+def build_item(row) -> schemas.CatalogProduct:
+    return schemas.CatalogProduct(
+        id=row.id,
+        name=row.name or "",
+        category=row.category,
+        price=row.price,
+        price_raw=row.price_raw or 0,
+        image=row.image,
+        images=row.images or "[]",
+        rating=_rating(row.rating),
+        is_hit=bool(row.is_hit),
+        is_new=bool(row.is_new),
+        in_stock=(row.stock_quantity or 0) > 0,
+        composition=_composition(row.composition),
+    )
+
+
+async def _build(db: AsyncSession, key: str) -> Tuple[str, bytes]:
+    rows = await repository.get_catalog_rows(db, None if key == "all" else key)
+    body = _adapter.dump_json([build_item(row) for row in rows])
+    return f'"{hashlib.sha1(body).hexdigest()}"', body
+
+
+async def get_catalog(db: AsyncSession, category: str = None) -> Tuple[str, bytes]:
+    """(etag, body) витрины категории; при попадании в кэш — без запросов к БД."""
+    key = (category or "").strip().lower() or "all"
+    entry = _entries.get(key)
+    if entry and entry[2] > time.monotonic():
+        return entry[0], entry[1]
+    if key not in _entries and len(_entries) >= CATALOG_CACHE_MAX_KEYS:
+        return await _build(db, key)
+
+    # Один запрос к БД на промах: параллельные запросы той же категории ждут первый
+    async with _locks.setdefault(key, asyncio.Lock()):
+        entry = _entries.get(key)
+        if entry and entry[2] > time.monotonic():
+            return entry[0], entry[1]
+        generation = _generation
+        etag, body = await _build(db, key)
+        # Товары изменились, пока шла сборка — не кладём устаревший снимок
+        if generation == _generation:
+            _entries[key] = (etag, body, time.monotonic() + CATALOG_CACHE_TTL)
+        return etag, body
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String
+from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, CheckConstraint, Index, func
 from sqlalchemy.orm import relationship
 from app.database import Base
 
@@ -28,9 +28,22 @@ class Product(Base):
     is_ingredient = Column(Boolean, default=False)
 
     views = Column(Integer, default=0)
+    # Поисковые строки (app.search.text.document): транслит, синонимы; пишет репозиторий при create/update.
+    # PostgreSQL: GIN-индексы tsvector и pg_trgm по ним — migrate_product_search.py
+    search_name = Column(String, nullable=True)
+    search_body = Column(String, nullable=True)
+    # Оптимистическая блокировка: ORM-UPDATE идёт с WHERE version = загруженная (StaleDataError при гонке),
+    # атомарные изменения остатка (repository.apply_stock_deltas) тоже увеличивают version
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     
     history = relationship("ProductHistory", back_populates="product")
 
+    __table_args__ = (
+        # Фильтр витрины по категории без учёта регистра: lower(category) = :category
+        Index("ix_products_category_lower", func.lower(category)),
+    )
+    __mapper_args__ = {"version_id_col": version}
+
 class ProductHistory(Base):
     __tablename__ = "product_history"
     
@@ -41,3 +54,18 @@ class ProductHistory(Base):
     date = Column(String)
     
     product = relationship("Product", back_populates="history")
+
+class ProductComponent(Base):
+    """
+    Состав букета (bill of materials): product_id собирается из qty штук component_id.
+    Синхронизируется из Product.composition при create/update; существующие БД: migrate_product_components.py
+    """
+    __tablename__ = "product_components"
+    __table_args__ = (
+        CheckConstraint("qty > 0", name="ck_product_components_qty"),
+    )
+
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    # Обратный поиск «в каких букетах используется цветок»
+    component_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True, index=True)
+    qty = Column(Integer, nullable=False)
@@ -1,51 +1,144 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select, func, update as sql_update, insert, case, delete as sql_delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from app.search import text as search_text
 from . import models, schemas
 import datetime
+import json
 
-def get_all(db: Session, category: str = None, search: str = None):
-    query = db.query(models.Product)
+# Функции репозитория не коммитят: транзакцией владеет сервис (app.database.unit_of_work)
+
+# Букет из букетов: глубже не раскрываем (защита от циклов в составе)
+BOM_MAX_DEPTH = 5
+
+async def get_all(db: AsyncSession, category: str = None, search: str = None):
+    query = select(models.Product).options(selectinload(models.Product.history))
     if category and category != "all":
-        query = query.filter(models.Product.category.ilike(category))
+        # lower(category) = ... идёт по ix_products_category_lower, ILIKE индекс не использует
+        query = query.filter(func.lower(models.Product.category) == category.lower())
     if search:
         query = query.filter(models.Product.name.ilike(f"%{search}%"))
-    return query.all()
+    result = await db.execute(query)
+    return result.scalars().all()
+
+# Колонки витрины: без description, history и складских полей
+CATALOG_COLUMNS = (
+    models.Product.id, models.Product.name, models.Product.category, models.Product.price,
+    models.Product.price_raw, models.Product.image, models.Product.images, models.Product.rating,
+    models.Product.is_hit, models.Product.is_new, models.Product.stock_quantity, models.Product.composition,
+)
+
+async def get_catalog_rows(db: AsyncSession, category: str = None):
+    """Товары витрины (без ингредиентов) только нужными колонками; category — в нижнем регистре."""
+    query = select(*CATALOG_COLUMNS).filter(models.Product.is_ingredient.isnot(True)).order_by(models.Product.id)
+    if category:
+        query = query.filter(func.lower(models.Product.category) == category)
+    result = await db.execute(query)
+    return result.all()
+
+def search_fields(name, category, description) -> dict:
+    return {
+        "search_name": search_text.document(name),
+        "search_body": search_text.document(f"{category or ''} {description or ''}"),
+    }
+
+def mark_catalog_dirty(db: AsyncSession):
+    """Товары изменены: кэш витрины (app.products.catalog) сбросится после commit этой транзакции."""
+    db.info["catalog_dirty"] = True
+
+def mark_search_dirty(db: AsyncSession, product_id: int):
+    """Название/описание/категория изменены: товар переиндексируется (app.search.index) после commit."""
+    db.info.setdefault("search_dirty", set()).add(product_id)
 
-def get_by_id(db: Session, product_id: int):
-    return db.query(models.Product).filter(models.Product.id == product_id).first()
+async def get_catalog_rows_by_ids(db: AsyncSession, product_ids):
+    """Строки витрины для id в том же порядке (результаты поиска); удалённые пропускаются."""
+    if not product_ids:
+        return []
+    result = await db.execute(select(*CATALOG_COLUMNS).filter(models.Product.id.in_(list(product_ids))))
+    rows = {row.id: row for row in result.all()}
+    return [rows[pid] for pid in product_ids if pid in rows]
 
-def create(db: Session, product: schemas.ProductCreate):
+async def get_by_id(db: AsyncSession, product_id: int):
+    result = await db.execute(
+        select(models.Product)
+        .options(selectinload(models.Product.history))
+        .filter(models.Product.id == product_id)
+    )
+    return result.scalars().first()
+
+async def get_by_ids(db: AsyncSession, product_ids):
+    """Несколько товаров одним запросом (без истории)."""
+    if not product_ids:
+        return []
+    result = await db.execute(select(models.Product).filter(models.Product.id.in_(list(product_ids))))
+    return result.scalars().all()
+
+async def create(db: AsyncSession, product: schemas.ProductCreate):
     db_product = models.Product(**product.dict())
+    for key, value in search_fields(db_product.name, db_product.category, db_product.description).items():
+        setattr(db_product, key, value)
     db.add(db_product)
-    db.commit()
-    db.refresh(db_product)
-    return db_product
+    await db.flush()
+    mark_catalog_dirty(db)
+    mark_search_dirty(db, db_product.id)
+    await set_components(db, db_product.id, db_product.composition)
+    return await get_by_id(db, db_product.id)
 
-def update(db: Session, product_id: int, product_update: schemas.ProductUpdate):
-    db_product = get_by_id(db, product_id)
+async def update(db: AsyncSession, product_id: int, product_update: schemas.ProductUpdate):
+    """
+    Обновляет поля товара. ORM-UPDATE идёт с проверкой version (StaleDataError, если товар
+    изменили параллельно); новый stock_quantity применяется как атомарная разница к текущему
+    остатку под блокировкой строки, с записью в историю.
+    """
+    db_product = await get_by_id(db, product_id)
     if not db_product:
         return None
-    
-    update_data = product_update.dict(exclude_unset=True)
+
+    mark_catalog_dirty(db)
+    update_data = product_update.dict(exclude_unset=True, exclude={"version"})
+    new_stock = update_data.pop("stock_quantity", None)
     for key, value in update_data.items():
         setattr(db_product, key, value)
-    
-    db.commit()
-    db.refresh(db_product)
+    if update_data.keys() & {"name", "category", "description", "is_ingredient"}:
+        mark_search_dirty(db, product_id)
+        for key, value in search_fields(db_product.name, db_product.category, db_product.description).items():
+            setattr(db_product, key, value)
+
+    if "composition" in update_data:
+        await set_components(db, product_id, db_product.composition)
+    await db.flush()
+    if new_stock is not None:
+        current = (await get_stock(db, [product_id], lock=True)).get(product_id, 0)
+        await apply_stock_deltas(db, {product_id: new_stock - current})
+    await db.refresh(db_product, attribute_names=["stock_quantity", "version", "history"])
     return db_product
 
-def delete_product_history(db: Session, product_id: int):
-    db.query(models.ProductHistory).filter(models.ProductHistory.product_id == product_id).delete()
-    db.commit()
+async def delete_product_history(db: AsyncSession, product_id: int):
+    await db.execute(sql_delete(models.ProductHistory).where(models.ProductHistory.product_id == product_id))
 
-def delete(db: Session, product_id: int):
-    product = get_by_id(db, product_id)
+async def delete(db: AsyncSession, product_id: int):
+    product = await get_by_id(db, product_id)
     if product:
-        db.delete(product)
-        db.commit()
+        mark_catalog_dirty(db)
+        mark_search_dirty(db, product_id)
+        # ON DELETE CASCADE есть в схеме, но SQLite без PRAGMA foreign_keys его не применяет
+        await db.execute(sql_delete(models.ProductComponent).where(
+            (models.ProductComponent.product_id == product_id) | (models.ProductComponent.component_id == product_id)
+        ))
+        from app.stock.models import StockReservation
+        await db.execute(sql_delete(StockReservation).where(StockReservation.product_id == product_id))
+        # ... как и ON DELETE SET NULL у order_items: отчёт по товарам не ссылается на удалённый id
+        from app.orders.models import OrderItem
+        await db.execute(
+            sql_update(OrderItem).where(OrderItem.product_id == product_id).values(product_id=None)
+            .execution_options(synchronize_session=False)
+        )
+        await db.delete(product)
+        await db.flush()
         return True
     return False
 
-def add_history(db: Session, product_id: int, action: str, quantity: int, date: str):
+async def add_history(db: AsyncSession, product_id: int, action: str, quantity: int, date: str):
     history = models.ProductHistory(
         product_id=product_id,
         action=action,
@@ -53,19 +146,172 @@ def add_history(db: Session, product_id: int, action: str, quantity: int, date:
         date=date
     )
     db.add(history)
-    db.commit() # Commit here? Or let service commit? 
-    # Current codebase commits aggressively. I'll follow pattern.
+    await db.flush()
     return history
 
-def update_stock(db: Session, product: models.Product, quantity: int):
-    product.stock_quantity += quantity
-    db.commit()
-    db.refresh(product)
+async def update_stock(db: AsyncSession, product: models.Product, quantity: int):
+    """Атомарно меняет остаток на quantity (UPDATE stock = stock + quantity), без записи в историю."""
+    await apply_stock_deltas(db, {product.id: quantity}, history=False)
+    await db.refresh(product, attribute_names=["stock_quantity", "version"])
     return product
 
-def get_top_viewed(db: Session, limit: int = 4):
-    return db.query(models.Product).order_by(models.Product.views.desc()).limit(limit).all()
+async def get_top_viewed(db: AsyncSession, limit: int = 4):
+    """Самые просматриваемые товары витрины (строки CATALOG_COLUMNS)."""
+    result = await db.execute(
+        select(*CATALOG_COLUMNS)
+        .filter(models.Product.is_ingredient.isnot(True))
+        .order_by(models.Product.views.desc().nulls_last(), models.Product.id)
+        .limit(limit)
+    )
+    return result.all()
+
+async def add_views(db: AsyncSession, counts: dict):
+    """
+    Просмотры {product_id: n} одним UPDATE views = views + n (write-behind из app.counters).
+    Без version: просмотр не должен конфликтовать с правкой товара в Sklad. Удалённые id игнорируются.
+    """
+    counts = {pid: n for pid, n in counts.items() if n}
+    if not counts:
+        return
+    await db.execute(
+        sql_update(models.Product)
+        .where(models.Product.id.in_(sorted(counts)))
+        .values(views=func.coalesce(models.Product.views, 0) + case(counts, value=models.Product.id, else_=0))
+        .execution_options(synchronize_session=False)
+    )
 
-def increment_views(db: Session, product: models.Product):
-    product.views += 1
-    db.commit()
+def parse_composition(composition_json) -> dict:
+    """Product.composition ([{id, qty, ...}] от Sklad) -> {component_id: qty}; повторы суммируются."""
+    try:
+        items = json.loads(composition_json) if isinstance(composition_json, str) else composition_json
+    except (TypeError, ValueError):
+        return {}
+    if not isinstance(items, list):
+        return {}
+    components = {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        try:
+            component_id, qty = int(item.get("id")), int(float(item.get("qty") or 0))
+        except (TypeError, ValueError):
+            continue
+        if qty > 0:
+            components[component_id] = components.get(component_id, 0) + qty
+    return components
+
+async def set_components(db: AsyncSession, product_id: int, composition_json):
+    """Перезаписывает product_components по JSON состава (без commit). Несуществующие товары и сам букет пропускаются."""
+    components = parse_composition(composition_json)
+    components.pop(product_id, None)
+    await db.execute(sql_delete(models.ProductComponent).where(models.ProductComponent.product_id == product_id))
+    if components:
+        result = await db.execute(select(models.Product.id).filter(models.Product.id.in_(components)))
+        known = set(result.scalars().all())
+        rows = [
+            {"product_id": product_id, "component_id": cid, "qty": qty}
+            for cid, qty in components.items() if cid in known
+        ]
+        if rows:
+            await db.execute(insert(models.ProductComponent), rows)
+    return components
+
+async def get_components(db: AsyncSession, product_ids) -> dict:
+    """{product_id: {component_id: qty}} для нескольких товаров одним запросом."""
+    if not product_ids:
+        return {}
+    result = await db.execute(
+        select(models.ProductComponent.product_id, models.ProductComponent.component_id, models.ProductComponent.qty)
+        .filter(models.ProductComponent.product_id.in_(list(product_ids)))
+    )
+    components = {}
+    for product_id, component_id, qty in result.all():
+        components.setdefault(product_id, {})[component_id] = qty
+    return components
+
+async def explode(db: AsyncSession, lines: dict) -> dict:
+    """
+    Раскрывает {product_id: количество} до ингредиентов: {component_id: количество}.
+    Товары без состава остаются как есть; один запрос на уровень вложенности.
+    """
+    leaves = {}
+    level = {pid: qty for pid, qty in lines.items() if qty}
+    for _ in range(BOM_MAX_DEPTH):
+        if not level:
+            break
+        components = await get_components(db, level)
+        next_level = {}
+        for pid, qty in level.items():
+            if pid in components:
+                for cid, cqty in components[pid].items():
+                    next_level[cid] = next_level.get(cid, 0) + qty * cqty
+            else:
+                leaves[pid] = leaves.get(pid, 0) + qty
+        level = next_level
+    else:
+        if level:
+            raise ValueError(f"Состав глубже {BOM_MAX_DEPTH} уровней (цикл?): {sorted(level)}")
+    return leaves
+
+async def get_stock(db: AsyncSession, product_ids, lock: bool = False) -> dict:
+    """
+    {product_id: stock_quantity}. lock=True — SELECT ... FOR UPDATE в порядке id (PostgreSQL),
+    чтобы параллельные списания по одним и тем же товарам не взаимоблокировались.
+    """
+    if not product_ids:
+        return {}
+    query = (
+        select(models.Product.id, models.Product.stock_quantity)
+        .filter(models.Product.id.in_(list(product_ids)))
+        .order_by(models.Product.id)
+    )
+    if lock:
+        query = query.with_for_update()  # SQLite: игнорируется, запись и так сериализована
+    result = await db.execute(query)
+    return {pid: stock or 0 for pid, stock in result.all()}
+
+async def add_history_bulk(db: AsyncSession, deltas: dict, date: str = None):
+    """История движений {product_id: +/-количество} одним INSERT (без commit)."""
+    date = date or datetime.datetime.now().isoformat()
+    rows = [
+        {"product_id": pid, "action": "income" if d > 0 else "writeoff", "quantity": abs(d), "date": date}
+        for pid, d in deltas.items() if d
+    ]
+    if rows:
+        await db.execute(insert(models.ProductHistory), rows)
+
+async def apply_stock_deltas(db: AsyncSession, deltas: dict, history: bool = True, date: str = None, values: dict = None) -> list:
+    """
+    Атомарно меняет остатки {product_id: +/-количество} одним UPDATE stock = stock + delta,
+    version = version + 1 и пишет историю одной пачкой (без commit). values — дополнительные
+    колонки для того же UPDATE (цена закупки при поставке). Возвращает [(id, name, остаток)]
+    товаров, ушедших в минус при списании — вызывающий код должен сделать rollback.
+    """
+    deltas = {pid: d for pid, d in deltas.items() if d}
+    if not deltas:
+        return []
+    await get_stock(db, deltas, lock=True)
+    mark_catalog_dirty(db)
+    await db.execute(
+        sql_update(models.Product)
+        .where(models.Product.id.in_(list(deltas)))
+        .values(
+            stock_quantity=func.coalesce(models.Product.stock_quantity, 0) + case(deltas, value=models.Product.id, else_=0),
+            version=models.Product.version + 1,
+            **(values or {}),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    decreased = [pid for pid, d in deltas.items() if d < 0]
+    if decreased:
+        result = await db.execute(
+            select(models.Product.id, models.Product.name, models.Product.stock_quantity)
+            .filter(models.Product.id.in_(decreased), models.Product.stock_quantity < 0)
+            .order_by(models.Product.id)
+        )
+        shortages = result.all()
+        if shortages:
+            return shortages
+    if history:
+        await add_history_bulk(db, deltas, date)
+    return []
@@ -1,7 +1,7 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from typing import List
-from app.database import get_db
+from fastapi import APIRouter, Depends, Header, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from app.database import get_async_db
 from . import service, schemas
 
 router = APIRouter(
@@ -10,25 +10,50 @@ router = APIRouter(
 )
 
 @router.get("", response_model=List[schemas.Product])
-def get_products(category: str = None, search: str = None, db: Session = Depends(get_db)):
-    return service.get_products(db, category, search)
+async def get_products(category: str = None, search: str = None, db: AsyncSession = Depends(get_async_db)):
+    return await service.get_products(db, category, search)
+
+@router.get("/catalog", response_model=List[schemas.CatalogProduct])
+async def get_catalog(
+    category: str = None,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Витрина Mini App из кэша в памяти. If-None-Match с текущим ETag — 304 без тела."""
+    etag, body = await service.get_catalog(db, category)
+    # no-cache: браузер хранит ответ, но каждый раз сверяет ETag
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if if_none_match:
+        tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+        if etag in tags or "*" in tags:
+            return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 @router.get("/{product_id}", response_model=schemas.Product)
-def get_product(product_id: int, db: Session = Depends(get_db)):
-    return service.get_product(db, product_id)
+async def get_product(product_id: int, db: AsyncSession = Depends(get_async_db)):
+    return await service.get_product(db, product_id)
 
 @router.post("", response_model=schemas.Product)
-def create_product(product: schemas.ProductCreate, db: Session = Depends(get_db)):
-    return service.create_product(db, product)
+async def create_product(product: schemas.ProductCreate, db: AsyncSession = Depends(get_async_db)):
+    return await service.create_product(db, product)
 
 @router.put("/{product_id}", response_model=schemas.Product)
-def update_product(product_id: int, product_update: schemas.ProductUpdate, db: Session = Depends(get_db)):
-    return service.update_product(db, product_id, product_update)
+async def update_product(product_id: int, product_update: schemas.ProductUpdate, db: AsyncSession = Depends(get_async_db)):
+    return await service.update_product(db, product_id, product_update)
 
 @router.delete("/{product_id}")
-def delete_product(product_id: int, db: Session = Depends(get_db)):
-    return service.delete_product(db, product_id)
+async def delete_product(product_id: int, db: AsyncSession = Depends(get_async_db)):
+    return await service.delete_product(db, product_id)
 
 @router.post("/{product_id}/supply", response_model=schemas.Product)
-def supply_product(product_id: int, supply: schemas.ProductSupply, db: Session = Depends(get_db)):
-    return service.supply_product(db, product_id, supply)
+async def supply_product(product_id: int, supply: schemas.ProductSupply, db: AsyncSession = Depends(get_async_db)):
+    return await service.supply_product(db, product_id, supply)
+
+@router.post("/{product_id}/writeoff", response_model=schemas.Product)
+async def writeoff_product(product_id: int, writeoff: schemas.ProductWriteoff, db: AsyncSession = Depends(get_async_db)):
+    return await service.writeoff_product(db, product_id, writeoff)
+
+@router.post("/{product_id}/assemble", response_model=schemas.Product)
+async def assemble_product(product_id: int, assemble: schemas.ProductAssemble, db: AsyncSession = Depends(get_async_db)):
+    """Собрать quantity букетов: ингредиенты списываются по составу, 409 — если чего-то не хватает."""
+    return await service.assemble_product(db, product_id, assemble)
@@ -1,6 +1,8 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, computed_field
 from typing import List, Optional
 
+from app.common.schemas import ImageSet, image_set
+
 class ProductBase(BaseModel):
     name: str
     category: Optional[str] = None
@@ -41,12 +43,19 @@ class ProductUpdate(BaseModel):
     unit: Optional[str] = None
     is_ingredient: Optional[bool] = None
     views: Optional[int] = None
+    version: Optional[int] = None # версия, с которой открыта карточка; не совпала — 409
 
 class ProductSupply(BaseModel):
     quantity: int
     cost_price: int
     supplier: Optional[str] = None
 
+class ProductAssemble(BaseModel):
+    quantity: int = Field(..., gt=0, le=10000)
+
+class ProductWriteoff(BaseModel):
+    quantity: int = Field(..., gt=0)
+
 class ProductHistoryBase(BaseModel):
     product_id: int
     action: str
@@ -64,7 +73,13 @@ class ProductHistory(ProductHistoryBase):
 class Product(ProductBase):
     id: int
     images: str
+    version: Optional[int] = None
     history: List[ProductHistory] = []
+
+    @computed_field
+    @property
+    def image_set(self) -> Optional[ImageSet]:
+        return image_set(self.image, "full")
     
     class Config:
         from_attributes = True
@@ -73,3 +88,28 @@ class ProductWithHistory(Product):
     history: List[ProductHistory] = []
     class Config:
         from_attributes = True
+
+class CatalogComponent(BaseModel):
+    id: Optional[int] = None
+    name: str = ""
+    qty: int = 0
+
+class CatalogProduct(BaseModel):
+    """Карточка витрины (GET /products/catalog): без description и history, состав уже разобран."""
+    id: int
+    name: str
+    category: Optional[str] = None
+    price: Optional[str] = None
+    price_raw: Optional[int] = 0
+    image: Optional[str] = None
+    images: Optional[str] = "[]"
+    rating: float = 5.0
+    is_hit: bool = False
+    is_new: bool = False
+    in_stock: bool = False
+    composition: List[CatalogComponent] = []
+
+    @computed_field
+    @property
+    def image_set(self) -> Optional[ImageSet]:
+        return image_set(self.image, "card")
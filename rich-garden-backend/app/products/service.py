@@ -1,140 +1,126 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import delete as sql_delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.exc import StaleDataError
 from fastapi import HTTPException
-from . import repository, schemas, models
+from app.database import unit_of_work
+from . import repository, schemas, models, catalog
 from app.expenses import service as expense_service
 from app.expenses import schemas as expense_schemas
 from app.users.models import RecentlyViewed
+from app.stock.service import raise_shortage
 import datetime
 
-def get_products(db: Session, category: str = None, search: str = None):
-    return repository.get_all(db, category, search)
+async def get_products(db: AsyncSession, category: str = None, search: str = None):
+    return await repository.get_all(db, category, search)
 
-def get_product(db: Session, product_id: int):
-    product = repository.get_by_id(db, product_id)
+async def get_catalog(db: AsyncSession, category: str = None):
+    return await catalog.get_catalog(db, category)
+
+async def get_product(db: AsyncSession, product_id: int):
+    product = await repository.get_by_id(db, product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     return product
 
-def create_product(db: Session, product: schemas.ProductCreate):
-    return repository.create(db, product)
+async def create_product(db: AsyncSession, product: schemas.ProductCreate):
+    async with unit_of_work(db):
+        return await repository.create(db, product)
 
-def update_product(db: Session, product_id: int, product_update: schemas.ProductUpdate):
-    # Logic for stock history
-    db_product = repository.get_by_id(db, product_id)
+async def update_product(db: AsyncSession, product_id: int, product_update: schemas.ProductUpdate):
+    db_product = await repository.get_by_id(db, product_id)
     if not db_product:
         raise HTTPException(status_code=404, detail="Product not found")
-        
-    old_stock = db_product.stock_quantity
-    updated_product = repository.update(db, product_id, product_update)
-    
-    # Check if stock changed (this logic was in main.py)
-    # Since repository.update already commits, we can just check objects
-    # But repository.update updates the object in place attached to session.
-    
-    if "stock_quantity" in product_update.dict(exclude_unset=True) and old_stock != updated_product.stock_quantity:
-        diff = updated_product.stock_quantity - old_stock
-        if diff != 0:
-            repository.add_history(
-                db, 
-                product_id=updated_product.id,
-                action="income" if diff > 0 else "writeoff",
-                quantity=abs(diff),
-                date=datetime.datetime.now().isoformat()
-            )
-            
-    return updated_product
-
-import json
 
-def delete_product(db: Session, product_id: int):
+    # Клиент прислал version, с которой открывал карточку: правка поверх чужих изменений — 409
+    if product_update.version is not None and product_update.version != db_product.version:
+        raise HTTPException(status_code=409, detail="Товар изменён другим пользователем, обновите карточку")
     try:
-        product = repository.get_by_id(db, product_id)
-        if not product:
-            raise HTTPException(status_code=404, detail="Product not found")
+        async with unit_of_work(db):
+            return await repository.update(db, product_id, product_update)
+    except StaleDataError:
+        raise HTTPException(status_code=409, detail="Товар изменён другим пользователем, обновите карточку")
 
-        # RESTORE INGREDIENTS LOGIC
-        # If it's a bouquet (has composition) and has stock, return ingredients to warehouse
-        if product.stock_quantity > 0 and product.composition and product.composition != "[]":
-            try:
-                comp_list = json.loads(product.composition)
-                if isinstance(comp_list, list):
-                    for item in comp_list:
-                        ing_id = item.get('id')
-                        ing_qty = item.get('qty', 0)
-                        if ing_id and ing_qty > 0:
-                            ingredient = repository.get_by_id(db, ing_id)
-                            if ingredient:
-                                restore_amount = ing_qty * product.stock_quantity
-                                repository.update_stock(db, ingredient, restore_amount)
-                                # Add history record for ingredient
-                                repository.add_history(
-                                    db, 
-                                    product_id=ingredient.id, 
-                                    action="income", 
-                                    quantity=restore_amount, 
-                                    date=datetime.datetime.now().isoformat()
-                                )
-            except Exception as e:
-                print(f"Error restoring ingredients: {e}")
+async def assemble_product(db: AsyncSession, product_id: int, assemble: schemas.ProductAssemble):
+    """
+    Сборка букетов: списывает ингредиенты по product_components на quantity штук и
+    добавляет букеты на склад — одна транзакция, один UPDATE остатков, история пачкой.
+    """
+    product = await repository.get_by_id(db, product_id)
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+    components = await repository.explode(db, {product_id: assemble.quantity})
+    if components == {product_id: assemble.quantity}:
+        raise HTTPException(status_code=400, detail="У товара нет состава")
 
-        # Manually delete related records to avoid foreign key constraints
-        # Delete recently_viewed records
-        try:
-            db.query(RecentlyViewed).filter(RecentlyViewed.product_id == product_id).delete()
-            db.commit()
-        except Exception as e:
-            print(f"Error deleting recently_viewed: {e}")
+    deltas = {cid: -qty for cid, qty in components.items()}
+    deltas[product_id] = deltas.get(product_id, 0) + assemble.quantity
+    async with unit_of_work(db):
+        shortages = await repository.apply_stock_deltas(db, deltas)
+        if shortages:
+            raise_shortage(shortages)
+        await db.refresh(product, attribute_names=["stock_quantity", "version", "history"])
+    return product
 
-        # Delete product history
-        try:
-            db.query(models.ProductHistory).filter(models.ProductHistory.product_id == product_id).delete()
-            db.commit()
-        except Exception as e:
-            print(f"Error deleting history: {e}")
+async def delete_product(db: AsyncSession, product_id: int):
+    product = await repository.get_by_id(db, product_id)
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+    try:
+        # Всё удаление — одна транзакция: при ошибке склад и связанные записи не меняются
+        async with unit_of_work(db):
+            # Собранные букеты на складе: ингредиенты возвращаются на склад (раскрытие состава, один UPDATE)
+            if product.stock_quantity > 0:
+                components = await repository.explode(db, {product_id: product.stock_quantity})
+                components.pop(product_id, None)
+                await repository.apply_stock_deltas(db, components)
 
-        success = repository.delete(db, product_id)
-        if not success:
-            raise HTTPException(status_code=500, detail="Failed to delete product")
+            # Manually delete related records to avoid foreign key constraints
+            await db.execute(sql_delete(RecentlyViewed).where(RecentlyViewed.product_id == product_id))
+            await repository.delete_product_history(db, product_id)
+            await repository.delete(db, product_id)
         return {"message": "Product deleted successfully"}
-    except HTTPException as he:
-        raise he
     except Exception as e:
         print(f"CRITICAL ERROR deleting product {product_id}: {e}")
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Server error: {str(e)}")
 
-def supply_product(db: Session, product_id: int, supply: schemas.ProductSupply):
-    product = repository.get_by_id(db, product_id)
+async def supply_product(db: AsyncSession, product_id: int, supply: schemas.ProductSupply):
+    product = await repository.get_by_id(db, product_id)
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+
+    # Остаток, история и расход «Закупка» — одна транзакция
+    async with unit_of_work(db):
+        # Остаток, цена закупки и поставщик — одним атомарным UPDATE: параллельные поставки не теряются
+        values = {"cost_price": supply.cost_price}
+        if supply.supplier:
+            values["supplier"] = supply.supplier
+        shortages = await repository.apply_stock_deltas(db, {product.id: supply.quantity}, values=values)
+        if shortages:
+            raise_shortage(shortages)
+
+        total_cost = supply.quantity * supply.cost_price
+        if total_cost > 0:
+            expense = expense_schemas.ExpenseCreate(
+                amount=total_cost,
+                category="Закупка",
+                note=f"Поставка: {product.name} ({supply.quantity} шт) {f'от {supply.supplier}' if supply.supplier else ''}",
+                date=datetime.datetime.now()
+            )
+            await expense_service.create_expense(db, expense)
+
+        await db.refresh(product, attribute_names=["stock_quantity", "cost_price", "supplier", "version", "history"])
+    return product
+
+async def writeoff_product(db: AsyncSession, product_id: int, writeoff: schemas.ProductWriteoff):
+    """Списание: атомарный UPDATE stock = stock - quantity, 409 — если остатка не хватает."""
+    product = await repository.get_by_id(db, product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
-    
-    # Update product fields
-    product.cost_price = supply.cost_price
-    if supply.supplier:
-        product.supplier = supply.supplier
-    
-    # Update stock
-    repository.update_stock(db, product, supply.quantity)
-    
-    # Add History
-    repository.add_history(
-        db,
-        product_id=product.id,
-        action="income",
-        quantity=supply.quantity,
-        date=datetime.datetime.now().isoformat()
-    )
-    
-    # Create Expense
-    total_cost = supply.quantity * supply.cost_price
-    if total_cost > 0:
-        expense = expense_schemas.ExpenseCreate(
-            amount=total_cost,
-            category="Закупка",
-            note=f"Поставка: {product.name} ({supply.quantity} шт) {f'от {supply.supplier}' if supply.supplier else ''}",
-            date=datetime.datetime.now().isoformat()
-        )
-        expense_service.create_expense(db, expense)
-        
+    async with unit_of_work(db):
+        shortages = await repository.apply_stock_deltas(db, {product_id: -writeoff.quantity})
+        if shortages:
+            raise_shortage(shortages)
+        await db.refresh(product, attribute_names=["stock_quantity", "version", "history"])
     return product
@@ -0,0 +1,205 @@
+"""
+Инвертированный индекс товаров в памяти процесса — поиск для SQLite (на PostgreSQL работают
+tsvector + pg_trgm, см. repository.search_products_pg).
+
+Слово -> {product_id: вес поля} (название весомее категории/описания), отсортированный список
+слов для префиксного поиска (bisect) и триграммы слов для опечаток. Изменённые товары
+переиндексируются точечно: репозиторий товаров кладёт id в session.info["search_dirty"],
+после commit они помечаются устаревшими и перечитываются перед следующим поиском.
+Полная пересборка — по SEARCH_INDEX_TTL (несколько воркеров, правки в обход API).
+"""
+import asyncio
+import bisect
+import heapq
+import math
+import os
+import time
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.products import models as product_models
+from . import text
+
+SEARCH_INDEX_TTL = int(os.getenv("SEARCH_INDEX_TTL", "600"))
+
+NAME_WEIGHT = 3.0
+BODY_WEIGHT = 1.0
+PREFIX_QUALITY = 0.8
+FUZZY_QUALITY = 0.6
+FUZZY_MIN_SIMILARITY = 0.4
+# Короткий префикс («р») раскрывается в сотни слов — ограничиваем самыми частыми
+MAX_PREFIX_EXPANSION = 200
+
+
+class SearchIndex:
+    def __init__(self):
+        self.postings = {}     # слово -> {product_id: вес}
+        self.doc_tokens = {}   # product_id -> слова документа (для удаления)
+        self.views = {}        # product_id -> просмотры (при равном счёте популярные выше)
+        self.trigram_tokens = {}  # триграмма -> слова
+        self._sorted = []
+        self._sorted_dirty = False
+
+    def __len__(self):
+        return len(self.doc_tokens)
+
+    def add(self, product_id: int, name: str, category: str, description: str, views: int = 0):
+        self.remove(product_id)
+        weights = {}
+        for token in text.tokens(f"{category or ''} {description or ''}"):
+            weights[token] = BODY_WEIGHT
+        for token in text.tokens(name):
+            weights[token] = NAME_WEIGHT
+        for token, weight in weights.items():
+            posting = self.postings.get(token)
+            if posting is None:
+                posting = self.postings[token] = {}
+                for gram in text.trigrams(token):
+                    self.trigram_tokens.setdefault(gram, set()).add(token)
+                self._sorted_dirty = True
+            posting[product_id] = weight
+        self.doc_tokens[product_id] = tuple(weights)
+        self.views[product_id] = views or 0
+
+    def remove(self, product_id: int):
+        for token in self.doc_tokens.pop(product_id, ()):
+            posting = self.postings.get(token)
+            if posting is None:
+                continue
+            posting.pop(product_id, None)
+            if not posting:
+                # Слово пропадает из словаря: из триграмм и _sorted отфильтровывается при поиске
+                del self.postings[token]
+        self.views.pop(product_id, None)
+
+    def _vocabulary(self):
+        if self._sorted_dirty:
+            self._sorted = sorted(self.postings)
+            self._sorted_dirty = False
+        return self._sorted
+
+    def _expand(self, variant: str) -> dict:
+        """Слова словаря под вариант терма: {слово: качество совпадения}."""
+        vocabulary = self._vocabulary()
+        matches = {}
+        start = bisect.bisect_left(vocabulary, variant)
+        for token in vocabulary[start:]:
+            if not token.startswith(variant):
+                break
+            if token in self.postings:
+                matches[token] = 1.0 if token == variant else PREFIX_QUALITY
+        if len(matches) > MAX_PREFIX_EXPANSION:
+            top = sorted(matches, key=lambda t: -len(self.postings[t]))[:MAX_PREFIX_EXPANSION]
+            matches = {t: matches[t] for t in top}
+        if matches or len(variant) < 4:
+            return matches
+
+        # Опечатка: слова с похожими триграммами (коэффициент Жаккара)
+        grams = text.trigrams(variant)
+        shared = {}
+        for gram in grams:
+            for token in self.trigram_tokens.get(gram, ()):
+                shared[token] = shared.get(token, 0) + 1
+        for token, count in shared.items():
+            if token not in self.postings:
+                continue
+            similarity = count / (len(grams) + len(text.trigrams(token)) - count)
+            if similarity >= FUZZY_MIN_SIMILARITY:
+                matches[token] = FUZZY_QUALITY * similarity
+        return matches
+
+    def _term_scores(self, variants, name_only: bool) -> dict:
+        total = len(self.doc_tokens) or 1
+        scores = {}
+        for variant in variants:
+            for token, quality in self._expand(variant).items():
+                posting = self.postings[token]
+                factor = quality * math.log(1 + total / len(posting))
+                get = scores.get
+                for product_id, weight in posting.items():
+                    if name_only and weight < NAME_WEIGHT:
+                        continue
+                    score = weight * factor
+                    if score > get(product_id, 0):
+                        scores[product_id] = score
+        return scores
+
+    def search(self, terms: list, limit: int = 50, name_only: bool = False) -> list:
+        """
+        id товаров по убыванию релевантности. Сначала все термы (AND); если так ничего
+        не нашлось — любой из них (OR), совпавшие по большему числу слов выше.
+        """
+        if not terms:
+            return []
+        per_term = [self._term_scores(variants, name_only) for variants in terms]
+        if len(per_term) == 1:
+            totals = per_term[0]
+        else:
+            per_term.sort(key=len)
+            candidates = set(per_term[0])
+            for scores in per_term[1:]:
+                candidates &= scores.keys()
+            if not candidates:
+                candidates = set().union(*per_term)
+            totals = {pid: sum(scores.get(pid, 0) for scores in per_term) for pid in candidates}
+        # Нужны только первые limit: heapq вместо сортировки тысяч совпадений широкого запроса
+        views = self.views
+        return heapq.nlargest(limit, totals, key=lambda pid: (totals[pid], views.get(pid, 0), -pid))
+
+
+_index = None
+_built_at = 0.0
+_stale = set()
+_lock = asyncio.Lock()
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    dirty = session.info.pop("search_dirty", None)
+    if dirty:
+        _stale.update(dirty)
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session):
+    session.info.pop("search_dirty", None)
+
+
+def _rows_query():
+    Product = product_models.Product
+    return (
+        select(Product.id, Product.name, Product.category, Product.description, Product.views)
+        .filter(Product.is_ingredient.isnot(True))
+    )
+
+
+async def build(db: AsyncSession) -> SearchIndex:
+    index = SearchIndex()
+    result = await db.execute(_rows_query())
+    for row in result.all():
+        index.add(row.id, row.name, row.category, row.description, row.views)
+    return index
+
+
+async def get_index(db: AsyncSession) -> SearchIndex:
+    global _index, _built_at
+    if _index is not None and not _stale and time.monotonic() - _built_at < SEARCH_INDEX_TTL:
+        return _index
+    async with _lock:
+        if _index is None or time.monotonic() - _built_at >= SEARCH_INDEX_TTL:
+            _stale.clear()
+            _index = await build(db)
+            _built_at = time.monotonic()
+        elif _stale:
+            ids = list(_stale)
+            _stale.difference_update(ids)
+            result = await db.execute(_rows_query().filter(product_models.Product.id.in_(ids)))
+            found = set()
+            for row in result.all():
+                _index.add(row.id, row.name, row.category, row.description, row.views)
+                found.add(row.id)
+            for product_id in set(ids) - found:
+                _index.remove(product_id)
+    return _index
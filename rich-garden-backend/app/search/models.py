@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, DateTime, Index
+from datetime import datetime
+from app.database import Base
+
+class SearchQuery(Base):
+    """
+    Популярные запросы витрины: счётчик по нормализованному тексту (text.normalize_query).
+    Заменяет захардкоженные теги в /search/popular.
+    """
+    __tablename__ = "search_queries"
+    __table_args__ = (
+        Index("ix_search_queries_count", "count"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    # unique: upsert ON CONFLICT (query); диапазон query >= :prefix — автодополнение по B-tree
+    query = Column(String, nullable=False, unique=True)
+    count = Column(Integer, nullable=False, default=0)
+    results = Column(Integer, nullable=False, default=0) # сколько нашлось в последний раз
+    last_searched_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,102 @@
+from sqlalchemy import select, text as sql_text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.products import models as product_models
+from app.products import repository as product_repo
+from . import models
+
+# Выражение должно совпадать с индексом ix_products_search_vector (migrate_product_search.py),
+# иначе PostgreSQL его не использует
+SEARCH_VECTOR = (
+    "(setweight(to_tsvector('simple', coalesce(products.search_name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(products.search_body, '')), 'C'))"
+)
+
+def _tsquery(terms: list, weight: str = "") -> str:
+    """[[вариант, ...], ...] -> '(pion:* | peon:*) & (roz:*)'. Варианты — только \\w, экранировать нечего."""
+    return " & ".join("(" + " | ".join(f"{v}:*{weight}" for v in variants) + ")" for variants in terms)
+
+async def search_products_pg(db: AsyncSession, terms: list, raw: str, limit: int):
+    """
+    PostgreSQL: полнотекст по tsvector (префиксы, вес названия A, категории/описания C) или
+    похожесть названия по pg_trgm (опечатки). Ранг — ts_rank + word_similarity, затем просмотры.
+    """
+    Product = product_models.Product
+    query = (
+        select(*product_repo.CATALOG_COLUMNS)
+        .filter(
+            Product.is_ingredient.isnot(True),
+            sql_text(f"({SEARCH_VECTOR} @@ to_tsquery('simple', :tsq) OR :raw <% products.search_name)"),
+        )
+        .order_by(
+            sql_text(f"ts_rank({SEARCH_VECTOR}, to_tsquery('simple', :tsq)) + word_similarity(:raw, products.search_name) DESC"),
+            Product.views.desc().nulls_last(),
+            Product.id,
+        )
+        .limit(limit)
+        .params(tsq=_tsquery(terms), raw=raw)
+    )
+    result = await db.execute(query)
+    return result.all()
+
+async def suggest_products_pg(db: AsyncSession, terms: list, limit: int):
+    """Автодополнение: префиксы только по названию (вес A), популярные товары выше."""
+    Product = product_models.Product
+    query = (
+        select(Product.id, Product.name)
+        .filter(
+            Product.is_ingredient.isnot(True),
+            sql_text(f"{SEARCH_VECTOR} @@ to_tsquery('simple', :tsq)"),
+        )
+        .order_by(Product.views.desc().nulls_last(), Product.id)
+        .limit(limit)
+        .params(tsq=_tsquery(terms, "A"))
+    )
+    result = await db.execute(query)
+    return result.all()
+
+async def record_queries(db: AsyncSession, queries: dict):
+    """
+    Счётчики запросов {query: (count, results, last_searched_at)} одним upsert
+    INSERT ... ON CONFLICT (query) DO UPDATE count = count + excluded.count (без commit).
+    """
+    if not queries:
+        return
+    dialect = postgresql if db.bind.dialect.name == "postgresql" else sqlite
+    stmt = dialect.insert(models.SearchQuery).values([
+        {"query": query, "count": count, "results": results, "last_searched_at": at}
+        for query, (count, results, at) in sorted(queries.items())
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["query"],
+        set_={
+            "count": models.SearchQuery.count + stmt.excluded.count,
+            "results": stmt.excluded.results,
+            "last_searched_at": stmt.excluded.last_searched_at,
+        },
+    )
+    await db.execute(stmt)
+
+async def get_popular_queries(db: AsyncSession, limit: int, min_count: int = 1):
+    result = await db.execute(
+        select(models.SearchQuery.query)
+        .filter(models.SearchQuery.count >= min_count, models.SearchQuery.results > 0)
+        .order_by(models.SearchQuery.count.desc(), models.SearchQuery.last_searched_at.desc())
+        .limit(limit)
+    )
+    return result.scalars().all()
+
+async def suggest_queries(db: AsyncSession, prefix: str, limit: int, min_count: int = 1):
+    """Популярные запросы, начинающиеся с prefix: диапазон по уникальному индексу вместо LIKE."""
+    result = await db.execute(
+        select(models.SearchQuery.query)
+        .filter(
+            models.SearchQuery.query >= prefix,
+            models.SearchQuery.query < prefix + "\uffff",
+            models.SearchQuery.count >= min_count,
+            models.SearchQuery.results > 0,
+        )
+        .order_by(models.SearchQuery.count.desc())
+        .limit(limit)
+    )
+    return result.scalars().all()
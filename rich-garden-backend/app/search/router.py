@@ -1,13 +1,33 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from app.database import get_db
-from . import service
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+from app.database import get_async_db
+from app.products import schemas as product_schemas
+from . import service, schemas
 
 router = APIRouter(
     prefix="/search",
     tags=["search"]
 )
 
+@router.get("", response_model=List[product_schemas.CatalogProduct])
+async def search_products(
+    q: str = Query(..., max_length=100),
+    limit: int = Query(service.SEARCH_RESULTS_LIMIT, ge=1, le=100),
+    track: bool = Query(True, description="false — поиск по мере ввода, не учитывается в популярных"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Ранжированный поиск: кириллица/латиница/английский (пион, pion, peony), префиксы, опечатки."""
+    return await service.search_products(db, q, limit, track)
+
+@router.get("/suggest", response_model=schemas.Suggestions)
+async def suggest(
+    q: str = Query(..., max_length=100),
+    limit: int = Query(service.SEARCH_SUGGEST_LIMIT, ge=1, le=20),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await service.suggest(db, q, limit)
+
 @router.get("/popular")
-def get_popular_searches(db: Session = Depends(get_db)):
-    return service.get_popular_searches(db)
+async def get_popular_searches(db: AsyncSession = Depends(get_async_db)):
+    return await service.get_popular_searches(db)
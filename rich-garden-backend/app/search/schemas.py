@@ -0,0 +1,10 @@
+from pydantic import BaseModel
+from typing import List
+
+class ProductSuggestion(BaseModel):
+    id: int
+    name: str
+
+class Suggestions(BaseModel):
+    queries: List[str] = []
+    products: List[ProductSuggestion] = []
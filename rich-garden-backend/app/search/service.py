@@ -1,13 +1,64 @@
-from sqlalchemy.orm import Session
+import os
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.products import repository as product_repo
+from app.products import catalog
+from app.counters import service as counters_service
+from . import repository, index, text
 
-def get_popular_searches(db: Session):
-    tags = ["101 роза 🌹", "Пионы", "Авторские букеты", "Тюльпаны", "Гипсофила", "Сладкие подарки"]
-    
-    # Get top 4 viewed products
-    top_products = product_repo.get_top_viewed(db, limit=4)
-    
+SEARCH_RESULTS_LIMIT = 50
+SEARCH_SUGGEST_LIMIT = 8
+POPULAR_TAGS_LIMIT = 6
+# Запрос попадает в популярные, когда его искали хотя бы столько раз и он что-то находил
+SEARCH_POPULAR_MIN_COUNT = int(os.getenv("SEARCH_POPULAR_MIN_COUNT", "3"))
+# Холодный старт: пока статистики нет
+DEFAULT_TAGS = ["101 роза 🌹", "Пионы", "Авторские букеты", "Тюльпаны", "Гипсофила", "Сладкие подарки"]
+
+def _is_postgres(db: AsyncSession) -> bool:
+    return db.bind.dialect.name == "postgresql"
+
+async def search_products(db: AsyncSession, q: str, limit: int = SEARCH_RESULTS_LIMIT, track: bool = True):
+    """
+    Ранжированный поиск товаров витрины (карточки catalog.build_item). PostgreSQL — tsvector + pg_trgm,
+    SQLite — инвертированный индекс в памяти. track=False — поиск по мере ввода, без учёта в популярных.
+    """
+    terms = text.query_terms(q)
+    if not terms:
+        return []
+    if _is_postgres(db):
+        raw = " ".join(variants[0] for variants in terms)
+        rows = await repository.search_products_pg(db, terms, raw, limit)
+    else:
+        search_index = await index.get_index(db)
+        rows = await product_repo.get_catalog_rows_by_ids(db, search_index.search(terms, limit))
+    items = [catalog.build_item(row) for row in rows]
+
+    query = text.normalize_query(q)
+    if track and len(query) >= 2:
+        counters_service.add_search(query, len(items))
+    return items
+
+async def suggest(db: AsyncSession, q: str, limit: int = SEARCH_SUGGEST_LIMIT):
+    """Автодополнение: популярные запросы с этим началом и товары, в названии которых есть слова-префиксы."""
+    terms = text.query_terms(q)
+    prefix = text.normalize_query(q)
+    if not terms or not prefix:
+        return {"queries": [], "products": []}
+    queries = await repository.suggest_queries(db, prefix, limit, SEARCH_POPULAR_MIN_COUNT)
+    if _is_postgres(db):
+        rows = await repository.suggest_products_pg(db, terms, limit)
+        products = [{"id": row.id, "name": row.name} for row in rows]
+    else:
+        search_index = await index.get_index(db)
+        ids = search_index.search(terms, limit, name_only=True)
+        rows = await product_repo.get_catalog_rows_by_ids(db, ids)
+        products = [{"id": row.id, "name": row.name} for row in rows]
+    return {"queries": queries, "products": products}
+
+async def get_popular_searches(db: AsyncSession):
+    # Оба рейтинга — из кэша app.counters, без запросов к БД на каждое открытие поиска
+    tags = await counters_service.get_popular_queries(db, POPULAR_TAGS_LIMIT, SEARCH_POPULAR_MIN_COUNT)
+    top_products = await counters_service.get_top_viewed(db, limit=4)
     return {
-        "tags": tags,
+        "tags": tags or DEFAULT_TAGS,
         "products": top_products
     }
@@ -0,0 +1,94 @@
+"""
+Нормализация текста для поиска: нижний регистр, транслитерация кириллицы в латиницу,
+английские названия цветов -> русские (в транслите), лёгкое отсечение окончаний.
+Документы и запросы приводятся к одному виду, поэтому «пион», «pion» и «peony» совпадают.
+"""
+import re
+
+_TRANSLIT = {
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "е": "e", "ё": "e", "ж": "zh", "з": "z",
+    "и": "i", "й": "y", "к": "k", "л": "l", "м": "m", "н": "n", "о": "o", "п": "p", "р": "r",
+    "с": "s", "т": "t", "у": "u", "ф": "f", "х": "h", "ц": "ts", "ч": "ch", "ш": "sh", "щ": "sch",
+    "ъ": "", "ы": "y", "ь": "", "э": "e", "ю": "yu", "я": "ya",
+    # узбекская кириллица
+    "ў": "o", "қ": "q", "ғ": "g", "ҳ": "h",
+}
+
+# Английские слова и частые латинские написания -> русское слово в транслите
+SYNONYMS = {
+    "rose": "roza", "roses": "roza", "rosa": "roza",
+    "peony": "pion", "peonies": "pion", "peon": "pion",
+    "tulip": "tyulpan", "tulips": "tyulpan", "tulpan": "tyulpan", "tulpany": "tyulpan",
+    "lily": "liliya", "lilies": "liliya", "lilia": "liliya",
+    "orchid": "orhideya", "orchids": "orhideya",
+    "chrysanthemum": "hrizantema", "chrysanthemums": "hrizantema",
+    "hydrangea": "gortenziya", "hydrangeas": "gortenziya",
+    "carnation": "gvozdika", "carnations": "gvozdika",
+    "gypsophila": "gipsofila",
+    "eustoma": "eustoma", "lisianthus": "eustoma",
+    "bouquet": "buket", "bouquets": "buket",
+    "basket": "korzina", "baskets": "korzina",
+    "box": "korobka", "boxes": "korobka",
+    "wedding": "svadebnyy",
+    "mix": "avtorskiy",
+}
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+_ENDING_VOWELS = "aeiouy"
+
+
+def translit(text: str) -> str:
+    return "".join(_TRANSLIT.get(ch, ch) for ch in (text or "").lower())
+
+
+def stem(token: str) -> str:
+    """Отрезает гласные окончания (pion/piony, roza/rozy), оставляя не меньше 3 символов."""
+    while len(token) > 3 and token[-1] in _ENDING_VOWELS:
+        token = token[:-1]
+    return token
+
+
+def tokens(text: str) -> list:
+    """Слова текста в латинице; английский синоним добавляется рядом с исходным словом."""
+    result = []
+    for word in _WORD.findall(translit(text)):
+        word = word.replace("_", "")
+        if not word:
+            continue
+        result.append(word)
+        synonym = SYNONYMS.get(word)
+        if synonym and synonym != word:
+            result.append(synonym)
+    return result
+
+
+def document(text: str) -> str:
+    """Строка для колонок products.search_name/search_body: уникальные слова через пробел."""
+    return " ".join(dict.fromkeys(tokens(text)))
+
+
+def query_terms(query: str) -> list:
+    """
+    Термы запроса: для каждого слова — набор вариантов (исходное, синоним), уже со stem.
+    Документ подходит, если для каждого терма совпал хотя бы один вариант (префиксом).
+    """
+    terms = []
+    for word in _WORD.findall(translit(query)):
+        word = word.replace("_", "")
+        if not word:
+            continue
+        variants = {stem(word)}
+        if word in SYNONYMS:
+            variants.add(stem(SYNONYMS[word]))
+        terms.append(sorted(variants))
+    return terms
+
+
+def normalize_query(query: str) -> str:
+    """Ключ популярного запроса: как ввёл пользователь, но в нижнем регистре и без лишних пробелов."""
+    return " ".join((query or "").lower().split())[:64]
+
+
+def trigrams(token: str) -> set:
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
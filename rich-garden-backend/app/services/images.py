@@ -0,0 +1,186 @@
+"""
+Производные размеры загруженных фото: thumb / card / full в AVIF, WebP и JPEG.
+
+Раньше upload_file декодировал, масштабировал до 1920px и кодировал JPEG прямо в async-хендлере
+(сотни миллисекунд заблокированного event loop на фото), а Mini App качала 1920px даже для
+миниатюр. Теперь всё делается в пуле процессов (IMAGE_WORKERS): воркер сам пишет файлы в
+uploads/img и возвращает манифест, в event loop остаётся только ожидание.
+
+Имена адресуются содержимым: img/ab/cd/<sha256 исходника[:32]>-<размер>.<формат> плюс
+<хэш>.json с фактическими размерами (разбиение по каталогам — как у uploads.store). Повторная загрузка того же фото ничего не пересчитывает, а по любому
+URL производного (его и хранят product.image, banner.image_url, story.*_url) находятся
+остальные — так схемы отдают нужный размер и srcset, не меняя таблиц.
+"""
+import asyncio
+import hashlib
+import io
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from app.services import uploads
+
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", str(min(2, os.cpu_count() or 1))))
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "82"))
+IMAGE_AVIF_QUALITY = int(os.getenv("IMAGE_AVIF_QUALITY", "55"))  # у AVIF своя шкала: 55 ~ JPEG 82 по виду
+IMAGE_FORMATS = [f.strip() for f in os.getenv("IMAGE_FORMATS", "avif,webp,jpeg").split(",") if f.strip()]
+
+SIZES = {"thumb": 320, "card": 640, "full": 1920}  # ширина по большей стороне
+EXTENSIONS = {"avif": "avif", "webp": "webp", "jpeg": "jpg"}
+SUBDIR = "img"
+IMAGES_DIR = os.path.join(uploads.UPLOADS_DIR, SUBDIR)
+
+_URL_RE = re.compile(r"/uploads/img/[0-9a-f]{2}/[0-9a-f]{2}/([0-9a-f]{32})-(thumb|card|full)\.(avif|webp|jpg)$")
+
+_pool = None
+_manifests = {}  # хэш -> манифест (или None, если <хэш>.json нет)
+
+
+def _flatten(img):
+    """RGB на белом фоне (прозрачные PNG) с учётом EXIF-поворота."""
+    from PIL import Image, ImageOps
+
+    img = ImageOps.exif_transpose(img)
+    if img.mode in ("RGBA", "LA", "P"):
+        img = img.convert("RGBA")
+        background = Image.new("RGB", img.size, (255, 255, 255))
+        background.paste(img, mask=img.split()[-1])
+        return background
+    return img.convert("RGB") if img.mode != "RGB" else img
+
+
+def _write(path: str, img, fmt: str, quality: int):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    options = {"quality": quality}
+    if fmt == "jpeg":
+        options.update(optimize=True, progressive=True)
+    elif fmt == "webp":
+        options.update(method=4)
+    elif fmt == "avif":
+        options.update(speed=8)
+    img.save(tmp, format=fmt.upper(), **options)
+    os.replace(tmp, path)  # другие воркеры не увидят недописанный файл
+
+
+def _prefix(directory: str, digest: str) -> str:
+    """<directory>/ab/cd/<hash> — общая часть путей производных и манифеста."""
+    return os.path.join(directory, *uploads.fanout(digest).split("/"))
+
+
+def render(data: bytes, directory: str, formats: list, quality: int, avif_quality: int) -> dict:
+    """
+    Выполняется в процессе пула: один decode, по ресайзу на размер (от большего к меньшему,
+    без увеличения), все форматы. Возвращает манифест; если он уже на диске — сразу его.
+    """
+    from PIL import Image, features
+
+    digest = hashlib.sha256(data).hexdigest()[:uploads.HASH_LENGTH]
+    prefix = _prefix(directory, digest)
+    manifest_path = f"{prefix}.json"
+    if os.path.isfile(manifest_path):
+        os.utime(manifest_path)  # повторная загрузка: сборщик мусора отсчитывает grace заново
+        with open(manifest_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    formats = [fmt for fmt in formats if fmt == "jpeg" or features.check(fmt)] or ["jpeg"]
+    os.makedirs(os.path.dirname(prefix), exist_ok=True)
+    img = _flatten(Image.open(io.BytesIO(data)))
+    sizes = {}
+    for name, width in sorted(SIZES.items(), key=lambda item: -item[1]):
+        if max(img.size) > width:
+            img.thumbnail((width, width), Image.Resampling.LANCZOS)
+        for fmt in formats:
+            target = f"{prefix}-{name}.{EXTENSIONS[fmt]}"
+            _write(target, img, fmt, avif_quality if fmt == "avif" else quality)
+        sizes[name] = {"width": img.size[0], "height": img.size[1]}
+    manifest = {"hash": digest, "formats": formats, "sizes": sizes}
+    _write_json(manifest_path, manifest)
+    return manifest
+
+
+def _write_json(path: str, manifest: dict):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, path)
+
+
+def _url(digest: str, size: str, fmt: str) -> str:
+    return f"{uploads.STATIC_URL}uploads/{SUBDIR}/{uploads.fanout(digest)}-{size}.{EXTENSIONS[fmt]}"
+
+
+def path(digest: str, size: str, fmt: str) -> str:
+    return f"{_prefix(IMAGES_DIR, digest)}-{size}.{EXTENSIONS[fmt]}"
+
+
+def _executor() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=max(IMAGE_WORKERS, 1))
+    return _pool
+
+
+def stop():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def process(data: bytes) -> dict:
+    """
+    Строит производные в пуле и возвращает ответ для клиента: url (full JPEG — его сохраняют
+    в товар/баннер/историю, он же уходит в Telegram) и srcset по форматам.
+    Исключение Pillow (не картинка, битый файл) пробрасывается вызывающему.
+    """
+    loop = asyncio.get_running_loop()
+    manifest = await loop.run_in_executor(
+        _executor(), render, data, IMAGES_DIR, IMAGE_FORMATS, IMAGE_QUALITY, IMAGE_AVIF_QUALITY
+    )
+    _manifests[manifest["hash"]] = manifest
+    for size in manifest["sizes"]:
+        for fmt in manifest["formats"]:
+            uploads.register(_url(manifest["hash"], size, fmt), path(manifest["hash"], size, fmt))
+    url = _url(manifest["hash"], "full", "jpeg")
+    return {"url": url, **image_set(url, "full")}
+
+
+def manifest(url: Optional[str]) -> Optional[dict]:
+    """Манифест по URL любого производного; для старых загрузок (один JPEG) — None."""
+    match = _URL_RE.search(url) if isinstance(url, str) else None
+    if match is None:
+        return None
+    digest = match.group(1)
+    if digest not in _manifests:
+        try:
+            with open(f"{_prefix(IMAGES_DIR, digest)}.json", encoding="utf-8") as f:
+                _manifests[digest] = json.load(f)
+        except (OSError, ValueError):
+            _manifests[digest] = None
+    return _manifests[digest]
+
+
+def image_set(url: Optional[str], size: str) -> Optional[dict]:
+    """
+    {"src", "width", "height", "srcset": {формат: "url 320w, ..."}} для размера size:
+    src — JPEG этого размера, srcset — все размеры не больше него (браузер выберет по sizes/DPR).
+    Для старых загрузок — None, клиент показывает исходный URL.
+    """
+    info = manifest(url)
+    if info is None:
+        return None
+    limit = SIZES[size]
+    sizes = [(name, dims) for name, dims in info["sizes"].items() if SIZES[name] <= limit]
+    sizes.sort(key=lambda item: item[1]["width"])
+    srcset = {}
+    for fmt in info["formats"]:
+        seen, parts = set(), []
+        for name, dims in sizes:
+            if dims["width"] not in seen:  # маленький исходник: thumb и card одной ширины
+                seen.add(dims["width"])
+                parts.append(f"{_url(info['hash'], name, fmt)} {dims['width']}w")
+        srcset[fmt] = ", ".join(parts)
+    dims = info["sizes"][size]
+    return {"src": _url(info["hash"], size, "jpeg"), "width": dims["width"], "height": dims["height"], "srcset": srcset}
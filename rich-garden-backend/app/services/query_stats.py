@@ -0,0 +1,97 @@
+"""
+Счётчик SQL-запросов на HTTP-запрос.
+
+ASGI-middleware кладёт в contextvar счётчик запроса, слушатель before_cursor_execute async-движка
+его увеличивает (контекст доходит и до greenlet, в котором SQLAlchemy выполняет запросы).
+Число запросов уходит в заголовок X-DB-Queries, агрегаты по эндпоинту (шаблон пути FastAPI) —
+в GET /api/debug/query-stats (сброс — POST /api/debug/query-stats/reset). Эндпоинты без
+авторизации, поэтому регистрируются только при DEBUG_QUERY_STATS=1. Запросы тяжелее QUERY_STATS_WARN_THRESHOLD печатаются как WARN.
+Фоновые воркеры (outbox, counters) вне HTTP-запроса не считаются.
+"""
+import os
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+QUERY_STATS_ENABLED = os.getenv("QUERY_STATS_ENABLED", "1").strip().lower() in ("1", "true", "yes")
+DEBUG_QUERY_STATS = os.getenv("DEBUG_QUERY_STATS", "0").strip().lower() in ("1", "true", "yes")
+QUERY_STATS_WARN_THRESHOLD = int(os.getenv("QUERY_STATS_WARN_THRESHOLD", "25"))
+
+_current: ContextVar = ContextVar("query_stats_counter", default=None)
+_stats = {}  # "GET /api/user/{telegram_id}/recent" -> [requests, queries, max_queries]
+
+
+def install(async_engine):
+    if not QUERY_STATS_ENABLED:
+        return
+
+    @event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+    def _count(*_):
+        counter = _current.get()
+        if counter is not None:
+            counter[0] += 1
+
+
+def _record(key: str, queries: int):
+    entry = _stats.get(key)
+    if entry is None:
+        entry = _stats[key] = [0, 0, 0]
+    entry[0] += 1
+    entry[1] += queries
+    entry[2] = max(entry[2], queries)
+    if queries > QUERY_STATS_WARN_THRESHOLD:
+        print(f"WARN query_stats: {key} made {queries} SQL queries")
+
+
+def snapshot() -> list:
+    """Эндпоинты по убыванию суммарного числа запросов."""
+    rows = [
+        {"endpoint": key, "requests": requests, "queries": queries,
+         "avg_queries": round(queries / requests, 2), "max_queries": max_queries}
+        for key, (requests, queries, max_queries) in _stats.items()
+    ]
+    return sorted(rows, key=lambda row: -row["queries"])
+
+
+def reset():
+    _stats.clear()
+
+
+def _endpoint_path(scope) -> str:
+    """
+    Шаблон пути, а не сам путь: /api/user/555/orders -> /api/user/{telegram_id}/orders, иначе
+    каждый пользователь — отдельный ключ. Параметры берём из path_params, которые роутер
+    записывает в scope; без совпавшего маршрута (404) — общий ключ.
+    """
+    if scope.get("route") is None:
+        return "<unmatched>"
+    by_value = {str(value): name for name, value in (scope.get("path_params") or {}).items()}
+    return "/".join(
+        f"{{{by_value[segment]}}}" if segment in by_value else segment
+        for segment in scope.get("path", "").split("/")
+    )
+
+
+class QueryStatsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not QUERY_STATS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        counter = [0]
+        token = _current.set(counter)
+
+        async def send_with_header(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-queries", str(counter[0]).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_header)
+        finally:
+            _current.reset(token)
+            _record(f"{scope.get('method', '')} {_endpoint_path(scope)}", counter[0])
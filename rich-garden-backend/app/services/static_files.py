@@ -0,0 +1,152 @@
+"""
+Раздача /static: StaticFiles с долгим кэшем, сильными ETag, предсжатыми вариантами и LRU в памяти.
+
+Загрузки неизменяемы: новые файлы названы хэшем содержимого (app.services.uploads.store), старые —
+uuid4, файл под тем же именем не перезаписывается. Поэтому uploads/* отдаются с
+Cache-Control: immutable на год — Mini App не перепроверяет фото товаров при каждом показе.
+ETag сильный и зависит только от содержимого: у файлов хранилища это имя (в нём хэш), у старых —
+sha256 (считается один раз на размер+mtime). Range обрабатывает FileResponse; If-Range сверяется
+с этим же ETag.
+
+Маленькие горячие файлы (миниатюры, карточки) держатся в памяти (STATIC_CACHE_MAX_BYTES, файлы
+до STATIC_CACHE_MAX_FILE): запрос отдаётся без stat в пуле потоков и без чтения с диска.
+Файлы с хэшем в имени из кэша отдаются без проверки; старые сверяются по размеру и mtime не чаще
+раза в STATIC_REVALIDATE_SECONDS (stat — в пуле потоков, не в event loop).
+Для текстовых форматов (svg, json, css, js) при STATIC_PRECOMPRESSED отдаётся соседний .br/.gz,
+если он есть и клиент его принимает (создаёт precompress_static.py); If-None-Match сверяется
+с ETag выбранного варианта.
+"""
+import mimetypes
+import os
+import stat
+import time
+from collections import OrderedDict
+from email.utils import formatdate
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+from app.services import uploads
+
+STATIC_CACHE_MAX_BYTES = int(os.getenv("STATIC_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+STATIC_CACHE_MAX_FILE = int(os.getenv("STATIC_CACHE_MAX_FILE", str(512 * 1024)))
+STATIC_REVALIDATE_SECONDS = float(os.getenv("STATIC_REVALIDATE_SECONDS", "2"))
+STATIC_PRECOMPRESSED = os.getenv("STATIC_PRECOMPRESSED", "1").strip().lower() in ("1", "true", "yes")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+DEFAULT_CACHE_CONTROL = "public, max-age=3600"
+
+COMPRESSIBLE_EXTENSIONS = (".svg", ".json", ".css", ".js", ".txt", ".html", ".xml")
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))  # в порядке предпочтения
+
+
+class CachedStaticFiles(StaticFiles):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._entries = OrderedDict()  # path -> [size, mtime, body, headers, проверено (monotonic)]
+        self._bytes = 0
+
+    @staticmethod
+    def _content_addressed(path: str) -> bool:
+        return bool(uploads.hashes_in("/" + path.replace(os.sep, "/")))
+
+    @staticmethod
+    def _cache_control(path: str) -> str:
+        return IMMUTABLE_CACHE_CONTROL if path.replace(os.sep, "/").startswith("uploads/") else DEFAULT_CACHE_CONTROL
+
+    async def _etag(self, path: str, full_path: str) -> str:
+        if self._content_addressed(path):
+            return f'"{os.path.basename(full_path)}"'
+        digest = await anyio.to_thread.run_sync(uploads.content_hash, full_path)
+        return f'"{digest}"'
+
+    async def get_response(self, path: str, scope) -> Response:
+        if any(part.startswith(".") for part in path.split(os.sep)):
+            raise HTTPException(status_code=404)  # uploads/.tmp — недописанные файлы хранилища
+        if scope["method"] in ("GET", "HEAD"):
+            request_headers = Headers(scope=scope)
+            if "range" not in request_headers:
+                response = await self._from_memory(path, request_headers)
+                if response is not None:
+                    return response
+            try:
+                full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path)
+            except (OSError, ValueError):
+                full_path, stat_result = "", None
+            if stat_result is not None and stat.S_ISREG(stat_result.st_mode):
+                return await self._file_response(path, full_path, stat_result, request_headers)
+        # 405, 404, каталоги и ошибки путей — как у StaticFiles
+        return await super().get_response(path, scope)
+
+    async def _from_memory(self, path: str, request_headers: Headers):
+        entry = self._entries.get(path)
+        if entry is None:
+            return None
+        size, mtime, body, headers, checked_at = entry
+        if not self._content_addressed(path) and time.monotonic() - checked_at >= STATIC_REVALIDATE_SECONDS:
+            try:
+                stat_result = await anyio.to_thread.run_sync(os.stat, os.path.join(self.directory, path))
+            except OSError:
+                stat_result = None
+            if stat_result is None or (stat_result.st_size, stat_result.st_mtime) != (size, mtime):
+                self._evict(path)
+                return None
+            entry[4] = time.monotonic()
+        self._entries.move_to_end(path)
+        if self.is_not_modified(headers, request_headers):
+            return NotModifiedResponse(headers)
+        return Response(body, headers=headers)
+
+    def _evict(self, path: str):
+        entry = self._entries.pop(path, None)
+        if entry is not None:
+            self._bytes -= len(entry[2])
+
+    def _remember(self, path: str, stat_result, body: bytes, headers: dict):
+        self._evict(path)
+        self._entries[path] = [stat_result.st_size, stat_result.st_mtime, body, headers, time.monotonic()]
+        self._bytes += len(body)
+        while self._bytes > STATIC_CACHE_MAX_BYTES and self._entries:
+            self._evict(next(iter(self._entries)))
+
+    async def _file_response(self, path: str, full_path: str, stat_result, request_headers: Headers) -> Response:
+        media_type = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+        headers = {
+            "etag": await self._etag(path, full_path),
+            "cache-control": self._cache_control(path),
+            "last-modified": formatdate(stat_result.st_mtime, usegmt=True),
+            "content-type": media_type,
+            "accept-ranges": "bytes",
+        }
+        if full_path.endswith(COMPRESSIBLE_EXTENSIONS):
+            headers["vary"] = "Accept-Encoding"
+        if STATIC_PRECOMPRESSED and full_path.endswith(COMPRESSIBLE_EXTENSIONS):
+            accepted = request_headers.get("accept-encoding", "")
+            for encoding, suffix in ENCODINGS:
+                if encoding in accepted and await anyio.to_thread.run_sync(os.path.isfile, full_path + suffix):
+                    # у варианта свой ETag: 304 — только если клиент прислал именно его
+                    variant = dict(headers, etag=headers["etag"][:-1] + f'-{encoding}"')
+                    variant["content-encoding"] = encoding
+                    if self.is_not_modified(variant, request_headers):
+                        return NotModifiedResponse(variant)
+                    return FileResponse(full_path + suffix, headers=variant, media_type=media_type)
+
+        if self.is_not_modified(headers, request_headers):
+            return NotModifiedResponse(headers)
+
+        # Текстовые форматы в память не кладём: у них могут быть .br/.gz для других клиентов
+        if (stat_result.st_size <= STATIC_CACHE_MAX_FILE and "range" not in request_headers
+                and not full_path.endswith(COMPRESSIBLE_EXTENSIONS)):
+            body = await anyio.to_thread.run_sync(_read, full_path)
+            if len(body) == stat_result.st_size:
+                self._remember(path, stat_result, body, headers)
+                return Response(body, headers=headers)
+        return FileResponse(full_path, headers=headers, media_type=media_type, stat_result=stat_result)
+
+
+def _read(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
@@ -0,0 +1,163 @@
+"""
+Хранилище загруженных файлов. Ключ — путь внутри хранилища (ab/cd/<hash>.jpg), URL строится
+хранилищем, так что роутеры и сервисы не знают, где лежат байты.
+
+Storage — интерфейс; LocalStorage — каталог на диске, который раздаёт StaticFiles. Запись
+потоковая: чанки пишутся во временный файл и хэшируются в пуле потоков (STORAGE_IO_THREADS),
+event loop не ждёт диск. Затем commit переносит временный файл под итоговый ключ — тот, что
+вычислен по содержимому; если ключ уже есть, копия просто отбрасывается.
+
+S3-совместимое хранилище (MinIO и т.п.) реализует тот же интерфейс: write — multipart-загрузка
+во временный ключ, commit — copy + delete, local_path — None (тогда фото для Telegram и
+производные размеры потребуют скачивания, см. app.services.images).
+"""
+import asyncio
+import hashlib
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterable, List, Optional, Tuple
+
+STORAGE_IO_THREADS = int(os.getenv("STORAGE_IO_THREADS", "4"))
+
+_io_pool = None
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _io_pool
+    if _io_pool is None:
+        _io_pool = ThreadPoolExecutor(max_workers=max(STORAGE_IO_THREADS, 1), thread_name_prefix="storage")
+    return _io_pool
+
+
+async def run_io(fn, *args):
+    """Блокирующая файловая операция в пуле потоков хранилища."""
+    return await asyncio.get_running_loop().run_in_executor(_executor(), fn, *args)
+
+
+def stop():
+    global _io_pool
+    if _io_pool is not None:
+        _io_pool.shutdown(wait=True)
+        _io_pool = None
+
+
+class Storage:
+    """Интерфейс хранилища. temp — непрозрачный идентификатор незавершённой записи."""
+
+    async def write(self, chunks: AsyncIterable[bytes]) -> Tuple[str, str, int]:
+        """Пишет поток во временное место; возвращает (temp, sha256 hex, размер)."""
+        raise NotImplementedError
+
+    async def commit(self, temp: str, key: str) -> bool:
+        """Делает temp файлом key. False — key уже был (дубликат), temp удалён."""
+        raise NotImplementedError
+
+    async def discard(self, temp: str):
+        raise NotImplementedError
+
+    async def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    async def delete(self, key: str):
+        raise NotImplementedError
+
+    async def list(self, prefix: str = "") -> List[Tuple[str, int, float]]:
+        """[(key, размер, mtime)] всех файлов под prefix."""
+        raise NotImplementedError
+
+    def url(self, key: str) -> str:
+        raise NotImplementedError
+
+    def local_path(self, key: str) -> Optional[str]:
+        """Путь на диске, если хранилище локальное, иначе None."""
+        return None
+
+
+class LocalStorage(Storage):
+    def __init__(self, root: str, base_url: str):
+        self.root = root
+        self.base_url = base_url.rstrip("/") + "/"
+        self.tmp_dir = os.path.join(root, ".tmp")
+
+    def _path(self, key: str) -> str:
+        path = os.path.normpath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"storage key outside root: {key}")
+        return path
+
+    async def write(self, chunks: AsyncIterable[bytes]) -> Tuple[str, str, int]:
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        temp = os.path.join(self.tmp_dir, uuid.uuid4().hex)
+        f = await run_io(open, temp, "wb")
+        digest, size = hashlib.sha256(), 0
+
+        def write_chunk(chunk):
+            f.write(chunk)
+            digest.update(chunk)
+
+        try:
+            async for chunk in chunks:
+                if chunk:
+                    await run_io(write_chunk, chunk)
+                    size += len(chunk)
+        except BaseException:
+            await run_io(f.close)
+            await self.discard(temp)
+            raise
+        await run_io(f.close)
+        return temp, digest.hexdigest(), size
+
+    async def commit(self, temp: str, key: str) -> bool:
+        path = self._path(key)
+
+        def move() -> bool:
+            if os.path.exists(path):
+                os.remove(temp)
+                os.utime(path)  # свежий mtime: сборщик мусора не удалит файл до сохранения ссылки
+                return False
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(temp, path)
+            return True
+
+        return await run_io(move)
+
+    async def discard(self, temp: str):
+        try:
+            await run_io(os.remove, temp)
+        except FileNotFoundError:
+            pass
+
+    async def exists(self, key: str) -> bool:
+        return await run_io(os.path.isfile, self._path(key))
+
+    async def delete(self, key: str):
+        try:
+            await run_io(os.remove, self._path(key))
+        except FileNotFoundError:
+            pass
+
+    async def list(self, prefix: str = "") -> List[Tuple[str, int, float]]:
+        start = self._path(prefix) if prefix else self.root
+
+        def walk():
+            files = []
+            for directory, dirs, names in os.walk(start):
+                dirs[:] = [d for d in dirs if os.path.join(directory, d) != self.tmp_dir]
+                for name in names:
+                    path = os.path.join(directory, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    key = os.path.relpath(path, self.root).replace(os.sep, "/")
+                    files.append((key, stat.st_size, stat.st_mtime))
+            return files
+
+        return await run_io(walk)
+
+    def url(self, key: str) -> str:
+        return self.base_url + key
+
+    def local_path(self, key: str) -> Optional[str]:
+        return self._path(key)
@@ -1,16 +1,16 @@
 import os
-import httpx
 import json
 import html
 import re
 from dotenv import load_dotenv
+from app.services import telegram_client, uploads
+from app.telegram_files import service as telegram_files
 
 load_dotenv(override=True)
 
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 TELEGRAM_GROUP_BOT_TOKEN = os.getenv("TELEGRAM_GROUP_BOT_TOKEN", "7119055260:AAHEJ58S7A7b1niVY_Q20fcJr3KyZLfc7hk")
 TELEGRAM_GROUP_ID = os.getenv("TELEGRAM_GROUP_ID", "-5194643570")
-HTTPX_TIMEOUT = 30.0
 
 def escape_html(text):
     if not text:
@@ -21,6 +21,96 @@ def escape_html(text):
 def format_number(num):
     return f"{int(num):,}".replace(",", " ")
 
+def _is_ok(response) -> bool:
+    try:
+        return response.status_code == 200 and bool(response.json().get("ok"))
+    except ValueError:
+        return False
+
+
+def _file_id_rejected(response) -> bool:
+    """Telegram не принял file_id (другой бот, файл удалён) — нужно загрузить файл заново."""
+    try:
+        description = response.json().get("description", "")
+    except ValueError:
+        return False
+    return response.status_code == 400 and "file" in description.lower()
+
+
+def _photo_file_ids(response) -> list:
+    """file_id самого большого размера каждого фото из ответа sendPhoto / sendMediaGroup."""
+    try:
+        result = response.json().get("result")
+    except ValueError:
+        return []
+    messages = result if isinstance(result, list) else [result]
+    file_ids = []
+    for message in messages:
+        sizes = (message or {}).get("photo") if isinstance(message, dict) else None
+        file_ids.append(sizes[-1].get("file_id") if sizes else None)
+    return file_ids
+
+
+async def _send_photo(client, token: str, path: str, payload: dict):
+    """
+    sendPhoto: по file_id, если этот бот уже загружал файл (app.telegram_files), иначе потоком
+    с диска (httpx читает файл частями) — и file_id из ответа запоминается.
+    """
+    import mimetypes
+    bot = telegram_files.bot_id(token)
+    url_photo = telegram_client.method_url(token, "sendPhoto")
+    file_id = (await telegram_files.lookup(bot, [path])).get(path)
+    if file_id:
+        response = await client.post(url_photo, data={**payload, "photo": file_id})
+        if not _file_id_rejected(response):
+            return response
+        await telegram_files.forget(bot, [path])
+    with open(path, 'rb') as f:
+        files = {"photo": (os.path.basename(path), f, mimetypes.guess_type(path)[0] or "image/jpeg")}
+        response = await client.post(url_photo, data=payload, files=files)
+    if _is_ok(response):
+        file_ids = _photo_file_ids(response)
+        await telegram_files.remember(bot, {path: file_ids[0] if file_ids else None})
+    return response
+
+
+async def _post_media_group(client, token: str, paths: list, payload: dict, file_ids: dict):
+    import mimetypes
+    from contextlib import ExitStack
+    media_group = []
+    files_payload = []
+    with ExitStack() as opened:
+        for idx, path in enumerate(paths):
+            if path in file_ids:
+                media_group.append({"type": "photo", "media": file_ids[path]})
+                continue
+            field = f"p{idx}"
+            media_group.append({"type": "photo", "media": f"attach://{field}"})
+            # Открытые файлы, а не байты: коллаж не копирует все фото в память
+            f = opened.enter_context(open(path, 'rb'))
+            files_payload.append((field, (os.path.basename(path), f, mimetypes.guess_type(path)[0])))
+        url_media = telegram_client.method_url(token, "sendMediaGroup")
+        return await client.post(url_media, data={**payload, "media": json.dumps(media_group)}, files=files_payload or None)
+
+
+async def _send_media_group(client, token: str, paths: list, payload: dict):
+    """sendMediaGroup: уже загруженные фото — по file_id, остальные файлами; новые file_id запоминаются."""
+    bot = telegram_files.bot_id(token)
+    cached = await telegram_files.lookup(bot, paths)
+    response = await _post_media_group(client, token, paths, payload, cached)
+    if cached and _file_id_rejected(response):
+        await telegram_files.forget(bot, list(cached))
+        cached = {}
+        response = await _post_media_group(client, token, paths, payload, cached)
+    if _is_ok(response):
+        file_ids = _photo_file_ids(response)
+        if len(file_ids) == len(paths):
+            await telegram_files.remember(bot, {
+                path: file_id for path, file_id in zip(paths, file_ids) if path not in cached
+            })
+    return response
+
+
 async def send_order_notification(order: dict, items_detail: str, image_limit: int = 10, images: list = None):
     print(f"DEBUG send_order_notification: BOT_TOKEN={TELEGRAM_GROUP_BOT_TOKEN[:20]}..., GROUP_ID={TELEGRAM_GROUP_ID}")
     if not TELEGRAM_GROUP_BOT_TOKEN or not TELEGRAM_GROUP_ID:
@@ -131,66 +221,18 @@ async def send_order_notification(order: dict, items_detail: str, image_limit: i
 
     # ... (previous code)
 
-    # Resolve images first
+    # Фото товаров: URL -> файл через реестр загрузок (поиск в словаре, без перебора путей)
     valid_images_paths = []
     if images:
-        import os
-        base_path = os.getcwd()
         # Filter out anything that isn't a string to avoid 'unhashable type: dict'
         clean_images = [img for img in images if isinstance(img, str) and img]
-        unique_images = list(set(clean_images))[:10]
-        
-        print(f"DEBUG: Processing {len(unique_images)} images relative to {base_path}")
-        for img_path in unique_images:
-            clean_path = img_path.lstrip('/')
-            if not clean_path:
-                continue
-            
-            # Check directly first (if path is absolute or relative to CWD)
-            candidates = []
-            
-            # 1. Absolute path check (if it starts with /var/www...) or CWD relative
-            if os.path.exists(img_path):
-                 candidates.append(img_path)
-            
-            # 2. Construct paths relative to backend root
-            # Assumes CWD is where we launch python, usually backend root or app root
-            # Common pattern: clean_path is like "static/uploads/uuid.jpg" or "/static/uploads/uuid.jpg"
-            
-            # Adjust for potential missing leading parts
-            # e.g. if DB has "/static/uploads/foo.jpg" -> we need "app/static/uploads/foo.jpg"
-            
-            common_roots = [
-                base_path,                            # /var/www/.../rich-garden-backend
-                os.path.join(base_path, 'app'),       # /var/www/.../rich-garden-backend/app
-            ]
-            
-            for root in common_roots:
-                # Try raw join
-                candidates.append(os.path.join(root, clean_path))
-                
-                # Try with 'static' prefix if missing
-                if not clean_path.startswith('static'):
-                     candidates.append(os.path.join(root, 'static', clean_path))
-                
-                # Try without 'static' if double (less likely but possible)
-                if clean_path.startswith('static/'):
-                     candidates.append(os.path.join(root, clean_path.replace('static/', '', 1)))
-            
-            # Special case for "uploads" direct link
-            if clean_path.startswith('uploads/'):
-                 candidates.append(os.path.join(base_path, 'app', 'static', clean_path))
-
-            found = False
-            for p in candidates:
-                if os.path.exists(p) and os.path.isfile(p):
-                    valid_images_paths.append(p)
-                    print(f"DEBUG: Found image at {p}")
-                    found = True
-                    break
-            
-            if not found:
-                print(f"DEBUG: Image NOT found. Tried: {candidates}")
+        unique_images = list(dict.fromkeys(clean_images))[:10]
+        for img_url in unique_images:
+            path = uploads.resolve(img_url)
+            if path:
+                valid_images_paths.append(path)
+            else:
+                print(f"DEBUG: Image NOT found: {img_url}")
 
     message = (
         f"<b>Заказ #{order['id']}</b>\n"
@@ -248,123 +290,97 @@ async def send_order_notification(order: dict, items_detail: str, image_limit: i
     print(f"DEBUG: Keyboard structure: {json.dumps(keyboard, indent=2, ensure_ascii=False)}")
     print(f"Sending Telegram message to {TELEGRAM_GROUP_ID}") 
 
-    async with httpx.AsyncClient(timeout=HTTPX_TIMEOUT) as client:
-        try:
-            # STRATEGY: "Collage Mode"
-            # 1. If multiple images -> Send MediaGroup (Collage). Attach Caption (Order Info) to the FIRST photo of the group.
-            #    Then send a small separate message with Buttons ("Control Panel").
-            # 2. If single image -> Send Photo with Caption and Buttons (Perfect One Message).
+    client = telegram_client.get_client()
+    try:
+        # STRATEGY: "Collage Mode"
+        # 1. If multiple images -> Send MediaGroup (Collage). Attach Caption (Order Info) to the FIRST photo of the group.
+        #    Then send a small separate message with Buttons ("Control Panel").
+        # 2. If single image -> Send Photo with Caption and Buttons (Perfect One Message).
             
-            sent_message_id = None
+        sent_message_id = None
             
-            if len(valid_images_paths) == 1:
-                # Case 1: Single Photo (Perfect)
-                path = valid_images_paths[0]
-                url_photo = f"https://api.telegram.org/bot{TELEGRAM_GROUP_BOT_TOKEN}/sendPhoto"
-                print(f"DEBUG: Sending Single Photo Message: {path}")
-                import mimetypes
-                filename = os.path.basename(path)
-                mime, _ = mimetypes.guess_type(path)
+        if len(valid_images_paths) == 1:
+            # Case 1: Single Photo (Perfect)
+            path = valid_images_paths[0]
+            print(f"DEBUG: Sending Single Photo Message: {path}")
                 
-                # Full text in caption check
-                caption_text = message
-                use_fallback_text = len(message) > 1000
+            # Full text in caption check
+            caption_text = message
+            use_fallback_text = len(message) > 1000
                 
-                if not use_fallback_text:
-                    with open(path, 'rb') as f:
-                        file_content = f.read()
-                    payload = { "chat_id": TELEGRAM_GROUP_ID, "caption": caption_text, "parse_mode": "HTML", "reply_markup": json.dumps(keyboard) }
-                    files = { "photo": (filename, file_content, mime or "image/jpeg") }
-                    
-                    response = await client.post(url_photo, data=payload, files=files)
-                    if response.status_code == 200 and response.json().get("ok"):
-                        sent_message_id = response.json()["result"]["message_id"]
-                    else:
-                        use_fallback_text = True # Retry with fallback
-                
-                if use_fallback_text:
-                    # Fallback: Photo then Text
-                     path = valid_images_paths[0]
-                     with open(path, 'rb') as f:
-                         await client.post(url_photo, data={"chat_id": TELEGRAM_GROUP_ID}, files={"photo": (filename, f.read(), mime)})
-                     url_msg = f"https://api.telegram.org/bot{TELEGRAM_GROUP_BOT_TOKEN}/sendMessage"
-                     resp = await client.post(url_msg, json={"chat_id": TELEGRAM_GROUP_ID, "text": message, "parse_mode": "HTML", "reply_markup": keyboard})
-                     if resp.status_code == 200: sent_message_id = resp.json().get("result", {}).get("message_id")
-
-            elif len(valid_images_paths) > 1:
-                # Case 2: Link (Multiple Photos) -> Collage (Just Photos) + Text Card (Text + Buttons)
-                # Since Telegram does NOT support Buttons on MediaGroups, we keep the Text and Buttons together.
-                # Result:
-                # [ Album of Photos ]
-                # [ Text Order Details + Buttons ]
-                
-                print(f"DEBUG: Sending Collage with {len(valid_images_paths)} photos and separate Text Card")
-                media_group = []
-                files_payload = []
-                import mimetypes
+            if not use_fallback_text:
+                payload = { "chat_id": TELEGRAM_GROUP_ID, "caption": caption_text, "parse_mode": "HTML", "reply_markup": json.dumps(keyboard) }
+                response = await _send_photo(client, TELEGRAM_GROUP_BOT_TOKEN, path, payload)
+                if response.status_code == 200 and response.json().get("ok"):
+                    sent_message_id = response.json()["result"]["message_id"]
+                else:
+                    use_fallback_text = True # Retry with fallback
                 
-                for idx, path in enumerate(valid_images_paths):
-                    field = f"p{idx}"
-                    media_item = {
-                        "type": "photo", 
-                        "media": f"attach://{field}"
-                    }
-                    media_group.append(media_item)
-                    
-                    with open(path, 'rb') as f:
-                        c = f.read()
-                    files_payload.append((field, (os.path.basename(path), c, mimetypes.guess_type(path)[0])))
+            if use_fallback_text:
+                # Fallback: Photo then Text
+                 path = valid_images_paths[0]
+                 await _send_photo(client, TELEGRAM_GROUP_BOT_TOKEN, path, {"chat_id": TELEGRAM_GROUP_ID})
+                 url_msg = telegram_client.method_url(TELEGRAM_GROUP_BOT_TOKEN, "sendMessage")
+                 resp = await client.post(url_msg, json={"chat_id": TELEGRAM_GROUP_ID, "text": message, "parse_mode": "HTML", "reply_markup": keyboard})
+                 if resp.status_code == 200: sent_message_id = resp.json().get("result", {}).get("message_id")
+
+        elif len(valid_images_paths) > 1:
+            # Case 2: Link (Multiple Photos) -> Collage (Just Photos) + Text Card (Text + Buttons)
+            # Since Telegram does NOT support Buttons on MediaGroups, we keep the Text and Buttons together.
+            # Result:
+            # [ Album of Photos ]
+            # [ Text Order Details + Buttons ]
                 
-                url_media = f"https://api.telegram.org/bot{TELEGRAM_GROUP_BOT_TOKEN}/sendMediaGroup"
-                await client.post(url_media, data={"chat_id": TELEGRAM_GROUP_ID, "media": json.dumps(media_group)}, files=files_payload)
+            print(f"DEBUG: Sending Collage with {len(valid_images_paths)} photos and separate Text Card")
+            await _send_media_group(client, TELEGRAM_GROUP_BOT_TOKEN, valid_images_paths, {"chat_id": TELEGRAM_GROUP_ID})
                 
-                # Send Main Text Card with Buttons (so content and controls are combined)
-                url_msg = f"https://api.telegram.org/bot{TELEGRAM_GROUP_BOT_TOKEN}/sendMessage"
-                payload = {
-                    "chat_id": TELEGRAM_GROUP_ID,
-                    "text": message,
-                    "parse_mode": "HTML",
-                    "reply_markup": keyboard,
-                    "disable_web_page_preview": True
-                }
+            # Send Main Text Card with Buttons (so content and controls are combined)
+            url_msg = telegram_client.method_url(TELEGRAM_GROUP_BOT_TOKEN, "sendMessage")
+            payload = {
+                "chat_id": TELEGRAM_GROUP_ID,
+                "text": message,
+                "parse_mode": "HTML",
+                "reply_markup": keyboard,
+                "disable_web_page_preview": True
+            }
                 
-                response = await client.post(url_msg, json=payload)
-                if response.status_code == 200 and response.json().get("ok"):
-                    sent_message_id = response.json()["result"]["message_id"]
+            response = await client.post(url_msg, json=payload)
+            if response.status_code == 200 and response.json().get("ok"):
+                sent_message_id = response.json()["result"]["message_id"]
 
-            else:
-                # Case 3: Text Only
-                url_msg = f"https://api.telegram.org/bot{TELEGRAM_GROUP_BOT_TOKEN}/sendMessage"
-                payload = {
-                    "chat_id": TELEGRAM_GROUP_ID,
-                    "text": message,
-                    "parse_mode": "HTML",
-                    "reply_markup": keyboard,
-                    "disable_web_page_preview": True
-                }
-                response = await client.post(url_msg, json=payload)
-                if response.status_code == 200 and response.json().get("ok"):
-                    sent_message_id = response.json()["result"]["message_id"]
+        else:
+            # Case 3: Text Only
+            url_msg = telegram_client.method_url(TELEGRAM_GROUP_BOT_TOKEN, "sendMessage")
+            payload = {
+                "chat_id": TELEGRAM_GROUP_ID,
+                "text": message,
+                "parse_mode": "HTML",
+                "reply_markup": keyboard,
+                "disable_web_page_preview": True
+            }
+            response = await client.post(url_msg, json=payload)
+            if response.status_code == 200 and response.json().get("ok"):
+                sent_message_id = response.json()["result"]["message_id"]
 
-            return sent_message_id
+        return sent_message_id
 
-            return sent_message_id
+        return sent_message_id
 
-        except Exception as e:
-            print(f"ERROR: Failed to send telegram message: {e}")
-            import traceback
-            traceback.print_exc()
-            return None
+    except Exception as e:
+        print(f"ERROR: Failed to send telegram message: {e}")
+        import traceback
+        traceback.print_exc()
+        return None
 
-        except Exception as e:
-            print(f"ERROR: Failed to send telegram message: {e}")
-            import traceback
-            traceback.print_exc()
-            return None
+    except Exception as e:
+        print(f"ERROR: Failed to send telegram message: {e}")
+        import traceback
+        traceback.print_exc()
+        return None
 
 async def update_order_status_message(message_id: int, order: dict, items_detail: str):
     if not TELEGRAM_GROUP_BOT_TOKEN or not TELEGRAM_GROUP_ID or not message_id:
-        return
+        return False
 
     status_map = {
         "new": "🟢 Новый заказ",
@@ -506,85 +522,98 @@ async def update_order_status_message(message_id: int, order: dict, items_detail
 
     
     # Try updating caption first (if it was a photo message)
-    url_caption = f"https://api.telegram.org/bot{TELEGRAM_GROUP_BOT_TOKEN}/editMessageCaption"
+    url_caption = telegram_client.method_url(TELEGRAM_GROUP_BOT_TOKEN, "editMessageCaption")
     
     success = False
     
-    async with httpx.AsyncClient(timeout=HTTPX_TIMEOUT) as client:
-        try:
-            print(f"DEBUG: Attempting editMessageCaption for {message_id}")
-            resp_cap = await client.post(url_caption, json={
-                "chat_id": TELEGRAM_GROUP_ID,
-                "message_id": message_id,
-                "caption": message,
-                "parse_mode": "HTML",
-                "reply_markup": keyboard
-            })
+    client = telegram_client.get_client()
+    try:
+        print(f"DEBUG: Attempting editMessageCaption for {message_id}")
+        resp_cap = await client.post(url_caption, json={
+            "chat_id": TELEGRAM_GROUP_ID,
+            "message_id": message_id,
+            "caption": message,
+            "parse_mode": "HTML",
+            "reply_markup": keyboard
+        })
             
-            res_cap = resp_cap.json()
-            if resp_cap.status_code == 200 and res_cap.get("ok"):
+        res_cap = resp_cap.json()
+        if resp_cap.status_code == 200 and res_cap.get("ok"):
+            success = True
+            print("DEBUG: Successfully edited caption")
+        else:
+            # If failed, check if it's because message has no caption (i.e. it's a text message)
+            # or "message is not modified"
+            desc = res_cap.get("description", "")
+            if "not modified" in desc:
+                # Content same, technically success
                 success = True
-                print("DEBUG: Successfully edited caption")
-            else:
-                # If failed, check if it's because message has no caption (i.e. it's a text message)
-                # or "message is not modified"
-                desc = res_cap.get("description", "")
-                if "not modified" in desc:
-                    # Content same, technically success
-                    success = True
-                    print("DEBUG: Caption not modified (same content)")
-                elif "message is not generally modified" in desc:
-                    success = True
-                else: 
-                     # Only fallback if error implies it's not a caption-able message
-                     print(f"DEBUG: editMessageCaption failed: {desc}. Trying editMessageText.")
+                print("DEBUG: Caption not modified (same content)")
+            elif "message is not generally modified" in desc:
+                success = True
+            else: 
+                 # Only fallback if error implies it's not a caption-able message
+                 print(f"DEBUG: editMessageCaption failed: {desc}. Trying editMessageText.")
                      
-                     url_text = f"https://api.telegram.org/bot{TELEGRAM_GROUP_BOT_TOKEN}/editMessageText"
-                     resp_text = await client.post(url_text, json={
-                        "chat_id": TELEGRAM_GROUP_ID,
-                        "message_id": message_id,
-                        "text": message,
-                        "parse_mode": "HTML",
-                        "reply_markup": keyboard,
-                        "disable_web_page_preview": True
-                     })
-                     res_text = resp_text.json()
-                     if resp_text.status_code == 200 and res_text.get("ok"):
-                         success = True
-                         print("DEBUG: Successfully edited text")
-                     else:
-                         print(f"ERROR: Both edits failed. Text edit error: {res_text}")
-
-        except Exception as e:
-            print(f"Failed to edit telegram message: {e}")
+                 url_text = telegram_client.method_url(TELEGRAM_GROUP_BOT_TOKEN, "editMessageText")
+                 resp_text = await client.post(url_text, json={
+                    "chat_id": TELEGRAM_GROUP_ID,
+                    "message_id": message_id,
+                    "text": message,
+                    "parse_mode": "HTML",
+                    "reply_markup": keyboard,
+                    "disable_web_page_preview": True
+                 })
+                 res_text = resp_text.json()
+                 if resp_text.status_code == 200 and res_text.get("ok"):
+                     success = True
+                     print("DEBUG: Successfully edited text")
+                 else:
+                     print(f"ERROR: Both edits failed. Text edit error: {res_text}")
+
+    except Exception as e:
+        print(f"Failed to edit telegram message: {e}")
+    # False — сообщение не обновлено (сеть, 429, 5xx): outbox повторит событие
+    return success
+
+class TelegramRetryAfter(Exception):
+    """Telegram ответил 429 Too Many Requests: повторить не раньше, чем через retry_after секунд."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Too Many Requests: retry after {retry_after}")
+        self.retry_after = retry_after
 
 async def send_broadcast_message(telegram_id: int, text: str):
+    """True/False — доставлено или нет. При 429 бросает TelegramRetryAfter (решает вызывающий)."""
     if not TELEGRAM_BOT_TOKEN:
         print("Telegram token not set")
         return False
 
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
+    try:
+        response = await telegram_client.call(TELEGRAM_BOT_TOKEN, "sendMessage", json={
+            "chat_id": telegram_id,
+            "text": text,
+            "parse_mode": "HTML"
+        })
+    except Exception as e:
+        print(f"Error sending to {telegram_id}: {e}")
+        return False
 
-    async with httpx.AsyncClient(timeout=HTTPX_TIMEOUT) as client:
+    if response.status_code == 429:
         try:
-            response = await client.post(url, json={
-                "chat_id": telegram_id,
-                "text": text,
-                "parse_mode": "HTML"
-            })
-            if response.status_code == 200:
-                return True
-            else:
-                print(f"Failed to send to {telegram_id}: {response.text}")
-                return False
-        except Exception as e:
-            print(f"Error sending to {telegram_id}: {e}")
-            return False
+            retry_after = response.json().get("parameters", {}).get("retry_after", 1)
+        except ValueError:
+            retry_after = 1
+        raise TelegramRetryAfter(retry_after)
+    if response.status_code == 200:
+        return True
+    print(f"Failed to send to {telegram_id}: {response.text}")
+    return False
 
 async def fetch_photo_with_token(client, token, telegram_id):
     try:
         # 1. Get user profile photos
-        photos_url = f"https://api.telegram.org/bot{token}/getUserProfilePhotos"
+        photos_url = telegram_client.method_url(token, "getUserProfilePhotos")
         resp = await client.post(photos_url, json={"user_id": telegram_id, "limit": 1})
         data = resp.json()
         
@@ -593,7 +622,7 @@ async def fetch_photo_with_token(client, token, telegram_id):
             file_id = data["result"]["photos"][0][-1]["file_id"]
         else:
             # Try fallback: getChat
-            chat_resp = await client.post(f"https://api.telegram.org/bot{token}/getChat", json={"chat_id": telegram_id})
+            chat_resp = await client.post(telegram_client.method_url(token, "getChat"), json={"chat_id": telegram_id})
             chat_data = chat_resp.json()
             if chat_data.get("ok") and chat_data["result"].get("photo"):
                 file_id = chat_data["result"]["photo"]["big_file_id"]
@@ -602,7 +631,7 @@ async def fetch_photo_with_token(client, token, telegram_id):
             return None
 
         # 2. Get file path
-        file_url = f"https://api.telegram.org/bot{token}/getFile"
+        file_url = telegram_client.method_url(token, "getFile")
         file_resp = await client.post(file_url, json={"file_id": file_id})
         file_data = file_resp.json()
         if not file_data.get("ok"):
@@ -610,20 +639,13 @@ async def fetch_photo_with_token(client, token, telegram_id):
         file_path = file_data["result"]["file_path"]
         
         # 3. Download
-        download_url = f"https://api.telegram.org/file/bot{token}/{file_path}"
+        download_url = telegram_client.file_url(token, file_path)
         photo_resp = await client.get(download_url)
         if photo_resp.status_code != 200:
             return None
             
-        # 4. Save locally
-        import uuid
-        os.makedirs("app/static/uploads/avatars", exist_ok=True)
-        filename = f"avatar_{telegram_id}_{uuid.uuid4().hex[:8]}.jpg"
-        save_path = f"app/static/uploads/avatars/{filename}"
-        with open(save_path, "wb") as f:
-            f.write(photo_resp.content)
-            
-        return f"/static/uploads/avatars/{filename}"
+        # 4. Save locally: имя — хэш содержимого, неизменившийся аватар не создаёт новый файл
+        return await uploads.store(photo_resp.content, "jpg")
     except Exception as e:
         print(f"Error in fetch_photo_with_token: {e}")
         return None
@@ -637,11 +659,11 @@ async def get_chat_photo(telegram_id: int):
     
     tokens = [t for t in [admin_token, TELEGRAM_BOT_TOKEN, group_token] if t]
     
-    async with httpx.AsyncClient(timeout=HTTPX_TIMEOUT) as client:
-        for token in tokens:
-            photo_url = await fetch_photo_with_token(client, token, telegram_id)
-            if photo_url:
-                return photo_url
+    client = telegram_client.get_client()
+    for token in tokens:
+        photo_url = await fetch_photo_with_token(client, token, telegram_id)
+        if photo_url:
+            return photo_url
                 
     return None
 
@@ -682,24 +704,26 @@ async def send_customer_receipt(telegram_id: int, order: dict, items_detail: str
         ]
     }
     
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
+    url = telegram_client.method_url(TELEGRAM_BOT_TOKEN, "sendMessage")
     
     print(f"DEBUG send_customer_receipt: Using BOT_TOKEN={TELEGRAM_BOT_TOKEN[:20]}... for telegram_id={telegram_id}")
     
-    async with httpx.AsyncClient(timeout=HTTPX_TIMEOUT) as client:
-        try:
-            response = await client.post(url, json={
-                "chat_id": telegram_id,
-                "text": message,
-                "parse_mode": "HTML",
-                "reply_markup": keyboard
-            })
-            print(f"DEBUG send_customer_receipt: Response status={response.status_code}")
-            if response.status_code != 200:
-                print(f"ERROR send_customer_receipt: {response.text}")
-            return True
-        except Exception as e:
-            print(f"ERROR: Failed to send receipt to {telegram_id}: {e}")
-            import traceback
-            traceback.print_exc()
+    client = telegram_client.get_client()
+    try:
+        response = await client.post(url, json={
+            "chat_id": telegram_id,
+            "text": message,
+            "parse_mode": "HTML",
+            "reply_markup": keyboard
+        })
+        print(f"DEBUG send_customer_receipt: Response status={response.status_code}")
+        if response.status_code != 200 or not response.json().get("ok"):
+            # 429/5xx/403 — чек не доставлен; outbox повторит с backoff
+            print(f"ERROR send_customer_receipt: {response.status_code} {response.text}")
             return False
+        return True
+    except Exception as e:
+        print(f"ERROR: Failed to send receipt to {telegram_id}: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
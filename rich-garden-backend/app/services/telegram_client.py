@@ -0,0 +1,74 @@
+"""
+Общий HTTP-клиент Telegram Bot API.
+
+Один httpx.AsyncClient на процесс (живёт в lifespan FastAPI): соединение с
+api.telegram.org и TLS-сессия переиспользуются между уведомлениями и рассылкой,
+вместо нового рукопожатия на каждое сообщение. Здесь же — единственное место,
+где собираются URL методов с токеном бота.
+"""
+import os
+
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Базовый URL Bot API (переопределяется для fake_telegram_api.py / локального Bot API server)
+TELEGRAM_API_BASE = os.getenv("TELEGRAM_API_BASE", "https://api.telegram.org").rstrip("/")
+TELEGRAM_HTTP_TIMEOUT = float(os.getenv("TELEGRAM_HTTP_TIMEOUT", "30"))
+TELEGRAM_HTTP_MAX_CONNECTIONS = int(os.getenv("TELEGRAM_HTTP_MAX_CONNECTIONS", "30"))
+TELEGRAM_HTTP_MAX_KEEPALIVE = int(os.getenv("TELEGRAM_HTTP_MAX_KEEPALIVE", "30"))
+# HTTP/2 требует пакет h2 (pip install "httpx[http2]"); без него остаёмся на HTTP/1.1 keep-alive
+TELEGRAM_HTTP2 = os.getenv("TELEGRAM_HTTP2", "0").strip().lower() in ("1", "true", "yes")
+
+_client: httpx.AsyncClient | None = None
+
+
+def method_url(token: str, method: str) -> str:
+    """https://api.telegram.org/bot<token>/<method>"""
+    return f"{TELEGRAM_API_BASE}/bot{token}/{method}"
+
+
+def file_url(token: str, file_path: str) -> str:
+    """URL для скачивания файла, полученного из getFile."""
+    return f"{TELEGRAM_API_BASE}/file/bot{token}/{file_path}"
+
+
+def _http2_enabled() -> bool:
+    if not TELEGRAM_HTTP2:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        print("WARNING: TELEGRAM_HTTP2=1, but package 'h2' is not installed. Using HTTP/1.1 keep-alive.")
+        return False
+    return True
+
+
+def get_client() -> httpx.AsyncClient:
+    """Общий клиент с пулом соединений (создаётся лениво)."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=TELEGRAM_HTTP_TIMEOUT,
+            http2=_http2_enabled(),
+            limits=httpx.Limits(
+                max_connections=TELEGRAM_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=TELEGRAM_HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=60,
+            ),
+        )
+    return _client
+
+
+async def close_client():
+    """Закрывает пул соединений (вызывается из lifespan приложения)."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def call(token: str, method: str, **kwargs) -> httpx.Response:
+    """POST на метод Bot API через общий клиент. kwargs передаются в httpx (json, data, files)."""
+    return await get_client().post(method_url(token, method), **kwargs)
@@ -0,0 +1,131 @@
+"""
+Загруженные файлы: хранилище с адресацией по содержимому и реестр URL -> путь на диске.
+
+store кладёт файл под ключ из его sha256 с разбиением по каталогам (ab/cd/<hash>.<ext>, чтобы
+в одном каталоге не копились десятки тысяч файлов): повторная загрузка того же фото или
+неизменившийся аватар дают тот же URL и не занимают место. Ссылки на файлы из БД считает
+app.stored_files, он же удаляет файлы, на которые никто не ссылается (gc_uploads.py).
+Старые загрузки (uuid4.jpg, avatars/...) остаются где были.
+
+Файл регистрируется в момент записи (common.router.upload_file, аватары из Telegram), поэтому
+уведомление о заказе находит фото товара поиском в словаре, а не перебором путей от os.getcwd()
+с os.path.exists на каждый. Файлы, загруженные до рестарта или другим воркером uvicorn,
+разрешаются однозначно по URL (одна проверка isfile) и тоже запоминаются.
+"""
+import hashlib
+import os
+import re
+from typing import AsyncIterable, List, Optional, Union
+from urllib.parse import urlparse
+
+from app.services.storage import LocalStorage
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static")
+UPLOADS_DIR = os.path.join(STATIC_DIR, "uploads")
+STATIC_URL = "/static/"
+
+HASH_LENGTH = 32  # hex-символов sha256 в имени: 128 бит, коллизий не будет
+CHUNK_SIZE = 1024 * 1024
+# Ключ в хранилище: ab/cd/<hash>.<ext> или img/ab/cd/<hash>-<размер>.<ext> (app.services.images)
+_CONTENT_RE = re.compile(r"/uploads/(?:img/)?([0-9a-f]{2})/([0-9a-f]{2})/([0-9a-f]{32})[.\-]")
+
+storage = LocalStorage(UPLOADS_DIR, STATIC_URL + "uploads")
+
+_paths = {}  # "/static/uploads/x.jpg" -> "/var/www/.../app/static/uploads/x.jpg"
+_hashes = {}  # path -> (size, mtime_ns, sha256)
+
+
+def fanout(digest: str) -> str:
+    """ab/cd/<hash> — каталог и префикс имени для хэша."""
+    return f"{digest[:2]}/{digest[2:4]}/{digest}"
+
+
+def hashes_in(text: Optional[str]) -> List[str]:
+    """Хэши файлов хранилища, на которые ссылается строка (URL или JSON со списком URL)."""
+    if not isinstance(text, str) or "/uploads/" not in text:
+        return []
+    return [match.group(3) for match in _CONTENT_RE.finditer(text)
+            if match.group(3).startswith(match.group(1) + match.group(2))]
+
+
+async def _chunks(content: bytes):
+    for start in range(0, len(content), CHUNK_SIZE):
+        yield content[start:start + CHUNK_SIZE]
+
+
+async def store(content: Union[bytes, AsyncIterable[bytes]], extension: str) -> str:
+    """
+    Сохраняет файл (байты или поток чанков) под ключом из его хэша и возвращает URL.
+    Запись и хэширование идут в пуле потоков хранилища, дубликат не перезаписывает файл.
+    """
+    chunks = _chunks(content) if isinstance(content, (bytes, bytearray)) else content
+    temp, digest, _ = await storage.write(chunks)
+    extension = re.sub(r"[^0-9a-z]", "", (extension or "").lower())[:8] or "bin"
+    key = f"{fanout(digest[:HASH_LENGTH])}.{extension}"
+    await storage.commit(temp, key)
+    url = storage.url(key)
+    path = storage.local_path(key)
+    if path:
+        register(url, path)
+    return url
+
+
+def register(url: str, path: str):
+    _paths[url] = os.path.abspath(path)
+
+
+def _normalize(url: str) -> Optional[str]:
+    """/static/uploads/x.jpg из любых записей в БД: полный URL, без ведущего /, static/ или uploads/."""
+    path = urlparse(url).path if "://" in url else url
+    path = "/" + path.lstrip("/")
+    if path.startswith("/app/static/"):
+        path = path[len("/app"):]
+    if path.startswith("/uploads/"):
+        path = "/static" + path
+    return path if path.startswith(STATIC_URL) else None
+
+
+def resolve(url: str) -> Optional[str]:
+    """Путь к файлу по URL из БД или None, если файла нет (или URL ведёт за пределы static)."""
+    if not isinstance(url, str) or not url:
+        return None
+    path = _paths.get(url)
+    if path is not None:
+        return path
+    normalized = _normalize(url)
+    if normalized is None:
+        return None
+    path = _paths.get(normalized)
+    if path is None:
+        candidate = os.path.normpath(os.path.join(STATIC_DIR, normalized[len(STATIC_URL):]))
+        if not candidate.startswith(STATIC_DIR + os.sep) or not os.path.isfile(candidate):
+            return None
+        path = candidate
+        _paths[normalized] = path
+    _paths[url] = path
+    return path
+
+
+def forget(url: str):
+    """Файл удалён или не открылся: следующий resolve проверит диск заново."""
+    _paths.pop(url, None)
+    normalized = _normalize(url) if isinstance(url, str) else None
+    if normalized:
+        _paths.pop(normalized, None)
+
+
+def content_hash(path: str) -> Optional[str]:
+    """sha256 файла; пересчитывается, только если изменились размер или mtime (один stat)."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    cached = _hashes.get(path)
+    if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+        return cached[2]
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    _hashes[path] = (stat.st_size, stat.st_mtime_ns, digest.hexdigest())
+    return _hashes[path][2]
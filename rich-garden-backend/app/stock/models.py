@@ -0,0 +1,25 @@
+from sqlalchemy import Column, ForeignKey, Integer, String, DateTime, Index
+import datetime
+from app.database import Base
+
+class StockReservation(Base):
+    """
+    Резерв склада под неоплаченный заказ (pending_payment). Остаток товара уменьшается сразу,
+    чтобы один букет нельзя было оплатить дважды; при оплате резерв фиксируется (committed),
+    при отмене или истечении expires_at — возвращается на склад (released / expired).
+    Нехватка на складе оплату не блокирует и пишется строкой short (остаток не тронут); после
+    оплаты она становится owed — долг списания, который закрывает POST /orders/{id}/stock/deduct.
+    """
+    __tablename__ = "stock_reservations"
+    __table_args__ = (
+        # Воркер истечения: активные резервы по сроку
+        Index("ix_stock_reservations_status_expires", "status", "expires_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    order_id = Column(Integer, ForeignKey("orders.id", ondelete="CASCADE"), nullable=False, index=True)
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
+    quantity = Column(Integer, nullable=False)
+    status = Column(String, nullable=False, default="active")  # active / short / owed / committed / released / expired
+    expires_at = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, default=datetime.datetime.now)
@@ -0,0 +1,75 @@
+from sqlalchemy import select, update as sql_update, insert, delete as sql_delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import models
+import datetime
+
+# Строки неоплаченного заказа: active — товар снят с остатка, short — не хватило на складе
+PENDING = ("active", "short")
+
+async def add(db: AsyncSession, order_id: int, quantities: dict, expires_at: datetime.datetime, status: str = "active"):
+    """Резервы {product_id: количество} одной пачкой (без commit); status="short" — нехватка."""
+    rows = [
+        {"order_id": order_id, "product_id": pid, "quantity": qty, "status": status,
+         "expires_at": expires_at, "created_at": datetime.datetime.now()}
+        for pid, qty in quantities.items() if qty > 0
+    ]
+    if rows:
+        await db.execute(insert(models.StockReservation), rows)
+
+async def get_active(db: AsyncSession, order_id: int, statuses=("active",)):
+    """Резервы заказа в statuses с блокировкой строк (FOR UPDATE на PostgreSQL): фиксация и истечение не пересекутся."""
+    result = await db.execute(
+        select(models.StockReservation)
+        .filter(models.StockReservation.order_id == order_id, models.StockReservation.status.in_(statuses))
+        .order_by(models.StockReservation.id)
+        .with_for_update()
+    )
+    return result.scalars().all()
+
+async def get_due(db: AsyncSession, limit: int = 100):
+    """Истёкшие резервы (и нехватки) неоплаченных заказов; SKIP LOCKED — не ждать заказы, которые сейчас оплачиваются."""
+    result = await db.execute(
+        select(models.StockReservation)
+        .filter(
+            models.StockReservation.status.in_(PENDING),
+            models.StockReservation.expires_at <= datetime.datetime.now(),
+        )
+        .order_by(models.StockReservation.expires_at, models.StockReservation.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    return result.scalars().all()
+
+async def get_all(db: AsyncSession, status: str = None, order_id: int = None, limit: int = 200):
+    query = select(models.StockReservation).order_by(models.StockReservation.id.desc()).limit(limit)
+    if status:
+        query = query.filter(models.StockReservation.status == status)
+    if order_id:
+        query = query.filter(models.StockReservation.order_id == order_id)
+    result = await db.execute(query)
+    return result.scalars().all()
+
+async def set_status(db: AsyncSession, reservation_ids, status: str, from_statuses=PENDING):
+    """Переводит резервы из from_statuses в status (без commit). Возвращает число изменённых строк."""
+    if not reservation_ids:
+        return 0
+    result = await db.execute(
+        sql_update(models.StockReservation)
+        .where(models.StockReservation.id.in_(list(reservation_ids)), models.StockReservation.status.in_(from_statuses))
+        .values(status=status)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+async def extend(db: AsyncSession, order_id: int, expires_at: datetime.datetime):
+    result = await db.execute(
+        sql_update(models.StockReservation)
+        .where(models.StockReservation.order_id == order_id, models.StockReservation.status.in_(PENDING))
+        .values(expires_at=expires_at)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+async def delete_by_order(db: AsyncSession, order_id: int):
+    # ON DELETE CASCADE есть в схеме, но SQLite без PRAGMA foreign_keys его не применяет
+    await db.execute(sql_delete(models.StockReservation).where(models.StockReservation.order_id == order_id))
@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from app.database import get_async_db
+from . import service, schemas
+
+router = APIRouter(
+    prefix="/stock",
+    tags=["stock"]
+)
+
+@router.get("/reservations", response_model=List[schemas.StockReservation])
+async def get_reservations(
+    status: Optional[str] = Query(None, description="active / short / owed / committed / released / expired"),
+    order_id: Optional[int] = None,
+    limit: int = Query(200, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await service.get_reservations(db, status=status, order_id=order_id, limit=limit)
@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+from typing import Optional
+import datetime
+
+class StockReservation(BaseModel):
+    id: int
+    order_id: int
+    product_id: int
+    quantity: int
+    status: str
+    expires_at: datetime.datetime
+    created_at: Optional[datetime.datetime] = None
+    class Config:
+        from_attributes = True
@@ -0,0 +1,230 @@
+"""
+Складской учёт: резервы под неоплаченные заказы и их фиксация/возврат.
+
+Все изменения остатков идут через products.repository.apply_stock_deltas — один атомарный
+UPDATE stock = stock + delta (без чтения-изменения-записи в Python), история product_history
+служит журналом движений. Резерв уменьшает остаток сразу при переходе заказа в pending_payment
+(только на то, что есть на складе — оплату нехватка не блокирует, она пишется строками short);
+оплата фиксирует его (история + orders.stock_deducted_at), отмена или истечение срока —
+возвращает товар. Если при оплате была нехватка, short становится owed и заказ не помечается
+списанным: долг закрывает ручное списание (settle_owed), как и после истёкшего резерва.
+Истечение обрабатывает asyncio-таск в lifespan приложения (как outbox).
+"""
+import asyncio
+import datetime
+import os
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import AsyncSessionLocal
+from app.products import repository as prod_repo
+from . import repository
+
+STOCK_RESERVATION_TTL_MINUTES = int(os.getenv("STOCK_RESERVATION_TTL_MINUTES", "30"))
+STOCK_RESERVATION_POLL_INTERVAL = float(os.getenv("STOCK_RESERVATION_POLL_INTERVAL", "60"))
+
+_task: asyncio.Task | None = None
+
+
+def raise_shortage(shortages):
+    """409 со списком товаров, которых не хватило (остаток после списания < 0)."""
+    detail = ", ".join(f"{name or pid} (не хватает {-stock})" for pid, name, stock in shortages)
+    raise HTTPException(status_code=409, detail=f"Недостаточно на складе: {detail}")
+
+
+async def plan_order(db: AsyncSession, quantities: dict) -> dict:
+    """
+    Списание под позиции заказа {product_id: количество} -> {product_id: -количество}.
+    Собранные букеты берутся с остатка (строки блокируются), недостающие — раскрываются по составу.
+    """
+    stock = await prod_repo.get_stock(db, quantities, lock=True)
+    bouquets = await prod_repo.get_components(db, quantities)
+    deltas, to_assemble = {}, {}
+    for product_id, qty in quantities.items():
+        if product_id not in stock:
+            continue  # товар удалён после заказа
+        take = min(qty, max(stock[product_id], 0)) if product_id in bouquets else qty
+        if take:
+            deltas[product_id] = -take
+        if qty > take:
+            to_assemble[product_id] = qty - take
+    for component_id, qty in (await prod_repo.explode(db, to_assemble)).items():
+        deltas[component_id] = deltas.get(component_id, 0) - qty
+    return deltas
+
+
+async def reserve_order(db: AsyncSession, order):
+    """
+    Резервирует товары заказа на STOCK_RESERVATION_TTL_MINUTES (без commit). Повторный вызов
+    (новая попытка оплаты) продлевает резерв. Оплату резерв не блокирует: берётся то, что есть
+    на складе, нехватка пишется строками short (витринные товары часто ведутся с остатком 0).
+    """
+    from app.orders import repository as order_repo
+
+    if order.stock_deducted_at:
+        return
+    expires_at = datetime.datetime.now() + datetime.timedelta(minutes=STOCK_RESERVATION_TTL_MINUTES)
+    if await repository.extend(db, order.id, expires_at):
+        return
+    quantities = await order_repo.get_item_quantities(db, order)
+    if not quantities:
+        return
+    planned = await plan_order(db, quantities)
+    stock = await prod_repo.get_stock(db, planned, lock=True)
+    deltas, missing = {}, {}
+    for product_id, delta in planned.items():
+        take = min(-delta, max(stock.get(product_id, 0), 0))
+        if take:
+            deltas[product_id] = -take
+        if -delta > take:
+            missing[product_id] = -delta - take
+    if deltas:
+        async with db.begin_nested() as savepoint:
+            shortages = await prod_repo.apply_stock_deltas(db, deltas, history=False)
+            if shortages:
+                # строки заблокированы get_stock выше, гонки быть не должно; тогда не хватает всего
+                await savepoint.rollback()
+                deltas, missing = {}, {pid: -d for pid, d in planned.items() if d}
+            else:
+                await repository.add(db, order.id, {pid: -d for pid, d in deltas.items()}, expires_at)
+    if missing:
+        print(f"WARN stock: order {order.id} reserved partially, not in stock: {missing}")
+        await repository.add(db, order.id, missing, expires_at, status="short")
+
+
+async def commit_order(db: AsyncSession, order) -> bool:
+    """
+    Оплата: активные резервы фиксируются, движения пишутся в историю (без commit). Если резерв
+    был полным, заказ помечается stock_deducted_at; нехватка (short) становится долгом owed,
+    и заказ остаётся несписанным до settle_owed. Если резерв уже истёк — товар списывается
+    заново, при нехватке оплата не блокируется: заказ остаётся несписанным для ручного списания.
+    """
+    from app.orders import repository as order_repo
+
+    reservations = await repository.get_active(db, order.id, repository.PENDING)
+    if reservations:
+        active = [r for r in reservations if r.status == "active"]
+        short = [r for r in reservations if r.status == "short"]
+        await repository.set_status(db, [r.id for r in active], "committed")
+        moved = {}
+        for r in active:
+            moved[r.product_id] = moved.get(r.product_id, 0) - r.quantity
+        await prod_repo.add_history_bulk(db, moved)
+        if short:
+            await repository.set_status(db, [r.id for r in short], "owed")
+            owed = {r.product_id: r.quantity for r in short}
+            print(f"WARN stock: order {order.id} paid with shortage, owed: {owed}")
+            return False
+        await order_repo.claim_stock_deduction(db, order.id)
+        return True
+
+    if order.stock_deducted_at:
+        return False
+    quantities = await order_repo.get_item_quantities(db, order)
+    if not quantities:
+        return False
+    try:
+        async with db.begin_nested():
+            if not await order_repo.claim_stock_deduction(db, order.id):
+                return False
+            deltas = await plan_order(db, quantities)
+            shortages = await prod_repo.apply_stock_deltas(db, deltas)
+            if shortages:
+                raise_shortage(shortages)
+    except HTTPException as e:
+        print(f"WARN stock: order {order.id} paid after reservation expired, not deducted: {e.detail}")
+        return False
+    return True
+
+
+async def settle_owed(db: AsyncSession, order) -> dict:
+    """
+    Ручное списание долга owed (без commit): {product_id: -количество}, заказ помечается
+    stock_deducted_at. Пустой dict — долга нет; 409 — товара всё ещё не хватает.
+    """
+    from app.orders import repository as order_repo
+
+    owed = await repository.get_active(db, order.id, ("owed",))
+    if not owed:
+        return {}
+    deltas = {}
+    for r in owed:
+        deltas[r.product_id] = deltas.get(r.product_id, 0) - r.quantity
+    shortages = await prod_repo.apply_stock_deltas(db, deltas)
+    if shortages:
+        raise_shortage(shortages)  # откатывает вызывающий unit_of_work
+    await repository.set_status(db, [r.id for r in owed], "committed", from_statuses=("owed",))
+    await order_repo.claim_stock_deduction(db, order.id)
+    return deltas
+
+
+async def release_order(db: AsyncSession, order, status: str = "released") -> int:
+    """Возвращает активные резервы заказа на склад, нехватку закрывает (без commit)."""
+    reservations = await repository.get_active(db, order.id, repository.PENDING)
+    if not reservations:
+        return 0
+    await repository.set_status(db, [r.id for r in reservations], status)
+    returned = {}
+    for r in reservations:
+        if r.status == "active":
+            returned[r.product_id] = returned.get(r.product_id, 0) + r.quantity
+    if returned:
+        await prod_repo.apply_stock_deltas(db, returned, history=False)
+    return len(reservations)
+
+
+async def on_status_change(db: AsyncSession, order, old_status: str, new_status: str):
+    """Хук orders.repository.set_status: резерв при pending_payment, фиксация при оплате, возврат при отмене."""
+    if new_status == "pending_payment":
+        await reserve_order(db, order)
+    elif old_status == "pending_payment":
+        if new_status == "cancelled":
+            await release_order(db, order)
+        else:
+            await commit_order(db, order)
+
+
+async def get_reservations(db: AsyncSession, status: str = None, order_id: int = None, limit: int = 200):
+    return await repository.get_all(db, status=status, order_id=order_id, limit=limit)
+
+
+async def expire_due() -> int:
+    """Возвращает на склад одну пачку истёкших резервов. Возвращает их количество."""
+    async with AsyncSessionLocal() as db:
+        reservations = await repository.get_due(db)
+        if not reservations:
+            return 0
+        returned = {}
+        for r in reservations:
+            if r.status == "active":  # short — остаток не трогали, возвращать нечего
+                returned[r.product_id] = returned.get(r.product_id, 0) + r.quantity
+        await repository.set_status(db, [r.id for r in reservations], "expired")
+        if returned:
+            await prod_repo.apply_stock_deltas(db, returned, history=False)
+        await db.commit()
+        return len(reservations)
+
+
+async def run_worker():
+    while True:
+        try:
+            expired = await expire_due()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"ERROR stock worker: {e}")
+            expired = 0
+        if not expired:
+            await asyncio.sleep(STOCK_RESERVATION_POLL_INTERVAL)
+
+
+def start():
+    global _task
+    _task = asyncio.create_task(run_worker())
+
+
+async def stop():
+    global _task
+    if _task is not None:
+        _task.cancel()
+        await asyncio.gather(_task, return_exceptions=True)
+        _task = None
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, DateTime
+import datetime
+from app.database import Base
+
+class StoredFile(Base):
+    """
+    Счётчик ссылок на файл хранилища (app.services.uploads.store, app.services.images).
+    hash — имя файла без расширения/размера; refcount — сколько значений в БД (товары, баннеры,
+    истории, фото сотрудников и клиентов, позиции заказов) на него ссылается.
+    Ведётся при flush (app.stored_files.service), пересчитывается gc_uploads.py.
+    """
+    __tablename__ = "stored_files"
+
+    id = Column(Integer, primary_key=True, index=True)
+    hash = Column(String(32), unique=True, nullable=False)
+    refcount = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.datetime.now, onupdate=datetime.datetime.now)
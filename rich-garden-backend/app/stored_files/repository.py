@@ -0,0 +1,54 @@
+from sqlalchemy import select, delete as sql_delete
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import models
+import datetime
+
+# Функции репозитория не коммитят: транзакцией владеет сервис (app.database.unit_of_work)
+
+BATCH_SIZE = 500  # строк в одном INSERT/IN (лимит параметров SQLite)
+
+def refcount_delta_stmt(dialect_name: str, deltas: dict):
+    """INSERT ... ON CONFLICT (hash) DO UPDATE refcount = refcount + delta; deltas: {hash: ±n}."""
+    dialect = postgresql if dialect_name == "postgresql" else sqlite
+    now = datetime.datetime.now()
+    stmt = dialect.insert(models.StoredFile).values([
+        {"hash": file_hash, "refcount": delta, "updated_at": now}
+        for file_hash, delta in sorted(deltas.items())
+    ])
+    return stmt.on_conflict_do_update(
+        index_elements=["hash"],
+        set_={
+            "refcount": models.StoredFile.refcount + stmt.excluded.refcount,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+
+async def get_refcounts(db: AsyncSession) -> dict:
+    result = await db.execute(select(models.StoredFile.hash, models.StoredFile.refcount))
+    return {row.hash: row.refcount for row in result.all()}
+
+async def set_refcounts(db: AsyncSession, counts: dict):
+    """Пересчёт: refcount = counts[hash] (INSERT ... ON CONFLICT DO UPDATE), остальные строки — 0."""
+    existing = await get_refcounts(db)
+    changed = {file_hash: count for file_hash, count in counts.items() if existing.get(file_hash) != count}
+    changed.update({file_hash: 0 for file_hash, count in existing.items() if file_hash not in counts and count != 0})
+    dialect = postgresql if db.bind.dialect.name == "postgresql" else sqlite
+    now = datetime.datetime.now()
+    items = sorted(changed.items())
+    for start in range(0, len(items), BATCH_SIZE):
+        stmt = dialect.insert(models.StoredFile).values([
+            {"hash": file_hash, "refcount": count, "updated_at": now} for file_hash, count in items[start:start + BATCH_SIZE]
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["hash"],
+            set_={"refcount": stmt.excluded.refcount, "updated_at": stmt.excluded.updated_at},
+        )
+        await db.execute(stmt)
+
+async def delete_many(db: AsyncSession, hashes):
+    hashes = list(hashes)
+    for start in range(0, len(hashes), BATCH_SIZE):
+        await db.execute(
+            sql_delete(models.StoredFile).where(models.StoredFile.hash.in_(hashes[start:start + BATCH_SIZE]))
+        )
@@ -0,0 +1,162 @@
+"""
+Счётчики ссылок на файлы хранилища и сборка мусора.
+
+Ссылки — это URL в колонках REFERENCES (product.images — JSON со списком URL, order.items —
+JSON позиций, поэтому хэши ищутся в тексте, а не сравниваются со строкой целиком). При каждом
+flush слушатель сравнивает старые и новые значения этих колонок у добавленных, изменённых и
+удалённых объектов и одним UPSERT в той же транзакции сдвигает stored_files.refcount.
+Массовые UPDATE/DELETE в обход ORM слушатель не видит, поэтому collect (gc_uploads.py) сначала
+пересчитывает счётчики по всей БД и только потом удаляет файлы с нулём ссылок.
+
+Свежие файлы не удаляются (grace): загрузка и сохранение товара — два разных запроса, между ними
+у файла ещё нет ссылок. Повторная загрузка того же содержимого обновляет mtime файла.
+"""
+import os
+import re
+import time
+from collections import Counter
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.database import unit_of_work
+from app.services import uploads
+from . import repository
+
+UPLOAD_GC_GRACE_HOURS = float(os.getenv("UPLOAD_GC_GRACE_HOURS", "24"))
+
+_UPLOAD_KEY_RE = re.compile(r"/uploads/([^\s\"'?#,]+)")
+
+_references = None
+
+
+def references() -> dict:
+    """{модель: (колонки с URL файлов)}; модели импортируются при первом обращении (без циклов)."""
+    global _references
+    if _references is None:
+        from app.banners.models import Banner
+        from app.calendar.models import FamilyMember
+        from app.employees.models import Employee
+        from app.orders.models import Order, OrderItem
+        from app.products.models import Product
+        from app.stories.models import Story
+        from app.users.models import TelegramUser
+        _references = {
+            Product: ("image", "images"),
+            Banner: ("image_url",),
+            Story: ("thumbnail_url", "content_url"),
+            Employee: ("photo_url",),
+            TelegramUser: ("photo_url",),
+            FamilyMember: ("image",),
+            Order: ("items",),
+            OrderItem: ("image",),
+        }
+    return _references
+
+
+def _count(values, sign: int, deltas: Counter):
+    for value in values:
+        for file_hash in uploads.hashes_in(value):
+            deltas[file_hash] += sign
+
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session, flush_context):
+    # new/dirty/deleted и история атрибутов здесь ещё в состоянии до flush
+    tracked = references()
+    deltas = Counter()
+    for obj in session.new:
+        columns = tracked.get(type(obj))
+        if columns:
+            _count((getattr(obj, column) for column in columns), 1, deltas)
+    for obj in session.deleted:
+        columns = tracked.get(type(obj))
+        if columns:
+            state = inspect(obj)
+            _count((state.attrs[column].loaded_value for column in columns), -1, deltas)
+    for obj in session.dirty:
+        columns = tracked.get(type(obj))
+        if not columns or obj in session.deleted:
+            continue
+        state = inspect(obj)
+        for column in columns:
+            history = state.attrs[column].history
+            if history.added or history.deleted:
+                _count(history.added, 1, deltas)
+                _count(history.deleted, -1, deltas)
+    deltas = {file_hash: delta for file_hash, delta in deltas.items() if delta}
+    if deltas:
+        connection = session.connection()
+        connection.execute(repository.refcount_delta_stmt(connection.dialect.name, deltas))
+
+
+async def recount(db: AsyncSession, keys: set = None) -> Counter:
+    """
+    Ссылки на каждый хэш по всей БД (колонки REFERENCES). Если передан keys, туда же
+    собираются ключи хранилища из всех URL — для старых загрузок без хэша в имени.
+    """
+    counts = Counter()
+    for model, columns in references().items():
+        result = await db.execute(select(*(getattr(model, column) for column in columns)))
+        for row in result:
+            _count(row, 1, counts)
+            if keys is not None:
+                for value in row:
+                    if isinstance(value, str):
+                        keys.update(_UPLOAD_KEY_RE.findall(value))
+    return counts
+
+
+def _group(key: str):
+    """Хэш, к которому относится файл хранилища, или None для старых загрузок."""
+    hashes = uploads.hashes_in("/uploads/" + key)
+    return hashes[0] if hashes else None
+
+
+async def collect(db: AsyncSession, grace_hours: float = UPLOAD_GC_GRACE_HOURS,
+                  dry_run: bool = False, legacy: bool = False) -> dict:
+    """
+    Пересчитывает stored_files.refcount и удаляет файлы без ссылок старше grace_hours:
+    все производные и манифест хэша разом. legacy=True — ещё и старые файлы с uuid-именами,
+    на которые не ссылается ни одна колонка REFERENCES.
+    """
+    legacy_keys = set() if legacy else None
+    async with unit_of_work(db):
+        counts = await recount(db, legacy_keys)
+        if not dry_run:
+            await repository.set_refcounts(db, counts)
+
+    files = await uploads.storage.list()
+    groups, orphans_legacy = {}, []
+    for key, size, mtime in files:
+        file_hash = _group(key)
+        if file_hash is not None:
+            groups.setdefault(file_hash, []).append((key, size, mtime))
+        elif legacy and key not in legacy_keys:
+            orphans_legacy.append((key, size, mtime))
+
+    cutoff = time.time() - grace_hours * 3600
+    doomed_hashes = [
+        file_hash for file_hash, group in groups.items()
+        if counts.get(file_hash, 0) <= 0 and max(mtime for _, _, mtime in group) < cutoff
+    ]
+    doomed = [entry for file_hash in doomed_hashes for entry in groups[file_hash]]
+    doomed += [entry for entry in orphans_legacy if entry[2] < cutoff]
+
+    if not dry_run:
+        for key, _, _ in doomed:
+            await uploads.storage.delete(key)
+            uploads.forget(uploads.storage.url(key))
+        async with unit_of_work(db):
+            await repository.delete_many(db, doomed_hashes)
+
+    return {
+        "files": len(files),
+        "hashes": len(groups),
+        "referenced": sum(1 for file_hash in groups if counts.get(file_hash, 0) > 0),
+        "deleted_hashes": len(doomed_hashes),
+        "deleted_files": len(doomed),
+        "freed_bytes": sum(size for _, size, _ in doomed),
+        "dry_run": dry_run,
+    }
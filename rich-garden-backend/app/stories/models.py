@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, BigInteger
+from sqlalchemy import Column, Integer, String, DateTime, Date, Boolean, BigInteger, ForeignKey, UniqueConstraint, Index
 from datetime import datetime
 from app.database import Base
 
@@ -16,8 +16,33 @@ class Story(Base):
 
 class StoryView(Base):
     __tablename__ = "story_views"
+    __table_args__ = (
+        # Один просмотр на пользователя; индекс (story_id, user_id) покрывает и count по истории,
+        # и проверку "смотрел ли я". Существующие БД: migrate_story_views_indexes.py
+        UniqueConstraint("story_id", "user_id", name="uq_story_views_story_user"),
+        # Лента зрителей в статистике: курсор по viewed_at внутри истории
+        Index("ix_story_views_story_viewed_at", "story_id", "viewed_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    story_id = Column(Integer) # ForeignKey manually used for simplicity or add it properly
-    user_id = Column(BigInteger)
+    story_id = Column(Integer, ForeignKey("stories.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(BigInteger) # Telegram ID
     viewed_at = Column(DateTime, default=datetime.utcnow)
+    # День последнего учёта в story_viewers_daily: повторный просмотр в тот же день не считается
+    last_viewed_day = Column(Date, nullable=True)
+
+class StoryViewHourly(Base):
+    """Роллап: все открытия истории (включая повторные) по часам, обновляется в log_view."""
+    __tablename__ = "story_views_hourly"
+
+    story_id = Column(Integer, ForeignKey("stories.id", ondelete="CASCADE"), primary_key=True)
+    hour = Column(DateTime, primary_key=True) # UTC, начало часа
+    views = Column(Integer, nullable=False, default=0)
+
+class StoryViewerDaily(Base):
+    """Роллап: уникальные зрители истории по дням (UTC), обновляется в log_view."""
+    __tablename__ = "story_viewers_daily"
+
+    story_id = Column(Integer, ForeignKey("stories.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    unique_viewers = Column(Integer, nullable=False, default=0)
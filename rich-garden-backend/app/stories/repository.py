@@ -1,43 +1,58 @@
-from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+from sqlalchemy import select, func, case, literal, and_, or_, update as sql_update, delete as sql_delete
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 from app.stories import models, schemas
+from app.users import models as user_models
 
-def get_all(db: Session, skip: int = 0, limit: int = 100, user_id: Optional[int] = None):
-    stories = db.query(models.Story).filter(models.Story.is_active == True).order_by(models.Story.created_at.desc()).offset(skip).limit(limit).all()
-    # Add view count and is_viewed_by_me manually
-    for story in stories:
-        story.views_count = db.query(models.StoryView).filter(models.StoryView.story_id == story.id).count()
-        if user_id:
-            story.is_viewed_by_me = db.query(models.StoryView).filter(
-                models.StoryView.story_id == story.id,
-                models.StoryView.user_id == user_id
-            ).first() is not None
-        else:
-            story.is_viewed_by_me = False
-    return stories
-
-def get_by_id(db: Session, story_id: int, user_id: Optional[int] = None):
-    story = db.query(models.Story).filter(models.Story.id == story_id).first()
-    if story:
-        story.views_count = db.query(models.StoryView).filter(models.StoryView.story_id == story.id).count()
-        if user_id:
-            story.is_viewed_by_me = db.query(models.StoryView).filter(
-                models.StoryView.story_id == story.id,
-                models.StoryView.user_id == user_id
-            ).first() is not None
-        else:
-            story.is_viewed_by_me = False
+def _with_view_stats(user_id: Optional[int] = None):
+    """
+    Story + число просмотров + флаг "смотрел ли user_id" одним запросом:
+    LEFT JOIN story_views и агрегат по истории (индекс story_id, user_id).
+    """
+    if user_id:
+        viewed = func.max(case((models.StoryView.user_id == user_id, 1), else_=0))
+    else:
+        viewed = literal(0)
+    return (
+        select(models.Story, func.count(models.StoryView.id).label("views_count"), viewed.label("viewed"))
+        .outerjoin(models.StoryView, models.StoryView.story_id == models.Story.id)
+        .group_by(models.Story.id)
+    )
+
+def _attach_stats(row):
+    story, views_count, viewed = row
+    story.views_count = views_count or 0
+    story.is_viewed_by_me = bool(viewed)
     return story
 
-def create(db: Session, story: schemas.StoryCreate):
+async def get_all(db: AsyncSession, skip: int = 0, limit: int = 100, user_id: Optional[int] = None):
+    result = await db.execute(
+        _with_view_stats(user_id)
+        .filter(models.Story.is_active == True)
+        .order_by(models.Story.created_at.desc())
+        .offset(skip)
+        .limit(limit)
+    )
+    return [_attach_stats(row) for row in result.all()]
+
+async def get_by_id(db: AsyncSession, story_id: int, user_id: Optional[int] = None):
+    result = await db.execute(_with_view_stats(user_id).filter(models.Story.id == story_id))
+    row = result.first()
+    return _attach_stats(row) if row else None
+
+async def create(db: AsyncSession, story: schemas.StoryCreate):
     db_story = models.Story(**story.model_dump())
     db.add(db_story)
-    db.commit()
-    db.refresh(db_story)
+    await db.commit()
+    await db.refresh(db_story)
     return db_story
 
-def update(db: Session, story_id: int, story_data: schemas.StoryUpdate):
-    db_story = db.query(models.Story).filter(models.Story.id == story_id).first()
+async def update(db: AsyncSession, story_id: int, story_data: schemas.StoryUpdate):
+    result = await db.execute(select(models.Story).filter(models.Story.id == story_id))
+    db_story = result.scalars().first()
     if not db_story:
         return None
     
@@ -45,60 +60,154 @@ def update(db: Session, story_id: int, story_data: schemas.StoryUpdate):
     for key, value in update_data.items():
         setattr(db_story, key, value)
     
-    db.commit()
-    db.refresh(db_story)
+    await db.commit()
+    await db.refresh(db_story)
     return db_story
 
-def delete(db: Session, story_id: int):
-    db_story = db.query(models.Story).filter(models.Story.id == story_id).first()
+async def delete(db: AsyncSession, story_id: int):
+    result = await db.execute(select(models.Story).filter(models.Story.id == story_id))
+    db_story = result.scalars().first()
     if db_story:
-        db.delete(db_story)
-        db.commit()
+        # ON DELETE CASCADE есть в схеме, но SQLite без PRAGMA foreign_keys его не применяет
+        for model in (models.StoryView, models.StoryViewHourly, models.StoryViewerDaily):
+            await db.execute(sql_delete(model).where(model.story_id == story_id))
+        await db.delete(db_story)
+        await db.commit()
         return True
     return False
 
-def log_view(db: Session, story_id: int, user_id: int):
-    # Check if user already viewed this story to avoid double counting
-    # Or just log every view? Typically it's better to log unique views or 
-    # specific intervals. Let's do unique for now.
-    existing = db.query(models.StoryView).filter(
-        models.StoryView.story_id == story_id,
-        models.StoryView.user_id == user_id
-    ).first()
-    
-    if not existing:
-        db_view = models.StoryView(story_id=story_id, user_id=user_id)
-        db.add(db_view)
-        db.commit()
+async def _increment(db: AsyncSession, model, counter: str, **keys):
+    """Атомарный upsert роллапа: INSERT ... ON CONFLICT DO UPDATE counter = counter + 1."""
+    dialect = postgresql if db.bind.dialect.name == "postgresql" else sqlite
+    column = getattr(model, counter)
+    stmt = dialect.insert(model).values(**keys, **{counter: 1})
+    stmt = stmt.on_conflict_do_update(index_elements=list(keys), set_={counter: column + 1})
+    await db.execute(stmt)
+
+async def log_view(db: AsyncSession, story_id: int, user_id: int):
+    """
+    Первый просмотр пишет story_views (уникален по story_id, user_id).
+    Каждое открытие увеличивает story_views_hourly; первое за день — story_viewers_daily.
+    """
+    now = datetime.utcnow()
+    today = now.date()
+    try:
+        result = await db.execute(select(models.StoryView.id).filter(
+            models.StoryView.story_id == story_id,
+            models.StoryView.user_id == user_id
+        ))
+        if result.first() is None:
+            db.add(models.StoryView(story_id=story_id, user_id=user_id, viewed_at=now, last_viewed_day=today))
+            await db.flush()
+            first_today = True
+        else:
+            # Условный UPDATE вместо read-modify-write: параллельные запросы засчитают день один раз
+            result = await db.execute(
+                sql_update(models.StoryView)
+                .where(
+                    models.StoryView.story_id == story_id,
+                    models.StoryView.user_id == user_id,
+                    or_(models.StoryView.last_viewed_day.is_(None), models.StoryView.last_viewed_day < today),
+                )
+                .values(last_viewed_day=today)
+            )
+            first_today = result.rowcount > 0
+        await _increment(db, models.StoryViewHourly, "views",
+                         story_id=story_id, hour=now.replace(minute=0, second=0, microsecond=0))
+        if first_today:
+            await _increment(db, models.StoryViewerDaily, "unique_viewers", story_id=story_id, day=today)
+        await db.commit()
+    except IntegrityError:
+        # Параллельный запрос уже записал просмотр (или истории нет)
+        await db.rollback()
     return True
 
-def get_stats(db: Session, story_id: int):
-    story = get_by_id(db, story_id)
+def _encode_cursor(viewed_at: datetime, view_id: int) -> str:
+    return f"{viewed_at.isoformat()}_{view_id}"
+
+def _decode_cursor(cursor: str):
+    viewed_at, _, view_id = cursor.rpartition("_")
+    return datetime.fromisoformat(viewed_at), int(view_id)
+
+async def get_stats(db: AsyncSession, story_id: int, limit: int = 100, cursor: Optional[str] = None):
+    """
+    Зрители истории одним запросом (story_views LEFT JOIN telegram_users), новые сверху.
+    cursor — next_cursor предыдущей страницы: (viewed_at, id) последнего зрителя.
+    """
+    story = await get_by_id(db, story_id)
     if not story:
         return None
-        
-    viewers_raw = db.query(models.StoryView).filter(models.StoryView.story_id == story_id).order_by(models.StoryView.viewed_at.desc()).all()
-    
-    # Import here to avoid circular dependencies
-    from app.users import models as user_models
-    
-    viewers = []
-    for v in viewers_raw:
-        # Try to find user name and photo
-        user = db.query(user_models.TelegramUser).filter(user_models.TelegramUser.telegram_id == v.user_id).first()
-        user_name = user.first_name if user else f"User {v.user_id}"
-        user_photo = user.photo_url if user else None
-        
-        viewers.append({
-            "user_id": v.user_id,
-            "user_name": user_name,
-            "user_photo": user_photo,
-            "viewed_at": v.viewed_at
-        })
-    
+
+    query = (
+        select(
+            models.StoryView.id,
+            models.StoryView.user_id,
+            models.StoryView.viewed_at,
+            user_models.TelegramUser.first_name,
+            user_models.TelegramUser.photo_url,
+        )
+        .outerjoin(user_models.TelegramUser, user_models.TelegramUser.telegram_id == models.StoryView.user_id)
+        .filter(models.StoryView.story_id == story_id)
+    )
+    if cursor:
+        viewed_at, view_id = _decode_cursor(cursor)
+        query = query.filter(or_(
+            models.StoryView.viewed_at < viewed_at,
+            and_(models.StoryView.viewed_at == viewed_at, models.StoryView.id < view_id),
+        ))
+    result = await db.execute(
+        query.order_by(models.StoryView.viewed_at.desc(), models.StoryView.id.desc()).limit(limit + 1)
+    )
+    rows = result.all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode_cursor(rows[-1].viewed_at, rows[-1].id)
+
+    viewers = [
+        {
+            "user_id": row.user_id,
+            "user_name": row.first_name or f"User {row.user_id}",
+            "user_photo": row.photo_url,
+            "viewed_at": row.viewed_at,
+        }
+        for row in rows
+    ]
+
+    return {
+        "id": story.id,
+        "title": story.title,
+        "views_count": story.views_count,
+        "viewers": viewers,
+        "next_cursor": next_cursor,
+    }
+
+async def get_aggregates(db: AsyncSession, story_id: int, hours: int = 48, days: int = 30):
+    """Просмотры по часам и уникальные зрители по дням из роллапов (без чтения story_views)."""
+    story = await get_by_id(db, story_id)
+    if not story:
+        return None
+
+    now = datetime.utcnow()
+    since_hour = now.replace(minute=0, second=0, microsecond=0) - timedelta(hours=hours - 1)
+    since_day = now.date() - timedelta(days=days - 1)
+
+    hourly = await db.execute(
+        select(models.StoryViewHourly.hour, models.StoryViewHourly.views)
+        .filter(models.StoryViewHourly.story_id == story_id, models.StoryViewHourly.hour >= since_hour)
+        .order_by(models.StoryViewHourly.hour)
+    )
+    daily = await db.execute(
+        select(models.StoryViewerDaily.day, models.StoryViewerDaily.unique_viewers)
+        .filter(models.StoryViewerDaily.story_id == story_id, models.StoryViewerDaily.day >= since_day)
+        .order_by(models.StoryViewerDaily.day)
+    )
+
     return {
         "id": story.id,
         "title": story.title,
-        "views_count": len(viewers),
-        "viewers": viewers
+        "views_count": story.views_count,
+        "views_per_hour": [{"hour": row.hour, "views": row.views} for row in hourly.all()],
+        "unique_viewers_per_day": [{"day": row.day, "unique_viewers": row.unique_viewers} for row in daily.all()],
     }
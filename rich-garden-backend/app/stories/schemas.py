@@ -1,7 +1,9 @@
-from pydantic import BaseModel
-from datetime import datetime
+from pydantic import BaseModel, computed_field
+from datetime import datetime, date
 from typing import Optional, List
 
+from app.common.schemas import ImageSet, image_set
+
 class StoryBase(BaseModel):
     title: str
     thumbnail_url: str
@@ -36,6 +38,16 @@ class Story(StoryBase):
     is_viewed_by_me: bool = False
     created_at: datetime
 
+    @computed_field
+    @property
+    def thumbnail_set(self) -> Optional[ImageSet]:
+        return image_set(self.thumbnail_url, "thumb")
+
+    @computed_field
+    @property
+    def content_set(self) -> Optional[ImageSet]:
+        return image_set(self.content_url, "full") if self.content_type == "image" else None
+
     class Config:
         from_attributes = True
 
@@ -44,3 +56,19 @@ class StoryStats(BaseModel):
     title: str
     views_count: int
     viewers: List[StoryViewSchema]
+    next_cursor: Optional[str] = None
+
+class StoryHourlyViews(BaseModel):
+    hour: datetime
+    views: int
+
+class StoryDailyViewers(BaseModel):
+    day: date
+    unique_viewers: int
+
+class StoryAggregates(BaseModel):
+    id: int
+    title: str
+    views_count: int
+    views_per_hour: List[StoryHourlyViews]
+    unique_viewers_per_day: List[StoryDailyViewers]
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, DateTime, UniqueConstraint
+import datetime
+from app.database import Base
+
+class TelegramFile(Base):
+    """
+    Фото, уже загруженное в Telegram: повторная отправка идёт по file_id, без байтов.
+    file_id действителен только для бота, который его получил, поэтому ключ — (bot_id, path);
+    content_hash — sha256 файла: если файл по тому же пути заменили, запись не используется.
+    """
+    __tablename__ = "telegram_files"
+    __table_args__ = (
+        UniqueConstraint("bot_id", "path", name="uq_telegram_files_bot_path"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    bot_id = Column(String, nullable=False)  # числовая часть токена до «:»
+    path = Column(String, nullable=False)  # относительно app/static: uploads/<файл>
+    content_hash = Column(String(64), nullable=False)
+    file_id = Column(String, nullable=False)
+    updated_at = Column(DateTime, default=datetime.datetime.now, onupdate=datetime.datetime.now)
@@ -0,0 +1,45 @@
+from sqlalchemy import select, delete as sql_delete
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import models
+import datetime
+
+# Функции репозитория не коммитят: транзакцией владеет сервис (app.database.unit_of_work)
+
+async def get_many(db: AsyncSession, bot_id: str, paths) -> dict:
+    """{path: (content_hash, file_id)} одним запросом."""
+    if not paths:
+        return {}
+    result = await db.execute(
+        select(models.TelegramFile.path, models.TelegramFile.content_hash, models.TelegramFile.file_id)
+        .filter(models.TelegramFile.bot_id == bot_id, models.TelegramFile.path.in_(list(paths)))
+    )
+    return {row.path: (row.content_hash, row.file_id) for row in result.all()}
+
+async def upsert_many(db: AsyncSession, bot_id: str, files: dict):
+    """files: {path: (content_hash, file_id)} — INSERT ... ON CONFLICT (bot_id, path) DO UPDATE."""
+    if not files:
+        return
+    dialect = postgresql if db.bind.dialect.name == "postgresql" else sqlite
+    now = datetime.datetime.now()
+    stmt = dialect.insert(models.TelegramFile).values([
+        {"bot_id": bot_id, "path": path, "content_hash": content_hash, "file_id": file_id, "updated_at": now}
+        for path, (content_hash, file_id) in sorted(files.items())
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["bot_id", "path"],
+        set_={
+            "content_hash": stmt.excluded.content_hash,
+            "file_id": stmt.excluded.file_id,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+    await db.execute(stmt)
+
+async def delete_many(db: AsyncSession, bot_id: str, paths):
+    if not paths:
+        return
+    await db.execute(
+        sql_delete(models.TelegramFile)
+        .where(models.TelegramFile.bot_id == bot_id, models.TelegramFile.path.in_(list(paths)))
+    )
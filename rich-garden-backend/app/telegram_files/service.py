@@ -0,0 +1,89 @@
+"""
+Кэш file_id загруженных в Telegram фото: хиты продаж попадают почти в каждый заказ, и без
+кэша каждое уведомление заново отправляло одни и те же мегабайты через sendPhoto/sendMediaGroup.
+
+file_id берётся из ответа Telegram на загрузку и хранится в telegram_files (переживает рестарт)
+и в памяти процесса. Ключ — (бот, путь), запись действительна, пока совпадает sha256 файла:
+новое фото товара — это новый файл в uploads или другой хэш, поэтому старый file_id не
+используется. Если Telegram всё же отверг file_id, вызывающий делает forget и загружает файл.
+Ошибки БД кэша не ломают уведомление — фото просто уходит байтами. stat и sha256 файлов идут
+одним вызовом в пуле потоков хранилища: кэш работает в outbox-воркере на общем event loop.
+"""
+import os
+
+from app.database import AsyncSessionLocal, unit_of_work
+from app.services import storage, uploads
+from . import repository
+
+_cache = {}  # (bot_id, path) -> (content_hash, file_id)
+
+
+def bot_id(token: str) -> str:
+    """Числовой id бота — часть токена до «:» (сам токен в БД не пишем)."""
+    return (token or "").split(":", 1)[0]
+
+
+def _key(path: str) -> str:
+    return os.path.relpath(path, uploads.STATIC_DIR).replace(os.sep, "/")
+
+
+def _content_hashes(paths) -> dict:
+    return {path: uploads.content_hash(path) for path in paths}
+
+
+async def lookup(bot: str, paths: list) -> dict:
+    """{path: file_id} для фото, которые этот бот уже загружал и которые с тех пор не менялись."""
+    hashes = await storage.run_io(_content_hashes, paths)
+    found, missing = {}, []
+    for path, content_hash in hashes.items():
+        cached = _cache.get((bot, _key(path)))
+        if cached and cached[0] == content_hash:
+            found[path] = cached[1]
+        elif content_hash:
+            missing.append(path)
+    if missing:
+        try:
+            async with AsyncSessionLocal() as db:
+                rows = await repository.get_many(db, bot, [_key(path) for path in missing])
+        except Exception as e:
+            print(f"WARN telegram_files: lookup failed: {e}")
+            rows = {}
+        for path in missing:
+            row = rows.get(_key(path))
+            if row:
+                _cache[(bot, _key(path))] = row
+                if row[0] == hashes[path]:
+                    found[path] = row[1]
+    return found
+
+
+async def remember(bot: str, file_ids: dict):
+    """{path: file_id} из ответа Telegram на загрузку."""
+    hashes = await storage.run_io(_content_hashes, list(file_ids))
+    files = {}
+    for path, file_id in file_ids.items():
+        content_hash = hashes[path]
+        if content_hash and file_id:
+            files[_key(path)] = (content_hash, file_id)
+    if not files:
+        return
+    for key, value in files.items():
+        _cache[(bot, key)] = value
+    try:
+        async with AsyncSessionLocal() as db:
+            async with unit_of_work(db):
+                await repository.upsert_many(db, bot, files)
+    except Exception as e:
+        print(f"WARN telegram_files: save failed: {e}")
+
+
+async def forget(bot: str, paths: list):
+    keys = [_key(path) for path in paths]
+    for key in keys:
+        _cache.pop((bot, key), None)
+    try:
+        async with AsyncSessionLocal() as db:
+            async with unit_of_work(db):
+                await repository.delete_many(db, bot, keys)
+    except Exception as e:
+        print(f"WARN telegram_files: delete failed: {e}")
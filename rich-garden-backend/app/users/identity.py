@@ -0,0 +1,54 @@
+"""
+telegram_id -> telegram_users.id в памяти процесса (LRU + TTL).
+
+Почти каждый запрос Mini App (/user/{telegram_id}/..., /calendar/{telegram_id}) начинался с
+поиска пользователя по telegram_id, хотя дальше нужен только его id. Связка не меняется, пока
+пользователь существует: запоминается при входе (auth) и первом поиске, сбрасывается при
+удалении клиента. Отсутствующие пользователи не кэшируются — они могут войти в следующую секунду.
+USER_ID_CACHE_TTL ограничивает расхождение между воркерами uvicorn (удаление в другом процессе).
+"""
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import repository
+
+USER_ID_CACHE_SIZE = int(os.getenv("USER_ID_CACHE_SIZE", "10000"))
+USER_ID_CACHE_TTL = int(os.getenv("USER_ID_CACHE_TTL", "300"))
+
+_entries = OrderedDict()  # telegram_id -> (user_id, expires_at)
+
+
+def remember(telegram_id: Optional[int], user_id: Optional[int]):
+    if telegram_id is None or user_id is None:
+        return
+    _entries[telegram_id] = (user_id, time.monotonic() + USER_ID_CACHE_TTL)
+    _entries.move_to_end(telegram_id)
+    while len(_entries) > USER_ID_CACHE_SIZE:
+        _entries.popitem(last=False)
+
+
+def forget_user(user_id: int):
+    """Клиент удалён: убираем все telegram_id, указывающие на него (удаления редки — полный проход)."""
+    for telegram_id in [tg for tg, (cached_id, _) in _entries.items() if cached_id == user_id]:
+        del _entries[telegram_id]
+
+
+def invalidate():
+    _entries.clear()
+
+
+async def get_user_id(db: AsyncSession, telegram_id: int) -> Optional[int]:
+    entry = _entries.get(telegram_id)
+    if entry and entry[1] > time.monotonic():
+        _entries.move_to_end(telegram_id)
+        return entry[0]
+    user_id = await repository.get_user_id(db, telegram_id)
+    if user_id is not None:
+        remember(telegram_id, user_id)
+    else:
+        _entries.pop(telegram_id, None)
+    return user_id
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, DateTime, BigInteger
+from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, DateTime, BigInteger, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 import datetime
 from app.database import Base
@@ -33,7 +33,12 @@ class Address(Base):
 
 class RecentlyViewed(Base):
     __tablename__ = "recently_viewed"
-    
+    # Одна строка на пару (upsert ON CONFLICT); список пользователя — по убыванию viewed_at
+    __table_args__ = (
+        UniqueConstraint("user_id", "product_id", name="uq_recently_viewed_user_product"),
+        Index("ix_recently_viewed_user_viewed_at", "user_id", "viewed_at"),
+    )
+
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("telegram_users.id"))
     product_id = Column(Integer, ForeignKey("products.id"))
@@ -0,0 +1,73 @@
+"""
+«Недавно просмотренные» активных пользователей в памяти процесса (LRU).
+
+В БД у пользователя не больше RECENT_VIEWS_LIMIT строк (repository.upsert_recent_views), здесь —
+те же пары {product_id: viewed_at} для RECENT_CACHE_USERS последних пользователей. Воркер
+app.counters после записи пачки дописывает её сюда (remember), поэтому повторное открытие
+Mini App — один запрос товаров по первичному ключу вместо join по recently_viewed.
+RECENT_CACHE_TTL страхует от расхождения между воркерами uvicorn.
+"""
+import os
+import time
+from collections import OrderedDict
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import repository
+
+RECENT_CACHE_USERS = int(os.getenv("RECENT_CACHE_USERS", "1000"))
+RECENT_CACHE_TTL = int(os.getenv("RECENT_CACHE_TTL", "60"))
+
+_entries = OrderedDict()  # telegram_id -> ({product_id: viewed_at}, expires_at)
+_generation = 0
+
+
+def _trim(viewed: dict) -> dict:
+    newest = sorted(viewed, key=viewed.get, reverse=True)[:repository.RECENT_VIEWS_LIMIT]
+    return {product_id: viewed[product_id] for product_id in newest}
+
+
+def _put(telegram_id: int, viewed: dict):
+    _entries[telegram_id] = (viewed, time.monotonic() + RECENT_CACHE_TTL)
+    _entries.move_to_end(telegram_id)
+    while len(_entries) > RECENT_CACHE_USERS:
+        _entries.popitem(last=False)
+
+
+def remember(recent: dict):
+    """Записанная пачка {telegram_id: {product_id: viewed_at}}: обновляет закэшированных пользователей."""
+    global _generation
+    _generation += 1
+    for telegram_id, items in recent.items():
+        entry = _entries.get(telegram_id)
+        if entry is None:
+            continue
+        viewed = dict(entry[0])
+        for product_id, viewed_at in items.items():
+            if product_id not in viewed or viewed_at > viewed[product_id]:
+                viewed[product_id] = viewed_at
+        _entries[telegram_id] = (_trim(viewed), entry[1])
+
+
+def invalidate():
+    global _generation
+    _generation += 1
+    _entries.clear()
+
+
+async def get_viewed(db: AsyncSession, telegram_id: int):
+    """
+    ({product_id: viewed_at}, {product_id: Product}) из БД. При попадании в кэш товары не
+    загружаются — второй словарь пуст, их догружает вызывающий по id.
+    """
+    entry = _entries.get(telegram_id)
+    if entry and entry[1] > time.monotonic():
+        _entries.move_to_end(telegram_id)
+        return dict(entry[0]), {}
+    generation = _generation
+    rows = await repository.get_recent_views(db, telegram_id)
+    viewed = {product.id: viewed_at for product, viewed_at in rows}
+    # Пока шёл запрос, воркер записал новую пачку — снимок мог её не увидеть
+    if generation == _generation:
+        _put(telegram_id, viewed)
+    return dict(viewed), {product.id: product for product, _ in rows}
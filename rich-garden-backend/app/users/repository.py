@@ -1,57 +1,93 @@
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import select, func, or_, delete as sql_delete
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from sqlalchemy.exc import IntegrityError
 from . import models, schemas
+from app.products import models as product_models
 import datetime
+from typing import Optional
 
-def get_by_telegram_id(db: Session, telegram_id: int):
-    return db.query(models.TelegramUser).options(joinedload(models.TelegramUser.addresses)).filter(models.TelegramUser.telegram_id == telegram_id).first()
+# Функции репозитория не коммитят: транзакцией владеет сервис (app.database.unit_of_work)
 
-def get_by_id(db: Session, user_id: int):
-    return db.query(models.TelegramUser).options(joinedload(models.TelegramUser.addresses)).filter(models.TelegramUser.id == user_id).first()
+# Сколько «недавно просмотренных» хранится на пользователя (лишние удаляются при записи)
+RECENT_VIEWS_LIMIT = 10
 
-def get_by_phone(db: Session, phone_number: str):
-    return db.query(models.TelegramUser).filter(models.TelegramUser.phone_number == phone_number).first()
+# Лёгкие выборки — только строка пользователя. Адреса нужны лишь там, где пользователь уходит
+# в ответ как schemas.TelegramUser (*_with_addresses): ленивой загрузки в async-сессии нет.
 
-def create_or_update_telegram_user(db: Session, user: schemas.TelegramUserCreate):
-    db_user = get_by_telegram_id(db, user.telegram_id)
+async def get_user_id(db: AsyncSession, telegram_id: int) -> Optional[int]:
+    """Только id по telegram_id (кэшируется в app.users.identity)."""
+    result = await db.execute(
+        select(models.TelegramUser.id).filter(models.TelegramUser.telegram_id == telegram_id)
+    )
+    return result.scalar()
+
+async def get_by_telegram_id(db: AsyncSession, telegram_id: int):
+    result = await db.execute(
+        select(models.TelegramUser).filter(models.TelegramUser.telegram_id == telegram_id)
+    )
+    return result.scalars().first()
+
+async def get_by_telegram_id_with_addresses(db: AsyncSession, telegram_id: int):
+    result = await db.execute(
+        select(models.TelegramUser)
+        .options(selectinload(models.TelegramUser.addresses))
+        .filter(models.TelegramUser.telegram_id == telegram_id)
+    )
+    return result.scalars().first()
+
+async def get_by_id(db: AsyncSession, user_id: int):
+    result = await db.execute(select(models.TelegramUser).filter(models.TelegramUser.id == user_id))
+    return result.scalars().first()
+
+async def get_by_phone(db: AsyncSession, phone_number: str):
+    result = await db.execute(
+        select(models.TelegramUser)
+        .options(selectinload(models.TelegramUser.addresses))
+        .filter(models.TelegramUser.phone_number == phone_number)
+    )
+    return result.scalars().first()
+
+async def create_or_update_telegram_user(db: AsyncSession, user: schemas.TelegramUserCreate):
+    db_user = await get_by_telegram_id_with_addresses(db, user.telegram_id)
     if not db_user:
         try:
-            db_user = models.TelegramUser(**user.dict())
-            db.add(db_user)
-            db.commit()
-            db.refresh(db_user)
+            # Savepoint: гонка двух первых входов откатывает только INSERT, а не всю транзакцию сервиса
+            async with db.begin_nested():
+                db_user = models.TelegramUser(**user.dict(), addresses=[])
+                db.add(db_user)
+                await db.flush()
         except IntegrityError:
-            db.rollback()
-            db_user = get_by_telegram_id(db, user.telegram_id)
+            db_user = await get_by_telegram_id_with_addresses(db, user.telegram_id)
             if db_user:
                 # Update
-                _update_user_fields(db, db_user, user)
+                await _update_user_fields(db, db_user, user)
     else:
-        _update_user_fields(db, db_user, user)
-    
+        await _update_user_fields(db, db_user, user)
+
     return db_user
 
-def create_offline_user(db: Session, user: schemas.TelegramUserCreate):
+async def create_offline_user(db: AsyncSession, user: schemas.TelegramUserCreate):
     # Check by phone first if provided
     if user.phone_number:
-        db_user = get_by_phone(db, user.phone_number)
+        db_user = await get_by_phone(db, user.phone_number)
         if db_user:
             # Update fields
-            _update_user_fields(db, db_user, user)
+            await _update_user_fields(db, db_user, user)
             return db_user
-            
+
     # If no phone or not found, check if telegram_id provided (shouldn't be for purely offline but handled)
     if user.telegram_id:
-        return create_or_update_telegram_user(db, user)
+        return await create_or_update_telegram_user(db, user)
 
     # Create new offline user
-    db_user = models.TelegramUser(**user.dict())
+    db_user = models.TelegramUser(**user.dict(), addresses=[])
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.flush()
     return db_user
 
-def _update_user_fields(db: Session, db_user: models.TelegramUser, user_data: schemas.TelegramUserCreate):
+async def _update_user_fields(db: AsyncSession, db_user: models.TelegramUser, user_data: schemas.TelegramUserCreate):
     db_user.first_name = user_data.first_name
     db_user.username = user_data.username
     db_user.photo_url = user_data.photo_url
@@ -59,69 +95,194 @@ def _update_user_fields(db: Session, db_user: models.TelegramUser, user_data: sc
         db_user.phone_number = user_data.phone_number
     if user_data.birth_date:
         db_user.birth_date = user_data.birth_date
-    db.commit()
-    db.refresh(db_user)
-
-def get_all_clients(db: Session):
-    return db.query(models.TelegramUser).options(joinedload(models.TelegramUser.addresses)).order_by(models.TelegramUser.created_at.desc()).all()
-
-def create_address(db: Session, telegram_id: int, address: schemas.AddressCreate):
-    user = get_by_telegram_id(db, telegram_id)
-    if not user:
-        return None
-    
-    db_address = models.Address(**address.dict(), user_id=user.id)
+    await db.flush()
+
+CLIENT_SORT_FIELDS = ("created_at", "orders_count", "total_spent", "last_order_at", "first_name")
+
+def _client_stats_query():
+    """
+    Клиент + агрегаты по заказам одним запросом: GROUP BY orders.user_id
+    (индекс ix_orders_user_created) и телефон из последнего заказа.
+    """
+    from app.orders.models import Order
+
+    stats = (
+        select(
+            Order.user_id.label("user_id"),
+            func.count(Order.id).label("orders_count"),
+            func.sum(Order.total_price).label("total_spent"),
+            func.max(Order.created_at).label("last_order_at"),
+        )
+        .filter(Order.user_id.isnot(None))
+        .group_by(Order.user_id)
+        .subquery()
+    )
+    last_phone = (
+        select(Order.customer_phone)
+        .filter(Order.user_id == models.TelegramUser.id)
+        .order_by(Order.created_at.desc(), Order.id.desc())
+        .limit(1)
+        .correlate(models.TelegramUser)
+        .scalar_subquery()
+    )
+    columns = {
+        "orders_count": func.coalesce(stats.c.orders_count, 0),
+        "total_spent": func.coalesce(stats.c.total_spent, 0),
+        "last_order_at": stats.c.last_order_at,
+        "created_at": models.TelegramUser.created_at,
+        "first_name": models.TelegramUser.first_name,
+    }
+    query = (
+        select(
+            models.TelegramUser,
+            columns["orders_count"].label("orders_count"),
+            columns["total_spent"].label("total_spent"),
+            columns["last_order_at"].label("last_order_at"),
+            last_phone.label("last_phone"),
+        )
+        .outerjoin(stats, stats.c.user_id == models.TelegramUser.id)
+    )
+    return query, columns
+
+def _client_filters(query, columns, search: Optional[str], source: Optional[str], segment: Optional[str]):
+    if search:
+        pattern = f"%{search.strip()}%"
+        query = query.filter(or_(
+            models.TelegramUser.first_name.ilike(pattern),
+            models.TelegramUser.username.ilike(pattern),
+            models.TelegramUser.phone_number.ilike(pattern),
+        ))
+    if source == "online":
+        query = query.filter(models.TelegramUser.telegram_id.isnot(None))
+    elif source == "offline":
+        query = query.filter(models.TelegramUser.telegram_id.is_(None))
+    if segment == "purchased":
+        query = query.filter(columns["orders_count"] > 0)
+    elif segment == "leads":
+        query = query.filter(columns["orders_count"] == 0)
+    return query
+
+async def get_all_clients(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: Optional[int] = None,
+    sort: str = "created_at",
+    order: str = "desc",
+    search: Optional[str] = None,
+    source: Optional[str] = None,
+    segment: Optional[str] = None,
+):
+    """Возвращает (rows, total): строки (TelegramUser, orders_count, total_spent, last_order_at, last_phone)."""
+    query, columns = _client_stats_query()
+    query = _client_filters(query, columns, search, source, segment)
+
+    total_result = await db.execute(select(func.count()).select_from(query.order_by(None).subquery()))
+    total = total_result.scalar() or 0
+
+    sort_column = columns[sort]
+    sort_column = sort_column.asc() if order == "asc" else sort_column.desc()
+    query = (
+        query.options(selectinload(models.TelegramUser.addresses))
+        .order_by(sort_column.nulls_last(), models.TelegramUser.id.desc())
+        .offset(skip)
+    )
+    if limit is not None:
+        query = query.limit(limit)
+    result = await db.execute(query)
+    return result.all(), total
+
+async def create_address(db: AsyncSession, user_id: int, address: schemas.AddressCreate):
+    db_address = models.Address(**address.dict(), user_id=user_id)
     db.add(db_address)
-    db.commit()
-    db.refresh(db_address)
+    await db.flush()
+    await db.refresh(db_address)
     return db_address
 
-def get_addresses(db: Session, telegram_id: int):
-    user = get_by_telegram_id(db, telegram_id)
-    if not user:
-        return []
-    return user.addresses
-
-def get_recent_views(db: Session, telegram_id: int, limit: int = 10):
-    user = get_by_telegram_id(db, telegram_id)
-    if not user:
-        return []
-    
-    return db.query(models.RecentlyViewed).filter(models.RecentlyViewed.user_id == user.id)\
-             .order_by(models.RecentlyViewed.viewed_at.desc()).limit(limit).all()
-
-def add_recent_view(db: Session, telegram_id: int, product_id: int):
-    user = get_by_telegram_id(db, telegram_id)
-    if not user:
-        return None 
-    
-    recent = db.query(models.RecentlyViewed).filter(
-        models.RecentlyViewed.user_id == user.id,
-        models.RecentlyViewed.product_id == product_id
-    ).first()
-
-    if recent:
-        recent.viewed_at = datetime.datetime.now()
-    else:
-        recent = models.RecentlyViewed(user_id=user.id, product_id=product_id)
-        db.add(recent)
-    db.commit()
-    return True
+async def get_addresses(db: AsyncSession, user_id: int):
+    result = await db.execute(
+        select(models.Address).filter(models.Address.user_id == user_id).order_by(models.Address.id)
+    )
+    return result.scalars().all()
+
+async def get_recent_views(db: AsyncSession, telegram_id: int, limit: int = RECENT_VIEWS_LIMIT):
+    """[(Product, viewed_at)] пользователя, свежие первыми — один запрос с join, без адресов и N+1."""
+    RecentlyViewed = models.RecentlyViewed
+    result = await db.execute(
+        select(product_models.Product, RecentlyViewed.viewed_at)
+        .join(RecentlyViewed, RecentlyViewed.product_id == product_models.Product.id)
+        .join(models.TelegramUser, models.TelegramUser.id == RecentlyViewed.user_id)
+        .filter(models.TelegramUser.telegram_id == telegram_id)
+        .order_by(RecentlyViewed.viewed_at.desc(), RecentlyViewed.id.desc())
+        .limit(limit)
+    )
+    return result.all()
+
+async def upsert_recent_views(db: AsyncSession, recent: dict):
+    """
+    Недавно просмотренные {telegram_id: {product_id: viewed_at}} пачкой (write-behind из app.counters):
+    один INSERT ... ON CONFLICT (user_id, product_id) DO UPDATE viewed_at, затем у затронутых
+    пользователей остаются последние RECENT_VIEWS_LIMIT. Неизвестные пользователи и удалённые
+    товары пропускаются.
+    """
+    if not recent:
+        return 0
+    product_ids = {product_id for views in recent.values() for product_id in views}
+    result = await db.execute(
+        select(models.TelegramUser.telegram_id, models.TelegramUser.id)
+        .filter(models.TelegramUser.telegram_id.in_(list(recent)))
+    )
+    user_ids = dict(result.all())
+    result = await db.execute(
+        select(product_models.Product.id).filter(product_models.Product.id.in_(list(product_ids)))
+    )
+    known_products = set(result.scalars().all())
+
+    rows = []
+    for telegram_id, views in recent.items():
+        user_id = user_ids.get(telegram_id)
+        if user_id is None:
+            continue
+        for product_id, viewed_at in views.items():
+            if product_id in known_products:
+                rows.append({"user_id": user_id, "product_id": product_id, "viewed_at": viewed_at})
+    if not rows:
+        return 0
 
-def delete_user(db: Session, user_id: int):
-    db_user = get_by_id(db, user_id)
+    dialect = postgresql if db.bind.dialect.name == "postgresql" else sqlite
+    stmt = dialect.insert(models.RecentlyViewed).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id", "product_id"],
+        set_={"viewed_at": stmt.excluded.viewed_at},
+    )
+    await db.execute(stmt)
+    await trim_recent_views(db, {row["user_id"] for row in rows})
+    return len(rows)
+
+async def trim_recent_views(db: AsyncSession, user_ids, keep: int = RECENT_VIEWS_LIMIT):
+    """Удаляет у пользователей всё старше последних keep просмотров (row_number по viewed_at)."""
+    RecentlyViewed = models.RecentlyViewed
+    ranked = (
+        select(
+            RecentlyViewed.id,
+            func.row_number().over(
+                partition_by=RecentlyViewed.user_id,
+                order_by=(RecentlyViewed.viewed_at.desc(), RecentlyViewed.id.desc()),
+            ).label("position"),
+        )
+        .filter(RecentlyViewed.user_id.in_(list(user_ids)))
+        .subquery()
+    )
+    await db.execute(
+        sql_delete(RecentlyViewed)
+        .where(RecentlyViewed.id.in_(select(ranked.c.id).where(ranked.c.position > keep)))
+        .execution_options(synchronize_session=False)
+    )
+
+async def delete_user(db: AsyncSession, user_id: int):
+    db_user = await get_by_id(db, user_id)
     if db_user:
-        db.delete(db_user)
-        db.commit()
+        await db.execute(sql_delete(models.RecentlyViewed).where(models.RecentlyViewed.user_id == user_id))
+        await db.delete(db_user)
+        await db.flush()
         return True
     return False
-
-def get_users_purchased(db: Session):
-    from app.orders.models import Order
-    # Users who have at least one order
-    return db.query(models.TelegramUser).join(models.TelegramUser.orders).distinct().all()
-
-def get_users_leads(db: Session):
-    from app.orders.models import Order
-    # Users who have NO orders (LEFT JOIN + WHERE NULL)
-    return db.query(models.TelegramUser).outerjoin(models.TelegramUser.orders).filter(Order.id == None).all()
@@ -1,7 +1,7 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from typing import List
-from app.database import get_db
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from app.database import get_async_db
 from . import service, schemas
 from app.products import schemas as product_schemas
 from app.orders import schemas as order_schemas
@@ -18,58 +18,69 @@ auth_router = APIRouter(prefix="/auth", tags=["auth"])
 clients_router = APIRouter(prefix="/clients", tags=["clients"])
 
 @auth_router.post("/telegram", response_model=schemas.TelegramUser)
-def auth_telegram(user: schemas.TelegramUserCreate, db: Session = Depends(get_db)):
-    return service.auth_telegram(db, user)
+async def auth_telegram(user: schemas.TelegramUserCreate, db: AsyncSession = Depends(get_async_db)):
+    return await service.auth_telegram(db, user)
 
 @clients_router.get("", response_model=List[schemas.TelegramUser])
-def get_clients(db: Session = Depends(get_db)):
-    return service.get_clients(db)
+async def get_clients(
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    sort: str = "created_at",
+    order: str = "desc",
+    search: Optional[str] = None,
+    source: Optional[str] = Query(None, pattern="^(online|offline)$"),
+    segment: Optional[str] = Query(None, pattern="^(purchased|leads)$"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Без limit возвращает всех клиентов (POS, профиль); общее число после фильтров — в X-Total-Count."""
+    clients, total = await service.get_clients(
+        db, skip=skip, limit=limit, sort=sort, order=order, search=search, source=source, segment=segment
+    )
+    response.headers["X-Total-Count"] = str(total)
+    return clients
 
 @clients_router.post("/offline", response_model=schemas.TelegramUser)
-def create_offline_client(client: schemas.TelegramUserCreate, db: Session = Depends(get_db)):
-    return service.create_offline_client(db, client)
+async def create_offline_client(client: schemas.TelegramUserCreate, db: AsyncSession = Depends(get_async_db)):
+    return await service.create_offline_client(db, client)
 
 @clients_router.delete("/{client_id}")
-def delete_client(client_id: int, db: Session = Depends(get_db)):
-    return service.delete_user(db, client_id)
+async def delete_client(client_id: int, db: AsyncSession = Depends(get_async_db)):
+    return await service.delete_user(db, client_id)
 
 @clients_router.get("/{client_id}/orders", response_model=List[order_schemas.Order])
-def get_client_orders(client_id: int, db: Session = Depends(get_db)):
-    return service.get_client_orders(db, client_id)
-
-@clients_router.post("/broadcast")
-async def broadcast_message(request: schemas.BroadcastRequest, db: Session = Depends(get_db)):
-    return await service.send_broadcast(db, request.text, request.filter_type)
+async def get_client_orders(client_id: int, db: AsyncSession = Depends(get_async_db)):
+    return await service.get_client_orders(db, client_id)
 
 # User specific routes
 @router.post("/{telegram_id}/addresses", response_model=schemas.Address)
-def create_address(telegram_id: int, address: schemas.AddressCreate, db: Session = Depends(get_db)):
-    return service.create_address(db, telegram_id, address)
+async def create_address(telegram_id: int, address: schemas.AddressCreate, db: AsyncSession = Depends(get_async_db)):
+    return await service.create_address(db, telegram_id, address)
 
 @router.get("/{telegram_id}/addresses", response_model=List[schemas.Address])
-def get_addresses(telegram_id: int, db: Session = Depends(get_db)):
-    return service.get_addresses(db, telegram_id)
+async def get_addresses(telegram_id: int, db: AsyncSession = Depends(get_async_db)):
+    return await service.get_addresses(db, telegram_id)
 
-@router.get("/{telegram_id}/recent") # response_model List[Product]
-def get_recent_products(telegram_id: int, db: Session = Depends(get_db)):
-    return service.get_recent_products(db, telegram_id)
+@router.get("/{telegram_id}/recent", response_model=List[product_schemas.CatalogProduct])
+async def get_recent_products(telegram_id: int, db: AsyncSession = Depends(get_async_db)):
+    return await service.get_recent_products(db, telegram_id)
 
 @router.post("/{telegram_id}/recent/{product_id}")
-def add_recent_product(telegram_id: int, product_id: int, db: Session = Depends(get_db)):
-    return service.add_recent_product(db, telegram_id, product_id)
+async def add_recent_product(telegram_id: int, product_id: int, db: AsyncSession = Depends(get_async_db)):
+    return await service.add_recent_product(db, telegram_id, product_id)
 
 @router.get("/{telegram_id}", response_model=schemas.TelegramUser)
-def get_user(telegram_id: int, db: Session = Depends(get_db)):
-    user = service.get_user_by_telegram_id(db, telegram_id)
+async def get_user(telegram_id: int, db: AsyncSession = Depends(get_async_db)):
+    user = await service.get_user_by_telegram_id(db, telegram_id)
     if not user:
         from fastapi import HTTPException
         raise HTTPException(status_code=404, detail="User not found")
     return user
 
 @router.get("/{telegram_id}/orders", response_model=List[order_schemas.Order])
-def get_user_orders(telegram_id: int, db: Session = Depends(get_db)):
-    return service.get_user_orders(db, telegram_id)
+async def get_user_orders(telegram_id: int, db: AsyncSession = Depends(get_async_db)):
+    return await service.get_user_orders(db, telegram_id)
 
 @router.post("/{telegram_id}/phone")
-def update_user_phone(telegram_id: int, phone_data: schemas.PhoneUpdate, db: Session = Depends(get_db)):
-    return service.update_user_phone(db, telegram_id, phone_data.phone_number)
+async def update_user_phone(telegram_id: int, phone_data: schemas.PhoneUpdate, db: AsyncSession = Depends(get_async_db)):
+    return await service.update_user_phone(db, telegram_id, phone_data.phone_number)
@@ -36,6 +36,7 @@ class TelegramUser(TelegramUserBase):
     addresses: List[Address] = []
     orders_count: int = 0
     total_spent: int = 0
+    last_order_at: Optional[datetime.datetime] = None
     
     class Config:
         from_attributes = True
@@ -62,6 +63,3 @@ class RecentlyViewed(RecentlyViewedBase):
     class Config:
         from_attributes = True
 
-class BroadcastRequest(BaseModel):
-    text: str
-    filter_type: Optional[str] = "all"
@@ -1,35 +1,56 @@
-from sqlalchemy.orm import Session
-from fastapi import HTTPException    
-from . import repository, schemas, models
-from app.products import repository as product_repo
-from app.products import models as product_models 
-import asyncio
-
-def auth_telegram(db: Session, user: schemas.TelegramUserCreate):
-    return repository.create_or_update_telegram_user(db, user)
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import HTTPException
+from typing import Optional
+from app.database import unit_of_work
+from . import repository, schemas, models, recent, identity
+from app.products import catalog, repository as product_repo
+from app.products import models as product_models
+from app.counters import service as counters_service
+
+async def auth_telegram(db: AsyncSession, user: schemas.TelegramUserCreate):
+    async with unit_of_work(db):
+        db_user = await repository.create_or_update_telegram_user(db, user)
+    identity.remember(db_user.telegram_id, db_user.id)
+    return db_user
 
-def create_offline_client(db: Session, client: schemas.TelegramUserCreate):
+async def create_offline_client(db: AsyncSession, client: schemas.TelegramUserCreate):
     from datetime import date
-    db_user = repository.create_offline_user(db, client)
+    async with unit_of_work(db):
+        db_user = await repository.create_offline_user(db, client)
     if db_user.birth_date and isinstance(db_user.birth_date, date):
         db_user.birth_date = db_user.birth_date.isoformat()
     return db_user
 
-def get_clients(db: Session):
+PLACEHOLDER_PHONES = ("Уточнить", "Не указан", "Clarify")
+
+async def get_clients(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: Optional[int] = None,
+    sort: str = "created_at",
+    order: str = "desc",
+    search: Optional[str] = None,
+    source: Optional[str] = None,
+    segment: Optional[str] = None,
+):
     from datetime import date, datetime
-    users = repository.get_all_clients(db)
-    for user in users:
-        user_orders = user.orders 
-        user.orders_count = len(user_orders)
-        user.total_spent = sum(o.total_price for o in user_orders)
-        
+    if sort not in repository.CLIENT_SORT_FIELDS:
+        raise HTTPException(status_code=400, detail=f"Unknown sort field: {sort}")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail=f"Unknown sort order: {order}")
+
+    rows, total = await repository.get_all_clients(
+        db, skip=skip, limit=limit, sort=sort, order=order, search=search, source=source, segment=segment
+    )
+    users = []
+    for user, orders_count, total_spent, last_order_at, last_phone in rows:
+        user.orders_count = orders_count
+        user.total_spent = total_spent
+        user.last_order_at = last_order_at
+
         # Fallback phone from last order if missing
-        if not user.phone_number and user_orders:
-             # Sort orders by date to get the latest one
-             sorted_orders = sorted(user_orders, key=lambda x: x.created_at, reverse=True)
-             last_phone = sorted_orders[0].customer_phone
-             if last_phone and last_phone not in ["Уточнить", "Не указан", "Clarify"]:
-                 user.phone_number = last_phone
+        if not user.phone_number and last_phone and last_phone not in PLACEHOLDER_PHONES:
+            user.phone_number = last_phone
 
         if user.birth_date:
             if isinstance(user.birth_date, date):
@@ -38,121 +59,86 @@ def get_clients(db: Session):
                 user.birth_date = user.birth_date.date().isoformat()
         else:
             user.birth_date = None
-    return users
-
-def get_recent_products(db: Session, telegram_id: int):
-    recents = repository.get_recent_views(db, telegram_id)
-    products = []
-    seen = set()
-    for r in recents:
-        if r.product_id not in seen:
-            products.append(r.product)
-            seen.add(r.product_id)
-    return products
-
-def add_recent_product(db: Session, telegram_id: int, product_id: int):
-    product = product_repo.get_by_id(db, product_id)
-    if not product:
-        raise HTTPException(status_code=404, detail="Product not found")
-
-    product_repo.increment_views(db, product)
-    
-    success = repository.add_recent_view(db, telegram_id, product_id)
-    if not success:
-         raise HTTPException(status_code=404, detail="User not found")
-         
+        users.append(user)
+    return users, total
+
+async def get_recent_products(db: AsyncSession, telegram_id: int):
+    viewed, products = await recent.get_viewed(db, telegram_id)
+    # Просмотры пишутся в БД с задержкой (app.counters): свежие берём из буфера
+    for product_id, viewed_at in counters_service.pending_recent(telegram_id).items():
+        if product_id not in viewed or viewed_at > viewed[product_id]:
+            viewed[product_id] = viewed_at
+    ordered = sorted(viewed, key=viewed.get, reverse=True)[:repository.RECENT_VIEWS_LIMIT]
+    missing = [product_id for product_id in ordered if product_id not in products]
+    for product in await product_repo.get_by_ids(db, missing):
+        products[product.id] = product
+    # Карточки витрины (как /products/catalog): без себестоимости, версии и поисковых колонок
+    return [catalog.build_item(products[product_id]) for product_id in ordered if product_id in products]
+
+async def add_recent_product(db: AsyncSession, telegram_id: int, product_id: int):
+    # Без обращения к БД: просмотр и «недавно просмотренные» пишет воркер app.counters пачкой.
+    # Несуществующие товар/пользователь отбрасываются при записи.
+    counters_service.add_view(product_id, telegram_id)
     return {"message": "OK"}
 
-def create_address(db: Session, telegram_id: int, address: schemas.AddressCreate):
-    res = repository.create_address(db, telegram_id, address)
-    if not res:
+async def create_address(db: AsyncSession, telegram_id: int, address: schemas.AddressCreate):
+    user_id = await identity.get_user_id(db, telegram_id)
+    if user_id is None:
         raise HTTPException(status_code=404, detail="User not found")
-    return res
+    async with unit_of_work(db):
+        return await repository.create_address(db, user_id, address)
+
+async def get_addresses(db: AsyncSession, telegram_id: int):
+    user_id = await identity.get_user_id(db, telegram_id)
+    if user_id is None:
+        return []
+    return await repository.get_addresses(db, user_id)
 
-def get_addresses(db: Session, telegram_id: int):
-    return repository.get_addresses(db, telegram_id)
+async def get_user_by_telegram_id(db: AsyncSession, telegram_id: int):
+    user = await repository.get_by_telegram_id_with_addresses(db, telegram_id)
+    if user:
+        identity.remember(user.telegram_id, user.id)
+    return user
 
-def get_user_by_telegram_id(db: Session, telegram_id: int):
-    return repository.get_by_telegram_id(db, telegram_id)
+async def get_user_orders(db: AsyncSession, telegram_id: int):
+    from app.orders import repository as order_repo
 
-def get_user_orders(db: Session, telegram_id: int):
     # Bypass for development/browser testing
     if telegram_id == 12345678:
-        from app.orders import repository as order_repo
-        return order_repo.get_all(db)
+        return await order_repo.get_all(db)
 
-    user = repository.get_by_telegram_id(db, telegram_id)
-    if not user:
+    user_id = await identity.get_user_id(db, telegram_id)
+    if user_id is None:
         return []
-    return sorted(user.orders, key=lambda x: x.created_at, reverse=True)
+    return await order_repo.get_by_user_id(db, user_id)
+
+async def get_client_orders(db: AsyncSession, client_id: int):
+    from app.orders import repository as order_repo
 
-def get_client_orders(db: Session, client_id: int):
-    user = repository.get_by_id(db, client_id)
+    user = await repository.get_by_id(db, client_id)
     if not user:
         return []
-    return sorted(user.orders, key=lambda x: x.created_at, reverse=True)
-
-def delete_user(db: Session, user_id: int):
-    return repository.delete_user(db, user_id)
-
-async def send_broadcast(db: Session, text: str, filter_type: str = "all"):
-    from app.services import telegram
-    
-    # 1. Create query depending on filter
-    if filter_type == "purchased":
-        target_users = repository.get_users_purchased(db)
-    elif filter_type == "leads":
-        target_users = repository.get_users_leads(db)
-    else:
-        target_users = repository.get_all_clients(db)
-
-    # Filter out offline users (no telegram_id)
-    valid_users = [u for u in target_users if u.telegram_id]
-    
-    if not valid_users:
-        return {
-            "total": 0,
-            "success": 0,
-            "failed": 0
-        }
-
-    # 2. Send concurrently with Semaphore
-    semaphore = asyncio.Semaphore(20) # Max 20 concurrent requests
-    
-    async def send_one(user):
-        async with semaphore:
-            try:
-                # Slight delay to smooth out traffic spike
-                await asyncio.sleep(0.05)
-                return await telegram.send_broadcast_message(user.telegram_id, text)
-            except Exception as e:
-                print(f"Error sending broadcast to {user.telegram_id}: {e}")
-                return False
-
-    tasks = [send_one(u) for u in valid_users]
-    results = await asyncio.gather(*tasks)
-
-    success_count = results.count(True)
-    fail_count = results.count(False)
-            
-    return {
-        "total": len(valid_users),
-        "success": success_count,
-        "failed": fail_count
-    }
-
-def update_user_phone(db: Session, telegram_id: int, phone_number: str):
-    user = repository.get_by_telegram_id(db, telegram_id)
-    if not user:
-        from . import schemas
-        user_data = schemas.TelegramUserCreate(
-            telegram_id=telegram_id,
-            phone_number=phone_number,
-            first_name="Клиент"
-        )
-        return repository.create_or_update_telegram_user(db, user_data)
-    
-    user.phone_number = phone_number
-    db.commit()
-    db.refresh(user)
+    return await order_repo.get_by_user_id(db, user.id)
+
+async def delete_user(db: AsyncSession, user_id: int):
+    async with unit_of_work(db):
+        deleted = await repository.delete_user(db, user_id)
+    identity.forget_user(user_id)
+    recent.invalidate()
+    return deleted
+
+async def update_user_phone(db: AsyncSession, telegram_id: int, phone_number: str):
+    async with unit_of_work(db):
+        user = await repository.get_by_telegram_id_with_addresses(db, telegram_id)
+        if not user:
+            from . import schemas
+            user_data = schemas.TelegramUserCreate(
+                telegram_id=telegram_id,
+                phone_number=phone_number,
+                first_name="Клиент"
+            )
+            user = await repository.create_or_update_telegram_user(db, user_data)
+        else:
+            user.phone_number = phone_number
+    identity.remember(user.telegram_id, user.id)
     return user
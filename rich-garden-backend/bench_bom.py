@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк списания по составу букетов: заказ из --bouquets букетов (--types разных, по --ingredients
+ингредиентов в каждом). Старая схема — цикл как в прежнем delete_product (get_by_id + update_stock
+с commit + add_history с commit на каждый ингредиент) против orders.service.deduct_order_stock
+(раскрытие product_components, один UPDATE остатков, история пачкой, один commit).
+
+По умолчанию — временная SQLite. Для PostgreSQL передайте пустую тестовую БД:
+  python bench_bom.py --bouquets 100 --types 20 --ingredients 5
+  python bench_bom.py --database-url postgresql://localhost/rich_garden_bench
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.getcwd())
+
+
+async def _legacy_deduct(db, models, lines):
+    """
+    Прежний цикл, встроенный сюда: нынешние update_stock/add_history только flush-ят, поэтому
+    baseline — чтение товара, stock_quantity -= n в Python и по commit на остаток и на историю.
+    """
+    import datetime
+    from sqlalchemy import select
+    for bouquet_id, qty in lines.items():
+        bouquet = (await db.execute(select(models.Product).filter(models.Product.id == bouquet_id))).scalar_one()
+        for item in json.loads(bouquet.composition):
+            ingredient = (await db.execute(
+                select(models.Product).filter(models.Product.id == item["id"])
+            )).scalar_one()
+            amount = item["qty"] * qty
+            ingredient.stock_quantity = (ingredient.stock_quantity or 0) - amount
+            await db.commit()
+            await db.refresh(ingredient)
+            db.add(models.ProductHistory(
+                product_id=ingredient.id, action="writeoff", quantity=amount,
+                date=datetime.datetime.now().isoformat()
+            ))
+            await db.commit()
+
+
+def _seed(engine, models, args):
+    from sqlalchemy import insert
+    from app.database import Base
+    Base.metadata.create_all(bind=engine)
+    flowers = args.ingredients * 6
+    with engine.begin() as conn:
+        conn.execute(insert(models.Product), [
+            {"id": i + 1, "name": f"Flower {i}", "is_ingredient": True, "stock_quantity": 10 ** 9}
+            for i in range(flowers)
+        ])
+        bouquets, components = [], []
+        for t in range(args.types):
+            bouquet_id = flowers + t + 1
+            picked = random.sample(range(1, flowers + 1), args.ingredients)
+            composition = [{"id": fid, "qty": random.randint(1, 7)} for fid in picked]
+            bouquets.append({"id": bouquet_id, "name": f"Bouquet {t}", "stock_quantity": 0,
+                             "composition": json.dumps(composition)})
+            components += [{"product_id": bouquet_id, "component_id": c["id"], "qty": c["qty"]} for c in composition]
+        conn.execute(insert(models.Product), bouquets)
+        conn.execute(insert(models.ProductComponent), components)
+    lines = {}
+    for _ in range(args.bouquets):
+        bouquet_id = random.choice(bouquets)["id"]
+        lines[bouquet_id] = lines.get(bouquet_id, 0) + 1
+    return lines
+
+
+async def _measure(title, fn, counter, runs):
+    timings, queries, commits = [], [], []
+    for _ in range(runs):
+        counter["n"] = counter["commits"] = 0
+        started = time.perf_counter()
+        await fn()
+        timings.append(time.perf_counter() - started)
+        queries.append(counter["n"])
+        commits.append(counter["commits"])
+    print(f"{title:<32} queries={statistics.median(queries):>5.0f}  commits={statistics.median(commits):>4.0f}  "
+          f"p50={statistics.median(timings) * 1000:8.1f}ms  max={max(timings) * 1000:8.1f}ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bouquets", type=int, default=100)
+    parser.add_argument("--types", type=int, default=20)
+    parser.add_argument("--ingredients", type=int, default=5)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--database-url", help="пустая БД для бенчмарка (по умолчанию временная SQLite)")
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{tempfile.mkdtemp()}/bench_bom.db"
+
+    from sqlalchemy import event
+    from app import database
+    from app.products import models as product_models
+    from app.orders import models as order_models, repository as order_repo, service as order_service
+    from app.users import models as user_models  # noqa: F401 (metadata)
+
+    print(f"Seeding order: {args.bouquets} bouquets of {args.types} types x {args.ingredients} ingredients ...")
+    lines = _seed(database.engine, product_models, args)
+
+    counter = {"n": 0, "commits": 0}
+
+    def count_query(*_):
+        counter["n"] += 1
+
+    def count_commit(*_):
+        counter["commits"] += 1
+
+    event.listen(database.async_engine.sync_engine, "before_cursor_execute", count_query)
+    event.listen(database.async_engine.sync_engine, "commit", count_commit)
+
+    items = json.dumps([{"id": pid, "quantity": qty, "price": 0} for pid, qty in lines.items()])
+    async with database.AsyncSessionLocal() as db:
+        order_ids = []
+        for _ in range(args.runs):
+            order = order_models.Order(customer_name="Bench", customer_phone="0", total_price=0, items=items)
+            db.add(order)
+            await db.flush()
+            await order_repo.add_items(db, order.id, items)
+            order_ids.append(order.id)
+        await db.commit()
+
+        async def legacy():
+            db.expunge_all()
+            await _legacy_deduct(db, product_models, lines)
+
+        async def current():
+            db.expunge_all()
+            await order_service.deduct_order_stock(db, order_ids.pop())
+
+        await _measure("legacy loop (per ingredient)", legacy, counter, args.runs)
+        await _measure("deduct_order_stock (BOM)", current, counter, args.runs)
+
+    await database.async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк загрузки фото: прежний optimize_image (decode + LANCZOS до 1920px + JPEG прямо в
+async-хендлере) против app.services.images (thumb/card/full в AVIF/WebP/JPEG в пуле процессов).
+Пока идут загрузки, рядом тикает корутина раз в 10 мс — её максимальная задержка показывает,
+насколько заблокирован event loop (в это время стоят все остальные запросы). В конце — сколько
+байт качает Mini App за миниатюру и карточку.
+
+Файлы пишутся во временный каталог.
+  python bench_images.py --uploads 8 --concurrency 4 --workers 2
+"""
+import argparse
+import asyncio
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.getcwd())
+
+
+def _legacy_optimize(image_data: bytes) -> bytes:
+    """common.router.optimize_image до перехода на пул (без изменений)."""
+    from PIL import Image
+    img = Image.open(io.BytesIO(image_data))
+    if img.mode in ('RGBA', 'LA', 'P'):
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        if img.mode == 'P':
+            img = img.convert('RGBA')
+        background.paste(img, mask=img.split()[-1] if img.mode in ('RGBA', 'LA') else None)
+        img = background
+    if img.size[0] > 1920 or img.size[1] > 1920:
+        img.thumbnail((1920, 1920), Image.Resampling.LANCZOS)
+    output = io.BytesIO()
+    img.save(output, format='JPEG', quality=85, optimize=True)
+    return output.getvalue()
+
+
+async def _measure(title, handler, photos, concurrency):
+    lags = []
+    stop = asyncio.Event()
+
+    async def ticker():
+        while not stop.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.01)
+            lags.append(time.perf_counter() - started - 0.01)
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def upload(data):
+        async with semaphore:
+            return await handler(data)
+
+    tick = asyncio.create_task(ticker())
+    await asyncio.sleep(0.05)
+    started = time.perf_counter()
+    results = await asyncio.gather(*(upload(data) for data in photos))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await tick
+    print(f"{title:<34} {len(photos) / elapsed:6.2f} uploads/s  "
+          f"event loop lag max={max(lags) * 1000:7.1f}ms  p50={sorted(lags)[len(lags) // 2] * 1000:5.1f}ms")
+    return results
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uploads", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=2, help="IMAGE_WORKERS")
+    parser.add_argument("--size", default="3000x2000", help="размер исходных фото")
+    args = parser.parse_args()
+
+    os.environ["IMAGE_WORKERS"] = str(args.workers)
+    from PIL import Image, ImageFilter
+    from app.services import images
+
+    images.IMAGES_DIR = tempfile.mkdtemp()
+    width, height = (int(x) for x in args.size.split("x"))
+    photos = []
+    for i in range(args.uploads):
+        # Размытый шум + градиент: сжимается примерно как фото букета, а не как заливка
+        img = Image.merge("RGB", [Image.effect_noise((width, height), 60 + i),
+                                  Image.linear_gradient("L").resize((width, height)),
+                                  Image.effect_noise((width, height), 80)]).filter(ImageFilter.GaussianBlur(3))
+        buffer = io.BytesIO()
+        img.save(buffer, "JPEG", quality=92)
+        photos.append(buffer.getvalue())
+
+    async def legacy(data):
+        return _legacy_optimize(data)
+
+    legacy_results = await _measure("inline optimize_image (JPEG 1920)", legacy, photos, args.concurrency)
+    warmup = io.BytesIO()
+    Image.new("RGB", (64, 64), "white").save(warmup, "JPEG")
+    await images.process(warmup.getvalue())  # процессы пула стартуют при первой загрузке
+    results = await _measure(f"process pool x{args.workers} (3 sizes x formats)", images.process, photos, args.concurrency)
+    images.stop()
+
+    full = sum(len(data) for data in legacy_results) / len(legacy_results) / 1024
+    print(f"\nbefore: every card and thumbnail downloads the 1920px JPEG: {full:7.1f} KB")
+    info = images.manifest(results[0]["url"])
+    for size in ("thumb", "card", "full"):
+        sizes = []
+        for fmt in info["formats"]:
+            sizes.append(f"{fmt}={os.path.getsize(images.path(info['hash'], size, fmt)) / 1024:7.1f} KB")
+        print(f"after:  {size:<5} {info['sizes'][size]['width']:>4}px  " + "  ".join(sizes))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк платёжного потока против локального fake_payment_gateway.py.
+
+Для каждого «заказа»: Click invoice, Payme receipts.create + receipts.send,
+затем опрос receipts.get до оплаты. Сравнивается последовательный прогон
+(как раньше, когда блокирующий requests.post держал event loop) и
+конкурентный через общий пул app/payments/gateway.py.
+
+  python bench_payments.py --orders 200 --concurrency 50 --latency 0.2
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+sys.path.append(os.getcwd())
+
+
+def _start_gateway(port: int, latency: float, fail_rate: float) -> subprocess.Popen:
+    proc = subprocess.Popen([
+        sys.executable, "fake_payment_gateway.py",
+        "--port", str(port), "--latency", str(latency), "--fail-rate", str(fail_rate),
+    ])
+    for _ in range(100):
+        try:
+            httpx.post(f"http://127.0.0.1:{port}/api", json={}, timeout=1)
+            return proc
+        except httpx.TransportError:
+            time.sleep(0.1)
+    proc.terminate()
+    raise RuntimeError("fake gateway did not start")
+
+
+async def _pay_order(service, order, latencies):
+    started = time.perf_counter()
+    click = await service.create_click_invoice(order, "https://example.com/return")
+    receipt = await service.create_payme_receipt(order)
+    ok = click.get("status") == "success" and receipt.get("status") == "success"
+    if receipt.get("status") == "success":
+        receipt_id = receipt["receipt_id"]
+        await service.send_payme_receipt(receipt_id, order.customer_phone)
+        for _ in range(5):
+            status = await service.check_payme_receipt(receipt_id)
+            if status.get("paid"):
+                break
+        else:
+            ok = False
+    latencies.append(time.perf_counter() - started)
+    return ok
+
+
+async def _run(service, orders, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(order):
+        async with semaphore:
+            return await _pay_order(service, order, latencies)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(one(o) for o in orders))
+    elapsed = time.perf_counter() - started
+    return elapsed, latencies, results.count(True)
+
+
+def _report(title, n, elapsed, latencies, ok):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0
+    print(
+        f"{title:<28} orders={n:<5} ok={ok:<5} total={elapsed:7.2f}s "
+        f"orders/s={n / elapsed:7.1f} p50={statistics.median(latencies) * 1000:7.1f}ms p95={p95 * 1000:7.1f}ms"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--sequential-orders", type=int, default=10, help="заказов в последовательном прогоне")
+    args = parser.parse_args()
+
+    base = f"http://127.0.0.1:{args.port}"
+    os.environ["CLICK_API_URL"] = f"{base}/v2/merchant/invoice/create"
+    os.environ["PAYME_RECEIPTS_API_URL"] = f"{base}/api"
+
+    # Импорт после переопределения URL: config читает их при загрузке
+    from app.orders.models import Order
+    from app.users import models as user_models  # регистрирует TelegramUser для Order.user
+    from app.payments import gateway, service
+
+    proc = _start_gateway(args.port, args.latency, args.fail_rate)
+    try:
+        make = lambda i: Order(id=i, total_price=150000, customer_phone=f"+99890{i:07d}")
+
+        seq_orders = [make(i + 1) for i in range(args.sequential_orders)]
+        elapsed, latencies, ok = await _run(service, seq_orders, 1)
+        _report("sequential (blocking-like)", len(seq_orders), elapsed, latencies, ok)
+
+        orders = [make(i + 1) for i in range(args.orders)]
+        elapsed, latencies, ok = await _run(service, orders, args.concurrency)
+        _report(f"pooled async (c={args.concurrency})", len(orders), elapsed, latencies, ok)
+    finally:
+        await gateway.close_client()
+        proc.terminate()
+        proc.wait()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк поиска на синтетическом каталоге (--products, по умолчанию 50 000 товаров): прежний
+name ILIKE '%q%' против app.search (SQLite — индекс в памяти, PostgreSQL — tsvector + pg_trgm).
+Поисковые колонки и индексы заполняет migrate_product_search.py, как на проде.
+
+По умолчанию — временная SQLite. Для PostgreSQL передайте пустую тестовую БД:
+  python bench_search.py --products 50000 --runs 50
+  python bench_search.py --database-url postgresql://localhost/rich_garden_bench
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.getcwd())
+
+FLOWERS = ["Пион", "Роза", "Тюльпан", "Гортензия", "Хризантема", "Орхидея", "Эустома", "Гвоздика", "Лилия",
+           "Ромашка", "Ранункулюс", "Гипсофила", "Peony", "Rose", "Tulip"]
+ADJECTIVES = ["нежный", "красный", "белый", "розовый", "пышный", "весенний", "авторский", "свадебный",
+              "Premium", "Classic", "Pastel"]
+SHAPES = ["букет", "корзина", "коробка", "композиция", "моно", "микс", "bouquet", "box"]
+CATEGORIES = ["roses", "peonies", "tulips", "mix", "boxes", "baskets", "wedding"]
+
+QUERIES = [
+    ("точное слово", "пион"), ("латиница", "pion"), ("английский", "peony"), ("префикс", "горт"),
+    ("два слова", "белый тюльпан"), ("опечатка", "гортензя"), ("мн. число", "розы"), ("нет совпадений", "кактус"),
+]
+
+
+def _seed(engine, models, count):
+    from sqlalchemy import insert
+    from app.database import Base
+    Base.metadata.create_all(bind=engine)
+    rnd = random.Random(42)
+    rows = []
+    for i in range(count):
+        flower = rnd.choice(FLOWERS)
+        rows.append({
+            "name": f"{rnd.choice(ADJECTIVES)} {flower} {rnd.choice(SHAPES)} №{i}",
+            "category": rnd.choice(CATEGORIES),
+            "description": f"{rnd.randint(5, 101)} шт, {rnd.choice(ADJECTIVES)} {rnd.choice(FLOWERS)}, упаковка крафт",
+            "is_ingredient": False,
+            "views": rnd.randint(0, 1000),
+            "stock_quantity": rnd.randint(0, 5),
+        })
+    with engine.begin() as conn:
+        for start in range(0, count, 5000):
+            conn.execute(insert(models.Product), rows[start:start + 5000])
+
+
+async def _measure(title, fn, runs):
+    timings, found = [], 0
+    for _ in range(runs):
+        started = time.perf_counter()
+        found = len(await fn())
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    print(f"  {title:<34} found={found:>3}  p50={statistics.median(timings) * 1000:7.2f}ms  "
+          f"p95={timings[max(int(runs * 0.95) - 1, 0)] * 1000:7.2f}ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=50000)
+    parser.add_argument("--runs", type=int, default=30)
+    parser.add_argument("--database-url", help="пустая БД для бенчмарка (по умолчанию временная SQLite)")
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{tempfile.mkdtemp()}/bench_search.db"
+
+    from sqlalchemy import select
+    from app import database
+    from app.products import models as product_models, repository as product_repo
+    from app.users import models as user_models  # noqa: F401 (metadata)
+    from app.orders import models as order_models  # noqa: F401 (metadata)
+    from app.search import index, service
+    import migrate_product_search
+
+    print(f"Seeding {args.products} products ...")
+    _seed(database.engine, product_models, args.products)
+    started = time.perf_counter()
+    migrate_product_search.run(batch_size=5000)
+    print(f"migrate_product_search: {time.perf_counter() - started:.1f}s")
+
+    Product = product_models.Product
+    async with database.AsyncSessionLocal() as db:
+        if db.bind.dialect.name != "postgresql":
+            started = time.perf_counter()
+            await index.get_index(db)
+            print(f"индекс в памяти: {len(index._index)} товаров, {len(index._index.postings)} слов, "
+                  f"сборка {time.perf_counter() - started:.2f}s")
+
+        for title, q in QUERIES:
+            print(f"{title}: «{q}»")
+
+            async def legacy():
+                result = await db.execute(
+                    select(*product_repo.CATALOG_COLUMNS).filter(Product.name.ilike(f"%{q}%")).limit(service.SEARCH_RESULTS_LIMIT)
+                )
+                return result.all()
+
+            async def current():
+                return await service.search_products(db, q, track=False)
+
+            async def suggest():
+                return (await service.suggest(db, q[:3]))["products"]
+
+            await _measure("ILIKE '%q%' (прежний)", legacy, args.runs)
+            await _measure("app.search", current, args.runs)
+            await _measure(f"suggest «{q[:3]}»", suggest, args.runs)
+
+    await database.async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк раздачи фото товаров: прежний StaticFiles против CachedStaticFiles
+(app.services.static_files). Витрина из --products товаров, запросы распределены по Zipf —
+хиты продаж запрашиваются чаще всего. Для каждого размера (card WebP — карточка каталога,
+full JPEG — страница товара) меряется requests/sec первого показа (без валидаторов) и
+повторного: прежний mount без Cache-Control заставляет браузер перепроверять фото (If-None-Match
+-> 304), с immutable повторный показ берётся из кэша браузера и на сервер не приходит вовсе.
+
+Приложение вызывается в процессе через ASGI (без сети), так что цифры — стоимость самого
+сервера; фото — производные app.services.images во временном каталоге.
+  python bench_static.py --requests 3000 --concurrency 20 --products 50
+"""
+import argparse
+import asyncio
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.getcwd())
+
+
+def _zipf_indexes(count: int, total: int, seed: int = 1) -> list:
+    weights = [1 / (rank + 1) for rank in range(count)]
+    return random.Random(seed).choices(range(count), weights=weights, k=total)
+
+
+async def _load(client, urls, concurrency, revalidate=None):
+    """requests/sec; revalidate: {url: etag} — повторный показ с If-None-Match."""
+    queue = list(urls)
+    statuses = {}
+
+    async def worker():
+        while queue:
+            url = queue.pop()
+            headers = {"If-None-Match": revalidate[url]} if revalidate else None
+            response = await client.get(url, headers=headers)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return len(urls) / (time.perf_counter() - started), statuses
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--products", type=int, default=50)
+    args = parser.parse_args()
+
+    import httpx
+    from PIL import Image, ImageFilter
+    from starlette.applications import Starlette
+    from starlette.routing import Mount
+    from starlette.staticfiles import StaticFiles
+    from app.services import images, uploads
+    from app.services.static_files import CachedStaticFiles
+
+    static_dir = tempfile.mkdtemp()
+    images_dir = os.path.join(static_dir, "uploads", images.SUBDIR)
+    paths = {"card": [], "full": []}
+    for i in range(args.products):
+        img = Image.merge("RGB", [Image.effect_noise((1600, 1600), 60 + i % 20),
+                                  Image.linear_gradient("L").resize((1600, 1600)),
+                                  Image.effect_noise((1600, 1600), 80)]).filter(ImageFilter.GaussianBlur(3))
+        buffer = io.BytesIO()
+        img.save(buffer, "JPEG", quality=90)
+        manifest = images.render(buffer.getvalue(), images_dir, ["webp", "jpeg"], 82, 55)
+        prefix = f"/static/uploads/{images.SUBDIR}/{uploads.fanout(manifest['hash'])}"
+        paths["card"].append(f"{prefix}-card.webp")
+        paths["full"].append(f"{prefix}-full.jpg")
+
+    mounts = {
+        "StaticFiles (before)": StaticFiles(directory=static_dir),
+        "CachedStaticFiles": CachedStaticFiles(directory=static_dir),
+    }
+    order = _zipf_indexes(args.products, args.requests)
+    for size, urls in paths.items():
+        requests = [urls[i] for i in order]
+        average = sum(os.path.getsize(os.path.join(static_dir, url[len("/static/"):])) for url in urls) / len(urls)
+        print(f"\n{size} ({average / 1024:.1f} KB avg), {args.requests} requests, concurrency {args.concurrency}")
+        for title, mount in mounts.items():
+            app = Starlette(routes=[Mount("/static", app=mount)])
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+                first = await client.get(urls[0])
+                cache_control = first.headers.get("cache-control", "-")
+                await _load(client, urls, args.concurrency)  # прогрев (и LRU)
+                rps, _ = await _load(client, requests, args.concurrency)
+                etags = {url: (await client.get(url)).headers["etag"] for url in urls}
+                revalidate_rps, statuses = await _load(client, requests, args.concurrency, etags)
+            repeat = "0 (served from browser cache)" if "immutable" in cache_control else \
+                f"{args.requests} revalidations, {revalidate_rps:7.0f} req/s, statuses {statuses}"
+            print(f"  {title:<21} first view {rps:7.0f} req/s | repeat view: {repeat}")
+            print(f"  {'':<21} Cache-Control: {cache_control}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
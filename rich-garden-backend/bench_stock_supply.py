@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Нагрузочный тест POST /api/products/{id}/supply: много параллельных поставок одного товара,
+затем проверка, что ни одна не потерялась (остаток = начальный + сумма успешных поставок,
+по строке истории на каждую). Для сравнения --legacy прогоняет прежнюю схему
+(product.stock_quantity += n в Python и commit) теми же параллельными сессиями.
+
+По умолчанию поднимает uvicorn на временной SQLite. Для PostgreSQL или уже запущенного API:
+  python bench_stock_supply.py --requests 500 --concurrency 50
+  python bench_stock_supply.py --database-url postgresql://localhost/rich_garden_bench
+  python bench_stock_supply.py --url http://127.0.0.1:8000
+  python bench_stock_supply.py --legacy
+Поставки идут с cost_price=0, поэтому расходы «Закупка» не создаются. На SQLite при высокой
+конкуренции часть запросов может упасть с «database is locked» — это ошибки, а не потерянные обновления.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+sys.path.append(os.getcwd())
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _wait_ready(client, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/api/products/0")).status_code in (200, 404):
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("API не поднялся")
+
+
+async def _hammer(client, product_id, args):
+    semaphore = asyncio.Semaphore(args.concurrency)
+    timings, errors = [], {}
+
+    async def supply():
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                r = await client.post(f"/api/products/{product_id}/supply",
+                                      json={"quantity": args.quantity, "cost_price": 0})
+                status = r.status_code
+            except httpx.TransportError as e:
+                status = type(e).__name__
+            timings.append(time.perf_counter() - started)
+            if status != 200:
+                errors[status] = errors.get(status, 0) + 1
+            return status == 200
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(supply() for _ in range(args.requests)))
+    elapsed = time.perf_counter() - started
+    timings.sort()
+    print(f"supply x{args.requests} (concurrency {args.concurrency}): {elapsed:.2f}s, "
+          f"{args.requests / elapsed:.0f} req/s, p50={statistics.median(timings) * 1000:.1f}ms, "
+          f"p95={timings[int(len(timings) * 0.95) - 1] * 1000:.1f}ms, errors={errors or 0}")
+    return sum(results)
+
+
+async def run_api(args):
+    server = None
+    url = args.url
+    if not url:
+        port = _free_port()
+        env = dict(os.environ, DATABASE_URL=args.database_url or f"sqlite:///{tempfile.mkdtemp()}/bench_supply.db")
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+            env=env, stdout=subprocess.DEVNULL,
+        )
+        url = f"http://127.0.0.1:{port}"
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=url, timeout=60, limits=limits) as client:
+            await _wait_ready(client)
+            product = (await client.post("/api/products", json={
+                "name": "Bench supply", "category": "flowers", "is_ingredient": True, "stock_quantity": 0,
+            })).json()
+            ok = await _hammer(client, product["id"], args)
+            final = (await client.get(f"/api/products/{product['id']}")).json()
+            await client.delete(f"/api/products/{product['id']}")
+        expected = ok * args.quantity
+        lost = expected - final["stock_quantity"]
+        print(f"успешных поставок {ok}, ожидаемый остаток {expected}, фактический {final['stock_quantity']}, "
+              f"строк истории {len(final['history'])}, version {final.get('version')}")
+        if lost or len(final["history"]) != ok:
+            print(f"FAIL: потеряно обновлений: {lost}")
+            sys.exit(1)
+        print("OK: потерянных обновлений нет")
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+
+async def run_legacy(args):
+    """Прежний update_stock: чтение в Python, += и commit — параллельные сессии затирают друг друга."""
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{tempfile.mkdtemp()}/bench_supply_legacy.db"
+    from app import database
+    from app.products import models, repository
+    from app.users import models as user_models  # noqa: F401 (metadata)
+    from app.orders import models as order_models  # noqa: F401 (metadata)
+
+    database.Base.metadata.create_all(bind=database.engine)
+    async with database.AsyncSessionLocal() as db:
+        product = models.Product(name="Bench legacy", stock_quantity=0)
+        db.add(product)
+        await db.commit()
+        product_id = product.id
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def supply():
+        async with semaphore:
+            async with database.AsyncSessionLocal() as db:
+                try:
+                    stock = (await repository.get_stock(db, [product_id]))[product_id]
+                    await asyncio.sleep(0)  # другие запросы успевают прочитать тот же остаток
+                    await db.execute(
+                        models.Product.__table__.update()
+                        .where(models.Product.id == product_id)
+                        .values(stock_quantity=stock + args.quantity)
+                    )
+                    await db.commit()
+                    return True
+                except Exception:
+                    return False
+
+    ok = sum(await asyncio.gather(*(supply() for _ in range(args.requests))))
+    async with database.AsyncSessionLocal() as db:
+        final = (await repository.get_stock(db, [product_id]))[product_id]
+    await database.async_engine.dispose()
+    print(f"legacy: успешных поставок {ok}, ожидаемый остаток {ok * args.quantity}, фактический {final}, "
+          f"потеряно {ok * args.quantity - final}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--quantity", type=int, default=3)
+    parser.add_argument("--url", help="уже запущенный API (товар создаётся и удаляется)")
+    parser.add_argument("--database-url", help="пустая БД для бенчмарка (по умолчанию временная SQLite)")
+    parser.add_argument("--legacy", action="store_true", help="прежняя схема += в Python, без HTTP")
+    args = parser.parse_args()
+    asyncio.run(run_legacy(args) if args.legacy else run_api(args))
+
+
+if __name__ == "__main__":
+    main()
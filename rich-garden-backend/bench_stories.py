@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк историй: количество SQL-запросов и задержка stories.repository.get_all/get_by_id
+против старой схемы (COUNT + EXISTS на каждую историю, 2N+1 запросов), а также
+статистики зрителей get_stats/get_aggregates против старой (поиск TelegramUser на каждого зрителя).
+
+По умолчанию — временная SQLite. Для PostgreSQL передайте пустую тестовую БД:
+  python bench_stories.py --stories 50 --views 100000
+  python bench_stories.py --database-url postgresql://localhost/rich_garden_bench
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.getcwd())
+
+
+async def _legacy_get_all(db, models, user_id):
+    from sqlalchemy import select, func
+    result = await db.execute(
+        select(models.Story).filter(models.Story.is_active == True).order_by(models.Story.created_at.desc()).limit(100)
+    )
+    stories = result.scalars().all()
+    for story in stories:
+        count = await db.execute(select(func.count(models.StoryView.id)).filter(models.StoryView.story_id == story.id))
+        story.views_count = count.scalar() or 0
+        viewed = await db.execute(select(models.StoryView.id).filter(
+            models.StoryView.story_id == story.id, models.StoryView.user_id == user_id
+        ))
+        story.is_viewed_by_me = viewed.first() is not None
+    return stories
+
+
+async def _legacy_get_stats(db, models, story_id):
+    from sqlalchemy import select
+    from app.users import models as user_models
+    result = await db.execute(
+        select(models.StoryView).filter(models.StoryView.story_id == story_id).order_by(models.StoryView.viewed_at.desc())
+    )
+    viewers = []
+    for v in result.scalars().all():
+        user_result = await db.execute(
+            select(user_models.TelegramUser).filter(user_models.TelegramUser.telegram_id == v.user_id)
+        )
+        user = user_result.scalars().first()
+        viewers.append((v.user_id, user.first_name if user else None, v.viewed_at))
+    return viewers
+
+
+def _seed(engine, models, stories, views):
+    from sqlalchemy import insert
+    from app.database import Base
+    Base.metadata.create_all(bind=engine)
+    now = datetime.utcnow()
+    per_story = views // stories
+    with engine.begin() as conn:
+        conn.execute(insert(models.Story), [
+            {"title": f"Story {i}", "thumbnail_url": "/t.jpg", "content_url": "/c.jpg",
+             "created_at": now - timedelta(hours=i), "is_active": True}
+            for i in range(stories)
+        ])
+        story_ids = [r[0] for r in conn.exec_driver_sql("SELECT id FROM stories ORDER BY id")]
+        batch = []
+        for story_id in story_ids:
+            for user in range(per_story):
+                batch.append({"story_id": story_id, "user_id": 10_000_000 + user,
+                              "viewed_at": now - timedelta(seconds=random.randint(0, 7 * 86400))})
+                if len(batch) >= 10000:
+                    conn.execute(insert(models.StoryView), batch)
+                    batch = []
+        if batch:
+            conn.execute(insert(models.StoryView), batch)
+    return story_ids
+
+
+async def _measure(title, fn, counter, runs):
+    timings, queries = [], []
+    for _ in range(runs):
+        counter["n"] = 0
+        started = time.perf_counter()
+        await fn()
+        timings.append(time.perf_counter() - started)
+        queries.append(counter["n"])
+    print(f"{title:<34} queries/call={statistics.median(queries):>5.0f}  "
+          f"p50={statistics.median(timings) * 1000:8.1f}ms  max={max(timings) * 1000:8.1f}ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stories", type=int, default=50)
+    parser.add_argument("--views", type=int, default=100_000)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--database-url", help="пустая БД для бенчмарка (по умолчанию временная SQLite)")
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{tempfile.mkdtemp()}/bench_stories.db"
+
+    from sqlalchemy import event
+    from app import database
+    from app.stories import models as story_models, repository
+    from app.users import models as user_models  # noqa: F401 (metadata)
+
+    print(f"Seeding {args.stories} stories x {args.views} views ...")
+    story_ids = _seed(database.engine, story_models, args.stories, args.views)
+
+    counter = {"n": 0}
+
+    def count_query(*_):
+        counter["n"] += 1
+
+    event.listen(database.async_engine.sync_engine, "before_cursor_execute", count_query)
+    viewer = 10_000_005
+
+    async with database.AsyncSessionLocal() as db:
+        async def legacy():
+            db.expunge_all()
+            await _legacy_get_all(db, story_models, viewer)
+
+        async def current():
+            db.expunge_all()
+            await repository.get_all(db, user_id=viewer)
+
+        async def current_by_id():
+            db.expunge_all()
+            await repository.get_by_id(db, story_ids[0], user_id=viewer)
+
+        await _measure("legacy get_all (2N+1)", legacy, counter, args.runs)
+        await _measure("get_all (single query)", current, counter, args.runs)
+        await _measure("get_by_id (single query)", current_by_id, counter, args.runs)
+
+        async def legacy_stats():
+            db.expunge_all()
+            await _legacy_get_stats(db, story_models, story_ids[0])
+
+        async def stats_page():
+            db.expunge_all()
+            await repository.get_stats(db, story_ids[0], limit=100)
+
+        async def aggregates():
+            db.expunge_all()
+            await repository.get_aggregates(db, story_ids[0])
+
+        await _measure("legacy get_stats (N+1, all)", legacy_stats, counter, max(1, args.runs // 5))
+        await _measure("get_stats (joined, 100/page)", stats_page, counter, args.runs)
+        await _measure("get_aggregates (rollups)", aggregates, counter, args.runs)
+
+    await database.async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк исходящих запросов в Telegram против fake_telegram_api.py.
+
+Сравнивает старое поведение (новый httpx.AsyncClient, а значит новое
+соединение/TLS-рукопожатие, на каждое сообщение) с общим клиентом
+app/services/telegram_client.py:
+  - рассылка send_broadcast_message на N пользователей (20 параллельно, как в send_broadcast)
+  - задержка send_order_notification + update_order_status_message
+
+  python bench_telegram.py --users 1000 --orders 50 --latency 0.05 --tls
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+sys.path.append(os.getcwd())
+
+
+def _make_cert(directory: str):
+    cert = os.path.join(directory, "cert.pem")
+    key = os.path.join(directory, "key.pem")
+    subprocess.run([
+        "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+        "-subj", "/CN=127.0.0.1", "-addext", "subjectAltName=IP:127.0.0.1",
+        "-keyout", key, "-out", cert,
+    ], check=True, capture_output=True)
+    return cert, key
+
+
+def _start_server(port: int, latency: float, cert: str | None, key: str | None) -> subprocess.Popen:
+    cmd = [sys.executable, "fake_telegram_api.py", "--port", str(port), "--latency", str(latency)]
+    if cert:
+        cmd += ["--ssl-certfile", cert, "--ssl-keyfile", key]
+    proc = subprocess.Popen(cmd)
+    scheme = "https" if cert else "http"
+    for _ in range(100):
+        try:
+            httpx.get(f"{scheme}://127.0.0.1:{port}/stats", timeout=1, verify=cert or True)
+            return proc
+        except httpx.TransportError:
+            time.sleep(0.1)
+    proc.terminate()
+    raise RuntimeError("fake telegram api did not start")
+
+
+class PerCallClients:
+    """Подменяет telegram_client.get_client: новый клиент на каждый вызов (как было раньше)."""
+
+    def __init__(self, verify):
+        self.verify = verify
+        self.clients = {}
+
+    def __call__(self):
+        client = httpx.AsyncClient(timeout=30, verify=self.verify)
+        self.clients.setdefault(asyncio.current_task(), []).append(client)
+        return client
+
+    async def close(self):
+        # закрываем клиенты текущей задачи (в старом коде это делал async with)
+        for client in self.clients.pop(asyncio.current_task(), []):
+            await client.aclose()
+
+
+async def _server_stats(base, verify, reset=False):
+    async with httpx.AsyncClient(verify=verify) as client:
+        if reset:
+            await client.post(f"{base}/stats/reset")
+            return None
+        return (await client.get(f"{base}/stats")).json()
+
+
+async def _broadcast(telegram, users, per_call):
+    semaphore = asyncio.Semaphore(20)
+
+    async def one(telegram_id):
+        async with semaphore:
+            try:
+                return await telegram.send_broadcast_message(telegram_id, "Бенчмарк рассылки")
+            finally:
+                if per_call:
+                    await per_call.close()
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(one(100000 + i) for i in range(users)))
+    return time.perf_counter() - started, results.count(True)
+
+
+async def _notifications(telegram, orders, per_call):
+    latencies = []
+    for i in range(orders):
+        order = {
+            "id": i + 1, "customer_name": "Бенчмарк", "customer_phone": "+998901234567",
+            "total_price": 350000, "status": "new", "payment_method": "cash",
+        }
+        started = time.perf_counter()
+        message_id = await telegram.send_order_notification(order, "Букет x1")
+        await telegram.update_order_status_message(message_id, {**order, "status": "processing"}, "Букет x1")
+        latencies.append(time.perf_counter() - started)
+        if per_call:
+            await per_call.close()
+    return latencies
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--orders", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--port", type=int, default=9200)
+    parser.add_argument("--tls", action="store_true", help="self-signed HTTPS (нужен openssl), чтобы учесть рукопожатие TLS")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    cert = key = None
+    if args.tls:
+        cert, key = _make_cert(tmp)
+        # общий клиент создаётся с настройками по умолчанию — доверяем self-signed через env
+        os.environ["SSL_CERT_FILE"] = cert
+    scheme = "https" if args.tls else "http"
+    base = f"{scheme}://127.0.0.1:{args.port}"
+    os.environ["TELEGRAM_API_BASE"] = base
+    verify = cert or True
+
+    from app.services import telegram, telegram_client
+
+    # Токены из .env не нужны: запросы уходят только на локальный mock
+    telegram.TELEGRAM_BOT_TOKEN = "bench"
+    telegram.TELEGRAM_GROUP_BOT_TOKEN = "bench"
+    telegram.TELEGRAM_GROUP_ID = "-1"
+
+    proc = _start_server(args.port, args.latency, cert, key)
+    shared_get_client = telegram_client.get_client
+    try:
+        for title, per_call in (("per-call client (old)", PerCallClients(verify)), ("shared client", None)):
+            telegram_client.get_client = per_call or shared_get_client
+
+            await _server_stats(base, verify, reset=True)
+            elapsed, ok = await _broadcast(telegram, args.users, per_call)
+            conns = (await _server_stats(base, verify))["connections"]
+            print(f"broadcast      {title:<22} users={args.users:<6} ok={ok:<6} total={elapsed:6.2f}s "
+                  f"msg/s={args.users / elapsed:7.1f} tcp_connections={conns}")
+
+            await _server_stats(base, verify, reset=True)
+            latencies = await _notifications(telegram, args.orders, per_call)
+            conns = (await _server_stats(base, verify))["connections"]
+            latencies.sort()
+            print(f"notification   {title:<22} orders={args.orders:<5} p50={statistics.median(latencies) * 1000:7.1f}ms "
+                  f"p95={latencies[int(len(latencies) * 0.95) - 1] * 1000:7.1f}ms tcp_connections={conns}")
+    finally:
+        telegram_client.get_client = shared_get_client
+        await telegram_client.close_client()
+        proc.terminate()
+        proc.wait()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
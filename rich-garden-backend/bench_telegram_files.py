@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк уведомлений о заказе с фото против fake_telegram_api.py: каждое фото загружается
+байтами (как было) против кэша file_id (app.telegram_files). Считает байты, ушедшие в Telegram,
+и задержку send_order_notification для заказа из одного букета и для коллажа.
+
+Фото — временные файлы в app/static/uploads (удаляются в конце), кэш — во временной SQLite.
+  python bench_telegram_files.py --orders 30 --photos 4 --latency 0.05
+"""
+import argparse
+import asyncio
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.getcwd())
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=30)
+    parser.add_argument("--photos", type=int, default=4, help="фото в коллаже")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--port", type=int, default=9201)
+    args = parser.parse_args()
+
+    base = f"http://127.0.0.1:{args.port}"
+    os.environ["TELEGRAM_API_BASE"] = base
+    os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench_telegram_files.db"
+
+    import httpx
+    from PIL import Image
+    from bench_telegram import _start_server
+    from app import database
+    from app.services import telegram, telegram_client, uploads
+    from app.telegram_files import models as telegram_file_models  # noqa: F401 (metadata)
+    from app.telegram_files import service as telegram_files
+
+    database.Base.metadata.create_all(bind=database.engine)
+    telegram.TELEGRAM_GROUP_BOT_TOKEN = "1000:bench"
+    telegram.TELEGRAM_GROUP_ID = "-1"
+
+    # Фото как после upload_file: JPEG ~1-1.5 MB (шум плохо сжимается, как реальные снимки)
+    urls = []
+    for _ in range(args.photos):
+        buffer = io.BytesIO()
+        Image.effect_noise((1200, 1200), 64).convert("RGB").save(buffer, "JPEG", quality=90)
+        urls.append(await uploads.store(buffer.getvalue(), "jpg"))
+
+    async def run(title, images, cached):
+        async with httpx.AsyncClient() as stats_client:
+            await stats_client.post(f"{base}/stats/reset")
+            latencies = []
+            for i in range(args.orders):
+                if not cached:
+                    telegram_files._cache.clear()
+                    async with database.AsyncSessionLocal() as db:
+                        async with database.unit_of_work(db):
+                            await db.execute(telegram_file_models.TelegramFile.__table__.delete())
+                order = {"id": i + 1, "customer_name": "Бенчмарк", "total_price": 350000, "status": "new"}
+                started = time.perf_counter()
+                await telegram.send_order_notification(order, "Букет x1", images=images)
+                latencies.append(time.perf_counter() - started)
+            stats = (await stats_client.get(f"{base}/stats")).json()
+        latencies.sort()
+        print(f"{title:<30} p50={statistics.median(latencies) * 1000:7.1f}ms  "
+              f"p95={latencies[max(int(len(latencies) * 0.95) - 1, 0)] * 1000:7.1f}ms  "
+              f"sent={stats['bytes'] / args.orders / 1024:8.1f} KB/order  uploads={stats['uploads']}")
+
+    proc = _start_server(args.port, args.latency, None, None)
+    try:
+        await run("1 photo: upload every time", urls[:1], cached=False)
+        await run("1 photo: file_id cache", urls[:1], cached=True)
+        await run(f"{args.photos} photos: upload every time", urls, cached=False)
+        await run(f"{args.photos} photos: file_id cache", urls, cached=True)
+    finally:
+        await telegram_client.close_client()
+        proc.terminate()
+        proc.wait()
+        for url in urls:
+            path = uploads.resolve(url)
+            os.remove(path)
+            for directory in (os.path.dirname(path), os.path.dirname(os.path.dirname(path))):
+                try:
+                    os.rmdir(directory)  # пустые каталоги ab/cd
+                except OSError:
+                    break
+        await database.async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
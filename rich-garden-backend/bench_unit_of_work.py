@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк unit of work: поставка, удаление товара и создание заказа. Прежняя схема — те же
+функции репозиториев с commit после каждого вызова (как было до app.database.unit_of_work)
+против сервисов, где вся операция — одна транзакция и один commit.
+
+По умолчанию — временная SQLite (файл, commit = fsync). Для PostgreSQL передайте пустую тестовую БД:
+  python bench_unit_of_work.py --runs 200
+  python bench_unit_of_work.py --database-url postgresql://localhost/rich_garden_bench
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.getcwd())
+
+
+def _seed(engine, models, user_models, runs):
+    """Ингредиент для поставок, runs товаров под удаление (с историей и просмотрами) и клиент."""
+    from sqlalchemy import insert
+    from app.database import Base
+    Base.metadata.create_all(bind=engine)
+    now = datetime.datetime.now().isoformat()
+    with engine.begin() as conn:
+        conn.execute(insert(models.Product), [
+            {"id": 1, "name": "Bench rose", "is_ingredient": True, "stock_quantity": 0},
+        ] + [
+            {"id": 100 + i, "name": f"Bench delete {i}", "is_ingredient": False, "stock_quantity": 0}
+            for i in range(runs * 2)
+        ])
+        conn.execute(insert(models.ProductHistory), [
+            {"product_id": 100 + i, "action": "income", "quantity": 1, "date": now}
+            for i in range(runs * 2) for _ in range(3)
+        ])
+        conn.execute(insert(user_models.TelegramUser), [{"id": 1, "telegram_id": 1, "first_name": "Bench"}])
+        conn.execute(insert(user_models.RecentlyViewed), [
+            {"user_id": 1, "product_id": 100 + i} for i in range(runs * 2)
+        ])
+
+
+async def _measure(title, fn, counter, runs):
+    timings, queries, commits = [], [], []
+    for i in range(runs):
+        counter["n"] = counter["commits"] = 0
+        started = time.perf_counter()
+        await fn(i)
+        timings.append(time.perf_counter() - started)
+        queries.append(counter["n"])
+        commits.append(counter["commits"])
+    print(f"{title:<28} queries={statistics.median(queries):>4.0f}  commits={statistics.median(commits):>3.0f}  "
+          f"p50={statistics.median(timings) * 1000:7.2f}ms  p95={sorted(timings)[int(runs * 0.95) - 1] * 1000:7.2f}ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=100)
+    parser.add_argument("--database-url", help="пустая БД для бенчмарка (по умолчанию временная SQLite)")
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{tempfile.mkdtemp()}/bench_uow.db"
+
+    from sqlalchemy import event, delete as sql_delete
+    from app import database
+    from app.products import models as product_models, repository as product_repo, schemas as product_schemas
+    from app.products import service as product_service
+    from app.expenses import repository as expense_repo, schemas as expense_schemas
+    from app.orders import repository as order_repo, schemas as order_schemas, service as order_service
+    from app.users import models as user_models
+    from app.outbox import service as outbox_service
+
+    _seed(database.engine, product_models, user_models, args.runs)
+
+    counter = {"n": 0, "commits": 0}
+
+    def count_query(*_):
+        counter["n"] += 1
+
+    def count_commit(*_):
+        counter["commits"] += 1
+
+    event.listen(database.async_engine.sync_engine, "before_cursor_execute", count_query)
+    event.listen(database.async_engine.sync_engine, "commit", count_commit)
+    outbox_service.wake = lambda: None  # воркер не запущен
+
+    supply = product_schemas.ProductSupply(quantity=5, cost_price=1000, supplier="Bench")
+    items = json.dumps([{"id": 1, "name": "Bench rose", "quantity": 1, "price": 1000}])
+    order_in = order_schemas.OrderCreate(
+        customer_name="Гость", customer_phone="", total_price=1000, items=items, payment_method="cash", telegram_id=1,
+    )
+
+    async with database.AsyncSessionLocal() as db:
+
+        async def legacy_supply(_):
+            db.expunge_all()
+            product = await product_repo.get_by_id(db, 1)
+            await product_repo.update_stock(db, product, supply.quantity)
+            await db.commit()
+            await db.refresh(product)
+            await product_repo.add_history(db, product.id, "income", supply.quantity, datetime.datetime.now().isoformat())
+            await db.commit()
+            expense = await expense_repo.create(db, expense_schemas.ExpenseCreate(
+                amount=supply.quantity * supply.cost_price, category="Закупка",
+                note=f"Поставка: {product.name}", date=datetime.datetime.now(),
+            ))
+            await db.commit()
+            await db.refresh(expense)
+
+        async def current_supply(_):
+            db.expunge_all()
+            await product_service.supply_product(db, 1, supply)
+
+        async def legacy_delete(i):
+            db.expunge_all()
+            product_id = 100 + i
+            await product_repo.get_by_id(db, product_id)
+            await db.execute(sql_delete(user_models.RecentlyViewed).where(user_models.RecentlyViewed.product_id == product_id))
+            await db.commit()
+            await product_repo.delete_product_history(db, product_id)
+            await db.commit()
+            await product_repo.delete(db, product_id)
+            await db.commit()
+
+        async def current_delete(i):
+            db.expunge_all()
+            await product_service.delete_product(db, 100 + args.runs + i)
+
+        async def legacy_order(_):
+            db.expunge_all()
+            db_order = await order_repo.create(db, order_in)
+            await db.commit()
+            await order_service.queue_new_order_notification(db, db_order, order_in.telegram_id)
+            await db.commit()
+
+        async def current_order(_):
+            db.expunge_all()
+            await order_service.create_order(db, order_in)
+
+        await _measure("supply: per-call commits", legacy_supply, counter, args.runs)
+        await _measure("supply: unit of work", current_supply, counter, args.runs)
+        await _measure("delete: per-call commits", legacy_delete, counter, args.runs)
+        await _measure("delete: unit of work", current_delete, counter, args.runs)
+        await _measure("order: per-call commits", legacy_order, counter, args.runs)
+        await _measure("order: unit of work", current_order, counter, args.runs)
+
+    await database.async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк просмотров карточек (POST /api/user/{tg}/recent/{pid}): прежняя схема — на каждый тап
+поиск товара, UPDATE views + 1, пользователь с адресами, поиск recently_viewed и commit —
+против write-behind буфера app.counters (тап — только счётчик в памяти, запись — один flush).
+Параллельные тапы идут через --concurrency сессий; в конце сверяется сумма views (ничего не потеряно).
+
+По умолчанию — временная SQLite. Для PostgreSQL передайте пустую тестовую БД:
+  python bench_views.py --taps 5000 --concurrency 20
+  python bench_views.py --database-url postgresql://localhost/rich_garden_bench
+"""
+import argparse
+import asyncio
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.getcwd())
+
+
+def _seed(engine, models, user_models, products, users):
+    from sqlalchemy import insert
+    from app.database import Base
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(models.Product), [
+            {"id": i, "name": f"Bench {i}", "is_ingredient": False, "views": 0, "stock_quantity": 1}
+            for i in range(1, products + 1)
+        ])
+        conn.execute(insert(user_models.TelegramUser), [
+            {"id": i, "telegram_id": 1000 + i, "first_name": f"Bench {i}"} for i in range(1, users + 1)
+        ])
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--taps", type=int, default=2000)
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--database-url", help="пустая БД для бенчмарка (по умолчанию временная SQLite)")
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{tempfile.mkdtemp()}/bench_views.db"
+
+    from sqlalchemy import event, func, select, update as sql_update
+    from app import database
+    from app.products import models as product_models, repository as product_repo
+    from app.users import models as user_models, repository as user_repo
+    from app.orders import models as order_models  # noqa: F401 (metadata)
+    from app.search import models as search_models  # noqa: F401 (metadata)
+    from app.counters import service as counters_service
+
+    _seed(database.engine, product_models, user_models, args.products, args.users)
+
+    counter = {"n": 0, "commits": 0}
+
+    def count_query(*_):
+        counter["n"] += 1
+
+    def count_commit(*_):
+        counter["commits"] += 1
+
+    event.listen(database.async_engine.sync_engine, "before_cursor_execute", count_query)
+    event.listen(database.async_engine.sync_engine, "commit", count_commit)
+
+    rnd = random.Random(42)
+    taps = [(1000 + rnd.randint(1, args.users), rnd.randint(1, args.products)) for _ in range(args.taps)]
+    Product = product_models.Product
+
+    async def legacy_tap(db, telegram_id, product_id):
+        product = await product_repo.get_by_id(db, product_id)
+        await db.execute(
+            sql_update(Product).where(Product.id == product.id)
+            .values(views=func.coalesce(Product.views, 0) + 1).execution_options(synchronize_session=False)
+        )
+        user = await user_repo.get_by_telegram_id(db, telegram_id)
+        result = await db.execute(select(user_models.RecentlyViewed).filter(
+            user_models.RecentlyViewed.user_id == user.id,
+            user_models.RecentlyViewed.product_id == product_id,
+        ))
+        recent = result.scalars().first()
+        if recent:
+            recent.viewed_at = datetime.datetime.now()
+        else:
+            db.add(user_models.RecentlyViewed(user_id=user.id, product_id=product_id))
+        await db.commit()
+
+    async def legacy_worker(chunk):
+        async with database.AsyncSessionLocal() as db:
+            for telegram_id, product_id in chunk:
+                db.expunge_all()
+                try:
+                    await legacy_tap(db, telegram_id, product_id)
+                except Exception:
+                    # SQLite: database is locked при параллельной записи — тап теряется, как и раньше
+                    await db.rollback()
+
+    async def current_worker(chunk):
+        for telegram_id, product_id in chunk:
+            counters_service.add_view(product_id, telegram_id)
+            await asyncio.sleep(0)
+
+    async def total_views():
+        async with database.AsyncSessionLocal() as db:
+            return (await db.execute(select(func.coalesce(func.sum(Product.views), 0)))).scalar()
+
+    async def run(title, worker, flush):
+        before = await total_views()
+        counter["n"] = counter["commits"] = 0
+        chunks = [taps[i::args.concurrency] for i in range(args.concurrency)]
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(chunk) for chunk in chunks))
+        tapped = time.perf_counter() - started
+        if flush:
+            await counters_service.flush()
+        elapsed = time.perf_counter() - started
+        lost = args.taps - (await total_views() - before)
+        print(f"{title:<24} taps/s={args.taps / tapped:>10.0f}  total={elapsed * 1000:8.1f}ms  "
+              f"queries={counter['n']:>6}  commits={counter['commits']:>5}  lost={lost}")
+
+    await run("per-tap commit", legacy_worker, flush=False)
+    await run("write-behind + flush", current_worker, flush=True)
+
+    await database.async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Локальный fake-шлюз Click / Payme для офлайн-проверки и бенчмарка оплаты.
+
+Эмулирует:
+  POST /v2/merchant/invoice/create  — Click: выставление счёта по номеру
+  POST /api                         — Payme Subscribe API: receipts.create / receipts.send / receipts.get
+
+Запуск:
+  python fake_payment_gateway.py --port 9100 --latency 0.2 --fail-rate 0.05
+
+Backend направляется на него через .env:
+  CLICK_API_URL=http://127.0.0.1:9100/v2/merchant/invoice/create
+  PAYME_RECEIPTS_API_URL=http://127.0.0.1:9100/api
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+LATENCY = float(os.getenv("FAKE_GATEWAY_LATENCY", "0.2"))
+FAIL_RATE = float(os.getenv("FAKE_GATEWAY_FAIL_RATE", "0"))
+
+app = FastAPI(title="Fake Payment Gateway")
+
+_invoice_ids = itertools.count(1000)
+# receipt_id -> {"amount", "order_id", "state", "checks"}
+_receipts = {}
+
+
+async def _simulate_network():
+    # Небольшой разброс, чтобы запросы не приходили «ступенькой»
+    await asyncio.sleep(LATENCY * random.uniform(0.8, 1.2))
+    if FAIL_RATE and random.random() < FAIL_RATE:
+        return JSONResponse({"error": "temporarily unavailable"}, status_code=503)
+    return None
+
+
+@app.post("/v2/merchant/invoice/create")
+async def click_invoice_create(request: Request):
+    failed = await _simulate_network()
+    if failed:
+        return failed
+    if not request.headers.get("Auth"):
+        return {"error_code": -1, "error_note": "Auth header missing"}
+    body = await request.json()
+    phone = str(body.get("phone_number") or "")
+    if phone.endswith("0000000"):
+        return {"error_code": -500, "error_note": "Клиент не является пользователем Click"}
+    return {"error_code": 0, "error_note": "Успешно", "invoice_id": next(_invoice_ids)}
+
+
+@app.post("/api")
+async def payme_rpc(request: Request):
+    failed = await _simulate_network()
+    if failed:
+        return failed
+    body = await request.json()
+    rpc_id = body.get("id")
+    method = body.get("method")
+    params = body.get("params") or {}
+
+    if not request.headers.get("X-Auth"):
+        return {"jsonrpc": "2.0", "id": rpc_id, "error": {"code": -32504, "message": "Insufficient privilege"}}
+
+    if method == "receipts.create":
+        receipt_id = uuid.uuid4().hex[:24]
+        _receipts[receipt_id] = {
+            "amount": params.get("amount"),
+            "order_id": (params.get("account") or {}).get("order_id"),
+            "state": 0,
+            "checks": 0,
+        }
+        return {"jsonrpc": "2.0", "id": rpc_id, "result": {"receipt": {"_id": receipt_id, "state": 0, "amount": params.get("amount")}}}
+
+    receipt_id = params.get("id")
+    receipt = _receipts.get(receipt_id)
+    if receipt is None:
+        return {"jsonrpc": "2.0", "id": rpc_id, "error": {"code": -31602, "message": "Receipt not found"}}
+
+    if method == "receipts.send":
+        return {"jsonrpc": "2.0", "id": rpc_id, "result": {"success": True}}
+
+    if method == "receipts.get":
+        # Чек «оплачивается» со второй проверки статуса
+        receipt["checks"] += 1
+        if receipt["checks"] >= 2:
+            receipt["state"] = 4
+        return {"jsonrpc": "2.0", "id": rpc_id, "result": {"receipt": {"_id": receipt_id, "state": receipt["state"], "amount": receipt["amount"]}}}
+
+    return {"jsonrpc": "2.0", "id": rpc_id, "error": {"code": -32601, "message": "Method not found"}}
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Fake Click/Payme gateway")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", type=float, default=LATENCY, help="задержка ответа, сек")
+    parser.add_argument("--fail-rate", type=float, default=FAIL_RATE, help="доля ответов 503")
+    args = parser.parse_args()
+    LATENCY = args.latency
+    FAIL_RATE = args.fail_rate
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
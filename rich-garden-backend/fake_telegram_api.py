@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Локальный mock Telegram Bot API для офлайн-проверки уведомлений и рассылок.
+
+Отвечает {"ok": true, ...} на POST /bot<token>/<method> (sendMessage, sendPhoto,
+sendMediaGroup, editMessageCaption, editMessageText, ...). Считает входящие
+TCP-соединения, чтобы было видно переиспользование keep-alive, и байты запросов.
+На загруженные фото выдаёт file_id, повторная отправка по file_id возвращает его же.
+
+Запуск:
+  python fake_telegram_api.py --port 9200 --latency 0.05
+  python fake_telegram_api.py --port 9200 --ssl-certfile cert.pem --ssl-keyfile key.pem
+
+Backend направляется на него через .env:
+  TELEGRAM_API_BASE=http://127.0.0.1:9200
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+
+from fastapi import FastAPI, Request
+
+LATENCY = float(os.getenv("FAKE_TELEGRAM_LATENCY", "0.05"))
+
+app = FastAPI(title="Fake Telegram Bot API")
+
+_message_ids = itertools.count(1)
+_file_ids = itertools.count(1)
+_connections = set()
+_stats = {"requests": 0, "bytes": 0, "uploads": 0}
+
+
+def _photo(value) -> dict:
+    """Сообщение с фото: загруженный файл получает новый file_id, строка — это уже file_id."""
+    if isinstance(value, str) and not value.startswith("attach://"):
+        file_id = value
+    else:
+        _stats["uploads"] += 1
+        file_id = f"fake-file-{next(_file_ids)}"
+    return {"message_id": next(_message_ids), "photo": [{"file_id": f"{file_id}-thumb"}, {"file_id": file_id}]}
+
+
+@app.post("/bot{token}/{method}")
+async def bot_method(token: str, method: str, request: Request):
+    _stats["requests"] += 1
+    client = request.scope.get("client")
+    if client:
+        _connections.add(tuple(client))
+    body = await request.body()
+    _stats["bytes"] += len(body)
+    await asyncio.sleep(LATENCY * random.uniform(0.8, 1.2))
+
+    if method in ("sendPhoto", "sendMediaGroup"):
+        form = await request.form()
+        if method == "sendPhoto":
+            return {"ok": True, "result": _photo(form.get("photo"))}
+        media = json.loads(form.get("media") or "[]")
+        return {"ok": True, "result": [_photo(item.get("media")) for item in media]}
+    if method.startswith("edit"):
+        return {"ok": True, "result": True}
+    return {"ok": True, "result": {"message_id": next(_message_ids)}}
+
+
+@app.get("/stats")
+async def stats():
+    return {**_stats, "connections": len(_connections)}
+
+
+@app.post("/stats/reset")
+async def reset_stats():
+    _stats.update(requests=0, bytes=0, uploads=0)
+    _connections.clear()
+    return {"ok": True}
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Fake Telegram Bot API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9200)
+    parser.add_argument("--latency", type=float, default=LATENCY, help="задержка ответа, сек")
+    parser.add_argument("--ssl-certfile")
+    parser.add_argument("--ssl-keyfile")
+    args = parser.parse_args()
+    LATENCY = args.latency
+    uvicorn.run(
+        app, host=args.host, port=args.port, log_level="warning",
+        ssl_certfile=args.ssl_certfile, ssl_keyfile=args.ssl_keyfile,
+    )
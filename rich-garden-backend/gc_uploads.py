@@ -0,0 +1,45 @@
+"""
+Сборка мусора в хранилище загрузок (app.stored_files.service.collect).
+1) пересчитывает stored_files.refcount по всем колонкам с URL файлов (товары, баннеры,
+   истории, фото сотрудников и клиентов, заказы);
+2) удаляет файлы с адресацией по содержимому (ab/cd/<hash>.*, img/ab/cd/<hash>-*), на которые
+   нет ссылок и которые не трогали дольше --grace-hours (по умолчанию UPLOAD_GC_GRACE_HOURS=24);
+3) с --legacy — ещё и старые файлы (uuid4.jpg, avatars/...) без ссылок из БД. Осторожно: на них
+   могут ссылаться уже отправленные сообщения Telegram и закэшированные страницы.
+Запуск: cd /var/www/rich-garden/rich-garden-backend && python gc_uploads.py --dry-run
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+# гарантируем загрузку .env из директории бэкенда
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import database
+from app.stored_files import models as stored_file_models  # noqa: F401 (metadata)
+from app.stored_files import service as stored_files
+
+
+async def run(args):
+    database.Base.metadata.create_all(bind=database.engine, tables=[stored_file_models.StoredFile.__table__])
+    try:
+        async with database.AsyncSessionLocal() as db:
+            stats = await stored_files.collect(db, args.grace_hours, args.dry_run, args.legacy)
+    finally:
+        await database.async_engine.dispose()
+    prefix = "DRY RUN: " if args.dry_run else ""
+    print(f"{prefix}files={stats['files']} hashes={stats['hashes']} referenced={stats['referenced']}")
+    print(f"{prefix}deleted {stats['deleted_files']} files ({stats['deleted_hashes']} hashes), "
+          f"freed {stats['freed_bytes'] / 1024 / 1024:.1f} MB")
+
+
+if __name__ == "__main__":
+    if not os.getenv("DATABASE_URL"):
+        print("ERROR: DATABASE_URL не задан (проверьте .env)")
+        sys.exit(1)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="только посчитать, ничего не удалять")
+    parser.add_argument("--grace-hours", type=float, default=stored_files.UPLOAD_GC_GRACE_HOURS)
+    parser.add_argument("--legacy", action="store_true", help="удалять и старые файлы без ссылок")
+    asyncio.run(run(parser.parse_args()))
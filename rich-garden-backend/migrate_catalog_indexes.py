@@ -0,0 +1,29 @@
+"""
+Миграция: индекс витрины ix_products_category_lower по lower(category) — фильтр каталога
+по категории без учёта регистра (вместо ILIKE, который B-tree индекс не использует).
+Запуск: cd /var/www/rich-garden/rich-garden-backend && python migrate_catalog_indexes.py
+"""
+import os
+import sys
+
+# гарантируем загрузку .env из директории бэкенда
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.database import engine
+from sqlalchemy import text
+
+
+def run():
+    url = os.getenv("DATABASE_URL")
+    if not url:
+        print("ERROR: DATABASE_URL не задан (проверьте .env)")
+        sys.exit(1)
+
+    with engine.connect() as conn:
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_products_category_lower ON products (lower(category))"))
+        print("OK: индекс ix_products_category_lower")
+        conn.commit()
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,71 @@
+"""
+Миграция expenses.date: строка ISO -> TIMESTAMP с индексом (для /api/finance/summary).
+Значения с часовым поясом ("...Z" из Sklad) переводятся в локальное время сервера, как orders.created_at.
+Нераспознанные строки печатаются и становятся NULL.
+Запуск: cd /var/www/rich-garden/rich-garden-backend && python migrate_expenses_date.py
+"""
+import datetime
+import os
+import sys
+
+# гарантируем загрузку .env из директории бэкенда
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.database import engine
+from sqlalchemy import text, inspect
+
+
+def _parse(value):
+    if value is None or isinstance(value, datetime.datetime):
+        return value
+    try:
+        parsed = datetime.datetime.fromisoformat(str(value).strip())
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+
+def _is_postgres():
+    url = os.getenv("DATABASE_URL", "") or ""
+    return "postgresql" in url.lower()
+
+
+def run():
+    url = os.getenv("DATABASE_URL")
+    if not url:
+        print("ERROR: DATABASE_URL не задан (проверьте .env)")
+        sys.exit(1)
+
+    columns = {c["name"]: c for c in inspect(engine).get_columns("expenses")}
+    if "date" in columns and "CHAR" not in str(columns["date"]["type"]).upper() and "TEXT" not in str(columns["date"]["type"]).upper():
+        print(f"expenses.date уже {columns['date']['type']}, конвертация не нужна")
+    else:
+        with engine.connect() as conn:
+            if "date_ts" not in columns:
+                conn.execute(text("ALTER TABLE expenses ADD COLUMN date_ts TIMESTAMP"))
+            rows = conn.execute(text("SELECT id, date FROM expenses")).fetchall()
+            converted = 0
+            for row_id, raw in rows:
+                parsed = _parse(raw)
+                if parsed is None and raw:
+                    print(f"WARN: expense {row_id}: не удалось разобрать дату {raw!r}")
+                if parsed is not None and not _is_postgres():
+                    # Формат SQLAlchemy DateTime для SQLite: сравнения строк совпадают с хронологией
+                    parsed = parsed.strftime("%Y-%m-%d %H:%M:%S.%f")
+                conn.execute(text("UPDATE expenses SET date_ts = :d WHERE id = :id"), {"d": parsed, "id": row_id})
+                converted += parsed is not None
+            conn.execute(text("ALTER TABLE expenses DROP COLUMN date"))
+            conn.execute(text("ALTER TABLE expenses RENAME COLUMN date_ts TO date"))
+            conn.commit()
+        print(f"OK: expenses.date -> TIMESTAMP ({converted} из {len(rows)} строк)")
+
+    with engine.connect() as conn:
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_expenses_date ON expenses (date)"))
+        conn.commit()
+    print("OK: индекс ix_expenses_date")
+
+
+if __name__ == "__main__":
+    run()
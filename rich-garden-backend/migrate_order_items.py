@@ -0,0 +1,70 @@
+"""
+Миграция: таблица order_items и перенос позиций из JSON orders.items.
+Заказы читаются пачками по id (keyset), каждая пачка — отдельная транзакция, поэтому
+скрипт можно прервать и запустить снова: заказы, у которых уже есть строки, пропускаются.
+Запуск: cd /var/www/rich-garden/rich-garden-backend && python migrate_order_items.py [--batch-size 500]
+"""
+import argparse
+import os
+import sys
+
+# гарантируем загрузку .env из директории бэкенда
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.database import engine
+from app.users import models as user_models  # noqa: F401 (FK orders.user_id)
+from app.products import models as product_models
+from app.orders import models
+from app.orders.repository import parse_items
+from sqlalchemy import select, insert, exists
+
+
+def run(batch_size: int):
+    url = os.getenv("DATABASE_URL")
+    if not url:
+        print("ERROR: DATABASE_URL не задан (проверьте .env)")
+        sys.exit(1)
+
+    models.OrderItem.__table__.create(bind=engine, checkfirst=True)
+    print("OK: таблица order_items")
+
+    with engine.connect() as conn:
+        product_ids = set(conn.execute(select(product_models.Product.id)).scalars())
+
+    Order, OrderItem = models.Order, models.OrderItem
+    last_id, orders_done, rows_done, skipped = 0, 0, 0, 0
+    while True:
+        with engine.begin() as conn:
+            batch = conn.execute(
+                select(Order.id, Order.items)
+                .where(Order.id > last_id)
+                .where(~exists().where(OrderItem.order_id == Order.id))
+                .order_by(Order.id)
+                .limit(batch_size)
+            ).all()
+            if not batch:
+                break
+            rows = []
+            for order_id, items_json in batch:
+                parsed = parse_items(items_json)
+                if not parsed and items_json not in (None, "", "[]"):
+                    skipped += 1
+                    print(f"WARN: order {order_id}: не удалось разобрать items")
+                for r in parsed:
+                    if r["product_id"] not in product_ids:
+                        r["product_id"] = None
+                    rows.append({"order_id": order_id, **r})
+            if rows:
+                conn.execute(insert(OrderItem), rows)
+            last_id = batch[-1][0]
+            orders_done += len(batch)
+            rows_done += len(rows)
+        print(f"... заказов: {orders_done}, позиций: {rows_done} (последний id {last_id})")
+
+    print(f"OK: перенесено заказов {orders_done}, позиций {rows_done}, нераспознано {skipped}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-size", type=int, default=500)
+    run(parser.parse_args().batch_size)
@@ -0,0 +1,80 @@
+"""
+Миграция: таблица order_status_events и перенос истории из JSON orders.history.
+Записи {"status", "time": "%d.%m.%Y %H:%M"} становятся событиями; если время не разобрать —
+берётся orders.created_at. Заказ без истории получает одно событие с текущим статусом.
+Пачки по id (keyset), заказы с событиями пропускаются — можно запускать повторно.
+Запуск: cd /var/www/rich-garden/rich-garden-backend && python migrate_order_status_events.py [--batch-size 500]
+"""
+import argparse
+import datetime
+import json
+import os
+import sys
+
+# гарантируем загрузку .env из директории бэкенда
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.database import engine
+from app.users import models as user_models  # noqa: F401 (FK orders.user_id)
+from app.orders import models
+from sqlalchemy import select, insert, exists
+
+
+def _events(order_id, status, created_at, history_json):
+    try:
+        history = json.loads(history_json) if history_json else []
+    except ValueError:
+        history = []
+    events = []
+    # В JSON новые записи сверху
+    for entry in reversed(history if isinstance(history, list) else []):
+        if not isinstance(entry, dict) or not entry.get("status"):
+            continue
+        try:
+            at = datetime.datetime.strptime(entry.get("time") or "", "%d.%m.%Y %H:%M")
+        except ValueError:
+            at = created_at or datetime.datetime.now()
+        events.append({"order_id": order_id, "status": entry["status"], "at": at, "actor": entry.get("actor")})
+    if not events:
+        events.append({"order_id": order_id, "status": status or "new", "at": created_at or datetime.datetime.now(), "actor": None})
+    return events
+
+
+def run(batch_size: int):
+    url = os.getenv("DATABASE_URL")
+    if not url:
+        print("ERROR: DATABASE_URL не задан (проверьте .env)")
+        sys.exit(1)
+
+    models.OrderStatusEvent.__table__.create(bind=engine, checkfirst=True)
+    print("OK: таблица order_status_events")
+
+    Order, Event = models.Order, models.OrderStatusEvent
+    last_id, orders_done, events_done = 0, 0, 0
+    while True:
+        with engine.begin() as conn:
+            batch = conn.execute(
+                select(Order.id, Order.status, Order.created_at, Order.legacy_history)
+                .where(Order.id > last_id)
+                .where(~exists().where(Event.order_id == Order.id))
+                .order_by(Order.id)
+                .limit(batch_size)
+            ).all()
+            if not batch:
+                break
+            rows = []
+            for order_id, status, created_at, history_json in batch:
+                rows += _events(order_id, status, created_at, history_json)
+            conn.execute(insert(Event), rows)
+            last_id = batch[-1][0]
+            orders_done += len(batch)
+            events_done += len(rows)
+        print(f"... заказов: {orders_done}, событий: {events_done} (последний id {last_id})")
+
+    print(f"OK: перенесено заказов {orders_done}, событий {events_done}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-size", type=int, default=500)
+    run(parser.parse_args().batch_size)
@@ -0,0 +1,30 @@
+"""
+Миграция: индексы ленты заказов — keyset (created_at, id) и фильтр по статусу (status, created_at, id).
+Запуск: cd /var/www/rich-garden/rich-garden-backend && python migrate_orders_list_indexes.py
+"""
+import os
+import sys
+
+# гарантируем загрузку .env из директории бэкенда
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.database import engine
+from sqlalchemy import text
+
+
+def run():
+    url = os.getenv("DATABASE_URL")
+    if not url:
+        print("ERROR: DATABASE_URL не задан (проверьте .env)")
+        sys.exit(1)
+
+    with engine.connect() as conn:
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_orders_created_id ON orders (created_at, id)"))
+        print("OK: индекс ix_orders_created_id")
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_orders_status_created ON orders (status, created_at, id)"))
+        print("OK: индекс ix_orders_status_created")
+        conn.commit()
+
+
+if __name__ == "__main__":
+    run()
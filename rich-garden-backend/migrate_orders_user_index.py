@@ -0,0 +1,31 @@
+"""
+Миграция: составной индекс orders (user_id, created_at) для агрегатов страницы клиентов.
+Запуск: cd /var/www/rich-garden/rich-garden-backend && python migrate_orders_user_index.py
+"""
+import os
+import sys
+
+# гарантируем загрузку .env из директории бэкенда
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.database import engine
+from sqlalchemy import text
+
+
+def run():
+    url = os.getenv("DATABASE_URL")
+    if not url:
+        print("ERROR: DATABASE_URL не задан (проверьте .env)")
+        sys.exit(1)
+
+    with engine.connect() as conn:
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS ix_orders_user_created
+            ON orders (user_id, created_at)
+        """))
+        conn.commit()
+    print("OK: индекс ix_orders_user_created")
+
+
+if __name__ == "__main__":
+    run()
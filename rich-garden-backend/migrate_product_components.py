@@ -0,0 +1,74 @@
+"""
+Миграция: таблица product_components (состав букетов) из JSON products.composition
+и колонка orders.stock_deducted_at (списание товаров заказа, POST /api/orders/{id}/stock/deduct).
+Товары, у которых строки состава уже есть, пропускаются — скрипт можно запускать повторно.
+Запуск: cd /var/www/rich-garden/rich-garden-backend && python migrate_product_components.py [--batch-size 500]
+"""
+import argparse
+import os
+import sys
+
+# гарантируем загрузку .env из директории бэкенда
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.database import engine
+from app.products import models
+from app.products.repository import parse_composition
+from sqlalchemy import select, insert, exists, text, inspect
+
+
+def run(batch_size: int):
+    url = os.getenv("DATABASE_URL")
+    if not url:
+        print("ERROR: DATABASE_URL не задан (проверьте .env)")
+        sys.exit(1)
+
+    models.ProductComponent.__table__.create(bind=engine, checkfirst=True)
+    print("OK: таблица product_components")
+
+    columns = {c["name"] for c in inspect(engine).get_columns("orders")}
+    if "stock_deducted_at" not in columns:
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE orders ADD COLUMN stock_deducted_at TIMESTAMP"))
+        print("OK: колонка orders.stock_deducted_at")
+    else:
+        print("Колонка orders.stock_deducted_at уже есть")
+
+    with engine.connect() as conn:
+        product_ids = set(conn.execute(select(models.Product.id)).scalars())
+
+    Product, ProductComponent = models.Product, models.ProductComponent
+    last_id, products_done, rows_done = 0, 0, 0
+    while True:
+        with engine.begin() as conn:
+            batch = conn.execute(
+                select(Product.id, Product.composition)
+                .where(Product.id > last_id)
+                .where(Product.composition.isnot(None), Product.composition != "[]")
+                .where(~exists().where(ProductComponent.product_id == Product.id))
+                .order_by(Product.id)
+                .limit(batch_size)
+            ).all()
+            if not batch:
+                break
+            rows = []
+            for product_id, composition in batch:
+                for component_id, qty in parse_composition(composition).items():
+                    if component_id == product_id or component_id not in product_ids:
+                        print(f"WARN: product {product_id}: компонент {component_id} не найден, пропущен")
+                        continue
+                    rows.append({"product_id": product_id, "component_id": component_id, "qty": qty})
+            if rows:
+                conn.execute(insert(ProductComponent), rows)
+            last_id = batch[-1][0]
+            products_done += len(batch)
+            rows_done += len(rows)
+        print(f"... букетов: {products_done}, строк состава: {rows_done} (последний id {last_id})")
+
+    print(f"OK: перенесено букетов {products_done}, строк состава {rows_done}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-size", type=int, default=500)
+    run(parser.parse_args().batch_size)
@@ -0,0 +1,79 @@
+"""
+Миграция поиска: колонки products.search_name/search_body (транслит + синонимы, app.search.text),
+их заполнение пачками по id, таблица search_queries (популярные запросы) и на PostgreSQL —
+расширение pg_trgm и GIN-индексы: tsvector по обеим колонкам и триграммы по search_name.
+Повторный запуск безопасен: заполняются только строки с пустым search_name, индексы IF NOT EXISTS.
+Запуск: cd /var/www/rich-garden/rich-garden-backend && python migrate_product_search.py [--batch-size 1000]
+"""
+import argparse
+import os
+import sys
+
+# гарантируем загрузку .env из директории бэкенда
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.database import engine
+from app.products import models as product_models
+from app.products.repository import search_fields
+from app.search import models
+from app.search.repository import SEARCH_VECTOR
+from sqlalchemy import select, update, bindparam, text, inspect
+
+
+def run(batch_size: int):
+    url = os.getenv("DATABASE_URL")
+    if not url:
+        print("ERROR: DATABASE_URL не задан (проверьте .env)")
+        sys.exit(1)
+
+    columns = {c["name"] for c in inspect(engine).get_columns("products")}
+    with engine.begin() as conn:
+        for column in ("search_name", "search_body"):
+            if column not in columns:
+                conn.execute(text(f"ALTER TABLE products ADD COLUMN {column} VARCHAR"))
+                print(f"OK: колонка products.{column}")
+
+    models.SearchQuery.__table__.create(bind=engine, checkfirst=True)
+    print("OK: таблица search_queries")
+
+    Product = product_models.Product
+    stmt = (
+        update(Product.__table__)
+        .where(Product.__table__.c.id == bindparam("_id"))
+        .values(search_name=bindparam("search_name"), search_body=bindparam("search_body"))
+    )
+    last_id, done = 0, 0
+    while True:
+        with engine.begin() as conn:
+            batch = conn.execute(
+                select(Product.id, Product.name, Product.category, Product.description)
+                .where(Product.id > last_id, Product.search_name.is_(None))
+                .order_by(Product.id)
+                .limit(batch_size)
+            ).all()
+            if not batch:
+                break
+            conn.execute(stmt, [
+                {"_id": row.id, **search_fields(row.name, row.category, row.description)} for row in batch
+            ])
+            last_id = batch[-1].id
+            done += len(batch)
+        print(f"... товаров: {done} (последний id {last_id})")
+    print(f"OK: заполнено товаров {done}")
+
+    if engine.dialect.name == "postgresql":
+        with engine.connect() as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_products_search_vector ON products USING gin ({SEARCH_VECTOR})"))
+            print("OK: индекс ix_products_search_vector")
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_products_search_name_trgm ON products USING gin (search_name gin_trgm_ops)"))
+            print("OK: индекс ix_products_search_name_trgm")
+            conn.commit()
+    else:
+        print("SQLite: индексы не нужны, поиск идёт по индексу в памяти (app/search/index.py)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-size", type=int, default=1000)
+    run(parser.parse_args().batch_size)
@@ -0,0 +1,61 @@
+"""
+Миграция recently_viewed: одна строка на (user_id, product_id) и не больше RECENT_VIEWS_LIMIT
+на пользователя.
+1) удаляет строки без пользователя/товара и дубли пар (остаётся самый свежий просмотр);
+2) обрезает историю каждого пользователя до последних RECENT_VIEWS_LIMIT;
+3) создаёт уникальный индекс uq_recently_viewed_user_product (нужен для INSERT ... ON CONFLICT)
+   и ix_recently_viewed_user_viewed_at для списка пользователя.
+Запуск: cd /var/www/rich-garden/rich-garden-backend && python migrate_recently_viewed.py
+"""
+import os
+import sys
+
+# гарантируем загрузку .env из директории бэкенда
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.database import engine
+from app.users.repository import RECENT_VIEWS_LIMIT
+from sqlalchemy import text
+
+
+def _delete_ranked(conn, partition: str, keep: int) -> int:
+    result = conn.execute(text(f"""
+        DELETE FROM recently_viewed WHERE id IN (
+            SELECT id FROM (
+                SELECT id, row_number() OVER (PARTITION BY {partition} ORDER BY viewed_at DESC, id DESC) AS position
+                FROM recently_viewed
+            ) ranked
+            WHERE position > :keep
+        )
+    """), {"keep": keep})
+    return result.rowcount
+
+
+def run():
+    url = os.getenv("DATABASE_URL")
+    if not url:
+        print("ERROR: DATABASE_URL не задан (проверьте .env)")
+        sys.exit(1)
+
+    with engine.connect() as conn:
+        orphans = conn.execute(text(
+            "DELETE FROM recently_viewed WHERE user_id IS NULL OR product_id IS NULL"
+        )).rowcount
+        print(f"OK: удалено строк без пользователя/товара: {orphans}")
+        duplicates = _delete_ranked(conn, "user_id, product_id", 1)
+        print(f"OK: удалено дублей (user_id, product_id): {duplicates}")
+        trimmed = _delete_ranked(conn, "user_id", RECENT_VIEWS_LIMIT)
+        print(f"OK: удалено просмотров сверх {RECENT_VIEWS_LIMIT} на пользователя: {trimmed}")
+        conn.execute(text(
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_recently_viewed_user_product ON recently_viewed (user_id, product_id)"
+        ))
+        print("OK: индекс uq_recently_viewed_user_product")
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_recently_viewed_user_viewed_at ON recently_viewed (user_id, viewed_at)"
+        ))
+        print("OK: индекс ix_recently_viewed_user_viewed_at")
+        conn.commit()
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,39 @@
+"""
+Миграция складского учёта: колонка products.version (оптимистическая блокировка)
+и таблица stock_reservations (резервы под заказы pending_payment).
+Запуск: cd /var/www/rich-garden/rich-garden-backend && python migrate_stock_ledger.py
+"""
+import os
+import sys
+
+# гарантируем загрузку .env из директории бэкенда
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.database import engine
+from app.users import models as user_models  # noqa: F401 (FK orders.user_id)
+from app.products import models as product_models  # noqa: F401 (FK stock_reservations.product_id)
+from app.orders import models as order_models  # noqa: F401 (FK stock_reservations.order_id)
+from app.stock import models
+from sqlalchemy import text, inspect
+
+
+def run():
+    url = os.getenv("DATABASE_URL")
+    if not url:
+        print("ERROR: DATABASE_URL не задан (проверьте .env)")
+        sys.exit(1)
+
+    columns = {c["name"] for c in inspect(engine).get_columns("products")}
+    if "version" not in columns:
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE products ADD COLUMN version INTEGER NOT NULL DEFAULT 1"))
+        print("OK: колонка products.version")
+    else:
+        print("Колонка products.version уже есть")
+
+    models.StockReservation.__table__.create(bind=engine, checkfirst=True)
+    print("OK: таблица stock_reservations")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,77 @@
+"""
+Миграция статистики историй: колонка story_views.last_viewed_day, индекс (story_id, viewed_at),
+таблицы story_views_hourly / story_viewers_daily и их первичное заполнение из story_views.
+Повторные открытия до миграции не записывались, поэтому история роллапа строится по первым просмотрам.
+Запуск: cd /var/www/rich-garden/rich-garden-backend && python migrate_story_stats_rollup.py
+"""
+import os
+import sys
+
+# гарантируем загрузку .env из директории бэкенда
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.database import engine
+from app.stories import models
+from sqlalchemy import text, inspect
+
+
+def _is_postgres():
+    url = os.getenv("DATABASE_URL", "") or ""
+    return "postgresql" in url.lower()
+
+
+def run():
+    url = os.getenv("DATABASE_URL")
+    if not url:
+        print("ERROR: DATABASE_URL не задан (проверьте .env)")
+        sys.exit(1)
+
+    models.StoryViewHourly.__table__.create(bind=engine, checkfirst=True)
+    models.StoryViewerDaily.__table__.create(bind=engine, checkfirst=True)
+    print("OK: таблицы story_views_hourly, story_viewers_daily")
+
+    columns = {c["name"] for c in inspect(engine).get_columns("story_views")}
+
+    with engine.connect() as conn:
+        if "last_viewed_day" not in columns:
+            conn.execute(text("ALTER TABLE story_views ADD COLUMN last_viewed_day DATE"))
+            conn.execute(text("UPDATE story_views SET last_viewed_day = DATE(viewed_at)"))
+            print("OK: колонка story_views.last_viewed_day")
+        else:
+            print("Колонка story_views.last_viewed_day уже есть")
+
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS ix_story_views_story_viewed_at
+            ON story_views (story_id, viewed_at)
+        """))
+        print("OK: индекс ix_story_views_story_viewed_at")
+
+        if _is_postgres():
+            hour_expr = "date_trunc('hour', viewed_at)"
+        else:
+            hour_expr = "strftime('%Y-%m-%d %H:00:00.000000', viewed_at)"
+
+        has_rollup = conn.execute(text("SELECT 1 FROM story_views_hourly LIMIT 1")).fetchone()
+        if has_rollup:
+            print("Роллапы уже заполнены, пропускаем")
+        else:
+            r = conn.execute(text(f"""
+                INSERT INTO story_views_hourly (story_id, hour, views)
+                SELECT story_id, {hour_expr}, COUNT(*)
+                FROM story_views WHERE viewed_at IS NOT NULL
+                GROUP BY story_id, {hour_expr}
+            """))
+            print(f"story_views_hourly: {r.rowcount} строк")
+            r = conn.execute(text("""
+                INSERT INTO story_viewers_daily (story_id, day, unique_viewers)
+                SELECT story_id, DATE(viewed_at), COUNT(*)
+                FROM story_views WHERE viewed_at IS NOT NULL
+                GROUP BY story_id, DATE(viewed_at)
+            """))
+            print(f"story_viewers_daily: {r.rowcount} строк")
+
+        conn.commit()
+
+
+if __name__ == "__main__":
+    run()
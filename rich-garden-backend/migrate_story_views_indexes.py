@@ -0,0 +1,71 @@
+"""
+Миграция story_views: уникальный индекс (story_id, user_id) и внешний ключ на stories.
+Перед созданием индекса удаляет дубликаты просмотров и просмотры удалённых историй.
+Запуск: cd /var/www/rich-garden/rich-garden-backend && python migrate_story_views_indexes.py
+"""
+import os
+import sys
+
+# гарантируем загрузку .env из директории бэкенда
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.database import engine
+from sqlalchemy import text
+
+
+def _is_postgres():
+    url = os.getenv("DATABASE_URL", "") or ""
+    return "postgresql" in url.lower()
+
+
+def run():
+    url = os.getenv("DATABASE_URL")
+    if not url:
+        print("ERROR: DATABASE_URL не задан (проверьте .env)")
+        sys.exit(1)
+
+    with engine.connect() as conn:
+        # 1. Просмотры несуществующих историй (FK раньше не было)
+        r = conn.execute(text("""
+            DELETE FROM story_views
+            WHERE story_id IS NULL OR story_id NOT IN (SELECT id FROM stories)
+        """))
+        print(f"Удалено просмотров удалённых историй: {r.rowcount}")
+
+        # 2. Дубликаты (story_id, user_id): оставляем самый ранний просмотр
+        r = conn.execute(text("""
+            DELETE FROM story_views
+            WHERE id NOT IN (
+                SELECT MIN(id) FROM story_views GROUP BY story_id, user_id
+            )
+        """))
+        print(f"Удалено дубликатов просмотров: {r.rowcount}")
+
+        conn.execute(text("""
+            CREATE UNIQUE INDEX IF NOT EXISTS uq_story_views_story_user
+            ON story_views (story_id, user_id)
+        """))
+        print("OK: индекс uq_story_views_story_user")
+
+        if _is_postgres():
+            conn.execute(text("ALTER TABLE story_views ALTER COLUMN story_id SET NOT NULL"))
+            exists = conn.execute(text("""
+                SELECT 1 FROM information_schema.table_constraints
+                WHERE table_name = 'story_views' AND constraint_name = 'story_views_story_id_fkey'
+            """)).fetchone()
+            if not exists:
+                conn.execute(text("""
+                    ALTER TABLE story_views
+                    ADD CONSTRAINT story_views_story_id_fkey
+                    FOREIGN KEY (story_id) REFERENCES stories (id) ON DELETE CASCADE
+                """))
+            print("OK (PostgreSQL): story_views.story_id -> stories.id ON DELETE CASCADE")
+        else:
+            # SQLite не умеет ALTER TABLE ADD CONSTRAINT; FK появится при пересоздании таблицы
+            print("SQLite: внешний ключ пропущен (целостность обеспечивает repository.delete)")
+
+        conn.commit()
+
+
+if __name__ == "__main__":
+    run()
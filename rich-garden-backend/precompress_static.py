@@ -0,0 +1,65 @@
+"""
+Предсжатые варианты текстовых файлов в app/static (svg, json, css, js, ...): рядом с файлом
+пишутся .gz (и .br, если установлен пакет brotli). CachedStaticFiles отдаёт их клиентам с
+Accept-Encoding при STATIC_PRECOMPRESSED=1. Фото (jpg/webp/avif) уже сжаты — их не трогаем.
+Повторный запуск пересжимает только изменившиеся файлы; вариант, который вышел не меньше
+оригинала, не сохраняется.
+Запуск: cd /var/www/rich-garden/rich-garden-backend && python precompress_static.py
+"""
+import gzip
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.static_files import COMPRESSIBLE_EXTENSIONS
+from app.services.uploads import STATIC_DIR
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MIN_SIZE = 1024  # меньше — выигрыш съедают заголовки
+
+
+def _compressors():
+    yield ".gz", lambda data: gzip.compress(data, compresslevel=9, mtime=0)
+    if brotli is not None:
+        yield ".br", lambda data: brotli.compress(data, quality=11)
+
+
+def run():
+    written = skipped = saved = 0
+    for directory, dirs, names in os.walk(STATIC_DIR):
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        for name in names:
+            if not name.endswith(COMPRESSIBLE_EXTENSIONS):
+                continue
+            path = os.path.join(directory, name)
+            stat = os.stat(path)
+            if stat.st_size < MIN_SIZE:
+                continue
+            data = None
+            for suffix, compress in _compressors():
+                target = path + suffix
+                if os.path.exists(target) and os.stat(target).st_mtime >= stat.st_mtime:
+                    skipped += 1
+                    continue
+                if data is None:
+                    with open(path, "rb") as f:
+                        data = f.read()
+                compressed = compress(data)
+                if len(compressed) >= len(data):
+                    continue
+                with open(target + ".tmp", "wb") as f:
+                    f.write(compressed)
+                os.replace(target + ".tmp", target)
+                written += 1
+                saved += len(data) - len(compressed)
+    print(f"precompressed: {written} written, {skipped} up to date, saved {saved / 1024:.1f} KB"
+          + ("" if brotli else " (brotli не установлен — только .gz)"))
+
+
+if __name__ == "__main__":
+    run()
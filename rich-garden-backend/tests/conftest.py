@@ -0,0 +1,30 @@
+"""
+Тесты идут на временной SQLite: DATABASE_URL задаётся до импорта app (database читает его
+при импорте), .env с боевой БД не используется.
+  cd rich-garden-backend && python -m pytest -q tests
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/test.db"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from app import main  # noqa: F401 (все модели в metadata)
+from app import database
+
+
+@pytest.fixture
+def db():
+    """AsyncSession на пустой схеме; тест получает (loop, session) и гоняет корутины через loop."""
+    database.Base.metadata.drop_all(bind=database.engine)
+    database.Base.metadata.create_all(bind=database.engine)
+    loop = asyncio.new_event_loop()
+    session = database.AsyncSessionLocal()
+    yield loop, session
+    loop.run_until_complete(session.close())
+    loop.run_until_complete(database.async_engine.dispose())
+    loop.close()
@@ -0,0 +1,61 @@
+from app.broadcasts import repository, service
+from app.orders.models import Order
+from app.services import telegram
+from app.services.rate_limit import TokenBucket
+from app.users.models import TelegramUser
+
+
+def _users(db, count, buyers=()):
+    loop, session = db
+    users = [TelegramUser(telegram_id=1000 + i) for i in range(count)]
+    session.add_all(users)
+    loop.run_until_complete(session.flush())
+    for i in buyers:
+        session.add(Order(customer_name="Buyer", total_price=0, items="[]", user_id=users[i].id))
+    loop.run_until_complete(session.commit())
+    return [u.id for u in users]
+
+
+def _fake_telegram(monkeypatch, fail=(), rate_limited=()):
+    sent, limited = [], set()
+
+    async def send_broadcast_message(telegram_id, text):
+        if telegram_id in rate_limited and telegram_id not in limited:
+            limited.add(telegram_id)
+            raise telegram.TelegramRetryAfter(0)
+        sent.append(telegram_id)
+        return telegram_id not in fail
+
+    monkeypatch.setattr(telegram, "send_broadcast_message", send_broadcast_message)
+    monkeypatch.setattr(service, "_bucket", TokenBucket(10000))
+    monkeypatch.setattr(service, "BROADCAST_BATCH_SIZE", 2)
+    return sent
+
+
+def test_job_sends_in_batches_with_retry_after_and_counts_failures(db, monkeypatch):
+    loop, session = db
+    _users(db, 5, buyers=(1,))
+    sent = _fake_telegram(monkeypatch, fail={1003}, rate_limited={1004})
+    job_id = loop.run_until_complete(repository.create(session, "Скидки", "leads", 4)).id
+
+    loop.run_until_complete(service.run_job(job_id))
+    session.expire_all()  # задача шла в своей сессии
+    job = loop.run_until_complete(service.get_job(session, job_id))
+    assert sorted(sent) == [1000, 1002, 1003, 1004]  # 1001 — покупатель, 1004 — после паузы 429
+    assert (job.status, job.success, job.failed, job.progress) == ("done", 3, 1, 100.0)
+
+
+def test_interrupted_job_resumes_after_last_user(db, monkeypatch):
+    loop, session = db
+    ids = _users(db, 4)
+    sent = _fake_telegram(monkeypatch)
+    job = loop.run_until_complete(repository.create(session, "Привет", "all", 4))
+    job.status, job.last_user_id, job.success = "running", ids[1], 2  # рестарт после второй пачки
+    job_id = job.id
+    loop.run_until_complete(session.commit())
+
+    loop.run_until_complete(service.run_job(job_id))
+    session.expire_all()  # задача шла в своей сессии
+    job = loop.run_until_complete(service.get_job(session, job_id))
+    assert sent == [1002, 1003]
+    assert (job.status, job.success) == ("done", 4)
@@ -0,0 +1,18 @@
+import datetime
+
+from app.counters import service
+
+
+def test_failed_flush_keeps_newest_search(monkeypatch):
+    older = datetime.datetime(2026, 10, 1, 12, 0)
+    newer = older + datetime.timedelta(minutes=5)
+    monkeypatch.setattr(service, "_queries", {"розы": [1, 3, older]})
+    monkeypatch.setattr(service, "_pending", 0)
+
+    # упавший flush старше уже накопленного: results остаются от свежего поиска
+    service._merge_back({}, {}, {"розы": [2, 7, older - datetime.timedelta(minutes=1)]})
+    assert service._queries["розы"] == [3, 3, older]
+
+    # упавший flush свежее: берутся его results и last_searched_at
+    service._merge_back({}, {}, {"розы": [1, 9, newer]})
+    assert service._queries["розы"] == [4, 9, newer]
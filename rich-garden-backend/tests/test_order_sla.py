@@ -0,0 +1,56 @@
+import datetime
+
+from pytest import approx
+
+from app.orders import models, repository
+
+T0 = datetime.datetime(2026, 10, 1, 12, 0)
+
+
+def _order(session, *events):
+    """Заказ с журналом статусов: events — (статус, минуты от T0)."""
+    order = models.Order(customer_name="SLA", total_price=0, status=events[-1][0], items="[]")
+    order.status_events = [
+        models.OrderStatusEvent(status=status, at=T0 + datetime.timedelta(minutes=minutes))
+        for status, minutes in events
+    ]
+    session.add(order)
+
+
+def _stats(db, from_status, to_status, **period):
+    loop, session = db
+    loop.run_until_complete(session.flush())
+    return loop.run_until_complete(repository.get_sla_stats(session, from_status, to_status, **period))
+
+
+def test_repeated_status_pairs_with_next_event(db):
+    # new -> pending_payment (5) -> new (10) -> pending_payment (30): первый pending_payment
+    # раньше входа в new на 10-й минуте, пара — new(10) -> pending_payment(30)
+    _order(db[1], ("pending_payment", 0), ("new", 10), ("pending_payment", 30))
+    stats = _stats(db, "new", "pending_payment")
+    assert stats["count"] == 1
+    assert stats["avg_seconds"] == approx(20 * 60)
+
+
+def test_each_cycle_is_a_separate_pair(db):
+    _order(db[1], ("new", 0), ("pending_payment", 5), ("new", 10), ("pending_payment", 30))
+    stats = _stats(db, "new", "pending_payment")
+    assert stats["count"] == 2
+    assert (stats["min_seconds"], stats["max_seconds"]) == approx((5 * 60, 20 * 60))
+
+
+def test_repeated_start_before_one_end_counts_once(db):
+    # оплата с повторной попыткой: pending_payment -> new -> pending_payment -> paid
+    _order(db[1], ("pending_payment", 0), ("new", 3), ("pending_payment", 10), ("paid", 12))
+    stats = _stats(db, "pending_payment", "paid")
+    assert stats["count"] == 1
+    assert stats["avg_seconds"] == approx(12 * 60)
+
+
+def test_unfinished_and_out_of_period(db):
+    _order(db[1], ("new", 0))  # ещё не принят
+    _order(db[1], ("new", -3 * 24 * 60), ("accepted", -3 * 24 * 60 + 15))  # вне периода
+    _order(db[1], ("new", 0), ("accepted", 45))
+    stats = _stats(db, "new", "accepted", date_from=T0.date(), date_to=T0.date())
+    assert stats["count"] == 1
+    assert stats["median_seconds"] == approx(45 * 60)
@@ -0,0 +1,121 @@
+import datetime
+
+import httpx
+from sqlalchemy import select
+
+from app.orders import models, schemas, service as order_service
+from app.outbox import models as outbox_models, repository as outbox_repo, service as outbox
+from app.services import telegram, telegram_client
+from app.users.models import TelegramUser
+
+
+def _events(db):
+    loop, session = db
+    session.expire_all()
+    result = loop.run_until_complete(session.execute(select(outbox_models.OutboxEvent).order_by(outbox_models.OutboxEvent.id)))
+    return result.scalars().all()
+
+
+def _deferred_order(db, telegram_id=42):
+    """Онлайн-заказ, ждущий оплаты: сообщения в группе ещё нет."""
+    loop, session = db
+    user = TelegramUser(telegram_id=telegram_id)
+    order = models.Order(customer_name="Outbox", total_price=1000, status="pending_payment", items="[]",
+                         payment_method="click", user=user)
+    order.status_events = [models.OrderStatusEvent(status="pending_payment", at=datetime.datetime.now())]
+    session.add(order)
+    loop.run_until_complete(session.commit())
+    return order.id
+
+
+def _drain(db, passes=3):
+    loop, _ = db
+    for _ in range(passes):
+        loop.run_until_complete(outbox.drain_once())
+
+
+def test_failed_handler_is_retried_with_backoff(db):
+    loop, session = db
+    order_id = _deferred_order(db)
+    loop.run_until_complete(outbox_repo.add(session, "order.new", order_id, "test:new"))
+    loop.run_until_complete(session.commit())
+    event_id = _events(db)[0].id
+    calls = []
+
+    async def failing(db_, order_id_, payload):
+        calls.append(order_id_)
+        raise RuntimeError("telegram is down")
+
+    loop.run_until_complete(outbox.process_event(event_id, {"order.new": failing}))
+    event = _events(db)[0]
+    assert (event.status, event.attempts, event.last_error) == ("pending", 1, "telegram is down")
+    assert event.next_attempt_at > datetime.datetime.now()
+
+    async def ok(db_, order_id_, payload):
+        calls.append(order_id_)
+
+    loop.run_until_complete(outbox.process_event(event_id, {"order.new": ok}))
+    assert _events(db)[0].status == "done"
+    assert calls == [order_id, order_id]
+
+
+def test_manual_confirmation_of_deferred_order_sends_receipt_once(db, monkeypatch):
+    loop, session = db
+    order_id = _deferred_order(db)
+    receipts = []
+
+    async def send_order_notification(order, items_detail, images=None):
+        return 101
+
+    async def send_customer_receipt(telegram_id, order, items_detail):
+        receipts.append((telegram_id, order["id"]))
+        return True
+
+    monkeypatch.setattr(telegram, "send_order_notification", send_order_notification)
+    monkeypatch.setattr(telegram, "send_customer_receipt", send_customer_receipt)
+
+    loop.run_until_complete(order_service.update_order_status(
+        session, order_id, schemas.OrderUpdateStatus(status="new", actor="admin")))
+    _drain(db)
+    # повторный переход того же заказа: чек уже в outbox под тем же ключом
+    loop.run_until_complete(order_service.update_order_status(
+        session, order_id, schemas.OrderUpdateStatus(status="processing", actor="admin")))
+    _drain(db)
+
+    assert receipts == [(42, order_id)]
+    assert {e.event_type: e.status for e in _events(db)}["order.receipt"] == "done"
+    assert [e.idempotency_key for e in _events(db) if e.event_type == "order.receipt"] == [f"order:{order_id}:receipt"]
+
+
+def _telegram_answers(monkeypatch, status_code, body):
+    client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(status_code, json=body)))
+    monkeypatch.setattr(telegram_client, "get_client", lambda: client)
+    monkeypatch.setattr(telegram, "TELEGRAM_BOT_TOKEN", "1:test")
+    monkeypatch.setattr(telegram, "TELEGRAM_GROUP_BOT_TOKEN", "2:test")
+    monkeypatch.setattr(telegram, "TELEGRAM_GROUP_ID", "-1")
+
+
+def test_receipt_rate_limited_by_telegram_is_retried(db, monkeypatch):
+    loop, session = db
+    _telegram_answers(monkeypatch, 429, {"ok": False, "description": "Too Many Requests", "parameters": {"retry_after": 5}})
+    order_id = _deferred_order(db)
+    loop.run_until_complete(outbox_repo.add(session, "order.receipt", order_id, f"order:{order_id}:receipt", {}))
+    loop.run_until_complete(session.commit())
+
+    _drain(db, passes=1)
+    event = _events(db)[0]
+    assert (event.status, event.attempts) == ("pending", 1)
+
+
+def test_status_edit_failure_is_retried(db, monkeypatch):
+    loop, session = db
+    _telegram_answers(monkeypatch, 502, {"ok": False, "description": "Bad Gateway"})
+    order_id = _deferred_order(db)
+    order = loop.run_until_complete(order_service.get_order(session, order_id))
+    order.telegram_message_id = 101
+    loop.run_until_complete(outbox_repo.add(session, "order.status", order_id, "test:status"))
+    loop.run_until_complete(session.commit())
+
+    _drain(db, passes=1)
+    event = _events(db)[0]
+    assert (event.status, event.attempts) == ("pending", 1)
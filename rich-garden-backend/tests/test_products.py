@@ -0,0 +1,32 @@
+from sqlalchemy import select
+
+from app.orders import models as order_models
+from app.products import repository
+from app.products.models import Product, ProductComponent
+from app.stock.models import StockReservation
+
+
+def test_delete_clears_references_like_foreign_keys(db):
+    loop, session = db
+    flower, bouquet = Product(name="Роза", stock_quantity=5), Product(name="Букет", stock_quantity=0)
+    session.add_all([flower, bouquet])
+    order = order_models.Order(customer_name="Delete", total_price=0, items="[]")
+    session.add(order)
+    loop.run_until_complete(session.flush())
+    flower_id, bouquet_id, order_id = flower.id, bouquet.id, order.id
+    session.add_all([
+        ProductComponent(product_id=bouquet_id, component_id=flower_id, qty=3),
+        order_models.OrderItem(order_id=order_id, product_id=flower_id, name="Роза", quantity=2),
+    ])
+    loop.run_until_complete(session.commit())
+
+    assert loop.run_until_complete(repository.delete(session, flower_id))
+    loop.run_until_complete(session.commit())
+
+    # SQLite без PRAGMA foreign_keys: CASCADE / SET NULL делает сам repository.delete
+    items = loop.run_until_complete(session.execute(
+        select(order_models.OrderItem.product_id, order_models.OrderItem.name)
+        .filter(order_models.OrderItem.order_id == order_id)))
+    assert items.all() == [(None, "Роза")]
+    for model in (ProductComponent, StockReservation):
+        assert loop.run_until_complete(session.execute(select(model))).first() is None
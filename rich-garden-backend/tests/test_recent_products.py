@@ -0,0 +1,22 @@
+from app.products.models import Product
+from app.users import service
+from app.users.models import TelegramUser
+from app.counters import service as counters_service
+
+
+def test_recent_products_are_catalog_cards(db, monkeypatch):
+    loop, session = db
+    monkeypatch.setattr(counters_service, "_recent", {})
+    monkeypatch.setattr(counters_service, "_views", {})
+    session.add(TelegramUser(telegram_id=42))
+    product = Product(name="Розы", price_raw=350000, stock_quantity=2, cost_price=200000, composition="[]")
+    session.add(product)
+    loop.run_until_complete(session.commit())
+    counters_service.add_view(product.id, 42)
+
+    items = loop.run_until_complete(service.get_recent_products(session, 42))
+    data = [item.model_dump() for item in items]
+    assert [item["id"] for item in data] == [product.id]
+    assert data[0]["in_stock"] is True
+    for column in ("cost_price", "version", "search_name", "search_body"):
+        assert column not in data[0]
@@ -0,0 +1,50 @@
+import asyncio
+import os
+
+import httpx
+from starlette.applications import Starlette
+from starlette.routing import Mount
+
+from app.services import static_files
+from app.services.static_files import CachedStaticFiles
+
+
+def _get(app, url, **headers):
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await client.get(url, headers=headers)
+    return asyncio.run(run())
+
+
+def _app(directory):
+    return Starlette(routes=[Mount("/static", app=CachedStaticFiles(directory=str(directory)))])
+
+
+def test_precompressed_variant_revalidates_with_its_own_etag(tmp_path):
+    (tmp_path / "logo.svg").write_text("<svg/>")
+    (tmp_path / "logo.svg.br").write_bytes(b"br-bytes")
+    app = _app(tmp_path)
+
+    first = _get(app, "/static/logo.svg", **{"accept-encoding": "br"})
+    assert first.headers["content-encoding"] == "br"
+    assert _get(app, "/static/logo.svg", **{"accept-encoding": "br", "if-none-match": first.headers["etag"]}).status_code == 304
+
+    # ETag несжатого файла не подходит к br-варианту: клиенту нужно тело
+    identity = _get(app, "/static/logo.svg").headers["etag"]
+    assert identity != first.headers["etag"]
+    stale = _get(app, "/static/logo.svg", **{"accept-encoding": "br", "if-none-match": identity})
+    assert stale.status_code == 200 and stale.headers["content-encoding"] == "br"
+
+
+def test_legacy_file_from_memory_is_revalidated_after_ttl(tmp_path, monkeypatch):
+    path = tmp_path / "old.jpg"
+    path.write_bytes(b"one")
+    app = _app(tmp_path)
+    assert _get(app, "/static/old.jpg").content == b"one"
+
+    path.write_bytes(b"two!")
+    os.utime(path, (1, 1))
+    monkeypatch.setattr(static_files, "STATIC_REVALIDATE_SECONDS", 3600)
+    assert _get(app, "/static/old.jpg").content == b"one"  # в пределах TTL — из памяти без stat
+    monkeypatch.setattr(static_files, "STATIC_REVALIDATE_SECONDS", 0)
+    assert _get(app, "/static/old.jpg").content == b"two!"
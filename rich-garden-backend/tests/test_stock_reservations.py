@@ -0,0 +1,109 @@
+import datetime
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select, update
+
+from app.orders import models, repository as order_repo, service as order_service
+from app.products.models import Product
+from app.stock import models as stock_models, service as stock_service
+
+
+def _run(db, coro):
+    return db[0].run_until_complete(coro)
+
+
+def _setup(db, stocks, quantities):
+    """Товары с остатками stocks и заказ на quantities (по индексам товаров), ещё не оплаченный."""
+    _, session = db
+    products = [Product(name=f"P{i}", stock_quantity=stock) for i, stock in enumerate(stocks)]
+    session.add_all(products)
+    _run(db, session.flush())
+    order = models.Order(customer_name="Stock", total_price=0, status="new", items="[]")
+    order.status_events = [models.OrderStatusEvent(status="new", at=datetime.datetime.now())]
+    session.add(order)
+    _run(db, session.flush())
+    session.add_all([
+        models.OrderItem(order_id=order.id, product_id=products[i].id, name=f"P{i}", quantity=qty)
+        for i, qty in quantities.items()
+    ])
+    _run(db, session.commit())
+    return order, [p.id for p in products]
+
+
+def _stock(db, ids):
+    rows = _run(db, db[1].execute(select(Product.id, Product.stock_quantity).filter(Product.id.in_(ids))))
+    stock = dict(rows.all())
+    return [stock[pid] for pid in ids]
+
+
+def _reservations(db, order_id):
+    result = _run(db, db[1].execute(
+        select(stock_models.StockReservation.product_id, stock_models.StockReservation.quantity,
+               stock_models.StockReservation.status)
+        .filter(stock_models.StockReservation.order_id == order_id)
+        .order_by(stock_models.StockReservation.id)
+    ))
+    return [tuple(row) for row in result.all()]
+
+
+def _set_status(db, order, status):
+    _run(db, order_repo.set_status(db[1], order, status, actor="test"))
+    _run(db, db[1].commit())
+    _run(db, db[1].refresh(order, attribute_names=["stock_deducted_at"]))
+
+
+def test_full_reservation_is_committed_on_payment(db):
+    order, ids = _setup(db, [5], {0: 2})
+    _set_status(db, order, "pending_payment")
+    assert _stock(db, ids) == [3]
+    _set_status(db, order, "paid")
+    assert _reservations(db, order.id) == [(ids[0], 2, "committed")]
+    assert order.stock_deducted_at is not None
+
+
+def test_partial_reservation_leaves_owed_shortage_for_manual_deduction(db):
+    order, ids = _setup(db, [0, 3], {0: 2, 1: 5})
+    order_id = order.id
+    _set_status(db, order, "pending_payment")  # не 409: оплата не блокируется
+    assert _stock(db, ids) == [0, 0]
+    assert _reservations(db, order.id) == [(ids[1], 3, "active"), (ids[0], 2, "short"), (ids[1], 2, "short")]
+
+    _set_status(db, order, "paid")
+    assert order.stock_deducted_at is None  # нехватка не списана — заказ не помечен
+    assert [r[2] for r in _reservations(db, order.id)] == ["committed", "owed", "owed"]
+
+    # товара всё ещё нет: 409, ничего не меняется
+    with pytest.raises(HTTPException) as error:
+        _run(db, order_service.deduct_order_stock(db[1], order_id))
+    assert error.value.status_code == 409
+    _run(db, db[1].rollback())
+
+    _run(db, db[1].execute(update(Product).values(stock_quantity=10)))
+    _run(db, db[1].commit())
+    result = _run(db, order_service.deduct_order_stock(db[1], order_id))
+    assert sorted((m["product_id"], m["quantity"]) for m in result["movements"]) == [(ids[0], -2), (ids[1], -2)]
+    assert result["stock_deducted_at"] is not None
+    assert _stock(db, ids) == [8, 8]  # резерв (3 шт.) второй раз не списан
+    assert [r[2] for r in _reservations(db, order_id)] == ["committed"] * 3
+
+
+def test_expire_due_returns_reserved_stock_and_closes_shortage(db):
+    order, ids = _setup(db, [1], {0: 3})
+    _set_status(db, order, "pending_payment")
+    _run(db, db[1].execute(update(stock_models.StockReservation).values(
+        expires_at=datetime.datetime.now() - datetime.timedelta(minutes=1))))
+    _run(db, db[1].commit())
+
+    assert _run(db, stock_service.expire_due()) == 2
+    assert _stock(db, ids) == [1]
+    assert [r[2] for r in _reservations(db, order.id)] == ["expired", "expired"]
+    assert _run(db, stock_service.expire_due()) == 0
+
+
+def test_cancel_releases_reserved_stock(db):
+    order, ids = _setup(db, [4], {0: 6})
+    _set_status(db, order, "pending_payment")
+    _set_status(db, order, "cancelled")
+    assert _stock(db, ids) == [4]
+    assert [r[2] for r in _reservations(db, order.id)] == ["released", "released"]
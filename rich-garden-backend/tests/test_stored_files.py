@@ -0,0 +1,44 @@
+import json
+
+from app.products.models import Product
+from app.services import uploads
+from app.stored_files import repository, service
+
+A, B, C = ("a1" * 16, "b2" * 16, "c3" * 16)
+
+
+def _url(file_hash, size="card"):
+    return f"/static/uploads/img/{uploads.fanout(file_hash)}-{size}.webp"
+
+
+def _refcounts(db):
+    loop, session = db
+    return {h: n for h, n in loop.run_until_complete(repository.get_refcounts(session)).items() if n}
+
+
+def test_after_flush_tracks_reference_deltas(db):
+    loop, session = db
+    product = Product(name="Букет", image=_url(A), images=json.dumps([_url(A, "full"), _url(B)]))
+    session.add(product)
+    loop.run_until_complete(session.commit())
+    assert _refcounts(db) == {A: 2, B: 1}
+
+    product.image = _url(C)
+    product.images = json.dumps([_url(B), "/static/uploads/old-uuid.jpg"])  # старые файлы без хэша не считаются
+    loop.run_until_complete(session.commit())
+    assert _refcounts(db) == {B: 1, C: 1}
+
+    # пересчёт по всей БД совпадает с тем, что накопил слушатель
+    assert dict(loop.run_until_complete(service.recount(session))) == {B: 1, C: 1}
+
+    loop.run_until_complete(session.delete(product))
+    loop.run_until_complete(session.commit())
+    assert _refcounts(db) == {}
+
+
+def test_rolled_back_flush_does_not_change_refcounts(db):
+    loop, session = db
+    session.add(Product(name="Черновик", image=_url(A)))
+    loop.run_until_complete(session.flush())
+    loop.run_until_complete(session.rollback())
+    assert _refcounts(db) == {}
@@ -0,0 +1,28 @@
+from app.services import storage
+from app.telegram_files import service
+
+
+def test_file_ids_are_hashed_off_the_event_loop_and_invalidated_on_change(db, tmp_path, monkeypatch):
+    loop, _ = db
+    photo = tmp_path / "photo.jpg"
+    photo.write_bytes(b"first")
+    offloaded = []
+    run_io = storage.run_io
+
+    async def counting_run_io(fn, *args):
+        offloaded.append(fn.__name__)
+        return await run_io(fn, *args)
+
+    monkeypatch.setattr(storage, "run_io", counting_run_io)
+    monkeypatch.setattr(service, "_cache", {})
+
+    loop.run_until_complete(service.remember("1", {str(photo): "file-1"}))
+    assert loop.run_until_complete(service.lookup("1", [str(photo)])) == {str(photo): "file-1"}
+    assert loop.run_until_complete(service.lookup("2", [str(photo)])) == {}  # другой бот
+
+    service._cache.clear()  # рестарт: file_id берётся из telegram_files
+    assert loop.run_until_complete(service.lookup("1", [str(photo)])) == {str(photo): "file-1"}
+
+    photo.write_bytes(b"second photo")  # новое содержимое — старый file_id не годится
+    assert loop.run_until_complete(service.lookup("1", [str(photo)])) == {}
+    assert offloaded == ["_content_hashes"] * 5